@@ -42,6 +42,8 @@ class LLMProfile(BaseModel):
     description: Optional[str] = None
     api_key_env: Optional[str] = None
     top_p: Optional[float] = None
+    # Pooled connections to base_url (shared by profiles on the same upstream)
+    max_connections: Optional[int] = None
 
 
 class AgentTool(BaseModel):
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Webhook load test for gateway-bot
+
+Fires N synthetic Telegram updates (with a share of Telegram-style retries of
+the same update_id) at /telegram/webhook through the ASGI app and reports
+webhook response latency, duplicates, queue drain time and the peak
+concurrency per job type.
+
+Update processing (handle_telegram_webhook) is replaced by a sleep of a
+fixed duration per update type, so the test measures the webhook and job
+queue, not the downstream services.
+
+Modes:
+  - inline: WEBHOOK_ASYNC=false, update processed inside the request (old behaviour)
+  - queued: WEBHOOK_ASYNC=true, request only enqueues the job
+
+Usage:
+    python bench_webhook.py [--updates 1000] [--senders 50] [--duplicates 0.1]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "bench-token")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from fastapi import FastAPI
+
+import http_api
+from webhook_jobs import classify_update
+
+# Simulated processing time per job type, seconds
+PROCESSING_S = {"chat": 0.2, "vision": 0.5, "voice": 0.3, "document": 1.5}
+
+
+def make_updates(count: int, duplicates: float):
+    updates = []
+    for i in range(count):
+        roll = random.random()
+        message = {
+            "message_id": i,
+            "from": {"id": 1000 + i % 200, "username": f"user{i % 200}"},
+            "chat": {"id": 1000 + i % 200, "type": "private"},
+        }
+        if roll < 0.05:
+            message["document"] = {"file_id": f"doc{i}", "file_name": "report.pdf", "mime_type": "application/pdf"}
+        elif roll < 0.15:
+            message["photo"] = [{"file_id": f"photo{i}"}]
+        elif roll < 0.20:
+            message["voice"] = {"file_id": f"voice{i}"}
+        else:
+            message["text"] = f"Повідомлення {i}"
+        updates.append({"update_id": 500000 + i, "message": message})
+
+    # Telegram re-sends an update when the webhook is slow
+    updates += random.sample(updates, int(count * duplicates))
+    random.shuffle(updates)
+    return updates
+
+
+async def run(mode: str, updates, senders: int):
+    http_api.WEBHOOK_ASYNC = mode == "queued"
+    active = {job_type: 0 for job_type in PROCESSING_S}
+    peak = dict(active)
+    processed = 0
+
+    async def fake_handle(agent_config, update):
+        nonlocal processed
+        job_type = classify_update(update.message)
+        active[job_type] += 1
+        peak[job_type] = max(peak[job_type], active[job_type])
+        await asyncio.sleep(PROCESSING_S[job_type])
+        active[job_type] -= 1
+        processed += 1
+        return {"ok": True}
+
+    http_api.handle_telegram_webhook = fake_handle
+    http_api.webhook_jobs = http_api.WebhookJobQueue(lambda agent_config, update: http_api.handle_telegram_webhook(agent_config, update))
+
+    app = FastAPI()
+    app.include_router(http_api.router)
+    limit = asyncio.Semaphore(senders)
+    latencies = []
+    statuses = {}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://gateway") as client:
+        async def send(update):
+            async with limit:
+                start = time.perf_counter()
+                response = await client.post("/telegram/webhook", json=update)
+                latencies.append((time.perf_counter() - start) * 1000)
+                body = response.json()
+                key = "duplicate" if body.get("duplicate") else str(response.status_code)
+                statuses[key] = statuses.get(key, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(send(update) for update in updates))
+        acked = time.perf_counter() - start
+
+        if mode == "queued":
+            await http_api.webhook_jobs.stop(drain_timeout=600)
+        drained = time.perf_counter() - start
+
+    latencies.sort()
+    print(
+        f"{mode:<7} responses: {len(updates) / acked:7.1f}/s  "
+        f"p50={statistics.median(latencies):7.1f} ms  p99={latencies[int(len(latencies) * 0.99)]:7.1f} ms  "
+        f"all answered in {acked:5.2f}s, processed {processed} in {drained:5.2f}s"
+    )
+    print(f"        statuses={statuses}  peak concurrency={peak}")
+
+
+async def main_async(args):
+    random.seed(7)
+    updates = make_updates(args.updates, args.duplicates)
+    print(
+        f"{len(updates)} webhook calls ({args.updates} unique updates), {args.senders} concurrent senders, "
+        f"processing {PROCESSING_S}\n"
+    )
+    for mode in ("inline", "queued"):
+        await run(mode, updates, args.senders)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="gateway-bot webhook load test")
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--senders", type=int, default=50)
+    parser.add_argument("--duplicates", type=float, default=0.1)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
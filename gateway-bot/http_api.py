@@ -6,10 +6,9 @@ import asyncio
 import base64
 import logging
 import os
-import time
 import httpx
 from pathlib import Path
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Optional, List
 from datetime import datetime
 from dataclasses import dataclass
 
@@ -18,6 +17,8 @@ from pydantic import BaseModel
 
 from router_client import send_to_router
 from memory_client import memory_client
+from ttl_cache import create_cache, cache_stats
+from webhook_jobs import WebhookJobQueue, QueueFull, mark_reply_sent
 from services.doc_service import (
     parse_document,
     ingest_document,
@@ -171,7 +172,7 @@ AGENT_REGISTRY: Dict[str, AgentConfig] = {
 # 3. Створіть endpoint (опціонально, якщо потрібен окремий webhook):
 #    @router.post("/new_agent/telegram/webhook")
 #    async def new_agent_telegram_webhook(update: TelegramUpdate):
-#        return await handle_telegram_webhook(NEW_AGENT_CONFIG, update)
+#        return await accept_telegram_webhook(NEW_AGENT_CONFIG, update)
 #
 # Новий агент автоматично отримає:
 # - Обробку фото через Swapper vision-8b
@@ -196,11 +197,6 @@ GREENFOOD_SYSTEM_PROMPT = GREENFOOD_CONFIG.system_prompt
 # Request Models
 # ========================================
 
-# DRUID webhook endpoint
-@router.post("/druid/telegram/webhook")
-async def druid_telegram_webhook(update: TelegramUpdate):
-    return await handle_telegram_webhook(DRUID_CONFIG, update)
-
 class TelegramUpdate(BaseModel):
     """Simplified Telegram update model"""
     update_id: Optional[int] = None
@@ -296,25 +292,25 @@ def requires_complex_reasoning(text: str) -> bool:
     return any(keyword in lower for keyword in COMPLEX_REASONING_KEYWORDS)
 
 
-LAST_RESPONSE_CACHE: Dict[Tuple[str, str], Dict[str, Any]] = {}
 LAST_RESPONSE_TTL = float(os.getenv("TELEGRAM_LAST_RESPONSE_TTL", "15"))
+LAST_RESPONSE_CACHE_MAX_SIZE = int(os.getenv("TELEGRAM_LAST_RESPONSE_CACHE_MAX_SIZE", "2048"))
 
+# Остання відповідь на (agent_id, chat_id): повтор того ж тексту в межах TTL не йде в Router
+LAST_RESPONSE_CACHE = create_cache("last_response", max_size=LAST_RESPONSE_CACHE_MAX_SIZE, ttl=LAST_RESPONSE_TTL)
 
-def get_cached_response(agent_id: str, chat_id: str, text: str) -> Optional[str]:
-    entry = LAST_RESPONSE_CACHE.get((agent_id, chat_id))
-    if not entry:
-        return None
-    if entry["text"] == text and time.time() - entry["ts"] < LAST_RESPONSE_TTL:
+
+async def get_cached_response(agent_id: str, chat_id: str, text: str) -> Optional[str]:
+    entry = await LAST_RESPONSE_CACHE.get(f"{agent_id}:{chat_id}")
+    if entry and entry["text"] == text:
         return entry["answer"]
     return None
 
 
-def store_response_cache(agent_id: str, chat_id: str, text: str, answer: str) -> None:
-    LAST_RESPONSE_CACHE[(agent_id, chat_id)] = {
+async def store_response_cache(agent_id: str, chat_id: str, text: str, answer: str) -> None:
+    await LAST_RESPONSE_CACHE.set(f"{agent_id}:{chat_id}", {
         "text": text,
         "answer": answer,
-        "ts": time.time(),
-    }
+    })
 
 
 def _resolve_stt_upload_url() -> str:
@@ -370,6 +366,7 @@ async def send_telegram_message(chat_id: str, text: str, bot_token: Optional[str
         async with httpx.AsyncClient() as client:
             response = await client.post(url, json=payload, timeout=10.0)
             response.raise_for_status()
+            mark_reply_sent()
             return True
     except Exception as e:
         logger.error(f"Failed to send Telegram message: {e}")
@@ -966,7 +963,7 @@ async def handle_telegram_webhook(
     mentioned_bots = extract_bot_mentions(text)
     needs_complex_reasoning = requires_complex_reasoning(text)
     
-    cached_answer = get_cached_response(agent_config.agent_id, chat_id, text)
+    cached_answer = await get_cached_response(agent_config.agent_id, chat_id, text)
     if cached_answer:
         await send_telegram_message(chat_id, cached_answer, telegram_token)
         await memory_client.save_chat_turn(
@@ -1099,7 +1096,7 @@ async def handle_telegram_webhook(
             },
         )
         
-        store_response_cache(agent_config.agent_id, chat_id, text, answer_text)
+        await store_response_cache(agent_config.agent_id, chat_id, text, answer_text)
         
         return {"ok": True, "agent": agent_config.agent_id}
     else:
@@ -1109,6 +1106,65 @@ async def handle_telegram_webhook(
         return {"ok": False, "error": error_msg}
 
 
+# ========================================
+# Webhook Job Queue
+# ========================================
+
+# false — обробляти update прямо в запиті (як раніше), для налагодження
+WEBHOOK_ASYNC = os.getenv("WEBHOOK_ASYNC", "true").lower() not in ("0", "false", "no")
+
+webhook_jobs = WebhookJobQueue(lambda agent_config, update: handle_telegram_webhook(agent_config, update))
+
+
+async def accept_telegram_webhook(agent_config: AgentConfig, update: TelegramUpdate) -> Dict[str, Any]:
+    """
+    Перевірити update, відкинути дублікат, поставити job у чергу і одразу
+    відповісти Telegram (щоб він не повторював повільні webhook).
+    """
+    if not update.message:
+        # edited_message, callback_query тощо не обробляються
+        return {"ok": True, "ignored": True}
+    if not agent_config.get_telegram_token():
+        raise HTTPException(status_code=500, detail=f"Telegram token not configured for {agent_config.name}")
+    
+    if not WEBHOOK_ASYNC:
+        return await handle_telegram_webhook(agent_config, update)
+    
+    try:
+        job = await webhook_jobs.enqueue(agent_config, update)
+    except QueueFull as e:
+        logger.warning(f"{agent_config.name}: webhook queue full ({e}), asking Telegram to retry")
+        raise HTTPException(status_code=503, detail="Webhook queue is full", headers={"Retry-After": "5"})
+    
+    if job is None:
+        logger.info(f"{agent_config.name}: duplicate update {update.update_id} ignored")
+        return {"ok": True, "duplicate": True}
+    return {"ok": True, "queued": True, "job_id": job.job_id, "type": job.job_type}
+
+
+@router.get("/webhook/jobs")
+async def list_webhook_jobs(status: Optional[str] = None, limit: int = 50):
+    """Статистика черги та останні jobs (опційно з фільтром за статусом)"""
+    return {
+        "stats": webhook_jobs.stats(),
+        "jobs": webhook_jobs.recent(limit=min(limit, 500), status=status),
+    }
+
+
+@router.get("/webhook/jobs/{job_id}")
+async def get_webhook_job(job_id: str):
+    """Статус окремого job"""
+    job = webhook_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@router.on_event("shutdown")
+async def stop_webhook_jobs():
+    await webhook_jobs.stop()
+
+
 # ========================================
 # Endpoints
 # ========================================
@@ -1130,7 +1186,9 @@ async def telegram_webhook(update: TelegramUpdate):
     }
     """
     try:
-        return await handle_telegram_webhook(DAARWIZZ_CONFIG, update)
+        return await accept_telegram_webhook(DAARWIZZ_CONFIG, update)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error handling DAARWIZZ Telegram webhook: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -1738,6 +1796,7 @@ async def send_telegram_message(chat_id: str, text: str, bot_token: str = None):
         async with httpx.AsyncClient() as client:
             response = await client.post(url, json=payload, timeout=10.0)
             response.raise_for_status()
+            mark_reply_sent()
             logger.info(f"Telegram message sent to chat {chat_id}")
     except Exception as e:
         logger.error(f"Error sending Telegram message: {e}")
@@ -1753,7 +1812,9 @@ async def helion_telegram_webhook(update: TelegramUpdate):
     Handle Telegram webhook for Helion agent.
     """
     try:
-        return await handle_telegram_webhook(HELION_CONFIG, update)
+        return await accept_telegram_webhook(HELION_CONFIG, update)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error handling Helion Telegram webhook: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -1769,12 +1830,32 @@ async def greenfood_telegram_webhook(update: TelegramUpdate):
     Handle Telegram webhook for GREENFOOD agent.
     """
     try:
-        return await handle_telegram_webhook(GREENFOOD_CONFIG, update)
+        return await accept_telegram_webhook(GREENFOOD_CONFIG, update)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error handling GREENFOOD Telegram webhook: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ========================================
+# DRUID Telegram Webhook
+# ========================================
+
+@router.post("/druid/telegram/webhook")
+async def druid_telegram_webhook(update: TelegramUpdate):
+    """
+    Handle Telegram webhook for DRUID agent.
+    """
+    try:
+        return await accept_telegram_webhook(DRUID_CONFIG, update)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error handling DRUID Telegram webhook: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # Legacy code - will be removed after testing
 async def _old_helion_telegram_webhook(update: TelegramUpdate):
     """Стара версія - використовується для тестування"""
@@ -2151,5 +2232,7 @@ async def health():
         "status": "healthy",
         "agents": agents_info,
         "agents_count": len(AGENT_REGISTRY),
+        "caches": cache_stats(),
+        "webhook_jobs": webhook_jobs.stats() if WEBHOOK_ASYNC else None,
         "timestamp": datetime.utcnow().isoformat(),
     }
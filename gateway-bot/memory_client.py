@@ -1,15 +1,17 @@
 import asyncio
 import os
 import logging
-import time
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 import httpx
 
+from ttl_cache import create_cache
+
 logger = logging.getLogger(__name__)
 
 MEMORY_SERVICE_URL = os.getenv("MEMORY_SERVICE_URL", "http://memory-service:8000")
 CONTEXT_CACHE_TTL = float(os.getenv("MEMORY_CONTEXT_CACHE_TTL", "5"))
+CONTEXT_CACHE_MAX_SIZE = int(os.getenv("MEMORY_CONTEXT_CACHE_MAX_SIZE", "2048"))
 
 
 class MemoryClient:
@@ -18,17 +20,19 @@ class MemoryClient:
     def __init__(self, base_url: str = MEMORY_SERVICE_URL):
         self.base_url = base_url.rstrip("/")
         self.timeout = 10.0
-        self._context_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        # Ключ без limit, щоб save_chat_turn інвалідував запис одним delete
+        self._context_cache = create_cache(
+            "memory_context", max_size=CONTEXT_CACHE_MAX_SIZE, ttl=CONTEXT_CACHE_TTL
+        )
     
     def _cache_key(
         self,
         user_id: str,
         agent_id: str,
         team_id: str,
-        channel_id: Optional[str],
-        limit: int
+        channel_id: Optional[str]
     ) -> str:
-        return f"{user_id}:{agent_id}:{team_id}:{channel_id}:{limit}"
+        return f"{user_id}:{agent_id}:{team_id}:{channel_id}"
     
     async def get_context(
         self,
@@ -41,11 +45,10 @@ class MemoryClient:
         """
         Отримати контекст пам'яті для діалогу
         """
-        cache_key = self._cache_key(user_id, agent_id, team_id, channel_id, limit)
-        cached = self._context_cache.get(cache_key)
-        now = time.monotonic()
-        if cached and now - cached[0] < CONTEXT_CACHE_TTL:
-            return cached[1]
+        cache_key = self._cache_key(user_id, agent_id, team_id, channel_id)
+        cached = await self._context_cache.get(cache_key)
+        if cached and cached.get("limit") == limit:
+            return cached["context"]
         
         try:
             async with httpx.AsyncClient(timeout=self.timeout) as client:
@@ -97,7 +100,7 @@ class MemoryClient:
                     "recent_events": events,
                     "dialog_summaries": summaries
                 }
-                self._context_cache[cache_key] = (now, result)
+                await self._context_cache.set(cache_key, {"limit": limit, "context": result})
                 return result
         except Exception as e:
             logger.warning(f"Memory context fetch failed: {e}")
@@ -121,6 +124,9 @@ class MemoryClient:
     ) -> bool:
         """
         Зберегти один turn діалогу (повідомлення + відповідь)
+        
+        Кешований контекст цього діалогу інвалідується, щоб наступний
+        get_context побачив новий turn.
         """
         try:
             async with httpx.AsyncClient(timeout=self.timeout) as client:
@@ -169,6 +175,8 @@ class MemoryClient:
         except Exception as e:
             logger.warning(f"Failed to save chat turn: {e}")
             return False
+        finally:
+            await self._context_cache.delete(self._cache_key(user_id, agent_id, team_id, channel_id))
     
     async def create_dialog_summary(
         self,
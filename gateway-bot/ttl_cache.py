@@ -0,0 +1,168 @@
+"""
+Обмежені кеші з TTL для gateway-bot
+
+- TTLCache: in-process LRU з обмеженням розміру та TTL на запис
+- RedisTTLCache: той самий інтерфейс поверх Redis, щоб кілька реплік gateway
+  бачили одні й ті самі записи та інвалідації
+- create_cache(): вибір бекенду за GATEWAY_CACHE_BACKEND (memory | redis)
+
+Усі кеші мають лічильники hits/misses/evictions; cache_stats() повертає їх для /health.
+"""
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+GATEWAY_CACHE_BACKEND = os.getenv("GATEWAY_CACHE_BACKEND", "memory").lower()
+GATEWAY_CACHE_REDIS_URL = os.getenv("GATEWAY_CACHE_REDIS_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+
+_caches: Dict[str, Any] = {}
+
+
+class TTLCache:
+    """In-process LRU кеш з TTL (ключі — рядки)"""
+
+    backend = "memory"
+
+    def __init__(self, name: str, max_size: int = 1024, ttl: float = 60.0):
+        self.name = name
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self._items: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._items[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._items[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, key: str) -> None:
+        if self._items.pop(key, None) is not None:
+            self.invalidations += 1
+
+    async def clear(self) -> None:
+        self._items.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "size": len(self._items),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class RedisTTLCache(TTLCache):
+    """
+    Кеш у Redis (спільний для реплік). Значення зберігаються як JSON з PX-TTL;
+    розмір обмежує TTL та maxmemory-policy Redis. Помилки Redis = промах, а не збій.
+    """
+
+    backend = "redis"
+
+    def __init__(self, name: str, redis_client: Any, max_size: int = 1024, ttl: float = 60.0):
+        super().__init__(name, max_size=max_size, ttl=ttl)
+        self._redis = redis_client
+        self._prefix = f"gateway-bot:{name}:"
+        self.errors = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        try:
+            raw = await self._redis.get(self._prefix + key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache {self.name}: Redis get failed: {e}")
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl_ms = max(1, int((self.ttl if ttl is None else ttl) * 1000))
+        try:
+            await self._redis.set(self._prefix + key, json.dumps(value, ensure_ascii=False, default=str), px=ttl_ms)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache {self.name}: Redis set failed: {e}")
+
+    async def delete(self, key: str) -> None:
+        try:
+            if await self._redis.delete(self._prefix + key):
+                self.invalidations += 1
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache {self.name}: Redis delete failed: {e}")
+
+    async def clear(self) -> None:
+        try:
+            async for redis_key in self._redis.scan_iter(match=self._prefix + "*"):
+                await self._redis.delete(redis_key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Cache {self.name}: Redis clear failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["size"] = None  # не рахуємо ключі в Redis на кожен /health
+        stats["errors"] = self.errors
+        return stats
+
+
+def _redis_client() -> Optional[Any]:
+    try:
+        import redis.asyncio as aioredis
+    except ImportError:
+        logger.warning("GATEWAY_CACHE_BACKEND=redis, but redis package is not installed; using in-memory caches")
+        return None
+    return aioredis.from_url(GATEWAY_CACHE_REDIS_URL, encoding="utf-8", decode_responses=True)
+
+
+def create_cache(name: str, max_size: int = 1024, ttl: float = 60.0) -> TTLCache:
+    """Створити (і зареєструвати для статистики) кеш з налаштованим бекендом"""
+    cache: TTLCache
+    client = _redis_client() if GATEWAY_CACHE_BACKEND == "redis" else None
+    if client is not None:
+        cache = RedisTTLCache(name, client, max_size=max_size, ttl=ttl)
+        logger.info(f"Cache {name}: Redis backend ({GATEWAY_CACHE_REDIS_URL}), ttl={ttl}s")
+    else:
+        cache = TTLCache(name, max_size=max_size, ttl=ttl)
+    _caches[name] = cache
+    return cache
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: cache.stats() for name, cache in _caches.items()}
@@ -0,0 +1,277 @@
+"""
+Фонова обробка Telegram webhook для gateway-bot
+
+Webhook лише перевіряє update, відкидає дублікати за update_id, ставить job у чергу
+і одразу відповідає Telegram. Jobs обробляють воркери з окремою чергою та лімітом
+конкурентності на кожен тип (документи, фото, голос, чат), з повторними спробами
+та статусом, доступним через /webhook/jobs.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from ttl_cache import create_cache
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPES = ("document", "vision", "voice", "chat")
+
+WEBHOOK_CONCURRENCY = {
+    "document": int(os.getenv("WEBHOOK_CONCURRENCY_DOCUMENT", "2")),
+    "vision": int(os.getenv("WEBHOOK_CONCURRENCY_VISION", "4")),
+    "voice": int(os.getenv("WEBHOOK_CONCURRENCY_VOICE", "4")),
+    "chat": int(os.getenv("WEBHOOK_CONCURRENCY_CHAT", "16")),
+}
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+WEBHOOK_JOB_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_JOB_MAX_ATTEMPTS", "3"))
+WEBHOOK_JOB_RETRY_BASE_S = float(os.getenv("WEBHOOK_JOB_RETRY_BASE_S", "2"))
+WEBHOOK_JOB_HISTORY = int(os.getenv("WEBHOOK_JOB_HISTORY", "1000"))
+# Telegram повторює webhook до ~1 години; дублікати в межах цього вікна ігноруються
+WEBHOOK_DEDUPE_TTL = float(os.getenv("WEBHOOK_DEDUPE_TTL", "3600"))
+WEBHOOK_DEDUPE_MAX_SIZE = int(os.getenv("WEBHOOK_DEDUPE_MAX_SIZE", "50000"))
+
+JobHandler = Callable[[Any, Any], Awaitable[Dict[str, Any]]]
+
+
+class QueueFull(Exception):
+    """Черга jobs заповнена — webhook має відповісти 503, Telegram повторить пізніше"""
+
+
+@dataclass
+class WebhookJob:
+    job_id: str
+    agent_id: str
+    update_id: Optional[int]
+    job_type: str
+    agent_config: Any = field(repr=False)
+    update: Any = field(repr=False)
+    status: str = "queued"  # queued | running | retrying | done | failed
+    attempts: int = 0
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    # Користувач уже отримав відповідь: повтор надіслав би її вдруге
+    reply_sent: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "agent_id": self.agent_id,
+            "update_id": self.update_id,
+            "type": self.job_type,
+            "status": self.status,
+            "attempts": self.attempts,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "wait_ms": round((self.started_at - self.created_at) * 1000, 1) if self.started_at else None,
+            "error": self.error,
+            "result": self.result,
+            "reply_sent": self.reply_sent,
+        }
+
+
+# Job, який зараз виконує воркер (у контексті його задачі)
+_current_job: ContextVar[Optional[WebhookJob]] = ContextVar("webhook_job", default=None)
+
+
+def mark_reply_sent():
+    """Позначити, що поточний job уже надіслав відповідь у Telegram — такий job не повторюється"""
+    job = _current_job.get()
+    if job is not None:
+        job.reply_sent = True
+
+
+def classify_update(message: Dict[str, Any]) -> str:
+    """Тип job визначає, в яку чергу (і під який ліміт) він потрапить"""
+    text = message.get("text") or ""
+    if message.get("document") or text.strip().startswith("/ingest"):
+        return "document"
+    if message.get("photo"):
+        return "vision"
+    if message.get("voice") or message.get("audio") or message.get("video_note"):
+        return "voice"
+    return "chat"
+
+
+class WebhookJobQueue:
+    """Черги за типом job + воркери з лімітом на тип + історія статусів"""
+
+    def __init__(self, handler: JobHandler):
+        self.handler = handler
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: List[asyncio.Task] = []
+        self._jobs: "OrderedDict[str, WebhookJob]" = OrderedDict()
+        # Jobs, що чекають на повтор (backoff), за job_id
+        self._retry_handles: Dict[str, asyncio.TimerHandle] = {}
+        self._seen = create_cache("webhook_updates", max_size=WEBHOOK_DEDUPE_MAX_SIZE, ttl=WEBHOOK_DEDUPE_TTL)
+        self.active: Dict[str, int] = {job_type: 0 for job_type in JOB_TYPES}
+        self.counters: Dict[str, int] = {
+            "accepted": 0, "duplicates": 0, "rejected": 0,
+            "done": 0, "failed": 0, "retried": 0,
+        }
+
+    def _ensure_started(self):
+        # Воркери створюються в event loop першого запиту
+        if self._workers:
+            return
+        for job_type in JOB_TYPES:
+            self._queues[job_type] = asyncio.Queue()
+            for _ in range(max(1, WEBHOOK_CONCURRENCY[job_type])):
+                self._workers.append(asyncio.create_task(self._worker(job_type)))
+        logger.info(f"Webhook workers started: {WEBHOOK_CONCURRENCY}")
+
+    def queued(self) -> int:
+        return sum(queue.qsize() for queue in self._queues.values())
+
+    async def enqueue(self, agent_config: Any, update: Any) -> Optional[WebhookJob]:
+        """Поставити update у чергу; None, якщо це дублікат"""
+        self._ensure_started()
+
+        dedupe_key = f"{agent_config.agent_id}:{update.update_id}" if update.update_id is not None else None
+        if dedupe_key and await self._seen.get(dedupe_key):
+            self.counters["duplicates"] += 1
+            return None
+        if self.queued() >= WEBHOOK_QUEUE_SIZE:
+            self.counters["rejected"] += 1
+            raise QueueFull(f"{self.queued()} jobs queued")
+        if dedupe_key:
+            await self._seen.set(dedupe_key, True)
+
+        job = WebhookJob(
+            job_id=uuid.uuid4().hex,
+            agent_id=agent_config.agent_id,
+            update_id=update.update_id,
+            job_type=classify_update(update.message or {}),
+            agent_config=agent_config,
+            update=update,
+        )
+        self._remember(job)
+        self.counters["accepted"] += 1
+        self._queues[job.job_type].put_nowait(job)
+        return job
+
+    def _remember(self, job: WebhookJob):
+        self._jobs[job.job_id] = job
+        # Історія обмежена; незавершені jobs не витісняються
+        while len(self._jobs) > WEBHOOK_JOB_HISTORY:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest.status not in ("done", "failed"):
+                break
+            del self._jobs[oldest_id]
+
+    async def _worker(self, job_type: str):
+        queue = self._queues[job_type]
+        while True:
+            job = await queue.get()
+            await self._run(job)
+
+    async def _run(self, job: WebhookJob):
+        job.status = "running"
+        job.attempts += 1
+        job.started_at = job.started_at or time.time()
+        self.active[job.job_type] += 1
+        token = _current_job.set(job)
+        try:
+            result = await self.handler(job.agent_config, job.update)
+            job.result = {key: value for key, value in (result or {}).items() if key in ("ok", "error", "cached", "agent")}
+            if job.result.get("ok") is False:
+                # Більшість помилок обробник повертає як {"ok": False, ...}, а не винятком
+                self._failed_attempt(job, str(job.result.get("error") or "handler returned ok=false"))
+            else:
+                job.status = "done"
+                self.counters["done"] += 1
+        except HTTPException as e:
+            # 4xx — некоректний update, повтор не допоможе
+            if e.status_code < 500:
+                self._fail(job, str(e.detail))
+            else:
+                self._failed_attempt(job, str(e.detail))
+        except Exception as e:
+            logger.error(f"Webhook job {job.job_id} ({job.job_type}) failed: {e}", exc_info=True)
+            self._failed_attempt(job, str(e))
+        finally:
+            _current_job.reset(token)
+            self.active[job.job_type] -= 1
+            if job.status in ("done", "failed"):
+                job.finished_at = time.time()
+
+    def _failed_attempt(self, job: WebhookJob, error: str):
+        # Після надісланої відповіді (у т.ч. повідомлення про помилку) не повторюємо
+        if job.reply_sent or not self._retry(job, error):
+            self._fail(job, error)
+
+    def _retry(self, job: WebhookJob, error: str) -> bool:
+        if job.attempts >= WEBHOOK_JOB_MAX_ATTEMPTS:
+            return False
+        job.status = "retrying"
+        job.error = error
+        self.counters["retried"] += 1
+        delay = WEBHOOK_JOB_RETRY_BASE_S * (2 ** (job.attempts - 1))
+        self._retry_handles[job.job_id] = asyncio.get_running_loop().call_later(delay, self._requeue, job)
+        return True
+
+    def _requeue(self, job: WebhookJob):
+        self._retry_handles.pop(job.job_id, None)
+        if self.queued() >= WEBHOOK_QUEUE_SIZE:
+            self._fail(job, f"queue full on retry: {job.error}")
+            return
+        try:
+            self._queues[job.job_type].put_nowait(job)
+        except asyncio.QueueFull:
+            self._fail(job, f"queue full on retry: {job.error}")
+            return
+        job.status = "queued"
+
+    def _fail(self, job: WebhookJob, error: str):
+        job.status = "failed"
+        job.error = error
+        job.finished_at = job.finished_at or time.time()
+        self.counters["failed"] += 1
+
+    def get(self, job_id: str) -> Optional[WebhookJob]:
+        return self._jobs.get(job_id)
+
+    def recent(self, limit: int = 50, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        jobs = [job for job in reversed(self._jobs.values()) if status is None or job.status == status]
+        return [job.to_dict() for job in jobs[:limit]]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": {job_type: queue.qsize() for job_type, queue in self._queues.items()},
+            "active": dict(self.active),
+            "concurrency": dict(WEBHOOK_CONCURRENCY),
+            "queue_size": WEBHOOK_QUEUE_SIZE,
+            "retry_pending": len(self._retry_handles),
+            **self.counters,
+        }
+
+    async def stop(self, drain_timeout: float = 20.0):
+        """Дати воркерам дообробити прийняті jobs (Telegram вже отримав 200) і зупинити їх"""
+        deadline = time.monotonic() + drain_timeout
+        while (
+            self.queued() or any(self.active.values()) or self._retry_handles
+        ) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        # Повтори, що не встигли до дедлайну, фіксуються як failed, а не губляться
+        for job_id, handle in list(self._retry_handles.items()):
+            handle.cancel()
+            job = self._jobs.get(job_id)
+            if job is not None:
+                logger.warning(f"Webhook job {job_id} dropped at shutdown while waiting for retry")
+                self._fail(job, f"shutdown before retry: {job.error}")
+        self._retry_handles.clear()
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
@@ -5,8 +5,10 @@ Provides HTTP endpoints for routing requests
 """
 
 from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional, Dict, Any
+import json
 import logging
 
 from router_models import RouterRequest
@@ -43,6 +45,55 @@ class RouterAPIResponse(BaseModel):
     metadata: Dict[str, Any] = Field(default_factory=dict)
 
 
+# ============================================================================
+# Helpers
+# ============================================================================
+
+def to_router_request(req: IncomingRequest) -> RouterRequest:
+    """Normalize HTTP request into internal RouterRequest"""
+    # Нормалізувати payload: якщо є "context" на верхньому рівні (старий формат),
+    # перемістити його в payload.context для уніфікованої обробки
+    normalized_payload = req.payload.copy() if req.payload else {}
+    
+    # Перевірити, чи є context на верхньому рівні (legacy формат від gateway-bot)
+    # Це потрібно для сумісності з DAARWIZZ
+    if req.context:
+        # Якщо context на верхньому рівні, перемістити в payload.context
+        if "context" not in normalized_payload:
+            normalized_payload["context"] = {}
+        # Мержити context з верхнього рівня в payload.context
+        if isinstance(req.context, dict):
+            normalized_payload["context"].update(req.context)
+            logger.info(f"✅ Migrated top-level context to payload.context for agent={req.agent}, keys={list(req.context.keys())}")
+    
+    logger.info(f"✅ Normalized payload keys: {list(normalized_payload.keys())}")
+    if normalized_payload and "context" in normalized_payload:
+        logger.info(f"✅ Context keys: {list(normalized_payload['context'].keys()) if isinstance(normalized_payload.get('context'), dict) else []}")
+        if isinstance(normalized_payload.get('context'), dict) and "system_prompt" in normalized_payload['context']:
+            sp = normalized_payload['context']['system_prompt']
+            sp_len = len(sp) if sp else 0
+            logger.info(f"✅ System prompt found in context: {sp_len} chars")
+            logger.info(f"✅ System prompt preview: {sp[:100] if sp else 'None'}...")
+    
+    # Convert to internal RouterRequest
+    return RouterRequest(
+        mode=req.mode,
+        agent=req.agent,
+        dao_id=req.dao_id,
+        source=req.source,
+        session_id=req.session_id,
+        user_id=req.user_id,
+        message=req.message,
+        payload=normalized_payload,
+    )
+
+
+def sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Format one Server-Sent Events frame"""
+    frame = f"event: {event}\n" if event else ""
+    return frame + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 # ============================================================================
 # Router Builder
 # ============================================================================
@@ -80,41 +131,7 @@ def build_router_http(app_core: RouterApp) -> APIRouter:
         logger.info(f"Raw payload type: {type(req.payload)}, keys: {list(req.payload.keys()) if req.payload else []}")
         logger.info(f"Raw context: {req.context}")
         
-        # Нормалізувати payload: якщо є "context" на верхньому рівні (старий формат),
-        # перемістити його в payload.context для уніфікованої обробки
-        normalized_payload = req.payload.copy() if req.payload else {}
-        
-        # Перевірити, чи є context на верхньому рівні (legacy формат від gateway-bot)
-        # Це потрібно для сумісності з DAARWIZZ
-        if req.context:
-            # Якщо context на верхньому рівні, перемістити в payload.context
-            if "context" not in normalized_payload:
-                normalized_payload["context"] = {}
-            # Мержити context з верхнього рівня в payload.context
-            if isinstance(req.context, dict):
-                normalized_payload["context"].update(req.context)
-                logger.info(f"✅ Migrated top-level context to payload.context for agent={req.agent}, keys={list(req.context.keys())}")
-        
-        logger.info(f"✅ Normalized payload keys: {list(normalized_payload.keys())}")
-        if normalized_payload and "context" in normalized_payload:
-            logger.info(f"✅ Context keys: {list(normalized_payload['context'].keys()) if isinstance(normalized_payload.get('context'), dict) else []}")
-            if isinstance(normalized_payload.get('context'), dict) and "system_prompt" in normalized_payload['context']:
-                sp = normalized_payload['context']['system_prompt']
-                sp_len = len(sp) if sp else 0
-                logger.info(f"✅ System prompt found in context: {sp_len} chars")
-                logger.info(f"✅ System prompt preview: {sp[:100] if sp else 'None'}...")
-        
-        # Convert to internal RouterRequest
-        rreq = RouterRequest(
-            mode=req.mode,
-            agent=req.agent,
-            dao_id=req.dao_id,
-            source=req.source,
-            session_id=req.session_id,
-            user_id=req.user_id,
-            message=req.message,
-            payload=normalized_payload,
-        )
+        rreq = to_router_request(req)
         
         # Handle request
         try:
@@ -143,6 +160,43 @@ def build_router_http(app_core: RouterApp) -> APIRouter:
             metadata=resp.metadata,
         )
     
+    @router.post(
+        "/route/stream",
+        summary="Route request with token streaming",
+        description="Same routing as /route, but returns completion deltas as Server-Sent Events."
+    )
+    async def route_request_stream(req: IncomingRequest):
+        """
+        Stream response as SSE:
+        - `data: {"delta": "..."}` for each content delta
+        - `event: done` with provider, metadata (ttft_ms, tokens_per_sec)
+        - `event: error` if the provider fails
+        """
+        logger.info(f"Incoming stream request: agent={req.agent}, mode={req.mode}")
+        rreq = to_router_request(req)
+        
+        async def event_source():
+            try:
+                async for chunk in app_core.handle_stream(rreq):
+                    if chunk.error:
+                        yield sse_event({"provider": chunk.provider_id, "error": chunk.error}, event="error")
+                    elif chunk.done:
+                        yield sse_event(
+                            {"provider": chunk.provider_id, "data": chunk.data, "metadata": chunk.metadata},
+                            event="done",
+                        )
+                    elif chunk.delta:
+                        yield sse_event({"delta": chunk.delta})
+            except Exception as e:
+                logger.error(f"Stream error: {e}", exc_info=True)
+                yield sse_event({"provider": "router", "error": f"Internal error: {str(e)}"}, event="error")
+        
+        return StreamingResponse(
+            event_source(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    
     @router.get(
         "/health",
         summary="Health check",
@@ -172,6 +226,7 @@ def build_router_http(app_core: RouterApp) -> APIRouter:
             },
             "providers": app_core.get_provider_info(),
             "routing": app_core.get_routing_info(),
+            "caches": app_core.get_cache_info(),
         }
     
     @router.get(
@@ -183,6 +238,15 @@ def build_router_http(app_core: RouterApp) -> APIRouter:
         """List available providers"""
         return app_core.get_provider_info()
     
+    @router.get(
+        "/pools",
+        summary="HTTP pool occupancy",
+        description="Get shared HTTP connection pool metrics per upstream"
+    )
+    async def list_pools():
+        """HTTP pool metrics"""
+        return app_core.get_pool_info()
+    
     @router.get(
         "/routing",
         summary="List routing rules",
@@ -0,0 +1,224 @@
+"""
+Shared HTTP Connection Pool for Router
+One keep-alive httpx.AsyncClient per upstream origin, shared by all
+providers and side clients (RBAC, Memory, RAG)
+"""
+
+import os
+import logging
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+POOL_MAX_CONNECTIONS = int(os.getenv("ROUTER_POOL_MAX_CONNECTIONS", "100"))
+POOL_MAX_KEEPALIVE = int(os.getenv("ROUTER_POOL_MAX_KEEPALIVE", "20"))
+POOL_KEEPALIVE_EXPIRY_S = float(os.getenv("ROUTER_POOL_KEEPALIVE_EXPIRY_S", "30"))
+POOL_DEFAULT_TIMEOUT_S = float(os.getenv("ROUTER_POOL_DEFAULT_TIMEOUT_S", "60"))
+# How long a request waits for a free connection when its upstream is at
+# its limit; then it fails as "upstream busy" (httpx.PoolTimeout)
+POOL_ACQUIRE_TIMEOUT_S = float(os.getenv("ROUTER_POOL_ACQUIRE_TIMEOUT_S", "10"))
+# Optional cap for ollama upstreams without max_connections in config.
+# Ollama serves OLLAMA_NUM_PARALLEL requests at once; set this to that value
+# to queue the rest in the router. 0 = no cap (ROUTER_POOL_MAX_CONNECTIONS)
+POOL_OLLAMA_MAX_CONNECTIONS = int(os.getenv("ROUTER_POOL_OLLAMA_MAX_CONNECTIONS", "0"))
+
+# HTTP/2 needs the optional `h2` package (pip install httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def request_timeout(timeout_s: float) -> httpx.Timeout:
+    """Per-request timeout; waiting for a pool connection has its own (shorter) limit"""
+    return httpx.Timeout(timeout_s, pool=min(POOL_ACQUIRE_TIMEOUT_S, timeout_s))
+
+
+def origin_of(url: str) -> str:
+    """Normalize URL to scheme://host:port (pool key)"""
+    parts = urlsplit(url)
+    scheme = parts.scheme or "http"
+    port = parts.port or (443 if scheme == "https" else 80)
+    return f"{scheme}://{parts.hostname}:{port}"
+
+
+class UpstreamStats:
+    """Request counters for one upstream"""
+
+    def __init__(self):
+        self.requests_total = 0
+        self.errors_total = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def started(self):
+        self.requests_total += 1
+        self.in_flight += 1
+        if self.in_flight > self.max_in_flight:
+            self.max_in_flight = self.in_flight
+
+    def finished(self):
+        self.in_flight -= 1
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    """Response stream that reports completion when closed"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, stats: UpstreamStats):
+        self._stream = stream
+        self._stats = stats
+        self._closed = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._closed:
+                self._closed = True
+                self._stats.finished()
+
+
+class _TrackedTransport(httpx.AsyncBaseTransport):
+    """Transport wrapper counting in-flight requests (until body is closed)"""
+
+    def __init__(self, transport: httpx.AsyncHTTPTransport, stats: UpstreamStats):
+        self._transport = transport
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.started()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception:
+            self.stats.errors_total += 1
+            self.stats.finished()
+            raise
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_TrackedStream(response.stream, self.stats),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+    def connection_counts(self) -> Dict[str, int]:
+        """Open/idle connections from the underlying httpcore pool"""
+        pool = getattr(self._transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        idle = 0
+        for conn in connections:
+            try:
+                idle += 1 if conn.is_idle() else 0
+            except Exception:
+                pass
+        return {"connections": len(connections), "idle_connections": idle}
+
+
+class HTTPClientPool:
+    """
+    Router-wide connection pool manager.
+
+    Clients are created lazily per upstream origin and reused for the
+    lifetime of the process; call aclose() on shutdown.
+    Timeouts are per request (pass timeout= to client.get/post, see
+    request_timeout() for a separate pool acquisition limit).
+    """
+
+    def __init__(
+        self,
+        max_connections: int = POOL_MAX_CONNECTIONS,
+        max_keepalive_connections: int = POOL_MAX_KEEPALIVE,
+        keepalive_expiry: float = POOL_KEEPALIVE_EXPIRY_S,
+        http2: Optional[bool] = None,
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = HTTP2_AVAILABLE if http2 is None else (http2 and HTTP2_AVAILABLE)
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._transports: Dict[str, _TrackedTransport] = {}
+        self._overrides: Dict[str, httpx.Limits] = {}
+
+    def set_upstream_limits(
+        self,
+        base_url: str,
+        max_connections: int,
+        max_keepalive_connections: Optional[int] = None,
+    ):
+        """Override pool limits for one upstream (before first use)"""
+        origin = origin_of(base_url)
+        if origin in self._clients:
+            logger.warning(f"Pool for {origin} already created; new limits apply after reset")
+        self._overrides[origin] = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections or max_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def get_client(self, base_url: str) -> httpx.AsyncClient:
+        """Get (or create) the shared client for the upstream of base_url"""
+        origin = origin_of(base_url)
+        client = self._clients.get(origin)
+        if client is not None and not client.is_closed:
+            return client
+
+        limits = self._overrides.get(origin) or httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        # HTTP/2 is only negotiated over TLS (ALPN)
+        use_http2 = self.http2 and origin.startswith("https://")
+        stats = self._transports[origin].stats if origin in self._transports else UpstreamStats()
+        transport = _TrackedTransport(
+            httpx.AsyncHTTPTransport(limits=limits, http2=use_http2),
+            stats,
+        )
+        client = httpx.AsyncClient(transport=transport, timeout=POOL_DEFAULT_TIMEOUT_S)
+
+        self._clients[origin] = client
+        self._transports[origin] = transport
+        logger.info(
+            f"HTTP pool created for {origin}: max_connections={limits.max_connections}, "
+            f"keepalive={limits.max_keepalive_connections}, http2={use_http2}"
+        )
+        return client
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Pool occupancy per upstream"""
+        result = {}
+        for origin, transport in self._transports.items():
+            s = transport.stats
+            result[origin] = {
+                "requests_total": s.requests_total,
+                "errors_total": s.errors_total,
+                "in_flight": s.in_flight,
+                "max_in_flight": s.max_in_flight,
+                **transport.connection_counts(),
+            }
+        return result
+
+    async def aclose(self):
+        """Close all pooled clients (call on application shutdown)"""
+        for origin, client in list(self._clients.items()):
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Failed to close HTTP pool for {origin}: {e}")
+        self._clients.clear()
+        self._transports.clear()
+        logger.info("HTTP pools closed")
+
+
+# Global pool instance
+http_pool = HTTPClientPool()
@@ -7,6 +7,7 @@ Main entry point for DAGI Router HTTP API
 import argparse
 import logging
 import sys
+from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI
@@ -84,6 +85,13 @@ def create_app(config_path: str = None) -> FastAPI:
         logger.error(f"Failed to initialize RouterApp: {e}")
         raise RuntimeError(f"RouterApp initialization failed: {e}")
     
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await app_core.startup()
+        yield
+        # Shutdown: close pooled upstream connections
+        await app_core.shutdown()
+    
     # Create FastAPI app
     app = FastAPI(
         title="DAGI Router",
@@ -91,6 +99,7 @@ def create_app(config_path: str = None) -> FastAPI:
         version="1.0.0",
         docs_url="/docs",
         redoc_url="/redoc",
+        lifespan=lifespan,
     )
     
     # Add CORS middleware
@@ -116,9 +125,11 @@ def create_app(config_path: str = None) -> FastAPI:
             "status": "operational",
             "endpoints": {
                 "route": "POST /route",
+                "route_stream": "POST /route/stream",
                 "health": "GET /health",
                 "info": "GET /info",
                 "providers": "GET /providers",
+                "pools": "GET /pools",
                 "routing": "GET /routing",
                 "docs": "GET /docs",
             }
@@ -4,22 +4,43 @@ Used to get memory context for RAG queries
 """
 
 import os
+import time
+import asyncio
 import logging
-from typing import Optional, Dict, Any
-import httpx
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+from http_pool import http_pool
 
 logger = logging.getLogger(__name__)
 
 MEMORY_SERVICE_URL = os.getenv("MEMORY_SERVICE_URL", "http://memory-service:8000")
+MEMORY_CONTEXT_TTL_S = float(os.getenv("MEMORY_CONTEXT_TTL_S", "30"))
+MEMORY_CONTEXT_CACHE_SIZE = int(os.getenv("MEMORY_CONTEXT_CACHE_SIZE", "1024"))
+MEMORY_POOL_MAX_CONNECTIONS = int(os.getenv("MEMORY_POOL_MAX_CONNECTIONS", "20"))
+
+# (user_id, agent_id, team_id, channel_id, limit)
+ContextKey = Tuple[str, str, str, Optional[str], int]
 
 
 class MemoryClient:
     """Client for Memory Service"""
-    
-    def __init__(self, base_url: str = MEMORY_SERVICE_URL):
+
+    def __init__(
+        self,
+        base_url: str = MEMORY_SERVICE_URL,
+        cache_ttl_s: float = MEMORY_CONTEXT_TTL_S,
+        cache_size: int = MEMORY_CONTEXT_CACHE_SIZE,
+    ):
         self.base_url = base_url.rstrip("/")
         self.timeout = 10.0
-    
+        # ContextKey -> (expires_at, context)
+        self.cache_ttl_s = cache_ttl_s
+        self.cache_size = cache_size
+        self._context_cache: "OrderedDict[ContextKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
     async def get_context(
         self,
         user_id: str,
@@ -29,59 +50,102 @@ class MemoryClient:
         limit: int = 10
     ) -> Dict[str, Any]:
         """
-        Get memory context for dialogue
-        
+        Get memory context for dialogue.
+        Facts, events and summaries are fetched concurrently; a complete
+        result is cached for cache_ttl_s per (user, agent, team, channel, limit).
+
         Returns:
             Dictionary with facts, recent_events, dialog_summaries
         """
+        key = (user_id, agent_id, team_id, channel_id, limit)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        client = http_pool.get_client(self.base_url)
+
+        facts, events, summaries = await asyncio.gather(
+            # Get user facts
+            self._fetch(
+                client,
+                "/facts",
+                {"user_id": user_id, "team_id": team_id, "limit": limit},
+                items_key=None,
+            ),
+            # Get recent memory events
+            self._fetch(
+                client,
+                f"/agents/{agent_id}/memory",
+                {
+                    "team_id": team_id,
+                    "channel_id": channel_id,
+                    "scope": "short_term",
+                    "kind": "message",
+                    "limit": limit
+                },
+            ),
+            # Get dialog summaries
+            self._fetch(
+                client,
+                "/summaries",
+                {
+                    "team_id": team_id,
+                    "channel_id": channel_id,
+                    "agent_id": agent_id,
+                    "limit": 5
+                },
+            ),
+        )
+
+        context = {
+            "facts": facts if facts is not None else [],
+            "recent_events": events if events is not None else [],
+            "dialog_summaries": summaries if summaries is not None else []
+        }
+
+        # Don't cache degraded results
+        if facts is not None and events is not None and summaries is not None:
+            self._cache_put(key, context)
+
+        return context
+
+    async def _fetch(self, client, path: str, params: Dict[str, Any], items_key: Optional[str] = "items"):
+        """GET one memory resource; None on failure"""
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                # Get user facts
-                facts_response = await client.get(
-                    f"{self.base_url}/facts",
-                    params={"user_id": user_id, "team_id": team_id, "limit": limit}
-                )
-                facts = facts_response.json() if facts_response.status_code == 200 else []
-                
-                # Get recent memory events
-                events_response = await client.get(
-                    f"{self.base_url}/agents/{agent_id}/memory",
-                    params={
-                        "team_id": team_id,
-                        "channel_id": channel_id,
-                        "scope": "short_term",
-                        "kind": "message",
-                        "limit": limit
-                    }
-                )
-                events = events_response.json().get("items", []) if events_response.status_code == 200 else []
-                
-                # Get dialog summaries
-                summaries_response = await client.get(
-                    f"{self.base_url}/summaries",
-                    params={
-                        "team_id": team_id,
-                        "channel_id": channel_id,
-                        "agent_id": agent_id,
-                        "limit": 5
-                    }
-                )
-                summaries = summaries_response.json().get("items", []) if summaries_response.status_code == 200 else []
-                
-                return {
-                    "facts": facts,
-                    "recent_events": events,
-                    "dialog_summaries": summaries
-                }
+            response = await client.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+            if response.status_code != 200:
+                return None
+            data = response.json()
+            return data.get(items_key, []) if items_key else data
         except Exception as e:
-            logger.warning(f"Memory context fetch failed: {e}")
-            return {
-                "facts": [],
-                "recent_events": [],
-                "dialog_summaries": []
-            }
+            logger.warning(f"Memory context fetch failed ({path}): {e}")
+            return None
+
+    def _cache_get(self, key: ContextKey) -> Optional[Dict[str, Any]]:
+        entry = self._context_cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._context_cache.move_to_end(key)
+            self.cache_hits += 1
+            return entry[1]
+        if entry is not None:
+            del self._context_cache[key]
+        self.cache_misses += 1
+        return None
+
+    def _cache_put(self, key: ContextKey, context: Dict[str, Any]):
+        if self.cache_ttl_s <= 0:
+            return
+        self._context_cache[key] = (time.monotonic() + self.cache_ttl_s, context)
+        self._context_cache.move_to_end(key)
+        while len(self._context_cache) > self.cache_size:
+            self._context_cache.popitem(last=False)
+
+    def invalidate(self, user_id: str, agent_id: str, team_id: str, channel_id: Optional[str] = None):
+        """Drop cached context for every limit (e.g. after a new turn is saved)"""
+        prefix = (user_id, agent_id, team_id, channel_id)
+        for key in [key for key in self._context_cache if key[:4] == prefix]:
+            del self._context_cache[key]
 
 
 # Global client instance
 memory_client = MemoryClient()
-
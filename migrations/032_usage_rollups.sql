@@ -0,0 +1,225 @@
+-- Migration 032: Usage rollups
+-- Per-minute and per-hour pre-aggregates for usage-engine reports,
+-- with mergeable latency sketches for p50/p95/p99.
+--
+-- Maintained incrementally by services/usage-engine (writer.py + rollups.py):
+-- each flushed batch is added to its minute and hour buckets in the same
+-- statement that inserts the raw rows. Apply with usage-engine stopped so
+-- no raw rows are written between the backfill below and the new writer.
+
+-- =============================================================================
+-- Latency sketch helpers
+-- Sketch = JSONB {"<key>": count}; key k holds values in (1.02^(k-1), 1.02^k],
+-- values <= 1 ms go to key 0. Must match sketch.py (SKETCH_GAMMA).
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION usage_sketch_key(value DOUBLE PRECISION)
+RETURNS INT
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT CASE WHEN value <= 1 THEN 0 ELSE CEIL(LN(value) / LN(1.02))::int END
+$$;
+
+CREATE OR REPLACE FUNCTION usage_sketch_merge(a JSONB, b JSONB)
+RETURNS JSONB
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT COALESCE(jsonb_object_agg(key, total), '{}'::jsonb)
+    FROM (
+        SELECT key, SUM(value::bigint) AS total
+        FROM (
+            SELECT * FROM jsonb_each_text(COALESCE(a, '{}'::jsonb))
+            UNION ALL
+            SELECT * FROM jsonb_each_text(COALESCE(b, '{}'::jsonb))
+        ) bins
+        GROUP BY key
+    ) merged
+$$;
+
+-- =============================================================================
+-- Rollup tables
+-- granularity: 'minute' | 'hour'; bucket_start is UTC-aligned.
+-- NULL microdao_id / agent_id are stored as '' (part of the primary key).
+-- =============================================================================
+
+CREATE TABLE IF NOT EXISTS usage_llm_rollup (
+  granularity TEXT NOT NULL,
+  bucket_start TIMESTAMPTZ NOT NULL,
+  microdao_id TEXT NOT NULL DEFAULT '',
+  agent_id TEXT NOT NULL DEFAULT '',
+  model TEXT NOT NULL,
+  provider TEXT NOT NULL,
+  calls BIGINT NOT NULL DEFAULT 0,
+  success_calls BIGINT NOT NULL DEFAULT 0,
+  prompt_tokens BIGINT NOT NULL DEFAULT 0,
+  completion_tokens BIGINT NOT NULL DEFAULT 0,
+  total_tokens BIGINT NOT NULL DEFAULT 0,
+  latency_sum_ms BIGINT NOT NULL DEFAULT 0,
+  latency_sketch JSONB NOT NULL DEFAULT '{}',
+  PRIMARY KEY (granularity, bucket_start, microdao_id, agent_id, model, provider)
+);
+
+CREATE INDEX IF NOT EXISTS idx_usage_llm_rollup_microdao ON usage_llm_rollup(microdao_id, granularity, bucket_start);
+CREATE INDEX IF NOT EXISTS idx_usage_llm_rollup_agent ON usage_llm_rollup(agent_id, granularity, bucket_start);
+
+CREATE TABLE IF NOT EXISTS usage_tool_rollup (
+  granularity TEXT NOT NULL,
+  bucket_start TIMESTAMPTZ NOT NULL,
+  microdao_id TEXT NOT NULL DEFAULT '',
+  agent_id TEXT NOT NULL DEFAULT '',
+  tool_id TEXT NOT NULL,
+  tool_name TEXT NOT NULL,
+  calls BIGINT NOT NULL DEFAULT 0,
+  success_calls BIGINT NOT NULL DEFAULT 0,
+  latency_sum_ms BIGINT NOT NULL DEFAULT 0,
+  latency_sketch JSONB NOT NULL DEFAULT '{}',
+  PRIMARY KEY (granularity, bucket_start, microdao_id, agent_id, tool_id, tool_name)
+);
+
+CREATE INDEX IF NOT EXISTS idx_usage_tool_rollup_microdao ON usage_tool_rollup(microdao_id, granularity, bucket_start);
+
+CREATE TABLE IF NOT EXISTS usage_agent_rollup (
+  granularity TEXT NOT NULL,
+  bucket_start TIMESTAMPTZ NOT NULL,
+  microdao_id TEXT NOT NULL DEFAULT '',
+  agent_id TEXT NOT NULL,
+  invocations BIGINT NOT NULL DEFAULT 0,
+  success_invocations BIGINT NOT NULL DEFAULT 0,
+  llm_calls BIGINT NOT NULL DEFAULT 0,
+  tool_calls BIGINT NOT NULL DEFAULT 0,
+  duration_sum_ms BIGINT NOT NULL DEFAULT 0,
+  duration_sketch JSONB NOT NULL DEFAULT '{}',
+  PRIMARY KEY (granularity, bucket_start, microdao_id, agent_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_usage_agent_rollup_microdao ON usage_agent_rollup(microdao_id, granularity, bucket_start);
+
+CREATE TABLE IF NOT EXISTS usage_message_rollup (
+  granularity TEXT NOT NULL,
+  bucket_start TIMESTAMPTZ NOT NULL,
+  microdao_id TEXT NOT NULL,
+  agent_id TEXT NOT NULL DEFAULT '', -- sender if actor_type = 'agent', '' for humans/services
+  messages BIGINT NOT NULL DEFAULT 0,
+  total_length BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (granularity, bucket_start, microdao_id, agent_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_usage_message_rollup_microdao ON usage_message_rollup(microdao_id, granularity, bucket_start);
+
+-- =============================================================================
+-- Backfill from existing raw rows (skipped if a rollup table already has rows)
+-- Same binning as services/usage-engine/rollups.py
+-- =============================================================================
+
+WITH bins AS (
+    SELECT
+        g.granularity,
+        date_trunc(g.granularity, src.timestamp AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS bucket_start,
+        COALESCE(microdao_id, '') AS microdao_id,
+        COALESCE(agent_id, '') AS agent_id,
+        model AS model,
+        provider AS provider,
+        COUNT(*) AS calls,
+        COUNT(*) FILTER (WHERE success) AS success_calls,
+        SUM(prompt_tokens) AS prompt_tokens,
+        SUM(completion_tokens) AS completion_tokens,
+        SUM(total_tokens) AS total_tokens,
+        SUM(latency_ms) AS latency_sum_ms,
+        usage_sketch_key(latency_ms) AS sketch_key,
+        COUNT(*) AS sketch_count
+    FROM usage_llm src
+    CROSS JOIN (VALUES ('minute'), ('hour')) AS g(granularity)
+    GROUP BY 1, 2, 3, 4, 5, 6, 13
+)
+INSERT INTO usage_llm_rollup AS r (
+    granularity, bucket_start, microdao_id, agent_id, model, provider,
+    calls, success_calls, prompt_tokens, completion_tokens, total_tokens,
+    latency_sum_ms, latency_sketch
+)
+SELECT
+    granularity, bucket_start, microdao_id, agent_id, model, provider,
+    SUM(calls), SUM(success_calls), SUM(prompt_tokens), SUM(completion_tokens), SUM(total_tokens),
+    SUM(latency_sum_ms), jsonb_object_agg(sketch_key, sketch_count)
+FROM bins
+WHERE NOT EXISTS (SELECT 1 FROM usage_llm_rollup)
+GROUP BY granularity, bucket_start, microdao_id, agent_id, model, provider
+ON CONFLICT (granularity, bucket_start, microdao_id, agent_id, model, provider) DO NOTHING;
+
+WITH bins AS (
+    SELECT
+        g.granularity,
+        date_trunc(g.granularity, src.timestamp AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS bucket_start,
+        COALESCE(microdao_id, '') AS microdao_id,
+        COALESCE(agent_id, '') AS agent_id,
+        tool_id AS tool_id,
+        tool_name AS tool_name,
+        COUNT(*) AS calls,
+        COUNT(*) FILTER (WHERE success) AS success_calls,
+        SUM(latency_ms) AS latency_sum_ms,
+        usage_sketch_key(latency_ms) AS sketch_key,
+        COUNT(*) AS sketch_count
+    FROM usage_tool src
+    CROSS JOIN (VALUES ('minute'), ('hour')) AS g(granularity)
+    GROUP BY 1, 2, 3, 4, 5, 6, 10
+)
+INSERT INTO usage_tool_rollup AS r (
+    granularity, bucket_start, microdao_id, agent_id, tool_id, tool_name,
+    calls, success_calls, latency_sum_ms, latency_sketch
+)
+SELECT
+    granularity, bucket_start, microdao_id, agent_id, tool_id, tool_name,
+    SUM(calls), SUM(success_calls), SUM(latency_sum_ms), jsonb_object_agg(sketch_key, sketch_count)
+FROM bins
+WHERE NOT EXISTS (SELECT 1 FROM usage_tool_rollup)
+GROUP BY granularity, bucket_start, microdao_id, agent_id, tool_id, tool_name
+ON CONFLICT (granularity, bucket_start, microdao_id, agent_id, tool_id, tool_name) DO NOTHING;
+
+WITH bins AS (
+    SELECT
+        g.granularity,
+        date_trunc(g.granularity, src.timestamp AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS bucket_start,
+        COALESCE(microdao_id, '') AS microdao_id,
+        agent_id AS agent_id,
+        COUNT(*) AS invocations,
+        COUNT(*) FILTER (WHERE success) AS success_invocations,
+        SUM(COALESCE(llm_calls, 0)) AS llm_calls,
+        SUM(COALESCE(tool_calls, 0)) AS tool_calls,
+        SUM(duration_ms) AS duration_sum_ms,
+        usage_sketch_key(duration_ms) AS sketch_key,
+        COUNT(*) AS sketch_count
+    FROM usage_agent src
+    CROSS JOIN (VALUES ('minute'), ('hour')) AS g(granularity)
+    GROUP BY 1, 2, 3, 4, 10
+)
+INSERT INTO usage_agent_rollup AS r (
+    granularity, bucket_start, microdao_id, agent_id,
+    invocations, success_invocations, llm_calls, tool_calls, duration_sum_ms, duration_sketch
+)
+SELECT
+    granularity, bucket_start, microdao_id, agent_id,
+    SUM(invocations), SUM(success_invocations), SUM(llm_calls), SUM(tool_calls), SUM(duration_sum_ms),
+    jsonb_object_agg(sketch_key, sketch_count)
+FROM bins
+WHERE NOT EXISTS (SELECT 1 FROM usage_agent_rollup)
+GROUP BY granularity, bucket_start, microdao_id, agent_id
+ON CONFLICT (granularity, bucket_start, microdao_id, agent_id) DO NOTHING;
+
+WITH bins AS (
+    SELECT
+        g.granularity,
+        date_trunc(g.granularity, src.timestamp AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS bucket_start,
+        microdao_id AS microdao_id,
+        CASE WHEN actor_type = 'agent' THEN actor_id ELSE '' END AS agent_id,
+        COUNT(*) AS messages,
+        SUM(message_length) AS total_length
+    FROM usage_message src
+    CROSS JOIN (VALUES ('minute'), ('hour')) AS g(granularity)
+    GROUP BY 1, 2, 3, 4
+)
+INSERT INTO usage_message_rollup AS r (
+    granularity, bucket_start, microdao_id, agent_id, messages, total_length
+)
+SELECT
+    granularity, bucket_start, microdao_id, agent_id, SUM(messages), SUM(total_length)
+FROM bins
+WHERE NOT EXISTS (SELECT 1 FROM usage_message_rollup)
+GROUP BY granularity, bucket_start, microdao_id, agent_id
+ON CONFLICT (granularity, bucket_start, microdao_id, agent_id) DO NOTHING;
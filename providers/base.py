@@ -3,19 +3,44 @@ Base Provider Interface
 """
 
 from abc import ABC, abstractmethod
-from router_models import RouterRequest, RouterResponse
+from typing import AsyncIterator, Optional
+
+from http_pool import HTTPClientPool, http_pool as default_http_pool
+from router_models import RouterRequest, RouterResponse, StreamChunk
 
 
 class Provider(ABC):
     """Base class for all providers"""
     
-    def __init__(self, provider_id: str):
+    def __init__(self, provider_id: str, http_pool: Optional[HTTPClientPool] = None):
         self.id = provider_id
+        # Shared keep-alive clients (one pool per upstream)
+        self.http_pool = http_pool or default_http_pool
     
     @abstractmethod
     async def call(self, req: RouterRequest) -> RouterResponse:
         """Execute request and return response"""
         pass
     
+    async def stream(self, req: RouterRequest) -> AsyncIterator[StreamChunk]:
+        """
+        Stream response deltas.
+        Default for non-streaming providers: one delta with the full text.
+        """
+        response = await self.call(req)
+        if not response.ok:
+            yield StreamChunk(provider_id=response.provider_id, done=True, error=response.error)
+            return
+        
+        text = response.data.get("text") if isinstance(response.data, dict) else None
+        if text:
+            yield StreamChunk(provider_id=response.provider_id, delta=text)
+        yield StreamChunk(
+            provider_id=response.provider_id,
+            done=True,
+            data=None if text else response.data,
+            metadata=response.metadata,
+        )
+    
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}(id='{self.id}')"
@@ -9,6 +9,7 @@ import logging
 from typing import Dict, Any, Optional
 import httpx
 
+from http_pool import HTTPClientPool
 from providers.base import Provider
 from router_models import RouterRequest, RouterResponse
 
@@ -31,9 +32,10 @@ class DevToolsProvider(Provider):
         provider_id: str,
         base_url: str,
         timeout: int = 30,
+        http_pool: Optional[HTTPClientPool] = None,
         **kwargs
     ):
-        super().__init__(provider_id)
+        super().__init__(provider_id, http_pool)
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
         logger.info(f"DevToolsProvider initialized: {provider_id} → {base_url}")
@@ -88,23 +90,23 @@ class DevToolsProvider(Provider):
             url = f"{self.base_url}{endpoint}"
             logger.info(f"DevTools call: {tool} → {url}")
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(url, json=body)
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                return RouterResponse(
-                    ok=True,
-                    provider_id=self.id,
-                    data=data,
-                    metadata={
-                        "provider_type": "devtools",
-                        "tool": tool,
-                        "endpoint": endpoint,
-                        "status_code": response.status_code
-                    }
-                )
+            client = self.http_pool.get_client(self.base_url)
+            response = await client.post(url, json=body, timeout=self.timeout)
+            response.raise_for_status()
+            
+            data = response.json()
+            
+            return RouterResponse(
+                ok=True,
+                provider_id=self.id,
+                data=data,
+                metadata={
+                    "provider_type": "devtools",
+                    "tool": tool,
+                    "endpoint": endpoint,
+                    "status_code": response.status_code
+                }
+            )
         
         except httpx.HTTPStatusError as e:
             logger.error(f"DevTools HTTP error: {e}")
@@ -2,12 +2,15 @@
 LLM Provider - supports OpenAI-compatible APIs (Ollama, DeepSeek, etc)
 """
 
+import json
 import logging
-from typing import Dict, Optional
+import time
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
 
 import httpx
 
-from router_models import RouterRequest, RouterResponse
+from http_pool import POOL_ACQUIRE_TIMEOUT_S, HTTPClientPool, request_timeout
+from router_models import RouterRequest, RouterResponse, StreamChunk
 from .base import Provider
 
 logger = logging.getLogger(__name__)
@@ -29,8 +32,9 @@ class LLMProvider(Provider):
         max_tokens: int = 1024,
         temperature: float = 0.2,
         provider_type: str = "openai",  # "openai" or "ollama"
+        http_pool: Optional[HTTPClientPool] = None,
     ):
-        super().__init__(provider_id)
+        super().__init__(provider_id, http_pool)
         self.base_url = base_url.rstrip("/")
         self.model = model
         self.api_key = api_key
@@ -42,60 +46,35 @@ class LLMProvider(Provider):
     async def call(self, req: RouterRequest) -> RouterResponse:
         """Call LLM API"""
         
-        # Extract message from request
-        message = req.message or req.payload.get("message", "")
-        if not message:
+        request_spec = self._build_request(req, stream=False)
+        if request_spec is None:
             return RouterResponse(
                 ok=False,
                 provider_id=self.id,
                 error="No message provided"
             )
-        
-        # Build system prompt if agent specified
-        system_prompt = self._get_system_prompt(req)
-        
-        # Prepare messages
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": message})
-        
-        # Prepare headers
-        headers: Dict[str, str] = {"Content-Type": "application/json"}
-        if self.api_key:
-            headers["Authorization"] = f"Bearer {self.api_key}"
-        
-        # Determine endpoint and body based on provider type
-        if self.provider_type == "ollama" or "ollama" in self.base_url.lower():
-            # Ollama uses /v1/chat/completions or /api/chat
-            endpoint = f"{self.base_url}/v1/chat/completions"
-            body = {
-                "model": self.model,
-                "messages": messages,
-                "stream": False,
-            }
-        else:
-            # Standard OpenAI-compatible
-            endpoint = f"{self.base_url}/chat/completions"
-            body = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": self.temperature,
-                "max_tokens": self.max_tokens,
-            }
+        endpoint, body, headers = request_spec
         
         # Make request
         try:
-            async with httpx.AsyncClient(timeout=self.timeout_s) as client:
-                logger.info(f"[{self.id}] Calling {endpoint} with model {self.model}")
-                
-                response = await client.post(
-                    endpoint,
-                    json=body,
-                    headers=headers,
-                )
-                response.raise_for_status()
-                
+            client = self.http_pool.get_client(self.base_url)
+            logger.info(f"[{self.id}] Calling {endpoint} with model {self.model}")
+            
+            response = await client.post(
+                endpoint,
+                json=body,
+                headers=headers,
+                timeout=request_timeout(self.timeout_s),
+            )
+            response.raise_for_status()
+            
+        except httpx.PoolTimeout:
+            logger.error(f"[{self.id}] Upstream busy: no free connection to {self.base_url}")
+            return RouterResponse(
+                ok=False,
+                provider_id=self.id,
+                error=self._busy_error()
+            )
         except httpx.TimeoutException:
             logger.error(f"[{self.id}] Request timeout after {self.timeout_s}s")
             return RouterResponse(
@@ -155,6 +134,189 @@ class LLMProvider(Provider):
                 error=f"Failed to parse LLM response: {str(e)}"
             )
     
+    async def stream(self, req: RouterRequest) -> AsyncIterator[StreamChunk]:
+        """
+        Stream completion deltas (OpenAI-compatible SSE, also Ollama NDJSON).
+        Final chunk carries time-to-first-token and tokens/sec metrics.
+        """
+        
+        request_spec = self._build_request(req, stream=True)
+        if request_spec is None:
+            yield StreamChunk(provider_id=self.id, done=True, error="No message provided")
+            return
+        endpoint, body, headers = request_spec
+        
+        started = time.perf_counter()
+        first_token_at: Optional[float] = None
+        chunks = 0
+        usage: Dict[str, Any] = {}
+        
+        try:
+            client = self.http_pool.get_client(self.base_url)
+            logger.info(f"[{self.id}] Streaming {endpoint} with model {self.model}")
+            
+            async with client.stream(
+                "POST",
+                endpoint,
+                json=body,
+                headers=headers,
+                timeout=request_timeout(self.timeout_s),
+            ) as response:
+                if response.status_code >= 400:
+                    error_detail = (await response.aread()).decode(errors="replace")[:200]
+                    logger.error(f"[{self.id}] HTTP error {response.status_code}: {error_detail}")
+                    yield StreamChunk(
+                        provider_id=self.id,
+                        done=True,
+                        error=f"HTTP {response.status_code}: {error_detail}"
+                    )
+                    return
+                
+                async for line in response.aiter_lines():
+                    event = self._parse_stream_line(line)
+                    if event is None:
+                        continue
+                    if event == "[DONE]":
+                        break
+                    
+                    usage = event.get("usage") or usage
+                    delta = self._extract_delta(event)
+                    if delta:
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                        chunks += 1
+                        yield StreamChunk(provider_id=self.id, delta=delta)
+                    
+                    # Ollama native API marks the last object with done=true
+                    if event.get("done") is True:
+                        break
+        
+        except httpx.PoolTimeout:
+            logger.error(f"[{self.id}] Upstream busy: no free connection to {self.base_url}")
+            yield StreamChunk(provider_id=self.id, done=True, error=self._busy_error())
+            return
+        except httpx.TimeoutException:
+            logger.error(f"[{self.id}] Stream timeout after {self.timeout_s}s")
+            yield StreamChunk(
+                provider_id=self.id,
+                done=True,
+                error=f"Request timeout after {self.timeout_s}s"
+            )
+            return
+        except Exception as e:
+            logger.error(f"[{self.id}] Stream error: {e}")
+            yield StreamChunk(provider_id=self.id, done=True, error=f"Provider error: {str(e)}")
+            return
+        
+        finished = time.perf_counter()
+        tokens = usage.get("completion_tokens") or chunks
+        ttft_ms = round((first_token_at - started) * 1000, 1) if first_token_at else None
+        generation_s = finished - (first_token_at or started)
+        tokens_per_sec = round(tokens / generation_s, 2) if generation_s > 0 and tokens else 0.0
+        
+        logger.info(
+            f"[{self.id}] Stream done: tokens={tokens}, ttft_ms={ttft_ms}, tokens_per_sec={tokens_per_sec}"
+        )
+        
+        yield StreamChunk(
+            provider_id=self.id,
+            done=True,
+            metadata={
+                "provider_type": "llm",
+                "model": self.model,
+                "base_url": self.base_url,
+                "usage": usage,
+                "ttft_ms": ttft_ms,
+                "tokens": tokens,
+                "tokens_per_sec": tokens_per_sec,
+                "duration_ms": round((finished - started) * 1000, 1),
+            }
+        )
+    
+    def _busy_error(self) -> str:
+        return (
+            f"Upstream busy: all connections to {self.base_url} in use "
+            f"for {min(POOL_ACQUIRE_TIMEOUT_S, self.timeout_s)}s"
+        )
+    
+    @staticmethod
+    def _parse_stream_line(line: str):
+        """Decode one SSE `data:` line or NDJSON line; '[DONE]' marks the end"""
+        line = line.strip()
+        if not line or line.startswith(":"):
+            return None
+        if line.startswith("data:"):
+            line = line[5:].strip()
+        elif line.startswith(("event:", "id:", "retry:")):
+            return None
+        if line == "[DONE]":
+            return line
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return None
+        return event if isinstance(event, dict) else None
+    
+    @staticmethod
+    def _extract_delta(event: Dict[str, Any]) -> str:
+        """Content delta from OpenAI chunk or Ollama native chunk"""
+        choices = event.get("choices")
+        if choices:
+            choice = choices[0] or {}
+            delta = choice.get("delta") or choice.get("message") or {}
+            return delta.get("content") or ""
+        message = event.get("message")
+        if isinstance(message, dict):
+            return message.get("content") or ""
+        return event.get("response") or ""
+    
+    def _build_request(
+        self, req: RouterRequest, stream: bool
+    ) -> Optional[Tuple[str, Dict[str, Any], Dict[str, str]]]:
+        """Build (endpoint, body, headers); None if the request has no message"""
+        
+        # Extract message from request
+        message = req.message or req.payload.get("message", "")
+        if not message:
+            return None
+        
+        # Build system prompt if agent specified
+        system_prompt = self._get_system_prompt(req)
+        
+        # Prepare messages
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": message})
+        
+        # Prepare headers
+        headers: Dict[str, str] = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        
+        # Determine endpoint and body based on provider type
+        if self.provider_type == "ollama" or "ollama" in self.base_url.lower():
+            # Ollama uses /v1/chat/completions or /api/chat
+            endpoint = f"{self.base_url}/v1/chat/completions"
+            body = {
+                "model": self.model,
+                "messages": messages,
+                "stream": stream,
+            }
+        else:
+            # Standard OpenAI-compatible
+            endpoint = f"{self.base_url}/chat/completions"
+            body = {
+                "model": self.model,
+                "messages": messages,
+                "temperature": self.temperature,
+                "max_tokens": self.max_tokens,
+            }
+            if stream:
+                body["stream"] = True
+        
+        return endpoint, body, headers
+    
     def _get_system_prompt(self, req: RouterRequest) -> Optional[str]:
         """Get system prompt based on agent or context"""
         # 1. Check if context.system_prompt provided (e.g., from Gateway)
@@ -4,9 +4,10 @@ Provider Registry - builds providers from config
 
 import logging
 import os
-from typing import Dict
+from typing import Dict, Optional
 
 from config_loader import RouterConfig, get_llm_profile
+from http_pool import HTTPClientPool, http_pool as default_http_pool
 from .base import Provider
 from .llm_provider import LLMProvider
 from .devtools_provider import DevToolsProvider
@@ -16,12 +17,17 @@ from .vision_encoder_provider import VisionEncoderProvider
 logger = logging.getLogger(__name__)
 
 
-def build_provider_registry(config: RouterConfig) -> Dict[str, Provider]:
+def build_provider_registry(
+    config: RouterConfig,
+    http_pool: Optional[HTTPClientPool] = None,
+) -> Dict[str, Provider]:
     """
     Build provider registry from config.
+    All providers share `http_pool` (router-wide pool by default).
     Returns dict: {provider_id: Provider instance}
     """
     registry: Dict[str, Provider] = {}
+    http_pool = http_pool or default_http_pool
     
     logger.info("Building provider registry...")
     
@@ -55,6 +61,7 @@ def build_provider_registry(config: RouterConfig) -> Dict[str, Provider]:
             max_tokens=profile.max_tokens,
             temperature=profile.temperature,
             provider_type=provider_type,
+            http_pool=http_pool,
         )
         
         registry[provider_id] = provider
@@ -73,7 +80,8 @@ def build_provider_registry(config: RouterConfig) -> Dict[str, Provider]:
             provider = DevToolsProvider(
                 provider_id=provider_id,
                 base_url=base_url,
-                timeout=30
+                timeout=30,
+                http_pool=http_pool,
             )
             
             registry[provider_id] = provider
@@ -87,7 +95,8 @@ def build_provider_registry(config: RouterConfig) -> Dict[str, Provider]:
             provider = CrewAIProvider(
                 provider_id=provider_id,
                 base_url=orch_config["base_url"],
-                timeout=orch_config.get("timeout_ms", 120000) // 1000
+                timeout=orch_config.get("timeout_ms", 120000) // 1000,
+                http_pool=http_pool,
             )
             
             registry[provider_id] = provider
@@ -99,7 +108,8 @@ def build_provider_registry(config: RouterConfig) -> Dict[str, Provider]:
             provider = VisionEncoderProvider(
                 provider_id=provider_id,
                 base_url=orch_config["base_url"],
-                timeout=orch_config.get("timeout_ms", 30000) // 1000
+                timeout=orch_config.get("timeout_ms", 30000) // 1000,
+                http_pool=http_pool,
             )
             
             registry[provider_id] = provider
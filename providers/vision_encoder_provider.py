@@ -11,6 +11,7 @@ import logging
 from typing import Dict, Any, Optional
 import httpx
 
+from http_pool import HTTPClientPool
 from providers.base import Provider
 from router_models import RouterRequest, RouterResponse
 
@@ -32,9 +33,10 @@ class VisionEncoderProvider(Provider):
         provider_id: str,
         base_url: str,
         timeout: int = 60,
+        http_pool: Optional[HTTPClientPool] = None,
         **kwargs
     ):
-        super().__init__(provider_id)
+        super().__init__(provider_id, http_pool)
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
         logger.info(f"VisionEncoderProvider initialized: {provider_id} → {base_url}")
@@ -103,28 +105,28 @@ class VisionEncoderProvider(Provider):
             
             logger.info(f"VisionEncoder embed_text: {text[:100]}...")
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(url, json=body)
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                return RouterResponse(
-                    ok=True,
-                    provider_id=self.id,
-                    data={
-                        "embedding": data.get("embedding"),
-                        "dimension": data.get("dimension"),
-                        "model": data.get("model"),
-                        "normalized": data.get("normalized")
-                    },
-                    metadata={
-                        "provider_type": "vision_encoder",
-                        "operation": "embed_text",
-                        "text_length": len(text),
-                        "status_code": response.status_code
-                    }
-                )
+            client = self.http_pool.get_client(self.base_url)
+            response = await client.post(url, json=body, timeout=self.timeout)
+            response.raise_for_status()
+            
+            data = response.json()
+            
+            return RouterResponse(
+                ok=True,
+                provider_id=self.id,
+                data={
+                    "embedding": data.get("embedding"),
+                    "dimension": data.get("dimension"),
+                    "model": data.get("model"),
+                    "normalized": data.get("normalized")
+                },
+                metadata={
+                    "provider_type": "vision_encoder",
+                    "operation": "embed_text",
+                    "text_length": len(text),
+                    "status_code": response.status_code
+                }
+            )
         
         except httpx.HTTPStatusError as e:
             logger.error(f"VisionEncoder HTTP error: {e}")
@@ -162,28 +164,28 @@ class VisionEncoderProvider(Provider):
             
             logger.info(f"VisionEncoder embed_image: {image_url}")
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(url, json=body)
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                return RouterResponse(
-                    ok=True,
-                    provider_id=self.id,
-                    data={
-                        "embedding": data.get("embedding"),
-                        "dimension": data.get("dimension"),
-                        "model": data.get("model"),
-                        "normalized": data.get("normalized")
-                    },
-                    metadata={
-                        "provider_type": "vision_encoder",
-                        "operation": "embed_image",
-                        "image_url": image_url,
-                        "status_code": response.status_code
-                    }
-                )
+            client = self.http_pool.get_client(self.base_url)
+            response = await client.post(url, json=body, timeout=self.timeout)
+            response.raise_for_status()
+            
+            data = response.json()
+            
+            return RouterResponse(
+                ok=True,
+                provider_id=self.id,
+                data={
+                    "embedding": data.get("embedding"),
+                    "dimension": data.get("dimension"),
+                    "model": data.get("model"),
+                    "normalized": data.get("normalized")
+                },
+                metadata={
+                    "provider_type": "vision_encoder",
+                    "operation": "embed_image",
+                    "image_url": image_url,
+                    "status_code": response.status_code
+                }
+            )
         
         except httpx.HTTPStatusError as e:
             logger.error(f"VisionEncoder HTTP error: {e}")
@@ -8,6 +8,8 @@ import logging
 from typing import Optional, Dict, Any
 import httpx
 
+from http_pool import http_pool
+
 logger = logging.getLogger(__name__)
 
 RAG_SERVICE_URL = os.getenv("RAG_SERVICE_URL", "http://rag-service:9500")
@@ -38,34 +40,38 @@ class RAGClient:
         
         Returns:
             Dictionary with answer, citations, and documents
+            (plus "error" when the query failed)
         """
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/query",
-                    json={
-                        "dao_id": dao_id,
-                        "question": question,
-                        "top_k": top_k,
-                        "user_id": user_id
-                    }
-                )
-                response.raise_for_status()
-                return response.json()
-                
+            client = http_pool.get_client(self.base_url)
+            response = await client.post(
+                f"{self.base_url}/query",
+                json={
+                    "dao_id": dao_id,
+                    "question": question,
+                    "top_k": top_k,
+                    "user_id": user_id
+                },
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            return response.json()
+            
         except httpx.HTTPError as e:
             logger.error(f"RAG query failed: {e}")
             return {
                 "answer": "Помилка при запиті до бази знань.",
                 "citations": [],
-                "documents": []
+                "documents": [],
+                "error": str(e)
             }
         except Exception as e:
             logger.error(f"RAG query error: {e}", exc_info=True)
             return {
                 "answer": "Помилка при запиті до бази знань.",
                 "citations": [],
-                "documents": []
+                "documents": [],
+                "error": str(e)
             }
 
 
@@ -1,17 +1,46 @@
 """
 RBAC Client
 Fetches role-based access control information from microDAO RBAC service
+
+Resolved RBACInfo is cached in-process (LRU + TTL) per (dao_id, user_id):
+- concurrent misses for the same key share one upstream request
+- entries past TTL but within the stale window are served immediately
+  while a background refresh runs
+- membership/role events from microdao-service / dao-service (NATS)
+  invalidate affected entries
 """
-from typing import List
+import os
+import time
+import json
+import asyncio
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
 import httpx
 from pydantic import BaseModel
 import logging
 
+from http_pool import http_pool
+
 logger = logging.getLogger(__name__)
 
 # RBAC service configuration
 RBAC_BASE_URL = "http://127.0.0.1:9200"
 RBAC_RESOLVE_PATH = "/rbac/resolve"
+RBAC_TIMEOUT_S = 5.0
+
+# Cache configuration
+RBAC_CACHE_TTL_S = float(os.getenv("RBAC_CACHE_TTL_S", "60"))
+RBAC_CACHE_STALE_S = float(os.getenv("RBAC_CACHE_STALE_S", "300"))
+RBAC_CACHE_SIZE = int(os.getenv("RBAC_CACHE_SIZE", "10000"))
+
+# NATS events that change membership/roles
+RBAC_EVENT_SUBJECTS = ["microdao.event.*", "dao.event.*"]
+RBAC_INVALIDATING_EVENTS = {
+    "member_added",
+    "member_removed",
+    "member_role_updated",
+    "deleted",
+}
 
 
 class RBACInfo(BaseModel):
@@ -22,41 +51,215 @@ class RBACInfo(BaseModel):
     entitlements: List[str]
 
 
-async def fetch_rbac(dao_id: str, user_id: str) -> RBACInfo:
+RBACKey = Tuple[str, str]
+
+
+class RBACCache:
+    """LRU + TTL cache of RBACInfo with single-flight and stale-while-revalidate"""
+
+    def __init__(
+        self,
+        ttl_s: float = RBAC_CACHE_TTL_S,
+        stale_s: float = RBAC_CACHE_STALE_S,
+        max_size: int = RBAC_CACHE_SIZE,
+    ):
+        self.ttl_s = ttl_s
+        self.stale_s = stale_s
+        self.max_size = max_size
+        # key -> (fetched_at, info)
+        self._entries: "OrderedDict[RBACKey, Tuple[float, RBACInfo]]" = OrderedDict()
+        self._inflight: Dict[RBACKey, asyncio.Task] = {}
+        # Bumped on every invalidation; fetches started earlier are not stored
+        self._epoch = 0
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    async def get(self, dao_id: str, user_id: str) -> RBACInfo:
+        key = (dao_id, user_id)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+
+        if entry is not None:
+            age = now - entry[0]
+            if age < self.ttl_s:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if age < self.ttl_s + self.stale_s:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                self._refresh(key)
+                return entry[1]
+
+        self.misses += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = self._refresh(key)
+
+        try:
+            return await asyncio.shield(task)
+        except httpx.HTTPError as e:
+            logger.error(f"RBAC fetch failed: {e}")
+            if entry is not None:
+                # Expired entry beats a guest downgrade
+                return entry[1]
+            # Return default guest role on error (not cached)
+            return RBACInfo(
+                dao_id=dao_id,
+                user_id=user_id,
+                roles=["guest"],
+                entitlements=["chat.read"]
+            )
+
+    def _refresh(self, key: RBACKey) -> asyncio.Task:
+        """Start (or join) the single upstream fetch for key"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, self._epoch))
+            # Background refreshes may fail unobserved
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        return task
+
+    async def _load(self, key: RBACKey, epoch: int) -> RBACInfo:
+        try:
+            info = await _resolve_rbac(*key)
+        except httpx.HTTPError:
+            self.errors += 1
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        if epoch == self._epoch:
+            self._entries[key] = (time.monotonic(), info)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return info
+
+    def invalidate(self, dao_ids: Set[str], user_id: Optional[str] = None) -> int:
+        """Drop entries for any of dao_ids (all users, or only user_id)"""
+        self._epoch += 1
+        keys = [
+            key for key in self._entries
+            if key[0] in dao_ids and (user_id is None or key[1] == user_id)
+        ]
+        for key in keys:
+            del self._entries[key]
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self):
+        self._epoch += 1
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+    async def handle_event(self, subject: str, payload: Dict) -> int:
+        """Invalidate entries affected by a microdao/dao membership event"""
+        event = subject.rsplit(".", 1)[-1]
+        if event not in RBAC_INVALIDATING_EVENTS:
+            return 0
+        # Router requests may carry either the id or the slug as dao_id
+        dao_ids = {
+            str(payload[field])
+            for field in ("microdao_id", "dao_id", "slug")
+            if payload.get(field)
+        }
+        if not dao_ids:
+            return 0
+        user_id = payload.get("user_id") if event != "deleted" else None
+        dropped = self.invalidate(dao_ids, user_id)
+        logger.info(f"RBAC cache invalidated by {subject}: {dropped} entries")
+        return dropped
+
+
+# Global cache instance
+rbac_cache = RBACCache()
+
+
+async def _resolve_rbac(dao_id: str, user_id: str) -> RBACInfo:
     """
-    Fetch RBAC information from microDAO RBAC service.
-    
-    Args:
-        dao_id: DAO identifier
-        user_id: User identifier
-    
-    Returns:
-        RBACInfo with roles and entitlements
-    
+    Call RBAC service (uncached).
+
     Raises:
         httpx.HTTPError: if RBAC service request fails
     """
     url = f"{RBAC_BASE_URL}{RBAC_RESOLVE_PATH}"
     params = {"dao_id": dao_id, "user_id": user_id}
-    
+
     logger.debug(f"Fetching RBAC: dao_id={dao_id}, user_id={user_id}")
-    
+
+    client = http_pool.get_client(RBAC_BASE_URL)
+    response = await client.get(url, params=params, timeout=RBAC_TIMEOUT_S)
+    response.raise_for_status()
+    data = response.json()
+
+    rbac_info = RBACInfo(**data)
+    logger.info(f"RBAC resolved: roles={rbac_info.roles}, entitlements={len(rbac_info.entitlements)}")
+    return rbac_info
+
+
+async def fetch_rbac(dao_id: str, user_id: str) -> RBACInfo:
+    """
+    Fetch RBAC information from microDAO RBAC service (cached).
+
+    Args:
+        dao_id: DAO identifier
+        user_id: User identifier
+
+    Returns:
+        RBACInfo with roles and entitlements; default guest role if the
+        service is unavailable and nothing is cached
+    """
+    return await rbac_cache.get(dao_id, user_id)
+
+
+async def start_rbac_invalidation(nats_url: str):
+    """
+    Subscribe to microdao/dao events and invalidate cached RBAC.
+    Returns NATS connection (or None if NATS is unavailable).
+    """
+    try:
+        import nats
+    except ImportError:
+        logger.warning("nats-py not installed, RBAC cache relies on TTL only")
+        return None
+
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-        
-        rbac_info = RBACInfo(**data)
-        logger.info(f"RBAC resolved: roles={rbac_info.roles}, entitlements={len(rbac_info.entitlements)}")
-        return rbac_info
-    
-    except httpx.HTTPError as e:
-        logger.error(f"RBAC fetch failed: {e}")
-        # Return default guest role on error
-        return RBACInfo(
-            dao_id=dao_id,
-            user_id=user_id,
-            roles=["guest"],
-            entitlements=["chat.read"]
-        )
+        nc = await nats.connect(nats_url)
+    except Exception as e:
+        logger.warning(f"NATS unavailable ({e}), RBAC cache relies on TTL only")
+        return None
+
+    async def on_event(msg):
+        try:
+            payload = json.loads(msg.data.decode())
+        except ValueError:
+            return
+        if isinstance(payload, dict):
+            await rbac_cache.handle_event(msg.subject, payload)
+
+    for subject in RBAC_EVENT_SUBJECTS:
+        await nc.subscribe(subject, cb=on_event)
+    logger.info(f"RBAC cache invalidation subscribed: {RBAC_EVENT_SUBJECTS} @ {nats_url}")
+    return nc
@@ -2,16 +2,29 @@
 RouterApp - Main router application class
 """
 
+import asyncio
 import logging
-from rbac_client import fetch_rbac
+import os
+import time
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from rbac_client import fetch_rbac, rbac_cache, start_rbac_invalidation
 
 from config_loader import RouterConfig, load_config, ConfigError
-from router_models import RouterRequest, RouterResponse
+from http_pool import POOL_OLLAMA_MAX_CONNECTIONS, http_pool, origin_of
+from router_models import RouterRequest, RouterResponse, StreamChunk
 from providers.registry import build_provider_registry
 from routing_engine import RoutingTable
 
 logger = logging.getLogger(__name__)
 
+# Per-branch deadlines for rag_query retrieval (seconds)
+MEMORY_DEADLINE_S = float(os.getenv("RAG_QUERY_MEMORY_DEADLINE_S", "2.0"))
+RAG_DEADLINE_S = float(os.getenv("RAG_QUERY_RAG_DEADLINE_S", "15.0"))
+
+# NATS for RBAC cache invalidation (membership/role events)
+NATS_URL = os.getenv("NATS_URL")
+
 
 class RouterApp:
     """
@@ -24,14 +37,41 @@ class RouterApp:
         
         logger.info(f"Initializing RouterApp for node: {config.node.id}")
         
+        # Shared HTTP connection pool (providers + RBAC/Memory/RAG clients)
+        self.http_pool = http_pool
+        self._configure_upstream_limits(config)
+        
         # Build provider registry
-        self.providers = build_provider_registry(config)
+        self.providers = build_provider_registry(config, http_pool=self.http_pool)
         
         # Build routing table
         self.routing_table = RoutingTable(config, self.providers)
         
+        self._nats = None
+        
         logger.info("RouterApp initialized successfully")
     
+    def _configure_upstream_limits(self, config: RouterConfig):
+        """
+        Per-upstream pool limits (LLM profiles, Memory Service).
+        Applied before any client exists: limits are fixed at client creation.
+        """
+        from memory_client import MEMORY_POOL_MAX_CONNECTIONS, memory_client
+        
+        limits: Dict[str, int] = {}
+        for profile in config.llm_profiles.values():
+            limit = profile.max_connections
+            if limit is None and profile.provider.lower() == "ollama":
+                limit = POOL_OLLAMA_MAX_CONNECTIONS
+            if limit:
+                origin = origin_of(profile.base_url)
+                limits[origin] = max(limits.get(origin, 0), limit)
+        limits[origin_of(memory_client.base_url)] = MEMORY_POOL_MAX_CONNECTIONS
+        
+        for origin, limit in limits.items():
+            self.http_pool.set_upstream_limits(origin, limit)
+            logger.info(f"HTTP pool limit for {origin}: {limit} connections")
+    
     @classmethod
     def from_config_file(cls, config_path: str = None) -> "RouterApp":
         """
@@ -61,30 +101,7 @@ class RouterApp:
             return await self._handle_rag_query(req)
         
         # 1. RBAC injection for microDAO chat
-        if req.mode == "chat" and req.dao_id and req.user_id:
-            try:
-                rbac = await fetch_rbac(dao_id=req.dao_id, user_id=req.user_id)
-                
-                # Ensure payload.context exists
-                if req.payload is None:
-                    req.payload = {}
-                
-                ctx = req.payload.get("context")
-                if ctx is None or not isinstance(ctx, dict):
-                    ctx = {}
-                    req.payload["context"] = ctx
-                
-                # Inject RBAC info
-                ctx["rbac"] = {
-                    "dao_id": rbac.dao_id,
-                    "user_id": rbac.user_id,
-                    "roles": rbac.roles,
-                    "entitlements": rbac.entitlements,
-                }
-                
-                logger.info(f"RBAC injected for {req.user_id}: roles={rbac.roles}")
-            except Exception as e:
-                logger.warning(f"RBAC fetch failed, continuing without RBAC: {e}")
+        await self._inject_rbac(req)
         
         # 2. Standard routing
         """
@@ -132,13 +149,75 @@ class RouterApp:
                 error=f"Internal error: {str(e)}"
             )
     
+    async def _inject_rbac(self, req: RouterRequest):
+        """Inject RBAC context into payload.context for microDAO chat"""
+        if not (req.mode == "chat" and req.dao_id and req.user_id):
+            return
+        
+        try:
+            rbac = await fetch_rbac(dao_id=req.dao_id, user_id=req.user_id)
+            
+            # Ensure payload.context exists
+            if req.payload is None:
+                req.payload = {}
+            
+            ctx = req.payload.get("context")
+            if ctx is None or not isinstance(ctx, dict):
+                ctx = {}
+                req.payload["context"] = ctx
+            
+            # Inject RBAC info
+            ctx["rbac"] = {
+                "dao_id": rbac.dao_id,
+                "user_id": rbac.user_id,
+                "roles": rbac.roles,
+                "entitlements": rbac.entitlements,
+            }
+            
+            logger.info(f"RBAC injected for {req.user_id}: roles={rbac.roles}")
+        except Exception as e:
+            logger.warning(f"RBAC fetch failed, continuing without RBAC: {e}")
+    
+    async def handle_stream(self, req: RouterRequest) -> AsyncIterator[StreamChunk]:
+        """
+        Stream response deltas for a request.
+        rag_query mode is answered in one chunk (citations need the full answer).
+        """
+        if req.mode == "rag_query":
+            response = await self._handle_rag_query(req)
+            if response.ok:
+                yield StreamChunk(provider_id=response.provider_id, delta=response.data.get("text", ""))
+            yield StreamChunk(
+                provider_id=response.provider_id,
+                done=True,
+                error=response.error,
+                data={"citations": response.data.get("citations", [])} if response.ok else None,
+                metadata=response.metadata,
+            )
+            return
+        
+        await self._inject_rbac(req)
+        
+        logger.info(f"Handling stream request: agent={req.agent}, mode={req.mode}")
+        
+        try:
+            provider = self.routing_table.resolve_provider(req)
+        except ValueError as e:
+            logger.error(f"Routing error: {e}")
+            yield StreamChunk(provider_id="router", done=True, error=f"Routing error: {str(e)}")
+            return
+        
+        logger.info(f"Streaming from provider: {provider.id}")
+        async for chunk in provider.stream(req):
+            yield chunk
+    
     async def _handle_rag_query(self, req: RouterRequest) -> RouterResponse:
         """
         Handle RAG query mode: combines Memory + RAG → LLM
         
         Flow:
-        1. Get Memory context
-        2. Query RAG Service for documents
+        1. Get Memory context and 2. Query RAG Service for documents
+           (concurrently, each with its own deadline)
         3. Build prompt with Memory + RAG
         4. Call LLM provider
         5. Return answer with citations
@@ -147,6 +226,7 @@ class RouterApp:
         from memory_client import memory_client
         
         logger.info(f"Handling RAG query: dao_id={req.dao_id}, user_id={req.user_id}")
+        started = time.perf_counter()
         
         try:
             # Extract question
@@ -160,36 +240,57 @@ class RouterApp:
             
             dao_id = req.dao_id or "daarion"
             user_id = req.user_id or "anonymous"
+            timings: Dict[str, float] = {}
             
-            # 1. Get Memory context
-            memory_ctx = {}
-            try:
-                memory_ctx = await memory_client.get_context(
-                    user_id=user_id,
-                    agent_id=req.agent or "daarwizz",
-                    team_id=dao_id,
-                    channel_id=req.payload.get("channel_id"),
-                    limit=10
-                )
-                logger.info(f"Memory context retrieved: {len(memory_ctx.get('facts', []))} facts, {len(memory_ctx.get('recent_events', []))} events")
-            except Exception as e:
-                logger.warning(f"Memory context fetch failed: {e}")
-            
-            # 2. Query RAG Service
-            rag_resp = await rag_client.query(
-                dao_id=dao_id,
-                question=question,
-                top_k=5,
-                user_id=user_id
+            # 1-2. Memory context and RAG retrieval run concurrently,
+            # each bounded by its own deadline; a late/failed branch degrades to empty
+            retrieval_started = time.perf_counter()
+            (memory_ctx, memory_ms), (rag_resp, rag_ms) = await asyncio.gather(
+                self._run_branch(
+                    "memory",
+                    memory_client.get_context(
+                        user_id=user_id,
+                        agent_id=req.agent or "daarwizz",
+                        team_id=dao_id,
+                        channel_id=req.payload.get("channel_id"),
+                        limit=10
+                    ),
+                    MEMORY_DEADLINE_S,
+                ),
+                self._run_branch(
+                    "rag",
+                    rag_client.query(
+                        dao_id=dao_id,
+                        question=question,
+                        top_k=5,
+                        user_id=user_id
+                    ),
+                    RAG_DEADLINE_S,
+                ),
             )
+            timings["retrieval"] = self._elapsed_ms(retrieval_started)
+            timings["memory"] = memory_ms
+            timings["rag"] = rag_ms
+            
+            degraded = []
+            if memory_ctx is None:
+                degraded.append("memory")
+                memory_ctx = {}
+            if rag_resp is None or rag_resp.get("error"):
+                # RAGClient reports failures as an error dict, not an exception
+                degraded.append("rag")
+                rag_resp = {}
+            
+            logger.info(f"Memory context retrieved: {len(memory_ctx.get('facts', []))} facts, {len(memory_ctx.get('recent_events', []))} events")
             
-            rag_answer = rag_resp.get("answer", "")
             rag_citations = rag_resp.get("citations", [])
             rag_docs = rag_resp.get("documents", [])
+            rag_used = bool(rag_docs or rag_citations)
             
             logger.info(f"RAG retrieved {len(rag_docs)} documents, {len(rag_citations)} citations")
             
             # 3. Build final prompt with Memory + RAG (using optimized prompt builder)
+            prompt_started = time.perf_counter()
             from utils.rag_prompt_builder import build_rag_prompt_with_citations, estimate_token_count
             
             # Only include RAG if available
@@ -215,6 +316,7 @@ class RouterApp:
             
             # Estimate token count for logging
             estimated_tokens = estimate_token_count(final_prompt)
+            timings["prompt"] = self._elapsed_ms(prompt_started)
             logger.info(f"Final prompt length: ~{estimated_tokens} tokens, RAG used: {rag_used}")
             
             # 4. Call LLM provider
@@ -233,7 +335,10 @@ class RouterApp:
                 payload=req.payload
             )
             
+            llm_started = time.perf_counter()
             llm_response = await provider.call(llm_req)
+            timings["llm"] = self._elapsed_ms(llm_started)
+            timings["total"] = self._elapsed_ms(started)
             
             if not llm_response.ok:
                 return RouterResponse(
@@ -256,7 +361,9 @@ class RouterApp:
                     "documents_retrieved": len(rag_docs) if rag_used else 0,
                     "citations_count": len(rag_citations) if rag_used else 0,
                     "prompt_tokens_estimated": estimated_tokens,
-                    "rag_metrics": rag_resp.get("metrics") if rag_resp else None
+                    "rag_metrics": rag_resp.get("metrics") if rag_resp else None,
+                    "degraded": degraded,
+                    "timings_ms": timings,
                 },
                 error=None
             )
@@ -269,6 +376,63 @@ class RouterApp:
                 error=f"RAG query failed: {str(e)}"
             )
     
+    async def startup(self):
+        """Start background listeners (RBAC cache invalidation)"""
+        if NATS_URL:
+            self._nats = await start_rbac_invalidation(NATS_URL)
+        else:
+            logger.info("NATS_URL not set, RBAC cache relies on TTL only")
+    
+    async def shutdown(self):
+        """Release pooled HTTP connections and NATS subscription"""
+        if self._nats is not None:
+            try:
+                await self._nats.close()
+            except Exception as e:
+                logger.warning(f"Failed to close NATS connection: {e}")
+            self._nats = None
+        await self.http_pool.aclose()
+    
+    def get_cache_info(self):
+        """Get hit/miss counters of router caches"""
+        from memory_client import memory_client
+        
+        return {
+            "rbac": rbac_cache.stats(),
+            "routing": self.routing_table.cache_info(),
+            "memory_context": {
+                "size": len(memory_client._context_cache),
+                "hits": memory_client.cache_hits,
+                "misses": memory_client.cache_misses,
+            },
+        }
+    
+    def get_pool_info(self):
+        """Get HTTP pool occupancy per upstream"""
+        return {
+            "http2": self.http_pool.http2,
+            "max_connections": self.http_pool.max_connections,
+            "max_keepalive_connections": self.http_pool.max_keepalive_connections,
+            "upstreams": self.http_pool.stats(),
+        }
+    
+    @staticmethod
+    def _elapsed_ms(started: float) -> float:
+        return round((time.perf_counter() - started) * 1000, 1)
+    
+    async def _run_branch(self, name: str, coro, deadline_s: float) -> Tuple[Optional[Any], float]:
+        """Await one retrieval branch; returns (result or None on timeout/error, elapsed ms)"""
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(coro, timeout=deadline_s)
+        except asyncio.TimeoutError:
+            logger.warning(f"{name} branch exceeded {deadline_s}s deadline, continuing without it")
+            result = None
+        except Exception as e:
+            logger.warning(f"{name} branch failed, continuing without it: {e}")
+            result = None
+        return result, self._elapsed_ms(started)
+    
     def get_provider_info(self):
         """Get info about registered providers"""
         return {
@@ -294,14 +458,13 @@ class RouterApp:
                     "description": rule.description,
                 }
                 for rule in self.routing_table.rules
-            ]
+            ],
+            "decision_cache": self.routing_table.cache_info(),
         }
 
 
 # Quick test
 if __name__ == "__main__":
-    import asyncio
-    
     async def test():
         print("Testing RouterApp...\n")
         
@@ -40,3 +40,21 @@ class RouterResponse:
     def __post_init__(self):
         if self.metadata is None:
             self.metadata = {}
+
+
+@dataclass
+class StreamChunk:
+    """
+    Incremental piece of a streamed provider response.
+    The last chunk has done=True and carries error/metadata.
+    """
+    provider_id: str
+    delta: str = ""
+    done: bool = False
+    error: Optional[str] = None
+    data: Any = None
+    metadata: Dict[str, Any] = None
+    
+    def __post_init__(self):
+        if self.metadata is None:
+            self.metadata = {}
@@ -1,9 +1,16 @@
 """
 Routing Engine - matches requests to providers based on rules
+
+Rules are compiled once at load time into an index keyed by
+agent / mode / task_type (with precomputed env checks), and resolved
+decisions are memoized in a bounded LRU keyed by the routing-relevant
+fields of the request.
 """
 
 import logging
-from typing import Dict, List, Optional
+import os
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
 
 from config_loader import RouterConfig, RoutingRule, get_routing_rules
 from router_models import RouterRequest
@@ -11,38 +18,55 @@ from providers.base import Provider
 
 logger = logging.getLogger(__name__)
 
+# Max number of memoized routing decisions / candidate lists
+DECISION_CACHE_SIZE = 4096
+
+# Provider aliases accepted in payload.provider for use_llm: metadata.provider
+METADATA_PROVIDER_ALIASES = {
+    "local_slm": "llm_local_qwen3_8b",
+    "cloud_deepseek": "llm_cloud_deepseek",
+}
+
+# Wildcard marker for index keys (rule does not constrain the field)
+_ANY = object()
+
 
 def rule_matches(rule: RoutingRule, req: RouterRequest) -> bool:
-    """Check if routing rule matches the request"""
-    
+    """
+    Check if routing rule matches the request.
+
+    Reference (uncompiled) matcher. RoutingTable uses CompiledRule and
+    falls back to this only for requests with unhashable routing fields.
+    """
+
     when = rule.when
-    
+
     # Check agent match
     if "agent" in when:
         if when["agent"] != req.agent:
             return False
-    
+
     # Check mode match
     if "mode" in when:
         if when["mode"] != req.mode:
             return False
-    
+
     # Check metadata_has
     if "metadata_has" in when:
         metadata_key = when["metadata_has"]
         if metadata_key not in req.payload:
             return False
-    
+
     # Check task_type (in metadata or payload)
     if "task_type" in when:
         expected_types = when["task_type"]
         if not isinstance(expected_types, list):
             expected_types = [expected_types]
-        
+
         actual_type = req.payload.get("task_type")
         if actual_type not in expected_types:
             return False
-    
+
     # Check AND conditions
     if "and" in when:
         and_conditions = when["and"]
@@ -55,91 +79,225 @@ def rule_matches(rule: RoutingRule, req: RouterRequest) -> bool:
                     actual_type = req.payload.get("task_type")
                     if actual_type not in expected_types:
                         return False
-                        
+
                 if "api_key_available" in condition:
-                    import os
                     key_name = condition["api_key_available"]
                     if not os.getenv(key_name):
                         return False
-    
+
     return True
 
 
+class CompiledRule:
+    """
+    Routing rule with its `when` block flattened into plain attributes.
+
+    - agent / mode: exact value or _ANY
+    - task_types: frozenset the request task_type must belong to, or None
+      (top-level task_type and every `and` task_type are intersected)
+    - metadata_key: payload key that must be present, or None
+    - env_ok: result of all `api_key_available` checks at compile time
+    """
+
+    __slots__ = ("rule", "order", "agent", "mode", "task_types", "metadata_key", "env_ok", "is_default")
+
+    def __init__(self, rule: RoutingRule, order: int):
+        when = rule.when
+        self.rule = rule
+        self.order = order
+        self.is_default = bool(when.get("default"))
+        self.agent = when["agent"] if "agent" in when else _ANY
+        self.mode = when["mode"] if "mode" in when else _ANY
+        self.metadata_key = when["metadata_has"] if "metadata_has" in when else None
+
+        task_types: Optional[FrozenSet[Any]] = None
+        constraints = []
+        if "task_type" in when:
+            constraints.append(when["task_type"])
+
+        env_ok = True
+        for condition in when.get("and", []) or []:
+            if not isinstance(condition, dict):
+                continue
+            if "task_type" in condition:
+                constraints.append(condition["task_type"])
+            if "api_key_available" in condition:
+                if not os.getenv(condition["api_key_available"]):
+                    env_ok = False
+
+        for expected in constraints:
+            if not isinstance(expected, list):
+                expected = [expected]
+            expected_set = frozenset(expected)
+            task_types = expected_set if task_types is None else task_types & expected_set
+
+        self.task_types = task_types
+        self.env_ok = env_ok
+
+    def matches_static(self, agent: Any, mode: Any, task_type: Any) -> bool:
+        """Check the fields that are part of the index key"""
+        if self.agent is not _ANY and self.agent != agent:
+            return False
+        if self.mode is not _ANY and self.mode != mode:
+            return False
+        if self.task_types is not None and task_type not in self.task_types:
+            return False
+        return True
+
+
 class RoutingTable:
     """Routing table that resolves providers based on rules"""
-    
+
     def __init__(self, config: RouterConfig, providers: Dict[str, Provider]):
         self.config = config
         self.providers = providers
         self.rules = get_routing_rules(config)  # Already sorted by priority
-        
+
         logger.info(f"Routing table initialized with {len(self.rules)} rules")
         for rule in self.rules:
             logger.info(f"  [{rule.priority}] {rule.id} → {rule.use_llm}")
-    
+
+        self._compile()
+
+    # ------------------------------------------------------------------
+    # Compilation
+    # ------------------------------------------------------------------
+
+    def _compile(self):
+        """Compile rules into agent/mode indexes and reset caches"""
+        compiled = [CompiledRule(rule, order) for order, rule in enumerate(self.rules)]
+
+        # Specific rules that can ever match (env checks are precomputed)
+        specific = [c for c in compiled if not c.is_default and c.env_ok]
+        self._default_rule: Optional[RoutingRule] = next(
+            (c.rule for c in compiled if c.is_default), None
+        )
+
+        # Index specific rules by agent; _ANY bucket holds agent-agnostic rules
+        self._by_agent: Dict[Any, List[CompiledRule]] = {}
+        for c in specific:
+            self._by_agent.setdefault(c.agent, []).append(c)
+
+        # Payload keys that influence a decision (part of the cache key)
+        self._metadata_keys: FrozenSet[str] = frozenset(
+            c.metadata_key for c in specific if c.metadata_key is not None
+        )
+        value_keys = {r.use_metadata for r in self.rules if r.use_metadata}
+        if any(r.use_llm == "metadata.provider" for r in self.rules):
+            value_keys.add("provider")
+        self._value_keys: Tuple[str, ...] = tuple(sorted(value_keys))
+
+        self._candidates: "OrderedDict[tuple, List[CompiledRule]]" = OrderedDict()
+        self._decisions: "OrderedDict[tuple, Tuple[RoutingRule, Provider]]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        logger.info(
+            f"Routing rules compiled: {len(specific)} active, "
+            f"{len(self._by_agent)} agent buckets, default={'yes' if self._default_rule else 'no'}"
+        )
+
+    def invalidate_cache(self):
+        """
+        Recompile rules and drop memoized decisions.
+        Call after env vars used by `api_key_available` change.
+        """
+        self._compile()
+
+    def cache_info(self) -> Dict[str, int]:
+        """Decision cache statistics"""
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "size": len(self._decisions),
+            "max_size": DECISION_CACHE_SIZE,
+        }
+
+    def _get_candidates(self, agent: Any, mode: Any, task_type: Any) -> List[CompiledRule]:
+        """Specific rules matching (agent, mode, task_type), in priority order"""
+        key = (agent, mode, task_type)
+        candidates = self._candidates.get(key)
+        if candidates is not None:
+            return candidates
+
+        pool = self._by_agent.get(agent, []) + self._by_agent.get(_ANY, [])
+        candidates = sorted(
+            (c for c in pool if c.matches_static(agent, mode, task_type)),
+            key=lambda c: c.order,
+        )
+
+        self._candidates[key] = candidates
+        if len(self._candidates) > DECISION_CACHE_SIZE:
+            self._candidates.popitem(last=False)
+        return candidates
+
+    # ------------------------------------------------------------------
+    # Resolution
+    # ------------------------------------------------------------------
+
     def resolve_provider(self, req: RouterRequest) -> Provider:
         """
         Resolve which provider should handle the request.
         Returns Provider instance.
         Raises ValueError if no matching rule or provider not found.
         """
-        
+        payload = req.payload
+        task_type = payload.get("task_type")
+
+        try:
+            cache_key = (
+                req.agent,
+                req.mode,
+                task_type,
+                self._metadata_keys.intersection(payload) if self._metadata_keys else None,
+                tuple([payload.get(k) for k in self._value_keys]) if self._value_keys else None,
+            )
+            cached = self._decisions.get(cache_key)
+        except TypeError:
+            # Unhashable routing fields: resolve without index or cache
+            return self._resolve_uncached(req)
+
+        if cached is not None:
+            self._decisions.move_to_end(cache_key)
+            self.cache_hits += 1
+            return cached[1]
+
+        self.cache_misses += 1
         logger.debug(f"Resolving provider for request: mode={req.mode}, agent={req.agent}")
-        
-        # Find first matching rule (rules already sorted by priority)
+
+        matched_rule = None
+        for c in self._get_candidates(req.agent, req.mode, task_type):
+            if c.metadata_key is None or c.metadata_key in payload:
+                matched_rule = c.rule
+                break
+
+        provider = self._select_provider(matched_rule or self._default_rule, req)
+
+        self._decisions[cache_key] = (matched_rule, provider)
+        if len(self._decisions) > DECISION_CACHE_SIZE:
+            self._decisions.popitem(last=False)
+
+        return provider
+
+    def _resolve_uncached(self, req: RouterRequest) -> Provider:
+        """Linear scan with the reference matcher (no index, no memoization)"""
         matched_rule = None
         for rule in self.rules:
             # Skip default rules for now
             if rule.when.get("default"):
                 continue
-            
+
             if rule_matches(rule, req):
                 matched_rule = rule
                 break
-        
-        # If no specific rule matched, try default rule
-        if not matched_rule:
-            for rule in self.rules:
-                if rule.when.get("default"):
-                    matched_rule = rule
-                    break
-        
+
+        return self._select_provider(matched_rule or self._default_rule, req)
+
+    def _select_provider(self, matched_rule: Optional[RoutingRule], req: RouterRequest) -> Provider:
+        """Map matched rule to a registered Provider"""
         if not matched_rule:
             raise ValueError("No routing rule matched and no default rule defined")
-        
-        # Determine provider_id from rule
-        if matched_rule.use_provider:
-            provider_id = matched_rule.use_provider
-        elif matched_rule.use_llm:
-            provider_id = self._resolve_provider_id(matched_rule.use_llm, req)
-        elif matched_rule.use_metadata:
-            provider_id = req.payload.get(matched_rule.use_metadata) if req.payload else None
-        else:
-            raise ValueError(f"Rule '{matched_rule.id}' has no use_llm, use_provider, or use_metadata")
-        
-        logger.info(f"Matched rule: {matched_rule.id} → {provider_id}")
-        # Determine provider_id from rule
-        if matched_rule.use_provider:
-            provider_id = matched_rule.use_provider
-        elif matched_rule.use_llm:
-            provider_id = self._resolve_provider_id(matched_rule.use_llm, req)
-        elif matched_rule.use_metadata:
-            provider_id = req.payload.get(matched_rule.use_metadata) if req.payload else None
-        else:
-            raise ValueError(f"Rule '{matched_rule.id}' has no use_llm, use_provider, or use_metadata")
-        
-        logger.info(f"Matched rule: {matched_rule.id} → {provider_id}")
-        # Determine provider_id from rule
-        if matched_rule.use_provider:
-            provider_id = matched_rule.use_provider
-        elif matched_rule.use_llm:
-            provider_id = self._resolve_provider_id(matched_rule.use_llm, req)
-        elif matched_rule.use_metadata:
-            provider_id = req.payload.get(matched_rule.use_metadata) if req.payload else None
-        else:
-            raise ValueError(f"Rule '{matched_rule.id}' has no use_llm, use_provider, or use_metadata")
-        
-        logger.info(f"Matched rule: {matched_rule.id} → {provider_id}")
+
         # Determine provider_id from rule
         if matched_rule.use_provider:
             provider_id = matched_rule.use_provider
@@ -149,27 +307,27 @@ class RoutingTable:
             provider_id = req.payload.get(matched_rule.use_metadata) if req.payload else None
         else:
             raise ValueError(f"Rule '{matched_rule.id}' has no use_llm, use_provider, or use_metadata")
-        
+
         logger.info(f"Matched rule: {matched_rule.id} → {provider_id}")
-        
+
         if provider_id not in self.providers:
             available = ", ".join(self.providers.keys())
             raise ValueError(
                 f"Rule '{matched_rule.id}' uses unknown provider '{provider_id}'. "
                 f"Available: {available}"
             )
-        
+
         provider = self.providers[provider_id]
-        logger.info(f"Selected provider: {provider}")
-        
+        logger.debug(f"Selected provider: {provider}")
+
         return provider
-    
+
     def _resolve_provider_id(self, use_llm: str, req: RouterRequest) -> str:
         """
         Resolve provider ID from use_llm field.
         Handles special cases like 'metadata.provider'
         """
-        
+
         # Special case: metadata.provider
         if use_llm == "metadata.provider":
             provider_from_meta = req.payload.get("provider")
@@ -177,13 +335,8 @@ class RoutingTable:
                 raise ValueError("Rule uses 'metadata.provider' but no provider in metadata")
             # Map provider names to provider IDs
             # e.g., "local_slm" → "llm_local_qwen3_8b"
-            if provider_from_meta == "local_slm":
-                return "llm_local_qwen3_8b"
-            elif provider_from_meta == "cloud_deepseek":
-                return "llm_cloud_deepseek"
-            else:
-                return provider_from_meta
-        
+            return METADATA_PROVIDER_ALIASES.get(provider_from_meta, provider_from_meta)
+
         # Map profile names to provider IDs
         # use_llm typically references llm_profile name
         return f"llm_{use_llm}"
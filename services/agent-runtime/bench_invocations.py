@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Invocation throughput benchmark for agent-runtime
+
+Runs handle_invocation through InvocationPool against a local stub
+(messaging-service + LLM proxy + agent-memory on one port) and reports
+invocations/sec as the number of workers grows. Also checks that
+invocations of one channel completed in submission order.
+
+Then compares per-invocation prompt-build latency (blueprint + history +
+memory + prompt) with the blueprint cache and channel ring buffer off vs on;
+with them on, each invocation's message arrives as a message.created event first.
+
+Usage:
+    python bench_invocations.py [--invocations 200] [--channels 50] [--llm-latency-ms 100]
+                                [--messaging-latency-ms 20]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+
+MESSAGES = json.dumps([{
+    "id": str(uuid.uuid4()),
+    "sender_id": "user:1",
+    "sender_type": "human",
+    "body": "Привіт! Що нового?",
+    "created_at": "2025-01-01T00:00:00Z"
+}]).encode()
+
+
+def make_stub_handler(llm_latency_s: float, messaging_latency_s: float):
+    async def stub_handler(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Minimal HTTP/1.1 keep-alive server for all downstream services"""
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                request_line = head.split(b"\r\n", 1)[0].decode()
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+
+                path = request_line.split(" ")[1]
+                if "/messages" in path:
+                    await asyncio.sleep(messaging_latency_s)
+                    body = MESSAGES
+                elif "/llm/proxy" in path:
+                    await asyncio.sleep(llm_latency_s)
+                    body = b'{"content": "stub reply"}'
+                else:
+                    body = b'{"results": []}'
+
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+    return stub_handler
+
+
+async def run(workers: int, invocations: int, channels: int, handle_invocation):
+    from invocation_pool import InvocationPool
+
+    completed = {}
+    out_of_order = 0
+
+    async def handler(data):
+        nonlocal out_of_order
+        await handle_invocation(data)
+        channel_id, seq = data["payload"]["channel_id"], data["payload"]["seq"]
+        if completed.get(channel_id, -1) > seq:
+            out_of_order += 1
+        completed[channel_id] = seq
+
+    pool = InvocationPool(handler, workers=workers, max_queue=workers * 4)
+    pool.start()
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(invocations):
+            channel_id = f"channel-{i % channels}"
+            await pool.submit(channel_id, {
+                "agent_id": "agent:sofia",
+                "entrypoint": "channel_message",
+                "payload": {"channel_id": channel_id, "microdao_id": "microdao:daarion", "seq": i}
+            })
+        await pool.stop(drain=True)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"workers={workers:<3} {invocations / elapsed:7.1f} inv/s  "
+        f"elapsed={elapsed:6.2f}s  out_of_order={out_of_order}"
+    )
+
+
+async def run_prompt_build(label: str, invocations: int, channels: int, events: bool):
+    """Sequential invocations; records the prompt-build time of each one"""
+    import main
+
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(invocations):
+            channel_id = f"channel-{i % channels}"
+            message_id = str(uuid.uuid4())
+            if events:
+                main.channel_history.add_event({
+                    "channel_id": channel_id,
+                    "message_id": message_id,
+                    "sender_id": "user:1",
+                    "sender_type": "human",
+                    "content_preview": f"Повідомлення {i}",
+                    "created_at": f"2025-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}+00:00"
+                })
+            await main.handle_invocation({
+                "agent_id": "agent:sofia",
+                "entrypoint": "channel_message",
+                "payload": {"channel_id": channel_id, "message_id": message_id, "microdao_id": "microdao:daarion"}
+            })
+            samples.append(main.prompt_build_stats["last_ms"])
+
+    samples.sort()
+    print(
+        f"{label:<9} avg={statistics.mean(samples):6.2f} ms  "
+        f"p50={samples[len(samples) // 2]:6.2f} ms  p95={samples[int(len(samples) * 0.95)]:6.2f} ms  "
+        f"history={main.channel_history.stats()}"
+    )
+
+
+async def main_async(args):
+    server = await asyncio.start_server(
+        make_stub_handler(args.llm_latency_ms / 1000, args.messaging_latency_ms / 1000), "127.0.0.1", 0
+    )
+    base_url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+    for var in ("MESSAGING_SERVICE_URL", "LLM_PROXY_URL", "AGENT_MEMORY_URL"):
+        os.environ[var] = base_url
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from main import handle_invocation
+
+    print(
+        f"{args.invocations} invocations over {args.channels} channels, "
+        f"LLM latency {args.llm_latency_ms} ms\n"
+    )
+    for workers in (1, 2, 4, 8, 16, 32):
+        await run(workers, args.invocations, args.channels, handle_invocation)
+
+    import main
+    from context_cache import BlueprintCache, ChannelHistoryBuffer
+
+    print(f"\nPrompt build, messaging latency {args.messaging_latency_ms} ms\n")
+    main.blueprint_cache = BlueprintCache(ttl_s=0)
+    main.channel_history = ChannelHistoryBuffer(size=0)
+    await run_prompt_build("uncached", args.invocations, args.channels, events=False)
+
+    main.blueprint_cache = BlueprintCache()
+    main.channel_history = ChannelHistoryBuffer()
+    await run_prompt_build("cached", args.invocations, args.channels, events=True)
+
+    from http_client import close_http_client
+    await close_http_client()
+    server.close()
+    await server.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="agent-runtime invocation benchmark")
+    parser.add_argument("--invocations", type=int, default=200)
+    parser.add_argument("--channels", type=int, default=50)
+    parser.add_argument("--llm-latency-ms", type=float, default=100)
+    parser.add_argument("--messaging-latency-ms", type=float, default=20)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
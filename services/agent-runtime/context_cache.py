@@ -0,0 +1,216 @@
+"""
+In-process context caches for agent-runtime
+
+- BlueprintCache: agent blueprints, TTL + LRU, invalidated by agent update events
+- ChannelHistoryBuffer: per-channel ring buffer of recent messages, seeded once
+  over HTTP and then kept current from messaging.message.created events
+"""
+import asyncio
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from models import AgentBlueprint, ChannelMessage
+
+
+class BlueprintCache:
+    """Agent blueprints by agent_id (LRU + TTL)"""
+
+    def __init__(self, ttl_s: float = 300.0, max_size: int = 256):
+        self.ttl_s = ttl_s
+        self.max_size = max_size
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        # Bumped on invalidation so a load started before it is not cached
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, agent_id: str, loader: Callable[[str], Awaitable[AgentBlueprint]]) -> AgentBlueprint:
+        if self.ttl_s <= 0:
+            return await loader(agent_id)
+
+        item = self._items.get(agent_id)
+        if item and item[0] > time.monotonic():
+            self._items.move_to_end(agent_id)
+            self.hits += 1
+            return item[1]
+
+        # Concurrent misses for the same agent share one load
+        pending = self._loading.get(agent_id)
+        if pending:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        epoch = self._epoch
+        future = asyncio.get_running_loop().create_future()
+        self._loading[agent_id] = future
+        try:
+            blueprint = await loader(agent_id)
+            future.set_result(blueprint)
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters get the exception; avoid "never retrieved" warnings
+            future.exception()
+            raise
+        finally:
+            self._loading.pop(agent_id, None)
+            if not future.done():
+                future.cancel()
+
+        if epoch == self._epoch:
+            self._items[agent_id] = (time.monotonic() + self.ttl_s, blueprint)
+            self._items.move_to_end(agent_id)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+        return blueprint
+
+    def invalidate(self, agent_id: Optional[str] = None):
+        """Drop one agent (or all agents when agent_id is None)"""
+        self._epoch += 1
+        self.invalidations += 1
+        if agent_id is None:
+            self._items.clear()
+        else:
+            self._items.pop(agent_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+class _ChannelHistory:
+    def __init__(self, size: int):
+        self.messages: Deque[ChannelMessage] = deque(maxlen=size)
+        self.synced = False
+        # Events that arrive while the initial fetch is in flight
+        self.early: List[ChannelMessage] = []
+
+    def ids(self) -> set:
+        return {m.message_id for m in self.messages if m.message_id}
+
+
+class ChannelHistoryBuffer:
+    """
+    Recent messages per channel, oldest first
+
+    A channel is tracked after its first fetch; from then on
+    message.created events append to it and no HTTP fetch is needed as long
+    as the buffer already contains the message that triggered the invocation.
+    """
+
+    def __init__(self, size: int = 50, max_channels: int = 1000):
+        self.size = size
+        self.max_channels = max_channels
+        self._channels: "OrderedDict[str, _ChannelHistory]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.events = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    async def get(
+        self,
+        channel_id: str,
+        fetch: Callable[[str, int], Awaitable[List[ChannelMessage]]],
+        message_id: Optional[str] = None
+    ) -> List[ChannelMessage]:
+        if not self.enabled:
+            return await fetch(channel_id, 50)
+
+        history = self._channels.get(channel_id)
+        if history and history.synced and (not message_id or message_id in history.ids()):
+            self._channels.move_to_end(channel_id)
+            self.hits += 1
+            return list(history.messages)
+
+        # Not tracked yet, or the triggering message has not arrived as an event
+        self.misses += 1
+        history = self._track(channel_id)
+        history.synced = False
+        messages = await fetch(channel_id, self.size)
+        self._seed(history, messages)
+        return list(history.messages)
+
+    def add_event(self, event: dict):
+        """Apply a messaging.message.created event (ignored for untracked channels)"""
+        history = self._channels.get(event.get("channel_id"))
+        if history is None:
+            return
+        message = message_from_event(event)
+        if message is None:
+            return
+        self.events += 1
+        if not history.synced:
+            history.early.append(message)
+        elif message.message_id not in history.ids():
+            self._append_ordered(history, message)
+
+    def invalidate(self, channel_id: str):
+        self._channels.pop(channel_id, None)
+
+    def _track(self, channel_id: str) -> _ChannelHistory:
+        history = self._channels.get(channel_id)
+        if history is None:
+            history = _ChannelHistory(self.size)
+            self._channels[channel_id] = history
+            while len(self._channels) > self.max_channels:
+                self._channels.popitem(last=False)
+        self._channels.move_to_end(channel_id)
+        return history
+
+    def _seed(self, history: _ChannelHistory, messages: List[ChannelMessage]):
+        merged = {}
+        for message in list(messages) + history.early:
+            merged[message.message_id or id(message)] = message
+        history.messages.clear()
+        history.messages.extend(sorted(merged.values(), key=lambda m: m.created_at)[-self.size:])
+        history.early = []
+        history.synced = True
+
+    def _append_ordered(self, history: _ChannelHistory, message: ChannelMessage):
+        messages = history.messages
+        if not messages or messages[-1].created_at <= message.created_at:
+            messages.append(message)
+            return
+        # Out-of-order delivery: rare, rebuild the (small) window
+        ordered = sorted(list(messages) + [message], key=lambda m: m.created_at)
+        messages.clear()
+        messages.extend(ordered[-self.size:])
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "channels": len(self._channels),
+            "size": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "events": self.events,
+        }
+
+
+def message_from_event(event: dict) -> Optional[ChannelMessage]:
+    """Build a ChannelMessage from a messaging.message.created payload"""
+    content = event.get("content_preview")
+    if content is None:
+        # Older publishers do not include the text; the next fetch will have it
+        return None
+    try:
+        return ChannelMessage(
+            message_id=event.get("message_id"),
+            sender_id=event.get("sender_id", "unknown"),
+            sender_type=event.get("sender_type", "human"),
+            content=content,
+            created_at=datetime.fromisoformat(event["created_at"].replace("Z", "+00:00"))
+        )
+    except Exception as e:
+        print(f"⚠️ Error parsing message event: {e}")
+        return None
@@ -0,0 +1,114 @@
+"""
+Invocation worker pool for agent-runtime
+
+- up to `workers` invocations run concurrently
+- invocations with the same key (channel_id) run one at a time, in arrival order,
+  so replies in a channel stay ordered
+- at most `max_queue` invocations are accepted (queued + running);
+  submit() waits when the pool is full, which stops pulling from NATS
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+Handler = Callable[[dict], Awaitable[Any]]
+Callback = Optional[Callable[[], Awaitable[Any]]]
+
+
+class InvocationPool:
+    """Bounded worker pool with per-key sequential lanes"""
+
+    def __init__(self, handler: Handler, workers: int = 8, max_queue: int = 100):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_queue = max(self.workers, max_queue)
+
+        # key -> pending (data, on_success, on_failure); key present while a lane is queued/running
+        self._lanes: Dict[str, Deque[Tuple[dict, Callback, Callback]]] = {}
+        self._ready: "asyncio.Queue[str]" = asyncio.Queue()
+        self._capacity = asyncio.Semaphore(self.max_queue)
+        self._tasks: list = []
+
+        self.pending = 0
+        self.active = 0
+        self.processed = 0
+        self.failed = 0
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, drain: bool = True, drain_timeout: float = 30.0):
+        """
+        Stop workers (optionally after everything accepted has run, up to
+        drain_timeout seconds). Invocations still pending are not acked, so
+        JetStream redelivers them after ack_wait.
+        """
+        if drain:
+            deadline = time.monotonic() + drain_timeout
+            while self.pending and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+        if self.pending:
+            print(f"⚠️ Invocation pool stopped with {self.pending} unfinished invocation(s)")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def free_slots(self) -> int:
+        return self.max_queue - self.pending
+
+    async def submit(self, key: str, data: dict, on_success: Callback = None, on_failure: Callback = None):
+        """Queue an invocation; waits while the pool is full"""
+        await self._capacity.acquire()
+        self.pending += 1
+        lane = self._lanes.get(key)
+        if lane is None:
+            # New lane: schedule it; otherwise the running lane picks it up in order
+            self._lanes[key] = deque([(data, on_success, on_failure)])
+            self._ready.put_nowait(key)
+        else:
+            lane.append((data, on_success, on_failure))
+
+    async def _worker(self):
+        while True:
+            key = await self._ready.get()
+            lane = self._lanes[key]
+            data, on_success, on_failure = lane.popleft()
+
+            self.active += 1
+            try:
+                await self.handler(data)
+                self.processed += 1
+                callback = on_success
+            except Exception as e:
+                self.failed += 1
+                print(f"❌ Invocation failed ({key}): {e}")
+                callback = on_failure
+            finally:
+                self.active -= 1
+                self.pending -= 1
+                self._capacity.release()
+                # Next invocation of this channel goes to the back of the ready queue
+                if lane:
+                    self._ready.put_nowait(key)
+                else:
+                    del self._lanes[key]
+
+            if callback:
+                try:
+                    await callback()
+                except Exception as e:
+                    print(f"⚠️ Ack/nak failed ({key}): {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+            "active": self.active,
+            "channels": len(self._lanes),
+            "processed": self.processed,
+            "failed": self.failed,
+        }
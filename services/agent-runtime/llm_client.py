@@ -1,35 +1,43 @@
 import httpx
 import os
+from http_client import get_http_client
 
 LLM_PROXY_URL = os.getenv("LLM_PROXY_URL", "http://llm-proxy:7007")
 
-async def generate_response(model: str, messages: list[dict], max_tokens: int = 1000) -> str:
+async def generate_response(
+    model: str,
+    messages: list[dict],
+    max_tokens: int = 1000,
+    agent_id: str = "agent:runtime",
+    microdao_id: str = "microdao:daarion"
+) -> str:
     """
     Call LLM Proxy to generate response
     
     Falls back to mock response if LLM Proxy is not available
     """
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{LLM_PROXY_URL}/internal/llm/proxy",
-                headers={
-                    "X-Internal-Secret": os.getenv("LLM_PROXY_SECRET", "dev-secret-token"),
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": model,
-                    "messages": messages,
-                    "max_tokens": max_tokens,
-                    "metadata": {
-                        "agent_id": "agent:runtime",
-                        "microdao_id": "microdao:daarion"
-                    }
+        client = get_http_client()
+        response = await client.post(
+            f"{LLM_PROXY_URL}/internal/llm/proxy",
+            headers={
+                "X-Internal-Secret": os.getenv("LLM_PROXY_SECRET", "dev-secret-token"),
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": model,
+                "messages": messages,
+                "max_tokens": max_tokens,
+                "metadata": {
+                    "agent_id": agent_id,
+                    "microdao_id": microdao_id
                 }
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data.get("content", "")
+            },
+            timeout=30.0
+        )
+        response.raise_for_status()
+        data = response.json()
+        return data.get("content", "")
     except httpx.HTTPStatusError as e:
         print(f"⚠️ LLM Proxy HTTP error: {e.response.status_code}")
         return await generate_mock_response(messages)
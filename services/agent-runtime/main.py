@@ -4,25 +4,60 @@ from llm_client import generate_response
 from messaging_client import get_channel_messages, post_message
 from memory_client import query_memory, store_memory
 from pep_client import pep_client
+from invocation_pool import InvocationPool
+from http_client import close_http_client
+from context_cache import BlueprintCache, ChannelHistoryBuffer
 import asyncio
 import json
 import os
+import time
 
 app = FastAPI(title="DAARION Agent Runtime", version="1.0.0")
 
 # Configuration
 NATS_URL = os.getenv("NATS_URL", "nats://nats:4222")
+INVOCATION_SUBJECT = "router.invoke.agent"
+INVOCATION_STREAM = os.getenv("INVOCATION_STREAM", "AGENT_INVOCATIONS")
+INVOCATION_DURABLE = os.getenv("INVOCATION_DURABLE", "agent-runtime")
+INVOCATION_WORKERS = int(os.getenv("INVOCATION_WORKERS", "8"))
+INVOCATION_QUEUE_SIZE = int(os.getenv("INVOCATION_QUEUE_SIZE", "100"))
+INVOCATION_ACK_WAIT_S = float(os.getenv("INVOCATION_ACK_WAIT_S", "300"))
+INVOCATION_NAK_DELAY_S = float(os.getenv("INVOCATION_NAK_DELAY_S", "10"))
+INVOCATION_MAX_DELIVER = int(os.getenv("INVOCATION_MAX_DELIVER", "5"))
+INVOCATION_DRAIN_TIMEOUT_S = float(os.getenv("INVOCATION_DRAIN_TIMEOUT_S", "20"))
+MESSAGE_CREATED_SUBJECT = "messaging.message.created"
+AGENT_UPDATED_SUBJECT = os.getenv("AGENT_UPDATED_SUBJECT", "agents.updated")
+BLUEPRINT_CACHE_TTL_S = float(os.getenv("BLUEPRINT_CACHE_TTL_S", "300"))
+CHANNEL_HISTORY_SIZE = int(os.getenv("CHANNEL_HISTORY_SIZE", "50"))
+CHANNEL_HISTORY_MAX_CHANNELS = int(os.getenv("CHANNEL_HISTORY_MAX_CHANNELS", "1000"))
 
 # NATS client
 nc = None
 nats_available = False
+consumer_task = None
+
+# Worker pool (created on startup, inside the running loop)
+invocation_pool: InvocationPool = None
+
+# Context caches (CHANNEL_HISTORY_SIZE=0 / BLUEPRINT_CACHE_TTL_S=0 disable them)
+blueprint_cache = BlueprintCache(ttl_s=BLUEPRINT_CACHE_TTL_S)
+channel_history = ChannelHistoryBuffer(size=CHANNEL_HISTORY_SIZE, max_channels=CHANNEL_HISTORY_MAX_CHANNELS)
+prompt_build_stats = {"count": 0, "total_ms": 0.0, "last_ms": 0.0}
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize NATS connection and subscriptions"""
-    global nc, nats_available
+    global nc, nats_available, consumer_task, invocation_pool
     print("🚀 Agent Runtime starting up...")
     
+    invocation_pool = InvocationPool(
+        handle_invocation,
+        workers=INVOCATION_WORKERS,
+        max_queue=INVOCATION_QUEUE_SIZE
+    )
+    invocation_pool.start()
+    print(f"✅ Invocation pool: {INVOCATION_WORKERS} workers, queue {INVOCATION_QUEUE_SIZE}")
+    
     # Try to connect to NATS
     try:
         import nats
@@ -30,32 +65,139 @@ async def startup_event():
         nats_available = True
         print(f"✅ Connected to NATS at {NATS_URL}")
         
+        # Keep context caches current
+        await subscribe_to_context_events()
+        
         # Subscribe to router invocations
-        asyncio.create_task(subscribe_to_invocations())
+        consumer_task = asyncio.create_task(subscribe_to_invocations())
     except Exception as e:
         print(f"⚠️ NATS not available: {e}")
         print("⚠️ Running in test mode (HTTP only)")
         nats_available = False
 
+async def on_message_created(msg):
+    try:
+        channel_history.add_event(json.loads(msg.data.decode()))
+    except Exception as e:
+        print(f"⚠️ Error applying message event: {e}")
+
+async def on_agent_updated(msg):
+    """agents.updated from agents-service (PATCH/DELETE /agents/{id}): {"agent_id": ...}"""
+    try:
+        agent_id = json.loads(msg.data.decode()).get("agent_id")
+    except (ValueError, AttributeError):
+        agent_id = None
+    # Unknown payload: drop everything rather than serve a stale blueprint
+    blueprint_cache.invalidate(agent_id)
+    print(f"🔄 Blueprint cache invalidated: {agent_id or 'all agents'}")
+
+async def subscribe_to_context_events():
+    """Feed channel ring buffers and drop stale blueprints from NATS events"""
+    try:
+        if channel_history.enabled:
+            await nc.subscribe(MESSAGE_CREATED_SUBJECT, cb=on_message_created)
+            print(f"✅ Subscribed to {MESSAGE_CREATED_SUBJECT} (channel history)")
+        await nc.subscribe(AGENT_UPDATED_SUBJECT, cb=on_agent_updated)
+        print(f"✅ Subscribed to {AGENT_UPDATED_SUBJECT} (blueprint cache)")
+    except Exception as e:
+        print(f"⚠️ Context event subscription failed: {e}")
+
+def invocation_key(invocation_data: dict) -> str:
+    """Invocations for the same channel are processed in order"""
+    payload = invocation_data.get("payload") or {}
+    return payload.get("channel_id") or invocation_data.get("agent_id") or "unknown"
+
 async def subscribe_to_invocations():
-    """Subscribe to router.invoke.agent events"""
+    """
+    Consume router.invoke.agent through a JetStream durable consumer
+    
+    The stream captures the router's plain publishes, so invocations survive
+    restarts. Messages are pulled only when the pool has free slots and
+    acked after processing. Falls back to a core subscription without JetStream.
+    """
     if not nc:
         return
     
     try:
-        sub = await nc.subscribe("router.invoke.agent")
-        print("✅ Subscribed to router.invoke.agent")
+        import nats
+        from nats.js.api import ConsumerConfig, AckPolicy, RetentionPolicy
+        
+        js = nc.jetstream()
+        try:
+            await js.add_stream(
+                name=INVOCATION_STREAM,
+                subjects=[INVOCATION_SUBJECT],
+                retention=RetentionPolicy.WORK_QUEUE
+            )
+        except Exception as e:
+            # Already exists (possibly with different settings)
+            print(f"ℹ️ Stream {INVOCATION_STREAM}: {e}")
+        
+        psub = await js.pull_subscribe(
+            INVOCATION_SUBJECT,
+            durable=INVOCATION_DURABLE,
+            stream=INVOCATION_STREAM,
+            config=ConsumerConfig(
+                ack_policy=AckPolicy.EXPLICIT,
+                ack_wait=INVOCATION_ACK_WAIT_S,
+                max_ack_pending=INVOCATION_QUEUE_SIZE,
+                max_deliver=INVOCATION_MAX_DELIVER
+            )
+        )
+        print(f"✅ Consuming {INVOCATION_SUBJECT} via JetStream ({INVOCATION_STREAM}/{INVOCATION_DURABLE})")
+    except Exception as e:
+        print(f"⚠️ JetStream unavailable ({e}), using core subscription")
+        await subscribe_to_invocations_core()
+        return
+    
+    while True:
+        # Backpressure: only pull what the pool can accept
+        batch = max(1, min(invocation_pool.free_slots(), 32))
+        try:
+            msgs = await psub.fetch(batch, timeout=1)
+        except nats.errors.TimeoutError:
+            continue
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Fetch error: {e}")
+            await asyncio.sleep(1)
+            continue
         
-        async for msg in sub.messages:
+        for msg in msgs:
             try:
                 invocation_data = json.loads(msg.data.decode())
-                await handle_invocation(invocation_data)
-            except Exception as e:
-                print(f"❌ Error processing invocation: {e}")
-                import traceback
-                traceback.print_exc()
-    except Exception as e:
-        print(f"❌ Subscription error: {e}")
+            except ValueError as e:
+                print(f"❌ Dropping malformed invocation: {e}")
+                await msg.term()
+                continue
+            await invocation_pool.submit(
+                invocation_key(invocation_data),
+                invocation_data,
+                on_success=msg.ack,
+                on_failure=lambda msg=msg: nak_or_term(msg)
+            )
+
+async def nak_or_term(msg):
+    """Redeliver a failed invocation after a delay; drop it after INVOCATION_MAX_DELIVER attempts"""
+    if msg.metadata.num_delivered >= INVOCATION_MAX_DELIVER:
+        print(f"❌ Dropping invocation after {msg.metadata.num_delivered} deliveries")
+        await msg.term()
+    else:
+        await msg.nak(delay=INVOCATION_NAK_DELAY_S)
+
+async def subscribe_to_invocations_core():
+    """Core NATS fallback (no persistence): still bounded and ordered per channel"""
+    sub = await nc.subscribe(INVOCATION_SUBJECT)
+    print(f"✅ Subscribed to {INVOCATION_SUBJECT}")
+    
+    async for msg in sub.messages:
+        try:
+            invocation_data = json.loads(msg.data.decode())
+        except ValueError as e:
+            print(f"❌ Error processing invocation: {e}")
+            continue
+        await invocation_pool.submit(invocation_key(invocation_data), invocation_data)
 
 async def handle_invocation(invocation_data: dict):
     """
@@ -69,6 +211,8 @@ async def handle_invocation(invocation_data: dict):
     5. Generate response
     6. Post to channel
     7. Store in memory (optional)
+    
+    Raises on failure so the pool naks the message for redelivery
     """
     try:
         print(f"\n🤖 Processing agent invocation")
@@ -87,16 +231,21 @@ async def handle_invocation(invocation_data: dict):
             print(f"❌ No channel_id in payload")
             return
         
+        started = time.perf_counter()
         print(f"📝 Agent: {invocation.agent_id}")
         print(f"📝 Channel: {channel_id}")
         print(f"📝 MicroDAO: {microdao_id}")
         
         # 1. Load agent blueprint
-        blueprint = await load_agent_blueprint(invocation.agent_id)
+        blueprint = await blueprint_cache.get(invocation.agent_id, load_agent_blueprint)
         print(f"✅ Loaded blueprint: {blueprint.name} (model: {blueprint.model})")
         
-        # 2. Load channel history
-        messages = await get_channel_messages(channel_id, limit=50)
+        # 2. Load channel history (ring buffer; fetched only if it lacks the triggering message)
+        messages = await channel_history.get(
+            channel_id,
+            get_channel_messages,
+            message_id=invocation.payload.get("message_id")
+        )
         if not messages:
             print(f"⚠️ No messages found in channel")
             return
@@ -152,7 +301,11 @@ async def handle_invocation(invocation_data: dict):
                 "content": msg.content
             })
         
-        print(f"📝 Built prompt with {len(llm_messages)} messages")
+        build_ms = (time.perf_counter() - started) * 1000
+        prompt_build_stats["count"] += 1
+        prompt_build_stats["total_ms"] += build_ms
+        prompt_build_stats["last_ms"] = build_ms
+        print(f"📝 Built prompt with {len(llm_messages)} messages in {build_ms:.1f} ms")
         
         # TODO Phase 4+: Parse tool calls from LLM response
         # If LLM wants to call a tool:
@@ -162,6 +315,7 @@ async def handle_invocation(invocation_data: dict):
         #        tool_id="projects.list",
         #        microdao_id=microdao_id
         #    )
+        #    (several tool calls in one turn: one POST /internal/pdp/evaluate/batch)
         # 2. If denied, inform LLM in next turn
         # 3. If permitted, call toolcore
         
@@ -194,12 +348,15 @@ async def handle_invocation(invocation_data: dict):
                 }
             )
         else:
-            print(f"❌ Failed to post agent reply")
+            # Nothing was posted: safe to redeliver
+            raise RuntimeError(f"Failed to post agent reply to {channel_id}")
         
     except Exception as e:
         print(f"❌ Error handling invocation: {e}")
         import traceback
         traceback.print_exc()
+        # The pool naks (or terms) the message; JetStream redelivers it
+        raise
 
 async def load_agent_blueprint(agent_id: str) -> AgentBlueprint:
     """
@@ -241,7 +398,15 @@ async def health():
         "status": "ok",
         "service": "agent-runtime",
         "version": "1.0.0",
-        "nats_connected": nats_available
+        "nats_connected": nats_available,
+        "invocations": invocation_pool.stats() if invocation_pool else None,
+        "blueprint_cache": blueprint_cache.stats(),
+        "channel_history": channel_history.stats(),
+        "prompt_build": {
+            "count": prompt_build_stats["count"],
+            "avg_ms": round(prompt_build_stats["total_ms"] / max(1, prompt_build_stats["count"]), 2),
+            "last_ms": round(prompt_build_stats["last_ms"], 2)
+        }
     }
 
 @app.post("/internal/agent-runtime/test-channel")
@@ -255,7 +420,13 @@ async def test_channel(invocation: AgentInvocation):
 async def shutdown_event():
     """Clean shutdown"""
     global nc
+    if consumer_task:
+        consumer_task.cancel()
+    if invocation_pool:
+        # Finish accepted invocations so they are acked, not redelivered
+        await invocation_pool.stop(drain=True, drain_timeout=INVOCATION_DRAIN_TIMEOUT_S)
     if nc:
         await nc.close()
         print("✅ NATS connection closed")
+    await close_http_client()
 
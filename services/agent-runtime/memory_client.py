@@ -1,5 +1,6 @@
 import httpx
 import os
+from http_client import get_http_client
 from typing import List, Dict, Any
 
 AGENT_MEMORY_URL = os.getenv("AGENT_MEMORY_URL", "http://agent-memory:7008")
@@ -17,25 +18,26 @@ async def query_memory(
     Falls back to empty list if Agent Memory service is not available
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(
-                f"{AGENT_MEMORY_URL}/internal/agent-memory/query",
-                headers={
-                    "X-Internal-Secret": os.getenv("MEMORY_ORCHESTRATOR_SECRET", "dev-secret-token"),
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "agent_id": agent_id,
-                    "microdao_id": microdao_id,
-                    "query": query,
-                    "limit": k
-                }
-            )
-            response.raise_for_status()
-            data = response.json()
-            results = data.get("results", [])
-            print(f"✅ Retrieved {len(results)} memory fragments")
-            return results
+        client = get_http_client()
+        response = await client.post(
+            f"{AGENT_MEMORY_URL}/internal/agent-memory/query",
+            headers={
+                "X-Internal-Secret": os.getenv("MEMORY_ORCHESTRATOR_SECRET", "dev-secret-token"),
+                "Content-Type": "application/json"
+            },
+            json={
+                "agent_id": agent_id,
+                "microdao_id": microdao_id,
+                "query": query,
+                "limit": k
+            },
+            timeout=10.0
+        )
+        response.raise_for_status()
+        data = response.json()
+        results = data.get("results", [])
+        print(f"✅ Retrieved {len(results)} memory fragments")
+        return results
     except httpx.ConnectError:
         print(f"⚠️ Agent Memory service not available (Phase 2 - OK)")
         return []
@@ -59,24 +61,25 @@ async def store_memory(
     Optional in Phase 2 - memory writeback
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(
-                f"{AGENT_MEMORY_URL}/internal/agent-memory/store",
-                headers={
-                    "X-Internal-Secret": os.getenv("MEMORY_ORCHESTRATOR_SECRET", "dev-secret-token"),
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "agent_id": agent_id,
-                    "microdao_id": microdao_id,
-                    "channel_id": channel_id,
-                    "kind": "conversation",
-                    "content": content
-                }
-            )
-            response.raise_for_status()
-            print(f"✅ Stored memory for {agent_id}")
-            return True
+        client = get_http_client()
+        response = await client.post(
+            f"{AGENT_MEMORY_URL}/internal/agent-memory/store",
+            headers={
+                "X-Internal-Secret": os.getenv("MEMORY_ORCHESTRATOR_SECRET", "dev-secret-token"),
+                "Content-Type": "application/json"
+            },
+            json={
+                "agent_id": agent_id,
+                "microdao_id": microdao_id,
+                "channel_id": channel_id,
+                "kind": "conversation",
+                "content": content
+            },
+            timeout=10.0
+        )
+        response.raise_for_status()
+        print(f"✅ Stored memory for {agent_id}")
+        return True
     except httpx.ConnectError:
         print(f"⚠️ Agent Memory service not available (Phase 2 - OK)")
         return False
@@ -16,6 +16,7 @@ class AgentBlueprint(BaseModel):
     tools: list[str] = []
 
 class ChannelMessage(BaseModel):
+    message_id: Optional[str] = None
     sender_id: str
     sender_type: Literal["human", "agent"]
     content: str
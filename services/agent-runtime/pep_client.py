@@ -4,6 +4,7 @@ Policy Enforcement Point - enforces tool execution permissions
 """
 import httpx
 import os
+from http_client import get_http_client
 from typing import Optional, Dict, Any
 
 PDP_SERVICE_URL = os.getenv("PDP_SERVICE_URL", "http://pdp-service:7012")
@@ -34,30 +35,31 @@ class PEPClient:
         }
         
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.post(
-                    f"{self.pdp_url}/internal/pdp/evaluate",
-                    json={
-                        "actor": actor,
-                        "action": "exec_tool",
-                        "resource": {
-                            "type": "tool",
-                            "id": tool_id
-                        },
-                        "context": context or {}
-                    }
-                )
-                response.raise_for_status()
-                decision = response.json()
+            client = get_http_client()
+            response = await client.post(
+                f"{self.pdp_url}/internal/pdp/evaluate",
+                json={
+                    "actor": actor,
+                    "action": "exec_tool",
+                    "resource": {
+                        "type": "tool",
+                        "id": tool_id
+                    },
+                    "context": context or {}
+                },
+                timeout=5.0
+            )
+            response.raise_for_status()
+            decision = response.json()
+            
+            if decision["effect"] == "permit":
+                print(f"✅ PDP: {agent_id} permitted to execute {tool_id}")
+                return True
+            else:
+                reason = decision.get("reason", "access_denied")
+                print(f"❌ PDP: {agent_id} denied tool {tool_id}: {reason}")
+                return False
                 
-                if decision["effect"] == "permit":
-                    print(f"✅ PDP: {agent_id} permitted to execute {tool_id}")
-                    return True
-                else:
-                    reason = decision.get("reason", "access_denied")
-                    print(f"❌ PDP: {agent_id} denied tool {tool_id}: {reason}")
-                    return False
-                    
         except httpx.HTTPStatusError as e:
             print(f"⚠️  PDP service error: {e.response.status_code}")
             # Fallback: deny (secure default)
@@ -0,0 +1,61 @@
+"""
+Unit tests for blueprint cache invalidation (agents.updated -> main.on_agent_updated)
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import main
+from context_cache import BlueprintCache
+from models import AgentBlueprint
+
+
+def _blueprint(agent_id, name):
+    return AgentBlueprint(id=agent_id, name=name, model="stub", instructions="", capabilities={}, tools=[])
+
+
+def _msg(payload):
+    return SimpleNamespace(data=payload if isinstance(payload, bytes) else json.dumps(payload).encode())
+
+
+def test_agent_updated_event_reloads_blueprint(monkeypatch):
+    """Test that agents.updated drops the cached blueprint of that agent only"""
+    cache = BlueprintCache(ttl_s=300)
+    monkeypatch.setattr(main, "blueprint_cache", cache)
+    versions = {"agent:sofia": "v1", "agent:helion": "v1"}
+    loads = []
+
+    async def loader(agent_id):
+        loads.append(agent_id)
+        return _blueprint(agent_id, versions[agent_id])
+
+    async def run():
+        for agent_id in versions:
+            await cache.get(agent_id, loader)
+        versions["agent:sofia"] = "v2"
+        await main.on_agent_updated(_msg({"agent_id": "agent:sofia", "change": "updated"}))
+        return (await cache.get("agent:sofia", loader)), (await cache.get("agent:helion", loader))
+
+    sofia, helion = asyncio.run(run())
+
+    assert sofia.name == "v2"
+    assert helion.name == "v1"
+    assert loads == ["agent:sofia", "agent:helion", "agent:sofia"]
+
+
+def test_unknown_payload_invalidates_all(monkeypatch):
+    """Test that an unparseable agents.updated payload drops every cached blueprint"""
+    cache = BlueprintCache(ttl_s=300)
+    monkeypatch.setattr(main, "blueprint_cache", cache)
+
+    async def loader(agent_id):
+        return _blueprint(agent_id, "v1")
+
+    async def run():
+        await cache.get("agent:sofia", loader)
+        await main.on_agent_updated(_msg(b"not json"))
+
+    asyncio.run(run())
+
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,87 @@
+"""
+Unit tests for failed invocations (main.handle_invocation -> InvocationPool -> main.nak_or_term)
+"""
+
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from invocation_pool import InvocationPool
+from models import ChannelMessage
+
+
+class FakeMsg:
+    """JetStream message stub recording ack/nak/term"""
+
+    def __init__(self, num_delivered):
+        self.metadata = SimpleNamespace(num_delivered=num_delivered)
+        self.calls = []
+
+    async def ack(self):
+        self.calls.append(("ack",))
+
+    async def nak(self, delay=None):
+        self.calls.append(("nak", delay))
+
+    async def term(self):
+        self.calls.append(("term",))
+
+
+@pytest.fixture
+def failing_post(monkeypatch):
+    """Every step succeeds except posting the reply"""
+
+    async def history(channel_id, fetch, message_id=None):
+        return [ChannelMessage(sender_id="u1", sender_type="human", content="hi", created_at=datetime.now())]
+
+    async def query_memory(*args):
+        return []
+
+    async def generate_response(*args, **kwargs):
+        return "hello"
+
+    async def post_message(*args):
+        return False
+
+    monkeypatch.setattr(main.channel_history, "get", history)
+    monkeypatch.setattr(main, "query_memory", query_memory)
+    monkeypatch.setattr(main, "generate_response", generate_response)
+    monkeypatch.setattr(main, "post_message", post_message)
+
+
+def _run(msg):
+    async def run():
+        pool = InvocationPool(main.handle_invocation, workers=1)
+        pool.start()
+        await pool.submit(
+            "channel:1",
+            {"agent_id": "agent:sofia", "payload": {"channel_id": "channel:1"}},
+            on_success=msg.ack,
+            on_failure=lambda: main.nak_or_term(msg),
+        )
+        await pool.stop(drain=True, drain_timeout=5)
+        return pool.stats()
+
+    return asyncio.run(run())
+
+
+def test_failed_post_naks_with_delay(failing_post):
+    """Test that an invocation whose reply could not be posted is nak'd, not acked"""
+    msg = FakeMsg(num_delivered=1)
+
+    stats = _run(msg)
+
+    assert stats["failed"] == 1
+    assert msg.calls == [("nak", main.INVOCATION_NAK_DELAY_S)]
+
+
+def test_last_delivery_is_termed(failing_post):
+    """Test that the final allowed delivery is termed instead of nak'd"""
+    msg = FakeMsg(num_delivered=main.INVOCATION_MAX_DELIVER)
+
+    _run(msg)
+
+    assert msg.calls == [("term",)]
@@ -22,6 +22,7 @@ from repository_events import EventRepository
 
 # Import NATS subscriber
 from nats_subscriber import NATSSubscriber
+from nats_helpers.publisher import NATSPublisher
 
 # Import Phase 2: Agents Core components
 from agent_router import AgentRouter
@@ -86,6 +87,7 @@ async def lifespan(app: FastAPI):
         await nats_subscriber.connect()
         await nats_subscriber.subscribe_all()
         print("✅ NATS subscriptions active")
+        routes_agents.publisher = NATSPublisher(nats_subscriber.nc)
     except Exception as e:
         print(f"⚠️  NATS connection failed (running without NATS): {e}")
     
@@ -122,6 +122,25 @@ class NATSPublisher:
             "tags": tags or {}
         })
     
+    async def publish_agent_updated(
+        self,
+        agent_id: str,
+        change: str = "updated"
+    ) -> None:
+        """
+        Опублікувати зміну агента (скидає кеш blueprint в agent-runtime)
+        
+        Subject: agents.updated
+        Payload: {
+            "agent_id": "agent:sofia",
+            "change": "updated" | "deleted"
+        }
+        """
+        await self.publish("agents.updated", {
+            "agent_id": agent_id,
+            "change": change
+        })
+    
     async def publish_run_created(
         self,
         run_id: str,
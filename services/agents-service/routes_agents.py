@@ -9,12 +9,14 @@ import httpx
 from models import AgentCreate, AgentUpdate, AgentRead, AgentBlueprint
 from repository_agents import AgentRepository
 from repository_events import EventRepository
+from nats_helpers.publisher import NATSPublisher
 
 router = APIRouter(prefix="/agents", tags=["agents"])
 
 # Dependency injection (will be set in main.py)
 agent_repo: Optional[AgentRepository] = None
 event_repo: Optional[EventRepository] = None
+publisher: Optional[NATSPublisher] = None
 
 # Service URLs (from env)
 import os
@@ -74,6 +76,18 @@ async def check_pdp_permission(
             print(f"⚠️  PDP error: {e}")
             return False  # Fail closed
 
+async def notify_agent_updated(agent_id: str, change: str):
+    """
+    Publish agents.updated so agent-runtime drops its cached blueprint.
+    Best effort: without NATS the runtime cache expires by TTL.
+    """
+    if publisher is None:
+        return
+    try:
+        await publisher.publish_agent_updated(agent_id, change)
+    except Exception:
+        pass  # already logged by NATSPublisher.publish
+
 # ============================================================================
 # Blueprints
 # ============================================================================
@@ -213,6 +227,7 @@ async def update_agent(
             "updated_by": actor.get("actor_id")
         }
     )
+    await notify_agent_updated(agent_id, "updated")
     
     return agent
 
@@ -259,6 +274,7 @@ async def delete_agent(
             "deleted_by": actor.get("actor_id")
         }
     )
+    await notify_agent_updated(agent_id, "deleted")
     
     return None
 
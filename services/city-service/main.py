@@ -20,7 +20,8 @@ from common.redis_client import get_redis, close_redis
 from presence_gateway import (
     websocket_global_presence,
     start_presence_gateway,
-    stop_presence_gateway
+    stop_presence_gateway,
+    global_presence_manager
 )
 
 # Logging
@@ -373,6 +374,16 @@ async def startup_event():
     except Exception as e:
         logger.warning(f"⚠️ Global presence gateway failed to start: {e}")
     
+    # Drop cached agent dashboards when agents-service changes an agent
+    if global_presence_manager.nc:
+        try:
+            await global_presence_manager.nc.subscribe(
+                routes_city.AGENT_UPDATED_SUBJECT, cb=routes_city.on_agent_updated
+            )
+            logger.info(f"✅ Subscribed to {routes_city.AGENT_UPDATED_SUBJECT} (dashboard cache)")
+        except Exception as e:
+            logger.warning(f"⚠️ Dashboard cache invalidation subscription failed: {e}")
+    
     logger.info("✅ WebSocket background tasks started")
 
 
@@ -4,8 +4,11 @@ City Backend API Routes
 
 from fastapi import APIRouter, HTTPException, Depends, Body, Header, Query, Request, UploadFile, File, Form
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import json
 import logging
+import time
 import httpx
 import os
 import io
@@ -285,6 +288,7 @@ async def update_agent_visibility_endpoint(
              )
              result["visibility_scope"] = scope
         
+        invalidate_agent_dashboard(agent_id)
         return result
     except HTTPException:
         raise
@@ -1321,6 +1325,7 @@ async def update_agent_public_profile(agent_id: str, request: Request):
         )
         
         logger.info(f"Updated public profile for agent {agent_id}: is_public={is_public}, slug={public_slug}")
+        invalidate_agent_dashboard(agent_id)
         
         return result
     
@@ -1412,6 +1417,7 @@ async def update_agent_prompt(agent_id: str, kind: str, request: Request):
         )
         
         logger.info(f"Updated {kind} prompt for agent {agent_id} to version {result['version']}")
+        invalidate_agent_dashboard(agent_id)
         
         return result
     
@@ -1442,19 +1448,95 @@ async def get_agent_prompt_history(agent_id: str, kind: str, limit: int = 10):
         raise HTTPException(status_code=500, detail="Failed to get prompt history")
 
 
+# Agent dashboard cache: short TTL, dropped on agent/profile/prompt updates
+# here and on agents.updated from agents-service
+AGENT_DASHBOARD_CACHE_TTL_S = float(os.getenv("AGENT_DASHBOARD_CACHE_TTL_S", "5"))
+AGENT_DASHBOARD_CACHE_SIZE = 1000
+AGENT_UPDATED_SUBJECT = os.getenv("AGENT_UPDATED_SUBJECT", "agents.updated")
+_dashboard_cache: Dict[str, Tuple[float, dict]] = {}
+
+# Dashboard lookups in flight across all requests; keeps the fan-out from
+# taking most of the DB pool (repo_city max_size=10)
+AGENT_DASHBOARD_DB_CONCURRENCY = max(1, int(os.getenv("AGENT_DASHBOARD_DB_CONCURRENCY", "3")))
+_dashboard_db_slots = asyncio.Semaphore(AGENT_DASHBOARD_DB_CONCURRENCY)
+
+
+async def _none():
+    return None
+
+
+async def _dashboard_lookup(coro):
+    """Run one dashboard DB lookup, holding a slot (and a pool connection) only while it runs"""
+    async with _dashboard_db_slots:
+        return await coro
+
+
+def _dashboard_cache_get(agent_id: str) -> Optional[dict]:
+    entry = _dashboard_cache.get(agent_id)
+    if entry is None:
+        return None
+    if entry[0] < time.monotonic():
+        _dashboard_cache.pop(agent_id, None)
+        return None
+    return entry[1]
+
+
+def _dashboard_cache_put(agent_id: str, dashboard: dict):
+    if AGENT_DASHBOARD_CACHE_TTL_S <= 0:
+        return
+    if len(_dashboard_cache) >= AGENT_DASHBOARD_CACHE_SIZE:
+        # Drop oldest entry (dicts keep insertion order)
+        _dashboard_cache.pop(next(iter(_dashboard_cache)), None)
+    _dashboard_cache[agent_id] = (time.monotonic() + AGENT_DASHBOARD_CACHE_TTL_S, dashboard)
+
+
+def invalidate_agent_dashboard(agent_id: Optional[str] = None):
+    """Drop cached dashboard for agent (or all agents)"""
+    if agent_id is None:
+        _dashboard_cache.clear()
+    else:
+        _dashboard_cache.pop(agent_id, None)
+
+
+async def on_agent_updated(msg):
+    """agents.updated from agents-service (PATCH/DELETE /agents/{id}): {"agent_id": ...}"""
+    try:
+        agent_id = json.loads(msg.data.decode()).get("agent_id")
+    except (ValueError, AttributeError):
+        agent_id = None
+    # Unknown payload: drop everything rather than serve a stale dashboard
+    invalidate_agent_dashboard(agent_id)
+
+
 @router.get("/agents/{agent_id}/dashboard")
 async def get_agent_dashboard(agent_id: str):
     """
     Отримати повний dashboard агента (DAIS Profile + Node + Metrics)
     """
     try:
-        # Get agent profile
-        agent = await repo_city.get_agent_by_id(agent_id)
+        cached = _dashboard_cache_get(agent_id)
+        if cached is not None:
+            return cached
+        
+        # Lookups keyed only by agent_id run concurrently, bounded by
+        # AGENT_DASHBOARD_DB_CONCURRENCY pool connections
+        agent, rooms, system_prompts, public_profile, memberships_raw = await asyncio.gather(
+            _dashboard_lookup(repo_city.get_agent_by_id(agent_id)),
+            _dashboard_lookup(repo_city.get_agent_rooms(agent_id)),
+            _dashboard_lookup(repo_city.get_agent_prompts(agent_id)),
+            _dashboard_lookup(repo_city.get_agent_public_profile(agent_id)),
+            _dashboard_lookup(repo_city.get_agent_microdao_memberships(agent_id)),
+        )
         if not agent:
             raise HTTPException(status_code=404, detail=f"Agent not found: {agent_id}")
         
-        # Get agent's rooms
-        rooms = await repo_city.get_agent_rooms(agent_id)
+        # Second wave: lookups that depend on the agent row
+        node_id = agent.get("node_id")
+        need_microdao_room = not rooms and agent.get("primary_microdao_id")
+        node_data, microdao_room = await asyncio.gather(
+            _dashboard_lookup(repo_city.get_node_by_id(node_id)) if node_id else _none(),
+            _dashboard_lookup(repo_city.get_microdao_primary_room(agent["primary_microdao_id"])) if need_microdao_room else _none(),
+        )
         
         # Build DAIS profile
         profile = {
@@ -1502,8 +1584,7 @@ async def get_agent_dashboard(agent_id: str):
         
         # Get node info (detailed)
         node_info = None
-        if agent.get("node_id"):
-            node_data = await repo_city.get_node_by_id(agent["node_id"])
+        if node_id:
             if node_data:
                 node_info = {
                     "node_id": node_data["node_id"],
@@ -1522,14 +1603,7 @@ async def get_agent_dashboard(agent_id: str):
                     "name": "Unknown Node"
                 }
         
-        # Get system prompts
-        system_prompts = await repo_city.get_agent_prompts(agent_id)
-        
-        # Get public profile
-        public_profile = await repo_city.get_agent_public_profile(agent_id)
-        
         # MicroDAO memberships
-        memberships_raw = await repo_city.get_agent_microdao_memberships(agent_id)
         memberships = [
             AgentMicrodaoMembership(
                 microdao_id=item["microdao_id"],
@@ -1554,10 +1628,8 @@ async def get_agent_dashboard(agent_id: str):
                 "matrix_room_id": primary_room.get("matrix_room_id")
             }
         # Priority 2: Get from primary MicroDAO's main room
-        elif agent.get("primary_microdao_id"):
-            microdao_room = await repo_city.get_microdao_primary_room(agent["primary_microdao_id"])
-            if microdao_room:
-                primary_city_room = microdao_room
+        elif microdao_room:
+            primary_city_room = microdao_room
         
         # Build dashboard response
         dashboard = {
@@ -1582,6 +1654,7 @@ async def get_agent_dashboard(agent_id: str):
             "microdao_memberships": memberships
         }
         
+        _dashboard_cache_put(agent_id, dashboard)
         return dashboard
     
     except HTTPException:
@@ -2159,6 +2232,7 @@ async def create_microdao_for_agent_endpoint(
                     is_public=False # Team rooms usually private/internal
                 )
         
+        invalidate_agent_dashboard(agent_id)
         return {
             "status": "ok",
             "microdao": result,
@@ -2219,7 +2293,8 @@ async def attach_agent_to_microdao_endpoint(
              # TODO: Update microdao table orchestrator_agent_id = payload.agent_id
              # For now, memberships are the source of truth for "orchestrators list"
              pass
-             
+        
+        invalidate_agent_dashboard(payload.agent_id)
         return result
         
     except HTTPException:
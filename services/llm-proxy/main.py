@@ -4,22 +4,41 @@ Port: 7007
 Multi-provider LLM gateway with usage tracking and rate limiting
 """
 import os
+import math
 from fastapi import FastAPI, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from models import LLMRequest, LLMResponse
 from router import ModelRouter
-from middlewares import RateLimiter, UsageTracker
+from middlewares import RateLimiter, UsagePublisher, UsageTracker, create_rate_limit_backend
 from providers import OpenAIProvider, DeepSeekProvider, LocalProvider
 
 # ============================================================================
 # App Setup
 # ============================================================================
 
+NATS_URL = os.getenv("NATS_URL")  # usage events to usage-engine; disabled if not set
+USAGE_SUBJECT = os.getenv("USAGE_SUBJECT", "usage.llm.batch")
+USAGE_BATCH_SIZE = int(os.getenv("USAGE_BATCH_SIZE", "100"))
+USAGE_FLUSH_INTERVAL = float(os.getenv("USAGE_FLUSH_INTERVAL", "2.0"))
+USAGE_LOG_SIZE = int(os.getenv("USAGE_LOG_SIZE", "1000"))
+
 model_router = ModelRouter()
-rate_limiter = RateLimiter(requests_per_minute=10)
-usage_tracker = UsageTracker()
+rate_limiter = RateLimiter.from_config(
+    model_router.rate_limits,
+    backend=create_rate_limit_backend(
+        os.getenv("RATE_LIMIT_BACKEND", model_router.rate_limits.get("backend", "memory")),
+        os.getenv("RATE_LIMIT_REDIS_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    )
+)
+usage_publisher = UsagePublisher(
+    NATS_URL,
+    subject=USAGE_SUBJECT,
+    batch_size=USAGE_BATCH_SIZE,
+    flush_interval=USAGE_FLUSH_INTERVAL
+) if NATS_URL else None
+usage_tracker = UsageTracker(max_entries=USAGE_LOG_SIZE, publisher=usage_publisher)
 
 providers = {}
 
@@ -42,6 +61,11 @@ async def lifespan(app: FastAPI):
     print(f"✅ LLM Proxy ready with {len(model_router.models)} models")
     print(f"📋 Available models: {', '.join(model_router.get_available_models())}")
     
+    if usage_publisher:
+        await usage_publisher.start()
+    else:
+        print("⚠️  NATS_URL not set, usage events are not published to usage-engine")
+    
     yield
     
     # Shutdown
@@ -49,6 +73,9 @@ async def lifespan(app: FastAPI):
     for provider in providers.values():
         if hasattr(provider, 'close'):
             await provider.close()
+    if usage_publisher:
+        # Publish usage still queued
+        await usage_publisher.stop()
 
 app = FastAPI(
     title="DAARION LLM Proxy",
@@ -88,11 +115,14 @@ async def llm_proxy(
     agent_id = request.metadata.get("agent_id")
     microdao_id = request.metadata.get("microdao_id")
     
-    # Rate limiting (per agent)
-    if agent_id:
-        allowed, remaining = rate_limiter.check_limit(f"agent:{agent_id}")
-        if not allowed:
-            raise HTTPException(429, f"Rate limit exceeded for agent {agent_id}")
+    # Rate limiting (per agent, microDAO and model)
+    limit = await rate_limiter.check(agent_id=agent_id, microdao_id=microdao_id, model=request.model)
+    if not limit.allowed:
+        raise HTTPException(
+            429,
+            f"Rate limit exceeded for {limit.key}",
+            headers={"Retry-After": str(max(1, math.ceil(limit.retry_after_s)))}
+        )
     
     # Route model
     try:
@@ -179,7 +209,9 @@ async def health():
         "status": "ok",
         "service": "llm-proxy",
         "providers": list(providers.keys()),
-        "models": len(model_router.models)
+        "models": len(model_router.models),
+        "rate_limiter": rate_limiter.stats(),
+        "usage_publisher": usage_publisher.stats() if usage_publisher else None
     }
 
 # ============================================================================
@@ -1,48 +1,411 @@
+import asyncio
+import json
 import time
-from collections import defaultdict
-from datetime import datetime, timedelta
-from typing import Dict
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# ============================================================================
+# Rate Limiting
+# ============================================================================
+
+# scope -> (config key of the default limit, window seconds)
+RATE_LIMIT_SCOPES = {
+    "agent": ("default_per_agent_per_minute", 60.0),
+    "microdao": ("default_per_microdao_per_hour", 3600.0),
+    "model": ("default_per_model_per_minute", 60.0),
+}
+
+# (key, limit, window seconds)
+Rule = Tuple[str, int, float]
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    remaining: int
+    key: Optional[str] = None  # limit that rejected the request
+    retry_after_s: float = 0.0
+
+
+def _estimate(current: int, previous: int, elapsed: float) -> float:
+    """Sliding window count: previous window weighted by the part still inside the window"""
+    return previous * (1.0 - elapsed) + current
+
+
+def _retry_after(limit: int, current: int, previous: int, elapsed: float, window: float) -> float:
+    """Seconds until one more request fits under the limit"""
+    room = limit - 1
+    if current <= room and previous:
+        # Wait while the previous window slides out
+        return max(0.0, (1.0 - (room - current) / previous) - elapsed) * window
+    # Current window alone is over the limit: wait for it to become "previous"
+    carry = (1.0 - room / current) if current else 0.0
+    return (1.0 - elapsed) * window + carry * window
+
+
+class _WindowCounter:
+    __slots__ = ("window", "index", "current", "previous", "last_seen")
+
+    def __init__(self, window: float, now: float):
+        self.window = window
+        self.index = int(now // window)
+        self.current = 0
+        self.previous = 0
+        self.last_seen = now
+
+    def roll(self, now: float) -> float:
+        """Advance to the window containing `now`; returns the elapsed fraction of it"""
+        index = int(now // self.window)
+        if index != self.index:
+            self.previous = self.current if index == self.index + 1 else 0
+            self.current = 0
+            self.index = index
+        self.last_seen = now
+        return (now - index * self.window) / self.window
+
 
 class RateLimiter:
-    """Simple in-memory rate limiter"""
-    
-    def __init__(self, requests_per_minute: int = 10):
-        self.requests_per_minute = requests_per_minute
-        self.requests: Dict[str, list[datetime]] = defaultdict(list)
-    
-    def check_limit(self, key: str) -> tuple[bool, int]:
-        """
-        Check if request is allowed
-        
-        Returns: (allowed: bool, remaining: int)
-        """
-        now = datetime.now()
-        cutoff = now - timedelta(minutes=1)
-        
-        # Clean old requests
-        self.requests[key] = [
-            req_time for req_time in self.requests[key]
-            if req_time > cutoff
-        ]
-        
-        # Check limit
-        current_count = len(self.requests[key])
-        
-        if current_count >= self.requests_per_minute:
-            return False, 0
-        
-        # Add new request
-        self.requests[key].append(now)
-        remaining = self.requests_per_minute - current_count - 1
-        
-        return True, remaining
+    """
+    Sliding-window-counter rate limiter with per-agent, per-microDAO and per-model limits
+
+    Each key keeps two counters (current and previous window), so a check is O(1)
+    per applicable limit. Keys idle for two windows are evicted. With a shared
+    backend (Redis) the counters live there and all replicas share the limits;
+    if the backend fails, the in-memory counters are used instead.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = 10,
+        defaults: Optional[Dict[str, int]] = None,
+        overrides: Optional[Dict[str, Dict[str, int]]] = None,
+        max_keys: int = 100_000,
+        backend: Optional["RedisRateLimitBackend"] = None,
+    ):
+        # Limit per scope (0 = no limit); requests_per_minute is the per-agent default
+        self.defaults: Dict[str, int] = {"agent": requests_per_minute, "microdao": 0, "model": 0}
+        self.defaults.update(defaults or {})
+        self.overrides: Dict[str, Dict[str, int]] = {scope: {} for scope in RATE_LIMIT_SCOPES}
+        for scope, values in (overrides or {}).items():
+            self.overrides.setdefault(scope, {}).update(values or {})
+        self.max_keys = max_keys
+        self.backend = backend
+
+        # One LRU per window length, so idle keys are always at the front
+        self._counters: Dict[float, "OrderedDict[str, _WindowCounter]"] = {
+            window: OrderedDict() for _, window in RATE_LIMIT_SCOPES.values()
+        }
+        self.allowed = 0
+        self.rejected: Dict[str, int] = {scope: 0 for scope in RATE_LIMIT_SCOPES}
+        self.evicted = 0
+        self.backend_errors = 0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], backend: Optional["RedisRateLimitBackend"] = None) -> "RateLimiter":
+        """Build from the rate_limits section of config.yaml"""
+        defaults = {
+            scope: int(config.get(config_key, 0) or 0)
+            for scope, (config_key, _) in RATE_LIMIT_SCOPES.items()
+        }
+        overrides = {
+            "agent": config.get("agents") or {},
+            "microdao": config.get("microdaos") or {},
+            "model": config.get("models") or {},
+        }
+        return cls(defaults=defaults, overrides=overrides, backend=backend)
+
+    def _rules(self, agent_id: Optional[str], microdao_id: Optional[str], model: Optional[str]) -> List[Rule]:
+        rules = []
+        for scope, value in (("agent", agent_id), ("microdao", microdao_id), ("model", model)):
+            if not value:
+                continue
+            limit = self.overrides[scope].get(value, self.defaults.get(scope, 0))
+            if limit and limit > 0:
+                rules.append((f"{scope}:{value}", int(limit), RATE_LIMIT_SCOPES[scope][1]))
+        return rules
+
+    async def check(
+        self,
+        agent_id: Optional[str] = None,
+        microdao_id: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> RateLimitResult:
+        """Count one request against every applicable limit; nothing is counted if any limit is hit"""
+        rules = self._rules(agent_id, microdao_id, model)
+        if not rules:
+            self.allowed += 1
+            return RateLimitResult(allowed=True, remaining=-1)
+
+        result = None
+        if self.backend:
+            try:
+                result = await self.backend.check(rules)
+            except Exception as e:
+                self.backend_errors += 1
+                print(f"⚠️  Rate limit backend failed, using in-memory limits: {e}")
+        if result is None:
+            result = self._check_local(rules, time.monotonic())
+
+        if result.allowed:
+            self.allowed += 1
+        else:
+            self.rejected[result.key.split(":", 1)[0]] += 1
+        return result
+
+    def _check_local(self, rules: List[Rule], now: float) -> RateLimitResult:
+        counters = []
+        remaining = None
+        for key, limit, window in rules:
+            lru = self._counters.setdefault(window, OrderedDict())
+            counter = lru.get(key)
+            if counter is None:
+                counter = lru[key] = _WindowCounter(window, now)
+            lru.move_to_end(key)
+            elapsed = counter.roll(now)
+            estimate = _estimate(counter.current, counter.previous, elapsed)
+            if estimate + 1 > limit:
+                self._evict_idle(now)
+                return RateLimitResult(
+                    allowed=False,
+                    remaining=0,
+                    key=key,
+                    retry_after_s=_retry_after(limit, counter.current, counter.previous, elapsed, window),
+                )
+            counters.append(counter)
+            left = int(limit - estimate - 1)
+            remaining = left if remaining is None else min(remaining, left)
+
+        for counter in counters:
+            counter.current += 1
+        self._evict_idle(now)
+        return RateLimitResult(allowed=True, remaining=remaining or 0)
+
+    def _evict_idle(self, now: float):
+        # A key idle for two windows has nothing left to count
+        for window, lru in self._counters.items():
+            while lru:
+                key, counter = next(iter(lru.items()))
+                if len(lru) <= self.max_keys and now - counter.last_seen < 2 * window:
+                    break
+                del lru[key]
+                self.evicted += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis" if self.backend else "memory",
+            "limits": {
+                scope: {"default": self.defaults.get(scope, 0), "window_s": window, "overrides": len(self.overrides[scope])}
+                for scope, (_, window) in RATE_LIMIT_SCOPES.items()
+            },
+            "keys": sum(len(lru) for lru in self._counters.values()),
+            "allowed": self.allowed,
+            "rejected": dict(self.rejected),
+            "evicted": self.evicted,
+            "backend_errors": self.backend_errors,
+        }
+
+
+# Same algorithm as RateLimiter._check_local, atomically in Redis.
+# KEYS[i] = counter prefix, ARGV[2i-1] = limit, ARGV[2i] = window ms.
+# Returns {1, remaining} or {0, rule index, current, previous, elapsed ms}.
+_REDIS_SLIDING_WINDOW = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local current_keys = {}
+local remaining = -1
+for i = 1, #KEYS do
+    local limit = tonumber(ARGV[2 * i - 1])
+    local window = tonumber(ARGV[2 * i])
+    local index = math.floor(now / window)
+    local elapsed = now - index * window
+    local current_key = KEYS[i] .. ':' .. index
+    local current = tonumber(redis.call('GET', current_key) or '0')
+    local previous = tonumber(redis.call('GET', KEYS[i] .. ':' .. (index - 1)) or '0')
+    local estimate = previous * (1 - elapsed / window) + current
+    if estimate + 1 > limit then
+        return {0, i, current, previous, elapsed}
+    end
+    local left = math.floor(limit - estimate - 1)
+    if remaining < 0 or left < remaining then
+        remaining = left
+    end
+    current_keys[i] = {current_key, window}
+end
+for i = 1, #current_keys do
+    redis.call('INCR', current_keys[i][1])
+    redis.call('PEXPIRE', current_keys[i][1], current_keys[i][2] * 2)
+end
+return {1, remaining}
+"""
+
+
+class RedisRateLimitBackend:
+    """Shared counters for multi-replica deployments (one script call per check)"""
+
+    def __init__(self, redis_client: Any, prefix: str = "llm-proxy:rl:"):
+        self._redis = redis_client
+        self._prefix = prefix
+        self._script = redis_client.register_script(_REDIS_SLIDING_WINDOW)
+
+    async def check(self, rules: List[Rule]) -> RateLimitResult:
+        keys = [self._prefix + key for key, _, _ in rules]
+        args: List[int] = []
+        for _, limit, window in rules:
+            args += [limit, int(window * 1000)]
+        reply = await self._script(keys=keys, args=args)
+        if int(reply[0]) == 1:
+            return RateLimitResult(allowed=True, remaining=int(reply[1]))
+        key, limit, window = rules[int(reply[1]) - 1]
+        current, previous, elapsed_ms = int(reply[2]), int(reply[3]), int(reply[4])
+        return RateLimitResult(
+            allowed=False,
+            remaining=0,
+            key=key,
+            retry_after_s=_retry_after(limit, current, previous, elapsed_ms / (window * 1000), window),
+        )
+
+
+def create_rate_limit_backend(backend: str, redis_url: str) -> Optional[RedisRateLimitBackend]:
+    """Shared backend for RATE_LIMIT_BACKEND=redis (None = in-memory limits)"""
+    if backend != "redis":
+        return None
+    try:
+        import redis.asyncio as aioredis
+    except ImportError:
+        print("⚠️  RATE_LIMIT_BACKEND=redis, but redis package is not installed; using in-memory limits")
+        return None
+    print(f"✅ Rate limits shared via Redis ({redis_url})")
+    return RedisRateLimitBackend(aioredis.from_url(redis_url))
+
+
+# ============================================================================
+# Usage Tracking
+# ============================================================================
+
+class UsagePublisher:
+    """
+    Publishes usage events to usage-engine over NATS in batches
+
+    Events wait in a bounded queue (oldest dropped when full) and go out as one
+    message per batch on `subject` ({"events": [...]}), when batch_size events
+    are queued or every flush_interval seconds. Failed batches are kept and retried.
+    """
+
+    def __init__(
+        self,
+        nats_url: str,
+        subject: str = "usage.llm.batch",
+        batch_size: int = 100,
+        flush_interval: float = 2.0,
+        max_pending: int = 10_000,
+    ):
+        self.nats_url = nats_url
+        self.subject = subject
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.pending: Deque[Dict[str, Any]] = deque(maxlen=max(self.batch_size, max_pending))
+        self.nc = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.batches = 0
+        self.dropped = 0
+        self.errors = 0
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        await self._connect()
+        self._task = asyncio.create_task(self._run())
+
+    async def _connect(self):
+        try:
+            import nats
+            self.nc = await nats.connect(self.nats_url)
+            print(f"✅ Usage publisher connected to NATS at {self.nats_url}")
+        except Exception as e:
+            self.nc = None
+            print(f"⚠️  Usage publisher: NATS unavailable ({e}), will retry")
+
+    def add(self, event: Dict[str, Any]):
+        if len(self.pending) == self.pending.maxlen:
+            self.dropped += 1
+        self.pending.append(event)
+        if len(self.pending) >= self.batch_size and self._wakeup:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        if not self.pending:
+            return
+        if self.nc is None or not self.nc.is_connected:
+            if self.nc is None:
+                await self._connect()
+            if self.nc is None or not self.nc.is_connected:
+                return
+
+        sent: List[List[Dict[str, Any]]] = []
+        try:
+            while self.pending:
+                batch = [self.pending.popleft() for _ in range(min(self.batch_size, len(self.pending)))]
+                sent.append(batch)
+                await self.nc.publish(self.subject, json.dumps({"events": batch}).encode())
+            # One round-trip confirms all batches of this flush reached the server
+            await self.nc.flush(timeout=5)
+        except Exception as e:
+            self.errors += 1
+            print(f"❌ Failed to publish usage batch: {e}")
+            for batch in reversed(sent):
+                self.pending.extendleft(reversed(batch))
+            return
+        self.batches += len(sent)
+        self.published += sum(len(batch) for batch in sent)
+
+    async def stop(self):
+        """Publish what is still queued and close the connection"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+        if self.pending:
+            print(f"⚠️  Usage publisher stopped with {len(self.pending)} unpublished events")
+        if self.nc is not None:
+            try:
+                await self.nc.close()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subject": self.subject,
+            "connected": bool(self.nc is not None and self.nc.is_connected),
+            "pending": len(self.pending),
+            "published": self.published,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
 
 class UsageTracker:
     """Track LLM usage for billing/monitoring"""
-    
-    def __init__(self):
-        self.usage_log: list = []
-    
+
+    def __init__(self, max_entries: int = 1000, publisher: Optional[UsagePublisher] = None):
+        # Recent entries for /internal/llm/usage; full history goes to usage-engine
+        self.usage_log: Deque[Dict[str, Any]] = deque(maxlen=max_entries)
+        self.publisher = publisher
+
     def log_usage(
         self,
         agent_id: str | None,
@@ -57,7 +420,8 @@ class UsageTracker:
     ):
         """Log LLM usage"""
         log_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "event_id": f"llm-{uuid.uuid4().hex}",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
             "agent_id": agent_id,
             "microdao_id": microdao_id,
             "model": model,
@@ -69,25 +433,29 @@ class UsageTracker:
             "success": success,
             "error": error
         }
-        
+
         self.usage_log.append(log_entry)
-        
-        # Keep last 1000 entries in memory
-        if len(self.usage_log) > 1000:
-            self.usage_log = self.usage_log[-1000:]
-        
-        # TODO: Write to database or metrics system
+
+        if self.publisher:
+            # usage-engine LlmUsageEvent
+            self.publisher.add({
+                **log_entry,
+                "actor_id": agent_id or "service:llm-proxy",
+                "actor_type": "agent" if agent_id else "service",
+                "latency_ms": int(round(latency_ms)),
+            })
+
         print(f"📊 Usage: {agent_id or 'unknown'} | {model} | {prompt_tokens + completion_tokens} tokens | {latency_ms:.0f}ms")
-    
+
     def get_usage_summary(self, agent_id: str | None = None) -> dict:
-        """Get usage summary"""
-        filtered = self.usage_log
+        """Get usage summary (over the recent entries kept in memory)"""
+        filtered = list(self.usage_log)
         if agent_id:
-            filtered = [log for log in self.usage_log if log.get("agent_id") == agent_id]
-        
+            filtered = [log for log in filtered if log.get("agent_id") == agent_id]
+
         if not filtered:
             return {"total_requests": 0, "total_tokens": 0}
-        
+
         return {
             "total_requests": len(filtered),
             "total_tokens": sum(log["total_tokens"] for log in filtered),
@@ -96,8 +464,3 @@ class UsageTracker:
             "avg_latency_ms": sum(log["latency_ms"] for log in filtered) / len(filtered),
             "success_rate": sum(1 for log in filtered if log["success"]) / len(filtered)
         }
-
-
-
-
-
@@ -7,6 +7,7 @@ class ModelRouter:
     def __init__(self, config_path: str = "config.yaml"):
         self.models: Dict[str, ModelConfig] = {}
         self.providers: Dict[str, ProviderConfig] = {}
+        self.rate_limits: dict = {}
         self._load_config(config_path)
     
     def _load_config(self, config_path: str):
@@ -35,6 +36,9 @@ class ModelRouter:
             )
             print(f"✅ Loaded provider: {name}")
         
+        # Rate limits (applied by middlewares.RateLimiter)
+        self.rate_limits = config.get('rate_limits') or {}
+        
         # Load models
         for logical_name, model_config in config.get('models', {}).items():
             self.models[logical_name] = ModelConfig(
@@ -435,6 +435,7 @@ async def send_message(
         "sender_id": current_user,
         "sender_type": sender_type,
         "microdao_id": channel["microdao_id"],
+        "content_preview": content_preview,
         "created_at": row["created_at"].isoformat()
     })
     
@@ -615,6 +616,18 @@ async def agent_post_to_channel(
         agent_id, "agent", agent_matrix_id, content_preview, "text"
     )
     
+    # Publish NATS event messaging.message.created (agent-filter drops agent senders)
+    await publish_nats_event("messaging.message.created", {
+        "channel_id": str(channel_id),
+        "message_id": str(message_id),
+        "matrix_event_id": matrix_event_id,
+        "sender_id": agent_id,
+        "sender_type": "agent",
+        "microdao_id": channel["microdao_id"],
+        "content_preview": content_preview,
+        "created_at": row["created_at"].isoformat()
+    })
+    
     # Broadcast to WebSocket clients
     await manager.broadcast(channel_id, {
         "type": "message.created",
@@ -0,0 +1,219 @@
+"""
+OCR рушії (Tesseract + EasyOCR), що виконуються у процесах пулу
+
+Функції тут викликаються в дочірніх процесах (spawn), тому модуль не
+імпортує FastAPI. EasyOCR Reader створюється один раз на процес і
+перевикористовується для всіх наступних сторінок.
+"""
+
+import io
+import logging
+import os
+import time
+from typing import List, Optional
+
+import numpy as np
+from PIL import Image, ImageEnhance
+
+logger = logging.getLogger(__name__)
+
+# Lazy import OCR engines
+try:
+    import pytesseract
+    TESSERACT_AVAILABLE = True
+except ImportError:
+    TESSERACT_AVAILABLE = False
+    logger.warning("⚠️ Tesseract not available")
+
+try:
+    import easyocr
+    EASYOCR_AVAILABLE = True
+except ImportError:
+    EASYOCR_AVAILABLE = False
+    logger.warning("⚠️ EasyOCR not available")
+
+EASYOCR_LANGUAGES = ['uk', 'en', 'ru']
+EASYOCR_GPU = os.getenv("OCR_GPU", "true").lower() == "true"
+
+# Мапінг мов для Tesseract
+LANG_MAP = {
+    'uk': 'ukr',
+    'en': 'eng',
+    'ru': 'rus',
+    'pl': 'pol',
+    'de': 'deu',
+    'fr': 'fra'
+}
+
+# Reader цього процесу (lazy)
+_easyocr_reader = None
+
+
+class EngineUnavailable(Exception):
+    """OCR рушій не встановлений"""
+
+
+def get_easyocr_reader():
+    """Lazy initialization of EasyOCR reader (один на процес)"""
+    global _easyocr_reader
+    if _easyocr_reader is None and EASYOCR_AVAILABLE:
+        _easyocr_reader = easyocr.Reader(EASYOCR_LANGUAGES, gpu=EASYOCR_GPU)
+    return _easyocr_reader
+
+
+def init_worker(preload_easyocr: bool):
+    """Ініціалізатор процесу пулу: одразу завантажити EasyOCR, якщо він рушій за замовчанням"""
+    logging.basicConfig(level=logging.INFO)
+    if preload_easyocr and EASYOCR_AVAILABLE:
+        start = time.perf_counter()
+        get_easyocr_reader()
+        logger.info(f"✅ EasyOCR reader loaded in pid {os.getpid()} ({time.perf_counter() - start:.1f}s)")
+
+
+def preprocess_image(img: Image.Image) -> Image.Image:
+    """
+    Попередня обробка зображення для кращого OCR
+    """
+    # Конвертувати в RGB якщо потрібно
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    # Збільшити контраст (опціонально)
+    enhancer = ImageEnhance.Contrast(img)
+    img = enhancer.enhance(1.5)
+
+    return img
+
+
+def split_pages(data: bytes, max_pages: Optional[int] = None) -> List[bytes]:
+    """
+    Розбити зображення на сторінки (кадри багатосторінкового TIFF, GIF...)
+
+    Викликається в батьківському процесі: кожне завдання пулу отримує лише
+    байти своєї сторінки, а не весь файл. Однокадрове зображення
+    повертається як є, кадри багатосторінкового - окремими PNG (без втрат).
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        pages = getattr(img, 'n_frames', 1)
+        if max_pages is not None and pages > max_pages:
+            raise ValueError(f"Too many pages: {pages} > {max_pages}")
+        if pages == 1:
+            return [data]
+        result = []
+        for page in range(pages):
+            img.seek(page)
+            frame = img if img.mode in ('1', 'L', 'LA', 'RGB', 'RGBA') else img.convert('RGB')
+            buffer = io.BytesIO()
+            frame.save(buffer, format='PNG')
+            result.append(buffer.getvalue())
+        return result
+
+
+def load_page(data: bytes) -> Image.Image:
+    return preprocess_image(Image.open(io.BytesIO(data)))
+
+
+def ocr_tesseract(img: Image.Image, languages: List[str]) -> dict:
+    """
+    OCR через Tesseract
+
+    Один прохід image_to_data: текст збирається з розпізнаних слів
+    по рядках/блоках, замість окремого image_to_string
+    """
+    if not TESSERACT_AVAILABLE:
+        raise EngineUnavailable("Tesseract not available")
+
+    tesseract_langs = '+'.join([LANG_MAP.get(lang, lang) for lang in languages])
+
+    data = pytesseract.image_to_data(img, lang=tesseract_langs, output_type=pytesseract.Output.DICT)
+
+    blocks = {}
+    confidences = []
+    for i, word in enumerate(data['text']):
+        conf = float(data['conf'][i])
+        if conf < 0 or not word.strip():
+            continue
+        confidences.append(conf)
+        block = blocks.setdefault(data['block_num'][i], {})
+        block.setdefault((data['par_num'][i], data['line_num'][i]), []).append(word)
+
+    text = '\n\n'.join(
+        '\n'.join(' '.join(words) for words in lines.values())
+        for lines in blocks.values()
+    )
+    avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+
+    return {
+        'text': text.strip(),
+        'confidence': avg_confidence / 100.0,
+        'engine': 'tesseract'
+    }
+
+
+def ocr_easyocr(img: Image.Image, languages: List[str]) -> dict:
+    """
+    OCR через EasyOCR
+    """
+    if not EASYOCR_AVAILABLE:
+        raise EngineUnavailable("EasyOCR not available")
+
+    reader = get_easyocr_reader()
+
+    # Конвертувати PIL Image в numpy array
+    img_array = np.array(img)
+
+    # Витягти текст
+    results = reader.readtext(img_array, detail=1)
+
+    # Зібрати текст та bounding boxes
+    text_parts = []
+    bounding_boxes = []
+    confidences = []
+
+    for bbox, text, conf in results:
+        text_parts.append(text)
+        bounding_boxes.append({
+            'text': text,
+            # numpy -> list, щоб результат серіалізувався в JSON
+            'bbox': [[float(x), float(y)] for x, y in bbox],
+            'confidence': float(conf)
+        })
+        confidences.append(float(conf))
+
+    full_text = ' '.join(text_parts)
+    avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+
+    return {
+        'text': full_text.strip(),
+        'confidence': avg_confidence,
+        'engine': 'easyocr',
+        'bounding_boxes': bounding_boxes
+    }
+
+
+ENGINES = {
+    'tesseract': ocr_tesseract,
+    'easyocr': ocr_easyocr,
+}
+
+
+def ocr_page(data: bytes, engine: str, languages: List[str]) -> dict:
+    """
+    Розпізнати одну сторінку (байти з split_pages) одним рушієм (виконується в процесі пулу)
+
+    Повертає результат рушія + 'seconds' (час роботи в процесі) і 'pid'
+    """
+    start = time.perf_counter()
+    img = load_page(data)
+    result = ENGINES[engine](img, languages)
+    result['seconds'] = time.perf_counter() - start
+    result['pid'] = os.getpid()
+    return result
+
+
+def pick_best(results: List[Optional[dict]]) -> Optional[dict]:
+    """Результат з більшою confidence (режим both)"""
+    results = [result for result in results if result]
+    if not results:
+        return None
+    return max(results, key=lambda result: result.get('confidence') or 0)
@@ -1,6 +1,8 @@
 """
 OCR Service - Optical Character Recognition для DAARION
 Витягує текст з зображень використовуючи Tesseract OCR + EasyOCR
+
+OCR виконується в пулі процесів (app/pool.py), а не в event loop
 """
 
 from fastapi import FastAPI, HTTPException, UploadFile, File
@@ -8,12 +10,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import logging
 import os
-import tempfile
 import base64
 from typing import Optional, List
-import io
-from PIL import Image
-import numpy as np
+from PIL import UnidentifiedImageError
+
+from app.engines import TESSERACT_AVAILABLE, EASYOCR_AVAILABLE, EngineUnavailable
+from app.pool import OCRPool
 
 # Logging
 logging.basicConfig(level=logging.INFO)
@@ -22,7 +24,7 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="OCR Service",
     description="Optical Character Recognition для DAARION (Tesseract + EasyOCR)",
-    version="1.0.0"
+    version="1.1.0"
 )
 
 # CORS
@@ -34,33 +36,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Lazy import OCR engines
-try:
-    import pytesseract
-    TESSERACT_AVAILABLE = True
-except ImportError:
-    TESSERACT_AVAILABLE = False
-    logger.warning("⚠️ Tesseract not available")
-
-try:
-    import easyocr
-    EASYOCR_AVAILABLE = True
-    # Ініціалізувати EasyOCR reader (lazy)
-    _easyocr_reader = None
-except ImportError:
-    EASYOCR_AVAILABLE = False
-    logger.warning("⚠️ EasyOCR not available")
-
-def get_easyocr_reader():
-    """Lazy initialization of EasyOCR reader"""
-    global _easyocr_reader
-    if _easyocr_reader is None and EASYOCR_AVAILABLE:
-        _easyocr_reader = easyocr.Reader(['uk', 'en', 'ru'], gpu=True)
-    return _easyocr_reader
-
 # Конфігурація
 OCR_ENGINE = os.getenv("OCR_ENGINE", "easyocr")  # tesseract, easyocr, both
 LANGUAGES = os.getenv("OCR_LANGUAGES", "ukr+eng").split('+')
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))  # процесів у пулі
+OCR_MAX_PAGES = int(os.getenv("OCR_MAX_PAGES", "50"))  # сторінок в одному зображенні (TIFF)
+
+ENGINE_NAMES = ('tesseract', 'easyocr', 'both')
+
+pool = OCRPool(
+    workers=OCR_WORKERS,
+    preload_easyocr=OCR_ENGINE in ('easyocr', 'both'),
+    max_pages=OCR_MAX_PAGES
+)
 
 class OCRRequest(BaseModel):
     image: str  # base64 encoded image
@@ -73,6 +61,15 @@ class OCRResponse(BaseModel):
     engine: str
     languages: List[str]
     bounding_boxes: Optional[List[dict]] = None
+    pages: Optional[List[dict]] = None  # лише для багатосторінкових зображень
+
+@app.on_event("startup")
+async def startup():
+    pool.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    pool.stop()
 
 @app.get("/")
 async def root():
@@ -86,7 +83,8 @@ async def root():
         },
         "default_engine": OCR_ENGINE,
         "languages": LANGUAGES,
-        "version": "1.0.0"
+        "workers": OCR_WORKERS,
+        "version": "1.1.0"
     }
 
 @app.get("/health")
@@ -104,95 +102,68 @@ async def health():
         "status": "healthy" if (TESSERACT_AVAILABLE or EASYOCR_AVAILABLE) else "degraded",
         "tesseract": "available" if TESSERACT_AVAILABLE else "unavailable",
         "easyocr": "available" if EASYOCR_AVAILABLE else "unavailable",
-        "gpu": gpu_available
+        "gpu": gpu_available,
+        "workers": OCR_WORKERS,
+        "in_flight": pool.in_flight
     }
 
-def preprocess_image(img: Image.Image) -> Image.Image:
-    """
-    Попередня обробка зображення для кращого OCR
-    """
-    # Конвертувати в RGB якщо потрібно
-    if img.mode != 'RGB':
-        img = img.convert('RGB')
-    
-    # Збільшити контраст (опціонально)
-    from PIL import ImageEnhance
-    enhancer = ImageEnhance.Contrast(img)
-    img = enhancer.enhance(1.5)
-    
-    return img
+@app.get("/api/ocr/stats")
+async def ocr_stats():
+    """Пропускна здатність і затримки пулу OCR"""
+    return pool.stats()
 
-def ocr_tesseract(img: Image.Image, languages: List[str]) -> dict:
+def merge_pages(pages: List[Optional[dict]]) -> Optional[dict]:
     """
-    OCR через Tesseract
+    Один результат з результатів сторінок
+
+    Текст сторінок через порожній рядок, confidence - середня;
+    bounding boxes отримують номер сторінки
     """
-    if not TESSERACT_AVAILABLE:
-        raise HTTPException(status_code=503, detail="Tesseract not available")
-    
-    # Мапінг мов
-    lang_map = {
-        'uk': 'ukr',
-        'en': 'eng',
-        'ru': 'rus',
-        'pl': 'pol',
-        'de': 'deu',
-        'fr': 'fra'
-    }
-    
-    tesseract_langs = '+'.join([lang_map.get(lang, lang) for lang in languages])
-    
-    # Витягти текст
-    text = pytesseract.image_to_string(img, lang=tesseract_langs)
-    
-    # Отримати confidence
-    data = pytesseract.image_to_data(img, lang=tesseract_langs, output_type=pytesseract.Output.DICT)
-    confidences = [int(conf) for conf in data['conf'] if conf != '-1']
-    avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+    recognized = [(index, page) for index, page in enumerate(pages) if page]
+    if not recognized:
+        return None
+    if len(pages) == 1:
+        return recognized[0][1]
     
+    bounding_boxes = [
+        dict(box, page=index)
+        for index, page in recognized
+        for box in page.get('bounding_boxes') or []
+    ]
     return {
-        'text': text.strip(),
-        'confidence': avg_confidence / 100.0,
-        'engine': 'tesseract'
+        'text': '\n\n'.join(page['text'] for _, page in recognized if page['text']),
+        'confidence': sum(page.get('confidence') or 0 for _, page in recognized) / len(recognized),
+        'engine': ','.join(sorted({page['engine'] for _, page in recognized})),
+        'bounding_boxes': bounding_boxes or None,
+        'pages': [
+            {
+                'page': index,
+                'text': page['text'] if page else '',
+                'confidence': page.get('confidence') if page else None,
+                'engine': page['engine'] if page else None
+            }
+            for index, page in enumerate(pages)
+        ]
     }
 
-def ocr_easyocr(img: Image.Image, languages: List[str]) -> dict:
+async def run_ocr(img_bytes: bytes, engine: str, languages: List[str]) -> dict:
     """
-    OCR через EasyOCR
+    OCR у пулі процесів; помилки -> HTTPException
     """
-    if not EASYOCR_AVAILABLE:
-        raise HTTPException(status_code=503, detail="EasyOCR not available")
-    
-    reader = get_easyocr_reader()
-    
-    # Конвертувати PIL Image в numpy array
-    img_array = np.array(img)
-    
-    # Витягти текст
-    results = reader.readtext(img_array, detail=1)
+    if engine not in ENGINE_NAMES:
+        raise HTTPException(status_code=400, detail=f"Unknown engine: {engine}")
     
-    # Зібрати текст та bounding boxes
-    text_parts = []
-    bounding_boxes = []
-    confidences = []
-    
-    for bbox, text, conf in results:
-        text_parts.append(text)
-        bounding_boxes.append({
-            'text': text,
-            'bbox': bbox,
-            'confidence': conf
-        })
-        confidences.append(conf)
-    
-    full_text = ' '.join(text_parts)
-    avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+    try:
+        recognized = await pool.recognize(img_bytes, engine, languages)
+    except EngineUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except (UnidentifiedImageError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return {
-        'text': full_text.strip(),
-        'confidence': avg_confidence,
-        'engine': 'easyocr',
-        'bounding_boxes': bounding_boxes
-    }
+    result = merge_pages(recognized['pages'])
+    if not result:
+        raise HTTPException(status_code=503, detail="No OCR engine available")
+    return result
 
 @app.post("/api/ocr", response_model=OCRResponse)
 async def extract_text(request: OCRRequest):
@@ -205,6 +176,8 @@ async def extract_text(request: OCRRequest):
         "engine": "easyocr",
         "languages": ["uk", "en"]
     }
+    
+    Багатосторінковий TIFF розпізнається посторінково паралельно
     """
     try:
         logger.info("📥 Received OCR request")
@@ -215,45 +188,14 @@ async def extract_text(request: OCRRequest):
             image_data = image_data.split(',')[1]
         
         img_bytes = base64.b64decode(image_data)
-        img = Image.open(io.BytesIO(img_bytes))
-        
-        logger.info(f"📊 Image size: {img.size}, mode: {img.mode}")
         
-        # Попередня обробка
-        img = preprocess_image(img)
+        logger.info(f"📊 Image bytes: {len(img_bytes)}")
         
         # Вибрати OCR engine
         engine = request.engine or OCR_ENGINE
         languages = request.languages or ['uk', 'en']
         
-        result = None
-        
-        if engine == 'tesseract':
-            result = ocr_tesseract(img, languages)
-        elif engine == 'easyocr':
-            result = ocr_easyocr(img, languages)
-        elif engine == 'both':
-            # Спробувати обидва та вибрати кращий результат
-            try:
-                result_tesseract = ocr_tesseract(img, languages)
-            except:
-                result_tesseract = None
-            
-            try:
-                result_easyocr = ocr_easyocr(img, languages)
-            except:
-                result_easyocr = None
-            
-            # Вибрати результат з більшою confidence
-            if result_tesseract and result_easyocr:
-                result = result_tesseract if result_tesseract['confidence'] > result_easyocr['confidence'] else result_easyocr
-            else:
-                result = result_tesseract or result_easyocr
-        else:
-            raise HTTPException(status_code=400, detail=f"Unknown engine: {engine}")
-        
-        if not result:
-            raise HTTPException(status_code=503, detail="No OCR engine available")
+        result = await run_ocr(img_bytes, engine, languages)
         
         logger.info(f"✅ Extracted text: '{result['text'][:50]}...' (confidence: {result.get('confidence', 0):.2f})")
         
@@ -262,9 +204,12 @@ async def extract_text(request: OCRRequest):
             confidence=result.get('confidence'),
             engine=result['engine'],
             languages=languages,
-            bounding_boxes=result.get('bounding_boxes')
+            bounding_boxes=result.get('bounding_boxes'),
+            pages=result.get('pages')
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ OCR error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -275,7 +220,7 @@ async def ocr_upload(file: UploadFile = File(...), engine: str = "easyocr"):
     Витягує текст з завантаженого зображення
     
     Form-data:
-    - file: image file (png, jpg, jpeg, webp)
+    - file: image file (png, jpg, jpeg, webp, tiff)
     - engine: tesseract | easyocr | both
     """
     try:
@@ -283,48 +228,25 @@ async def ocr_upload(file: UploadFile = File(...), engine: str = "easyocr"):
         
         # Прочитати файл
         content = await file.read()
-        img = Image.open(io.BytesIO(content))
-        
-        logger.info(f"📊 Image size: {img.size}, mode: {img.mode}")
-        
-        # Попередня обробка
-        img = preprocess_image(img)
-        
-        # Вибрати OCR engine
-        result = None
         
-        if engine == 'tesseract':
-            result = ocr_tesseract(img, ['uk', 'en'])
-        elif engine == 'easyocr':
-            result = ocr_easyocr(img, ['uk', 'en'])
-        elif engine == 'both':
-            try:
-                result_tesseract = ocr_tesseract(img, ['uk', 'en'])
-            except:
-                result_tesseract = None
-            
-            try:
-                result_easyocr = ocr_easyocr(img, ['uk', 'en'])
-            except:
-                result_easyocr = None
-            
-            if result_tesseract and result_easyocr:
-                result = result_tesseract if result_tesseract['confidence'] > result_easyocr['confidence'] else result_easyocr
-            else:
-                result = result_tesseract or result_easyocr
+        logger.info(f"📊 Image bytes: {len(content)}")
         
-        if not result:
-            raise HTTPException(status_code=503, detail="No OCR engine available")
+        result = await run_ocr(content, engine, ['uk', 'en'])
         
         logger.info(f"✅ Extracted text: '{result['text'][:50]}...'")
         
-        return {
+        response = {
             "text": result['text'],
             "confidence": result.get('confidence'),
             "engine": result['engine'],
             "filename": file.filename
         }
+        if result.get('pages'):
+            response["pages"] = result['pages']
+        return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Upload OCR error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,151 @@
+"""
+Пул процесів для OCR
+
+Кожна сторінка x рушій - окреме завдання в ProcessPoolExecutor, тож
+event loop не блокується, рушії в режимі both працюють паралельно, а
+сторінки багатосторінкового документа розходяться по воркерах. Документ
+розбивається на сторінки тут, і воркер отримує лише байти своєї сторінки.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Deque, Dict, List, Optional
+
+from app.engines import EngineUnavailable, init_worker, ocr_page, pick_best, split_pages
+
+logger = logging.getLogger(__name__)
+
+# Скільки останніх тривалостей тримати для статистики
+LATENCY_WINDOW = 1024
+
+# Порядок важливий для pick_best: при рівній confidence перемагає easyocr
+BOTH_ENGINES = ('easyocr', 'tesseract')
+
+
+class OCRPool:
+    """ProcessPoolExecutor + метрики пропускної здатності та затримок"""
+
+    def __init__(self, workers: int, preload_easyocr: bool = False, max_pages: int = 50):
+        self.workers = max(1, workers)
+        self.preload_easyocr = preload_easyocr
+        self.max_pages = max_pages
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.in_flight = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.started_at = time.monotonic()
+        self.requests = 0
+        self.pages = 0
+        self.failed = 0
+        self.engine_runs: Dict[str, int] = {}
+        self._request_ms: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._page_ms: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._wait_ms: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def start(self):
+        self._create_executor()
+        self.reset_stats()
+        logger.info(f"✅ OCR pool: {self.workers} worker process(es)")
+
+    def _create_executor(self):
+        # spawn: torch/CUDA (EasyOCR) не переживають fork
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(self.preload_easyocr,),
+        )
+
+    def stop(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, data: bytes, engine: str, languages: List[str]) -> dict:
+        submitted = time.perf_counter()
+        executor = self._executor
+        self.in_flight += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                executor, ocr_page, data, engine, languages
+            )
+        except BrokenProcessPool:
+            # Воркер впав (OOM, segfault) - наступні запити отримають новий пул
+            if self._executor is executor:
+                logger.error("❌ OCR worker died, restarting pool")
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._create_executor()
+            raise
+        finally:
+            self.in_flight -= 1
+        total_ms = (time.perf_counter() - submitted) * 1000
+        self.engine_runs[engine] = self.engine_runs.get(engine, 0) + 1
+        self._page_ms.append(result['seconds'] * 1000)
+        self._wait_ms.append(max(0.0, total_ms - result['seconds'] * 1000))
+        return result
+
+    async def _run_both(self, data: bytes, page: int, languages: List[str]) -> Optional[dict]:
+        results = await asyncio.gather(
+            *(self._run(data, engine, languages) for engine in BOTH_ENGINES),
+            return_exceptions=True
+        )
+        for engine, result in zip(BOTH_ENGINES, results):
+            if isinstance(result, BaseException) and not isinstance(result, EngineUnavailable):
+                logger.warning(f"⚠️ {engine} failed on page {page}: {result}")
+        return pick_best([result for result in results if not isinstance(result, BaseException)])
+
+    async def recognize(self, data: bytes, engine: str, languages: List[str]) -> Dict[str, Any]:
+        """
+        Розпізнати всі сторінки зображення
+
+        Повертає {'pages': [результат на сторінку]}; сторінка без
+        результату (both, обидва рушії недоступні) - None
+        """
+        if self._executor is None:
+            raise RuntimeError("OCR pool not started")
+        start = time.perf_counter()
+        self.requests += 1
+        try:
+            pages = await asyncio.to_thread(split_pages, data, self.max_pages)
+            if engine == 'both':
+                jobs = [self._run_both(page_data, page, languages) for page, page_data in enumerate(pages)]
+            else:
+                jobs = [self._run(page_data, engine, languages) for page_data in pages]
+            results = await asyncio.gather(*jobs)
+        except Exception:
+            self.failed += 1
+            raise
+        self.pages += len(pages)
+        self._request_ms.append((time.perf_counter() - start) * 1000)
+        return {'pages': results}
+
+    def stats(self) -> Dict[str, Any]:
+        def summary(values: Deque[float]) -> Dict[str, Optional[float]]:
+            ordered = sorted(values)
+            if not ordered:
+                return {"avg": None, "p50": None, "p95": None}
+            return {
+                "avg": round(sum(ordered) / len(ordered), 1),
+                "p50": round(ordered[len(ordered) // 2], 1),
+                "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+            }
+
+        uptime = time.monotonic() - self.started_at
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "pages": self.pages,
+            "failed": self.failed,
+            "engine_runs": dict(self.engine_runs),
+            "pages_per_s": round(self.pages / uptime, 3) if uptime > 0 else None,
+            "request_ms": summary(self._request_ms),
+            "page_ms": summary(self._page_ms),
+            "queue_wait_ms": summary(self._wait_ms),
+        }
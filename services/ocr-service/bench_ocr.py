@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Throughput / latency benchmark for ocr-service on a set of scans
+
+Compares, on the same documents:
+  - inline: pages OCR'd one after another in this process, engines one
+            after the other in `both` mode (what the async handlers did
+            before the process pool, blocking the event loop meanwhile)
+  - pool:   all documents submitted at once to OCRPool (--workers
+            processes; pages and `both` engines fan out across workers)
+
+Scans: --scans glob of images (png/jpg/multi-page tiff). Without it,
+--count synthetic documents of --pages rendered text pages each are
+generated (multi-page TIFF when --pages > 1).
+
+Reported: pages/s, mean / p95 latency per document and, for the pool,
+its /api/ocr/stats view (per-page run time and queue wait).
+
+Usage:
+    python bench_ocr.py [--scans 'scans/*.png'] [--engine tesseract|easyocr|both] [--workers 4]
+"""
+import argparse
+import asyncio
+import glob
+import io
+import json
+import os
+import random
+import time
+
+from PIL import Image, ImageDraw
+
+from app.engines import ocr_page, pick_best, split_pages
+from app.pool import BOTH_ENGINES, OCRPool
+
+WORDS = (
+    "мікроДАО агент токен голосування пропозиція скарбниця учасник канал "
+    "governance proposal treasury member channel node router policy"
+).split()
+
+
+def synth_page(rng: random.Random, width: int = 1240, height: int = 1754) -> Image.Image:
+    """A4 @150 dpi page with lines of random words"""
+    page = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(page)
+    y = 80
+    while y < height - 80:
+        line = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 12)))
+        draw.text((80, y), line, fill=0)
+        y += 28
+    return page
+
+
+def synth_documents(count: int, pages: int, seed: int):
+    rng = random.Random(seed)
+    documents = []
+    for _ in range(count):
+        frames = [synth_page(rng) for _ in range(pages)]
+        buffer = io.BytesIO()
+        if pages > 1:
+            frames[0].save(buffer, format="TIFF", save_all=True, append_images=frames[1:])
+        else:
+            frames[0].save(buffer, format="PNG")
+        documents.append(buffer.getvalue())
+    return documents
+
+
+def report(name: str, pages: int, latencies, elapsed: float):
+    latencies = sorted(latencies)
+    print(
+        f"{name:<7} {pages / elapsed:7.2f} pages/s  "
+        f"doc mean {sum(latencies) / len(latencies):6.2f}s  "
+        f"p95 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]:6.2f}s  "
+        f"total {elapsed:6.1f}s"
+    )
+
+
+def run_inline(documents, engine: str, languages):
+    latencies = []
+    start = time.perf_counter()
+    for data in documents:
+        doc_start = time.perf_counter()
+        for page_data in split_pages(data):
+            if engine == "both":
+                pick_best([ocr_page(page_data, name, languages) for name in BOTH_ENGINES])
+            else:
+                ocr_page(page_data, engine, languages)
+        latencies.append(time.perf_counter() - doc_start)
+    return latencies, time.perf_counter() - start
+
+
+async def run_pool(documents, engine: str, languages, workers: int):
+    pool = OCRPool(workers=workers, preload_easyocr=engine in ("easyocr", "both"))
+    pool.start()
+    try:
+        # Spawn workers (and load EasyOCR) before timing
+        await asyncio.gather(*(pool.recognize(documents[0], engine, languages) for _ in range(workers)))
+        pool.reset_stats()
+
+        async def one(data):
+            doc_start = time.perf_counter()
+            await pool.recognize(data, engine, languages)
+            return time.perf_counter() - doc_start
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(one(data) for data in documents))
+        return list(latencies), time.perf_counter() - start, pool.stats()
+    finally:
+        pool.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ocr-service throughput benchmark")
+    parser.add_argument("--scans", help="glob of scan images, e.g. 'scans/*.png'")
+    parser.add_argument("--count", type=int, default=12, help="synthetic documents when --scans is not given")
+    parser.add_argument("--pages", type=int, default=2, help="pages per synthetic document")
+    parser.add_argument("--engine", default="tesseract", choices=["tesseract", "easyocr", "both"])
+    parser.add_argument("--languages", default="uk,en")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--skip-inline", action="store_true")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.scans:
+        documents = []
+        for path in sorted(glob.glob(args.scans)):
+            with open(path, "rb") as f:
+                documents.append(f.read())
+        if not documents:
+            raise SystemExit(f"no scans match {args.scans}")
+    else:
+        documents = synth_documents(args.count, args.pages, args.seed)
+    languages = args.languages.split(",")
+    pages = sum(len(split_pages(data)) for data in documents)
+    print(f"\n{len(documents)} documents, {pages} pages, engine {args.engine}, {args.workers} worker(s)\n")
+
+    if not args.skip_inline:
+        # Warm-up (EasyOCR reader load) outside the timing
+        for engine in BOTH_ENGINES if args.engine == "both" else (args.engine,):
+            ocr_page(split_pages(documents[0])[0], engine, languages)
+        report("inline", pages, *run_inline(documents, args.engine, languages))
+    latencies, elapsed, stats = asyncio.run(run_pool(documents, args.engine, languages, args.workers))
+    report("pool", pages, latencies, elapsed)
+    print(json.dumps({key: stats[key] for key in ("page_ms", "queue_wait_ms", "engine_runs")}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -19,7 +19,8 @@ from app.schemas import (
 from app.core.config import settings
 from app.runtime.inference import parse_document_from_images
 from app.runtime.preprocessing import (
-    convert_pdf_to_images, load_image, detect_file_type, validate_file_size
+    convert_pdf_to_images, iter_pdf_pages, get_pdf_page_count,
+    load_image, detect_file_type, validate_file_size
 )
 from app.runtime.postprocessing import (
     build_chunks, build_qa_pairs, build_markdown
@@ -84,12 +85,20 @@ async def parse_document_endpoint(
             except ValueError as e:
                 raise HTTPException(status_code=400, detail=str(e))
             
-            # Convert to images
+            # Convert to images (lazily for the pipelined Ollama runtime)
             if doc_type == "pdf":
-                images = convert_pdf_to_images(content)
+                try:
+                    page_count = get_pdf_page_count(content)
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+                if settings.RUNTIME_TYPE == "ollama":
+                    images = iter_pdf_pages(content)
+                else:
+                    images = convert_pdf_to_images(content)
             else:
                 image = load_image(content)
                 images = [image]
+                page_count = 1
             
             # For region mode, validate and prepare region bbox
             region_bbox = None
@@ -108,12 +117,16 @@ async def parse_document_endpoint(
                 }
                 # If region_page specified, only process that page
                 if region_page is not None:
-                    if region_page < 1 or region_page > len(images):
+                    if region_page < 1 or region_page > page_count:
                         raise HTTPException(
                             status_code=400,
-                            detail=f"region_page {region_page} out of range (1-{len(images)})"
+                            detail=f"region_page {region_page} out of range (1-{page_count})"
                         )
-                    images = [images[region_page - 1]]
+                    if doc_type == "pdf":
+                        images = list(iter_pdf_pages(content, first_page=region_page, last_page=region_page))
+                    else:
+                        images = [images[region_page - 1]]
+                    page_count = 1
             
         else:
             # TODO: Download from doc_url
@@ -123,10 +136,9 @@ async def parse_document_endpoint(
             )
         
         # Parse document from images
-        logger.info(f"Parsing document: {len(images)} page(s), mode: {output_mode}")
+        logger.info(f"Parsing document: {page_count} page(s), mode: {output_mode}")
         
         # Check if using Ollama (async) or local model (sync)
-        from app.core.config import settings
         if settings.RUNTIME_TYPE == "ollama":
             from app.runtime.inference import parse_document_with_ollama
             parsed_doc = await parse_document_with_ollama(
@@ -134,7 +146,8 @@ async def parse_document_endpoint(
                 output_mode=output_mode,
                 doc_id=doc_id or str(uuid.uuid4()),
                 doc_type=doc_type,
-                region_bbox=region_bbox
+                region_bbox=region_bbox,
+                page_count=page_count
             )
         else:
             parsed_doc = parse_document_from_images(
@@ -28,6 +28,10 @@ class Settings(BaseSettings):
     # PDF processing
     PDF_DPI: int = int(os.getenv("PDF_DPI", "200"))
     PAGE_RANGE: Optional[str] = os.getenv("PAGE_RANGE", None)  # e.g., "1-20" for pages 1-20
+    PDF_RASTER_CHUNK_PAGES: int = int(os.getenv("PDF_RASTER_CHUNK_PAGES", "4"))  # Pages per pdftoppm call
+    
+    # Page pipeline: pages encoded / in flight to the vision model at once
+    PARSER_PAGE_CONCURRENCY: int = int(os.getenv("PARSER_PAGE_CONCURRENCY", "4"))
     
     # Image processing
     IMAGE_MAX_SIZE: int = int(os.getenv("IMAGE_MAX_SIZE", "2048"))  # Max size for longest side
@@ -2,10 +2,13 @@
 Inference functions for document parsing
 """
 
+import asyncio
+import io
 import logging
-from typing import Literal, Optional, List
+from typing import Iterable, Literal, Optional, List
 from pathlib import Path
 
+import httpx
 import torch
 from PIL import Image
 
@@ -26,26 +29,32 @@ logger = logging.getLogger(__name__)
 
 
 async def parse_document_with_ollama(
-    images: List[Image.Image],
+    images: Iterable[Image.Image],
     output_mode: Literal["raw_json", "markdown", "qa_pairs", "chunks", "layout_only", "region"] = "raw_json",
     doc_id: Optional[str] = None,
     doc_type: Literal["pdf", "image"] = "image",
-    region_bbox: Optional[dict] = None
+    region_bbox: Optional[dict] = None,
+    page_count: Optional[int] = None
 ) -> ParsedDocument:
     """
     Parse document using Ollama API
     
+    Pages are pipelined: the next page is rasterized/encoded while up to
+    PARSER_PAGE_CONCURRENCY pages are in flight to the model. Images may be
+    a lazy iterator (see preprocessing.iter_pdf_pages); each page image is
+    released right after PNG encoding, so peak memory depends on the
+    window size, not on the page count.
+    
     Args:
-        images: List of PIL Images
+        images: PIL Images (list or lazy iterator, in page order)
         output_mode: Output format mode
         doc_id: Document ID
         doc_type: Document type
+        page_count: Total pages (for progress logging only)
     
     Returns:
         ParsedDocument
     """
-    import io
-    
     # Convert output_mode to Ollama format
     ollama_mode_map = {
         "raw_json": OllamaOutputMode.raw_json,
@@ -55,48 +64,39 @@ async def parse_document_with_ollama(
     }
     ollama_mode = ollama_mode_map.get(output_mode, OllamaOutputMode.raw_json)
     
-    pages_data = []
+    window = max(1, settings.PARSER_PAGE_CONCURRENCY)
+    slots = asyncio.Semaphore(window)
+    page_iter = iter(images)
+    tasks = []
     
-    for idx, image in enumerate(images, start=1):
+    async with httpx.AsyncClient(
+        timeout=120.0,
+        limits=httpx.Limits(max_connections=window, max_keepalive_connections=window)
+    ) as client:
         try:
-            # Convert image to PNG bytes
-            buf = io.BytesIO()
-            image.convert("RGB").save(buf, format="PNG")
-            png_bytes = buf.getvalue()
-            
-            # Call Ollama
-            ollama_data = await call_ollama_vision(png_bytes, ollama_mode)
-            raw_text, parsed_json = parse_ollama_response(ollama_data, ollama_mode)
-            
-            logger.debug(f"Ollama output for page {idx}: {raw_text[:100]}...")
-            
-            # Parse into blocks
-            if parsed_json and isinstance(parsed_json, dict):
-                # Use structured JSON if available
-                blocks = parsed_json.get("blocks", [])
-                if not blocks:
-                    # Fallback: create block from raw text
-                    blocks = [{
-                        "type": "paragraph",
-                        "text": raw_text,
-                        "bbox": {"x": 0, "y": 0, "width": image.width, "height": image.height},
-                        "reading_order": 1
-                    }]
-            else:
-                # Parse plain text output
-                blocks = parse_model_output_to_blocks(raw_text, image.size, page_num=idx)
+            while True:
+                await slots.acquire()
+                # Rasterization (lazy iterators) happens off the event loop
+                image = await asyncio.to_thread(next, page_iter, None)
+                if image is None:
+                    slots.release()
+                    break
+                page_num = len(tasks) + 1
+                tasks.append(asyncio.create_task(
+                    _parse_page_with_ollama(image, page_num, page_count, ollama_mode, client, slots)
+                ))
+                del image
             
-            pages_data.append({
-                "blocks": blocks,
-                "width": image.width,
-                "height": image.height
-            })
-            
-            logger.info(f"Processed page {idx}/{len(images)} via Ollama")
-            
-        except Exception as e:
-            logger.error(f"Error processing page {idx} with Ollama: {e}", exc_info=True)
-            continue
+            results = await asyncio.gather(*tasks)
+        finally:
+            # Rasterization error, page error or cancellation: stop pages still in flight
+            # before the client closes
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    # Failed pages are dropped; page_num keeps numbering and order intact
+    pages_data = [page for page in results if page is not None]
     
     return build_parsed_document(
         pages_data=pages_data,
@@ -106,6 +106,67 @@ async def parse_document_with_ollama(
     )
 
 
+async def _parse_page_with_ollama(
+    image: Image.Image,
+    page_num: int,
+    page_count: Optional[int],
+    ollama_mode: OllamaOutputMode,
+    client: httpx.AsyncClient,
+    slots: asyncio.Semaphore
+) -> Optional[dict]:
+    """Encode one page, call Ollama and parse blocks; releases its window slot when done"""
+    try:
+        width, height = image.width, image.height
+        
+        # Convert image to PNG bytes
+        png_bytes = await asyncio.to_thread(_encode_png, image)
+        del image
+        
+        # Call Ollama
+        ollama_data = await call_ollama_vision(png_bytes, ollama_mode, client=client)
+        del png_bytes
+        raw_text, parsed_json = parse_ollama_response(ollama_data, ollama_mode)
+        
+        logger.debug(f"Ollama output for page {page_num}: {raw_text[:100]}...")
+        
+        # Parse into blocks
+        if parsed_json and isinstance(parsed_json, dict):
+            # Use structured JSON if available
+            blocks = parsed_json.get("blocks", [])
+            if not blocks:
+                # Fallback: create block from raw text
+                blocks = [{
+                    "type": "paragraph",
+                    "text": raw_text,
+                    "bbox": {"x": 0, "y": 0, "width": width, "height": height},
+                    "reading_order": 1
+                }]
+        else:
+            # Parse plain text output
+            blocks = parse_model_output_to_blocks(raw_text, (width, height), page_num=page_num)
+        
+        logger.info(f"Processed page {page_num}/{page_count or '?'} via Ollama")
+        
+        return {
+            "page_num": page_num,
+            "blocks": blocks,
+            "width": width,
+            "height": height
+        }
+        
+    except Exception as e:
+        logger.error(f"Error processing page {page_num} with Ollama: {e}", exc_info=True)
+        return None
+    finally:
+        slots.release()
+
+
+def _encode_png(image: Image.Image) -> bytes:
+    buf = io.BytesIO()
+    image.convert("RGB").save(buf, format="PNG")
+    return buf.getvalue()
+
+
 def parse_document_from_images(
     images: List[Image.Image],
     output_mode: Literal["raw_json", "markdown", "qa_pairs", "chunks", "layout_only", "region"] = "raw_json",
@@ -173,6 +234,7 @@ def parse_document_from_images(
             )
             
             pages_data.append({
+                "page_num": idx,
                 "blocks": blocks,
                 "width": image.width,
                 "height": image.height
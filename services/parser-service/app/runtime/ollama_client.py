@@ -75,7 +75,8 @@ def build_prompt(mode: OutputMode) -> str:
 async def call_ollama_vision(
     image_bytes: bytes,
     mode: OutputMode,
-    model_name: Optional[str] = None
+    model_name: Optional[str] = None,
+    client: Optional[httpx.AsyncClient] = None
 ) -> Dict[str, Any]:
     """
     Call Ollama vision API with image
@@ -84,6 +85,7 @@ async def call_ollama_vision(
         image_bytes: PNG image bytes
         mode: Output mode
         model_name: Model name (defaults to PARSER_MODEL_NAME)
+        client: Shared HTTP client (one per document); a new one is created if omitted
     
     Returns:
         Ollama response dictionary
@@ -106,13 +108,16 @@ async def call_ollama_vision(
     logger.info(f"Calling Ollama: {url}, model: {model_name}, mode: {mode}")
     
     try:
-        async with httpx.AsyncClient(timeout=120.0) as client:
+        if client is None:
+            async with httpx.AsyncClient(timeout=120.0) as own_client:
+                resp = await own_client.post(url, json=body)
+        else:
             resp = await client.post(url, json=body)
-            resp.raise_for_status()
-            data = resp.json()
-            
-            logger.debug(f"Ollama response: {data.get('response', '')[:100]}...")
-            return data
+        resp.raise_for_status()
+        data = resp.json()
+        
+        logger.debug(f"Ollama response: {data.get('response', '')[:100]}...")
+        return data
             
     except httpx.HTTPError as e:
         logger.error(f"Ollama HTTP error: {e}")
@@ -50,6 +50,8 @@ def build_parsed_document(
     Args:
         pages_data: List of page data from model
             Each page should have: blocks, width, height
+            and optionally page_num (pages may then arrive out of order
+            or with gaps from failed pages)
         doc_id: Document ID
         doc_type: Document type ("pdf" or "image")
         metadata: Additional metadata
@@ -59,7 +61,13 @@ def build_parsed_document(
     """
     pages = []
     
-    for page_idx, page_data in enumerate(pages_data, start=1):
+    numbered = [
+        (page_data.get('page_num') or position, page_data)
+        for position, page_data in enumerate(pages_data, start=1)
+    ]
+    numbered.sort(key=lambda item: item[0])
+    
+    for page_idx, page_data in numbered:
         blocks = []
         
         for block_data in page_data.get('blocks', []):
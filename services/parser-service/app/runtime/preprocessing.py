@@ -3,7 +3,7 @@ Preprocessing functions for PDF and images
 """
 
 import logging
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from io import BytesIO
 from pathlib import Path
 
@@ -15,6 +15,74 @@ from app.core.config import settings
 logger = logging.getLogger(__name__)
 
 
+def get_pdf_page_count(pdf_bytes: bytes, max_pages: Optional[int] = None) -> int:
+    """
+    Number of pages that will be processed (capped by max_pages)
+    
+    Args:
+        pdf_bytes: PDF file content as bytes
+        max_pages: Maximum number of pages to process (default from settings)
+    
+    Returns:
+        Page count
+    """
+    max_pages = max_pages or settings.PARSER_MAX_PAGES
+    
+    try:
+        info = pdf2image.pdfinfo_from_bytes(pdf_bytes)
+        return min(int(info["Pages"]), max_pages)
+    except Exception as e:
+        logger.error(f"Failed to read PDF info: {e}", exc_info=True)
+        raise ValueError(f"PDF conversion failed: {str(e)}")
+
+
+def iter_pdf_pages(
+    pdf_bytes: bytes,
+    dpi: Optional[int] = None,
+    max_pages: Optional[int] = None,
+    first_page: int = 1,
+    last_page: Optional[int] = None
+) -> Iterator[Image.Image]:
+    """
+    Rasterize PDF pages lazily
+    
+    Pages are rendered PDF_RASTER_CHUNK_PAGES at a time, so only one chunk
+    of page images exists until the consumer drops them.
+    
+    Args:
+        pdf_bytes: PDF file content as bytes
+        dpi: DPI for conversion (default from settings)
+        max_pages: Maximum number of pages to process (default from settings)
+        first_page: First page to render (1-based)
+        last_page: Last page to render (default: last page within max_pages)
+    
+    Yields:
+        PIL Images in page order
+    """
+    dpi = dpi or getattr(settings, 'PDF_DPI', 200)
+    page_count = get_pdf_page_count(pdf_bytes, max_pages)
+    last_page = min(last_page or page_count, page_count)
+    chunk = max(1, settings.PDF_RASTER_CHUNK_PAGES)
+    
+    for start in range(first_page, last_page + 1, chunk):
+        end = min(start + chunk - 1, last_page)
+        try:
+            images = pdf2image.convert_from_bytes(
+                pdf_bytes,
+                dpi=dpi,
+                first_page=start,
+                last_page=end
+            )
+        except Exception as e:
+            logger.error(f"Failed to convert PDF pages {start}-{end}: {e}", exc_info=True)
+            raise ValueError(f"PDF conversion failed: {str(e)}")
+        
+        logger.debug(f"Rasterized PDF pages {start}-{end} (DPI: {dpi})")
+        
+        while images:
+            yield images.pop(0)
+
+
 def convert_pdf_to_images(
     pdf_bytes: bytes,
     dpi: Optional[int] = None,
@@ -23,6 +91,8 @@ def convert_pdf_to_images(
     """
     Convert PDF bytes to list of PIL Images
     
+    Holds every page in memory; prefer iter_pdf_pages for large documents.
+    
     Args:
         pdf_bytes: PDF file content as bytes
         dpi: DPI for conversion (default from settings)
@@ -31,25 +101,9 @@ def convert_pdf_to_images(
     Returns:
         List of PIL Images (one per page)
     """
-    dpi = dpi or getattr(settings, 'PDF_DPI', 200)
-    max_pages = max_pages or settings.PARSER_MAX_PAGES
-    
-    try:
-        # Convert PDF to images
-        images = pdf2image.convert_from_bytes(
-            pdf_bytes,
-            dpi=dpi,
-            first_page=1,
-            last_page=max_pages
-        )
-        
-        logger.info(f"Converted PDF to {len(images)} images (DPI: {dpi}, max_pages: {max_pages})")
-        
-        return images
-        
-    except Exception as e:
-        logger.error(f"Failed to convert PDF to images: {e}", exc_info=True)
-        raise ValueError(f"PDF conversion failed: {str(e)}")
+    images = list(iter_pdf_pages(pdf_bytes, dpi=dpi, max_pages=max_pages))
+    logger.info(f"Converted PDF to {len(images)} images (DPI: {dpi or settings.PDF_DPI}, max_pages: {max_pages or settings.PARSER_MAX_PAGES})")
+    return images
 
 
 def load_image(image_bytes: bytes) -> Image.Image:
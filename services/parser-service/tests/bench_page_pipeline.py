@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Page pipeline benchmark for parse_document_with_ollama
+
+Parses a generated N-page PDF against a local stub vision server
+(fixed latency per page) and reports pages/sec and peak RSS for:
+  - sequential: eager convert_pdf_to_images, one page in flight
+  - pipelined:  lazy iter_pdf_pages, PARSER_PAGE_CONCURRENCY pages in flight
+
+Each mode runs in its own subprocess so peak RSS is not shared.
+Requires poppler (pdftoppm) like the service itself.
+
+Usage:
+    python tests/bench_page_pipeline.py [--pages 100] [--latency-ms 200] [--concurrency 8]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+BODY = json.dumps({
+    "response": json.dumps({"blocks": [{"type": "paragraph", "text": "stub page text", "reading_order": 1}]})
+}).encode()
+
+
+def make_stub_handler(latency_s: float):
+    async def stub_handler(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Minimal HTTP/1.1 keep-alive server imitating Ollama /api/generate"""
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                await asyncio.sleep(latency_s)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(BODY)).encode() + b"\r\n\r\n" + BODY
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+    return stub_handler
+
+
+def make_pdf(path: str, pages: int):
+    """A4-sized pages with some drawn text so PNG encoding does real work"""
+    from PIL import Image, ImageDraw
+
+    images = []
+    for page in range(1, pages + 1):
+        image = Image.new("RGB", (595, 842), color="white")
+        draw = ImageDraw.Draw(image)
+        for line in range(40):
+            draw.text((40, 40 + line * 19), f"Page {page} line {line} " + "lorem ipsum " * 6, fill="black")
+        images.append(image)
+    images[0].save(path, format="PDF", save_all=True, append_images=images[1:])
+
+
+def run_child(mode: str, pdf_path: str):
+    from app.runtime.inference import parse_document_with_ollama
+    from app.runtime.preprocessing import convert_pdf_to_images, iter_pdf_pages, get_pdf_page_count
+
+    content = Path(pdf_path).read_bytes()
+    page_count = get_pdf_page_count(content)
+
+    start = time.perf_counter()
+    if mode == "sequential":
+        images = convert_pdf_to_images(content)
+    else:
+        images = iter_pdf_pages(content)
+    doc = asyncio.run(parse_document_with_ollama(images, doc_id="bench", doc_type="pdf", page_count=page_count))
+    elapsed = time.perf_counter() - start
+
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"pages": len(doc.pages), "seconds": elapsed, "peak_rss_mb": peak_rss_mb}))
+
+
+async def main_async(args):
+    server = await asyncio.start_server(make_stub_handler(args.latency_ms / 1000), "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "bench.pdf")
+        make_pdf(pdf_path, args.pages)
+        print(f"{args.pages}-page PDF, stub latency {args.latency_ms} ms/page\n")
+
+        for mode, concurrency in (("sequential", 1), ("pipelined", args.concurrency)):
+            env = {
+                **os.environ,
+                "RUNTIME_TYPE": "ollama",
+                "OLLAMA_BASE_URL": f"http://127.0.0.1:{port}",
+                "PARSER_MAX_PAGES": str(args.pages),
+                "PARSER_PAGE_CONCURRENCY": str(concurrency),
+            }
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable, __file__, "--child", mode, pdf_path,
+                env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            )
+            out, _ = await proc.communicate()
+            result = json.loads(out.decode().strip().splitlines()[-1])
+            print(
+                f"{mode:<11} window={concurrency:<3} pages={result['pages']:<4} "
+                f"{result['pages'] / result['seconds']:6.2f} pages/s  "
+                f"peak RSS={result['peak_rss_mb']:7.1f} MB"
+            )
+
+    server.close()
+    await server.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parser page pipeline benchmark")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PDF"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+    else:
+        asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Tests for page-parallel Ollama parsing pipeline
+"""
+
+import asyncio
+import io
+import json
+import pytest
+from unittest.mock import patch
+from PIL import Image
+
+from app.runtime.inference import parse_document_with_ollama
+from app.runtime.postprocessing import build_parsed_document
+
+
+class TestOllamaPipeline:
+    """Tests for parse_document_with_ollama"""
+
+    @pytest.mark.asyncio
+    async def test_pages_parallel_in_order(self):
+        """Test pages run concurrently within the window and keep page order"""
+        in_flight = 0
+        max_in_flight = 0
+
+        async def fake_vision(image_bytes, mode, model_name=None, client=None):
+            nonlocal in_flight, max_in_flight
+            # Page number is encoded in the image width
+            page = Image.open(io.BytesIO(image_bytes)).width - 100
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            # Later pages finish first
+            await asyncio.sleep(0.02 * (7 - page))
+            in_flight -= 1
+            if page == 3:
+                raise RuntimeError("model error")
+            return {"response": json.dumps({"blocks": [{"type": "paragraph", "text": f"page {page}"}]})}
+
+        images = (Image.new("RGB", (100 + page, 140), color="white") for page in range(1, 7))
+
+        with patch("app.runtime.inference.call_ollama_vision", side_effect=fake_vision), \
+             patch("app.runtime.inference.settings.PARSER_PAGE_CONCURRENCY", 3):
+            doc = await parse_document_with_ollama(images, output_mode="raw_json", doc_id="doc")
+
+        assert max_in_flight == 3
+        assert [p.page_num for p in doc.pages] == [1, 2, 4, 5, 6]
+        assert [p.blocks[0].text for p in doc.pages] == ["page 1", "page 2", "page 4", "page 5", "page 6"]
+
+    @pytest.mark.asyncio
+    async def test_in_flight_pages_cancelled_on_error(self):
+        """Test a rasterization error cancels pages already sent to the model"""
+        started = []
+        cancelled = []
+
+        async def fake_vision(image_bytes, mode, model_name=None, client=None):
+            started.append(image_bytes)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(image_bytes)
+                raise
+
+        def images():
+            yield Image.new("RGB", (100, 140), color="white")
+            yield Image.new("RGB", (100, 140), color="white")
+            raise RuntimeError("broken page")
+
+        with patch("app.runtime.inference.call_ollama_vision", side_effect=fake_vision), \
+             patch("app.runtime.inference.settings.PARSER_PAGE_CONCURRENCY", 3):
+            with pytest.raises(RuntimeError, match="broken page"):
+                await asyncio.wait_for(
+                    parse_document_with_ollama(images(), output_mode="raw_json", doc_id="doc"), 5
+                )
+
+        assert started
+        assert cancelled == started
+
+    def test_build_parsed_document_uses_page_num(self):
+        """Test explicit page_num wins over list position"""
+        pages_data = [
+            {"page_num": 3, "blocks": [{"text": "third"}], "width": 10, "height": 10},
+            {"page_num": 1, "blocks": [{"text": "first"}], "width": 10, "height": 10},
+        ]
+
+        doc = build_parsed_document(pages_data, doc_id="doc", doc_type="pdf")
+
+        assert [p.page_num for p in doc.pages] == [1, 3]
+        assert doc.pages[1].blocks[0].page_num == 3
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Decision throughput benchmark for pdp-service
+
+Builds a synthetic config (many microDAOs, channels and tools with long
+owner/admin/blocked/allowlist lists), then measures decisions/sec for:
+  - evaluate:        engine.evaluate() on every request
+  - cached:          evaluate_cached() with a DecisionCache
+  - batch:           evaluate_many() in --batch-size chunks (cached),
+                     what /internal/pdp/evaluate/batch runs per call
+
+Requests repeat with a skewed distribution (a few hot actor/resource
+tuples, long tail), like agent-runtime re-checking the same tools.
+Request parsing and HTTP are not included.
+
+Usage:
+    python bench_evaluate.py [--requests 200000] [--distinct 5000] [--list-size 2000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import yaml
+
+from decision_cache import DecisionCache
+from engine import evaluate, evaluate_cached, evaluate_many
+from models import PolicyRequest
+from policy_store import PolicyStore
+
+
+def make_config(list_size: int, entities: int) -> dict:
+    users = [f"user:{i}" for i in range(list_size)]
+    agents = [f"agent:{i}" for i in range(list_size)]
+    return {
+        "microdao_policies": [
+            {
+                "microdao_id": f"microdao:{m}",
+                "owners": users[: list_size // 10],
+                "admins": users[list_size // 10 : list_size // 2],
+                "members": [],
+            }
+            for m in range(entities)
+        ],
+        "channel_policies": [
+            {
+                "channel_id": f"channel-{c}",
+                "microdao_id": f"microdao:{c % entities}",
+                "allowed_roles": ["member", "admin", "owner"],
+                "blocked_users": users[list_size // 2 :],
+            }
+            for c in range(entities)
+        ],
+        "tool_policies": [
+            {
+                "tool_id": f"tool.{t}",
+                "enabled": True,
+                "allowed_agents": agents[: list_size // 2],
+                "allowed_user_roles": ["admin", "owner"],
+            }
+            for t in range(entities)
+        ],
+        "agent_policies": [
+            {"agent_id": f"agent:{a}", "owner_id": f"user:{a}", "microdao_id": f"microdao:{a % entities}"}
+            for a in range(entities)
+        ],
+    }
+
+
+def make_requests(count: int, distinct: int, list_size: int, entities: int):
+    rng = random.Random(7)
+    pool = []
+    for i in range(distinct):
+        kind = i % 4
+        microdao = f"microdao:{rng.randrange(entities)}"
+        if kind == 0:
+            actor = {"actor_id": f"agent:{rng.randrange(list_size)}", "actor_type": "agent",
+                     "microdao_ids": [microdao], "roles": []}
+            action, resource = "exec_tool", {"type": "tool", "id": f"tool.{rng.randrange(entities)}"}
+        elif kind == 1:
+            actor = {"actor_id": f"user:{rng.randrange(list_size)}", "actor_type": "human",
+                     "microdao_ids": [microdao], "roles": ["member"]}
+            action, resource = "send_message", {"type": "channel", "id": f"channel-{rng.randrange(entities)}"}
+        elif kind == 2:
+            actor = {"actor_id": f"user:{rng.randrange(list_size)}", "actor_type": "human",
+                     "microdao_ids": [microdao], "roles": ["member"]}
+            action, resource = rng.choice(["read", "write", "invite"]), {"type": "microdao", "id": microdao}
+        else:
+            actor = {"actor_id": f"user:{rng.randrange(list_size)}", "actor_type": "human",
+                     "microdao_ids": [microdao], "roles": []}
+            action, resource = "view_usage", {"type": "usage", "id": microdao}
+        pool.append(PolicyRequest(actor=actor, action=action, resource=resource))
+    # Skewed: index ~ distinct * u^3 puts most traffic on the first tuples
+    return [pool[int(distinct * rng.random() ** 3)] for _ in range(count)]
+
+
+def report(name: str, count: int, elapsed: float, extra: str = ""):
+    print(f"{name:<10} {count / elapsed:12.0f} decisions/s  {elapsed * 1e6 / count:7.2f} us/decision  {extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pdp-service decision benchmark")
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--distinct", type=int, default=5000)
+    parser.add_argument("--list-size", type=int, default=2000)
+    parser.add_argument("--entities", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--cache-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile("w", suffix=".yaml", delete=False) as f:
+        yaml.safe_dump(make_config(args.list_size, args.entities), f)
+        config_path = f.name
+    try:
+        start = time.perf_counter()
+        store = PolicyStore(config_path)
+        load_ms = (time.perf_counter() - start) * 1000
+    finally:
+        os.unlink(config_path)
+
+    requests = make_requests(args.requests, args.distinct, args.list_size, args.entities)
+    print(f"\n{args.requests} requests ({args.distinct} distinct), lists of {args.list_size}, "
+          f"policy load {load_ms:.0f} ms\n")
+
+    start = time.perf_counter()
+    for request in requests:
+        evaluate(request, store)
+    report("evaluate", len(requests), time.perf_counter() - start)
+
+    cache = DecisionCache(max_size=args.cache_size)
+    start = time.perf_counter()
+    for request in requests:
+        evaluate_cached(request, store, cache)
+    stats = cache.stats()
+    report("cached", len(requests), time.perf_counter() - start,
+           f"hit rate {stats['hits'] / (stats['hits'] + stats['misses']):.1%}")
+
+    cache = DecisionCache(max_size=args.cache_size)
+    start = time.perf_counter()
+    for i in range(0, len(requests), args.batch_size):
+        evaluate_many(requests[i : i + args.batch_size], store, cache)
+    report("batch", len(requests), time.perf_counter() - start, f"{args.batch_size} per call")
+
+
+if __name__ == "__main__":
+    main()
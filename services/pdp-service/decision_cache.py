@@ -0,0 +1,80 @@
+"""
+Decision Cache
+
+Bounded LRU of policy decisions keyed by the request tuple.
+Entries belong to one policy store version and are dropped when it changes.
+"""
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+from models import PolicyDecision, PolicyRequest
+
+
+def decision_key(request: PolicyRequest) -> Tuple[Hashable, ...]:
+    """
+    Everything evaluate() looks at
+
+    From the context only the `rate_limited` flag affects decisions;
+    include any new context attribute here when a rule starts using it.
+    """
+    actor = request.actor
+    context = request.context or {}
+    return (
+        actor.actor_id,
+        actor.actor_type,
+        frozenset(actor.microdao_ids),
+        frozenset(actor.roles),
+        request.action,
+        request.resource.type,
+        request.resource.id,
+        bool(context.get("rate_limited")),
+    )
+
+
+class DecisionCache:
+    """LRU of decisions for the current policy version"""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._items: "OrderedDict[tuple, PolicyDecision]" = OrderedDict()
+        self.version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_version(self, version: int):
+        if version != self.version:
+            if self._items:
+                self.invalidations += 1
+            self._items.clear()
+            self.version = version
+
+    def get(self, key: tuple, version: int) -> Optional[PolicyDecision]:
+        self._check_version(version)
+        decision = self._items.get(key)
+        if decision is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return decision
+
+    def put(self, key: tuple, decision: PolicyDecision, version: int):
+        self._check_version(version)
+        self._items[key] = decision
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._items),
+            "max_size": self.max_size,
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
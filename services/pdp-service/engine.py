@@ -3,6 +3,9 @@ Policy Decision Engine
 
 Evaluates access control policies based on actor, action, and resource
 """
+from typing import List, Optional
+
+from decision_cache import DecisionCache, decision_key
 from models import PolicyRequest, PolicyDecision, ActorType, Action, ResourceType
 from policy_store import PolicyStore
 
@@ -56,6 +59,35 @@ def evaluate(request: PolicyRequest, policy_store: PolicyStore) -> PolicyDecisio
         reason="no_matching_policy"
     )
 
+def evaluate_cached(
+    request: PolicyRequest,
+    policy_store: PolicyStore,
+    cache: Optional[DecisionCache] = None
+) -> PolicyDecision:
+    """
+    evaluate() with a decision cache in front
+
+    Decisions depend only on the request tuple and the loaded policies,
+    so cached entries are dropped whenever the policy store is reloaded.
+    """
+    if cache is None:
+        return evaluate(request, policy_store)
+    
+    key = decision_key(request)
+    decision = cache.get(key, policy_store.version)
+    if decision is None:
+        decision = evaluate(request, policy_store)
+        cache.put(key, decision, policy_store.version)
+    return decision
+
+def evaluate_many(
+    requests: List[PolicyRequest],
+    policy_store: PolicyStore,
+    cache: Optional[DecisionCache] = None
+) -> List[PolicyDecision]:
+    """Evaluate several requests against the same policy snapshot"""
+    return [evaluate_cached(request, policy_store, cache) for request in requests]
+
 def evaluate_microdao_access(request: PolicyRequest, policy_store: PolicyStore) -> PolicyDecision:
     """Evaluate microDAO access"""
     microdao_id = request.resource.id
@@ -100,10 +132,9 @@ def evaluate_channel_access(request: PolicyRequest, policy_store: PolicyStore) -
         return PolicyDecision(effect="deny", reason="not_microdao_member")
     
     # Check if actor has required role
-    allowed_roles = channel_policy.get("allowed_roles", ["member"])
-    actor_has_role = any(role in request.actor.roles for role in allowed_roles)
+    allowed_roles = policy_store.channel_allowed_roles(channel_id)
     
-    if not actor_has_role:
+    if allowed_roles.isdisjoint(request.actor.roles):
         return PolicyDecision(effect="deny", reason="insufficient_role")
     
     # SEND_MESSAGE: additional checks
@@ -141,7 +172,7 @@ def evaluate_tool_access(request: PolicyRequest, policy_store: PolicyStore) -> P
         return PolicyDecision(effect="deny", reason="tool_disabled")
     
     # Check if actor is in allowed list
-    allowed_agents = tool_policy.get("allowed_agents")
+    allowed_agents = policy_store.tool_allowed_agents(tool_id)
     
     # None = all agents allowed
     if allowed_agents is None:
@@ -152,9 +183,9 @@ def evaluate_tool_access(request: PolicyRequest, policy_store: PolicyStore) -> P
         return PolicyDecision(effect="permit", reason="tool_allowed_agent")
     
     # Check if user has required role
-    allowed_user_roles = tool_policy.get("allowed_user_roles", [])
+    allowed_user_roles = policy_store.tool_allowed_roles(tool_id)
     if allowed_user_roles:
-        if any(role in request.actor.roles for role in allowed_user_roles):
+        if not allowed_user_roles.isdisjoint(request.actor.roles):
             return PolicyDecision(effect="permit", reason="tool_allowed_role")
     
     return PolicyDecision(effect="deny", reason="tool_not_allowed")
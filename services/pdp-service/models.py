@@ -54,6 +54,12 @@ class PolicyDecision(BaseModel):
     class Config:
         use_enum_values = True
 
+class PolicyBatchRequest(BaseModel):
+    requests: list[PolicyRequest] = Field(..., max_length=1000, description="Evaluated in order")
+
+class PolicyBatchResponse(BaseModel):
+    decisions: list[PolicyDecision]  # Same order as requests
+
 
 
 
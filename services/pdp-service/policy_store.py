@@ -3,100 +3,161 @@ Policy Store
 
 Phase 4: Config-based storage
 Phase 5: Database-backed with dynamic updates
+
+Membership lists from the config (owners, admins, blocked_users,
+allowed_roles, allowed_agents, ...) are compiled into frozensets at load
+time so every check is a hash lookup instead of a list scan.
 """
 import yaml
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, FrozenSet, Iterable
+
+EMPTY: FrozenSet[str] = frozenset()
+
+
+def _as_set(values: Optional[Iterable[str]]) -> FrozenSet[str]:
+    return frozenset(values or ())
+
 
 class PolicyStore:
     """Store and retrieve policies"""
-    
+
     def __init__(self, config_path: str = "config.yaml"):
+        self.config_path = config_path
         self.microdao_policies: Dict[str, Any] = {}
         self.channel_policies: Dict[str, Any] = {}
         self.tool_policies: Dict[str, Any] = {}
         self.agent_policies: Dict[str, Any] = {}
-        
+        self.defaults: Dict[str, Any] = {}
+
+        # Compiled indexes (see _compile)
+        self._owners: Dict[str, FrozenSet[str]] = {}
+        self._admins: Dict[str, FrozenSet[str]] = {}
+        self._blocked: Dict[str, FrozenSet[str]] = {}
+        self._channel_roles: Dict[str, FrozenSet[str]] = {}
+        self._tool_agents: Dict[str, Optional[FrozenSet[str]]] = {}
+        self._tool_roles: Dict[str, FrozenSet[str]] = {}
+
+        # Bumped on every (re)load; decision caches are keyed by it
+        self.version = 0
+
         self._load_config(config_path)
-    
+
+    def reload(self):
+        """Re-read policies from the config file"""
+        self._load_config(self.config_path)
+
     def _load_config(self, config_path: str):
         """Load policies from YAML config"""
+        microdao_policies: Dict[str, Any] = {}
+        channel_policies: Dict[str, Any] = {}
+        tool_policies: Dict[str, Any] = {}
+        agent_policies: Dict[str, Any] = {}
+        config: Dict[str, Any] = {}
+
         if not os.path.exists(config_path):
             print(f"⚠️  Config file not found: {config_path}, using empty policies")
-            return
-        
-        with open(config_path, 'r') as f:
-            config = yaml.safe_load(f) or {}
-        
+        else:
+            with open(config_path, 'r') as f:
+                config = yaml.safe_load(f) or {}
+
         # Load microDAO policies
         for policy in config.get('microdao_policies', []):
             microdao_id = policy['microdao_id']
-            self.microdao_policies[microdao_id] = policy
+            microdao_policies[microdao_id] = policy
             print(f"✅ Loaded microDAO policy: {microdao_id}")
-        
+
         # Load channel policies
         for policy in config.get('channel_policies', []):
             channel_id = policy['channel_id']
-            self.channel_policies[channel_id] = policy
+            channel_policies[channel_id] = policy
             print(f"✅ Loaded channel policy: {channel_id}")
-        
+
         # Load tool policies
         for policy in config.get('tool_policies', []):
             tool_id = policy['tool_id']
-            self.tool_policies[tool_id] = policy
+            tool_policies[tool_id] = policy
             print(f"✅ Loaded tool policy: {tool_id}")
-        
+
         # Load agent policies
         for policy in config.get('agent_policies', []):
             agent_id = policy['agent_id']
-            self.agent_policies[agent_id] = policy
+            agent_policies[agent_id] = policy
             print(f"✅ Loaded agent policy: {agent_id}")
-        
+
+        # Swap everything in at once so a reload never exposes half a config
+        self.microdao_policies = microdao_policies
+        self.channel_policies = channel_policies
+        self.tool_policies = tool_policies
+        self.agent_policies = agent_policies
+        self.defaults = config.get('defaults') or {}
+        self._compile()
+        self.version += 1
+
         print(f"📋 Total policies: {len(self.microdao_policies)} microDAOs, "
               f"{len(self.channel_policies)} channels, "
               f"{len(self.tool_policies)} tools, "
-              f"{len(self.agent_policies)} agents")
-    
+              f"{len(self.agent_policies)} agents (version {self.version})")
+
+    def _compile(self):
+        """Build set indexes from the loaded policies"""
+        owners: Dict[str, FrozenSet[str]] = {}
+        admins: Dict[str, FrozenSet[str]] = {}
+        for microdao_id, policy in self.microdao_policies.items():
+            owners[microdao_id] = _as_set(policy.get('owners'))
+            # Owners are admins too
+            admins[microdao_id] = _as_set(policy.get('admins')) | owners[microdao_id]
+
+        blocked: Dict[str, FrozenSet[str]] = {}
+        channel_roles: Dict[str, FrozenSet[str]] = {}
+        for channel_id, policy in self.channel_policies.items():
+            blocked[channel_id] = _as_set(policy.get('blocked_users'))
+            channel_roles[channel_id] = _as_set(policy.get('allowed_roles', ['member']))
+
+        tool_agents: Dict[str, Optional[FrozenSet[str]]] = {}
+        tool_roles: Dict[str, FrozenSet[str]] = {}
+        for tool_id, policy in self.tool_policies.items():
+            # None = all agents allowed
+            agents = policy.get('allowed_agents')
+            tool_agents[tool_id] = None if agents is None else _as_set(agents)
+            tool_roles[tool_id] = _as_set(policy.get('allowed_user_roles'))
+
+        self._owners, self._admins = owners, admins
+        self._blocked, self._channel_roles = blocked, channel_roles
+        self._tool_agents, self._tool_roles = tool_agents, tool_roles
+
     def is_microdao_owner(self, actor_id: str, microdao_id: str) -> bool:
         """Check if actor is microDAO owner"""
-        policy = self.microdao_policies.get(microdao_id)
-        if not policy:
-            return False
-        
-        owners = policy.get('owners', [])
-        return actor_id in owners
-    
+        return actor_id in self._owners.get(microdao_id, EMPTY)
+
     def is_microdao_admin(self, actor_id: str, microdao_id: str) -> bool:
-        """Check if actor is microDAO admin"""
-        policy = self.microdao_policies.get(microdao_id)
-        if not policy:
-            return False
-        
-        admins = policy.get('admins', [])
-        return actor_id in admins or self.is_microdao_owner(actor_id, microdao_id)
-    
+        """Check if actor is microDAO admin (or owner)"""
+        return actor_id in self._admins.get(microdao_id, EMPTY)
+
     def get_channel_policy(self, channel_id: str) -> Optional[Dict[str, Any]]:
         """Get channel policy"""
         return self.channel_policies.get(channel_id)
-    
+
     def is_blocked_in_channel(self, actor_id: str, channel_id: str) -> bool:
         """Check if actor is blocked in channel"""
-        policy = self.channel_policies.get(channel_id)
-        if not policy:
-            return False
-        
-        blocked_users = policy.get('blocked_users', [])
-        return actor_id in blocked_users
-    
+        return actor_id in self._blocked.get(channel_id, EMPTY)
+
+    def channel_allowed_roles(self, channel_id: str) -> FrozenSet[str]:
+        """Roles allowed in channel (default: member)"""
+        return self._channel_roles.get(channel_id, EMPTY)
+
     def get_tool_policy(self, tool_id: str) -> Optional[Dict[str, Any]]:
         """Get tool policy"""
         return self.tool_policies.get(tool_id)
-    
-    def get_agent_policy(self, agent_id: str) -> Optional[Dict[str, Any]]:
-        """Get agent policy"""
-        return self.agent_policies.get(agent_id)
-
-
 
+    def tool_allowed_agents(self, tool_id: str) -> Optional[FrozenSet[str]]:
+        """Agents allowed to run tool (None = all agents)"""
+        return self._tool_agents.get(tool_id)
 
+    def tool_allowed_roles(self, tool_id: str) -> FrozenSet[str]:
+        """User roles allowed to run tool"""
+        return self._tool_roles.get(tool_id, EMPTY)
 
+    def get_agent_policy(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        """Get agent policy"""
+        return self.agent_policies.get(agent_id)
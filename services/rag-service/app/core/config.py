@@ -33,9 +33,28 @@ class Settings(BaseSettings):
     CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "500"))
     CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", "50"))
     
+    # Ingest (streaming, batched)
+    INGEST_PAGES_PER_BATCH: int = int(os.getenv("INGEST_PAGES_PER_BATCH", "8"))
+    INGEST_EMBED_BATCH_SIZE: int = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "32"))
+    INGEST_MAX_CONCURRENCY: int = int(os.getenv("INGEST_MAX_CONCURRENCY", "2"))
+    # Shutdown: how long to wait for in-flight event ingests
+    INGEST_SHUTDOWN_TIMEOUT_S: float = float(os.getenv("INGEST_SHUTDOWN_TIMEOUT_S", "60"))
+    
     # Retrieval
     TOP_K: int = int(os.getenv("TOP_K", "5"))
     
+    # Retrieval stage (embedding + vector search off the event loop)
+    RETRIEVAL_WORKERS: int = int(os.getenv("RETRIEVAL_WORKERS", "4"))
+    RETRIEVAL_BATCH_WINDOW_MS: float = float(os.getenv("RETRIEVAL_BATCH_WINDOW_MS", "5"))
+    RETRIEVAL_MAX_BATCH: int = int(os.getenv("RETRIEVAL_MAX_BATCH", "32"))
+    RETRIEVAL_QUEUE_SIZE: int = int(os.getenv("RETRIEVAL_QUEUE_SIZE", "256"))
+    RETRIEVAL_QUEUE_TIMEOUT_S: float = float(os.getenv("RETRIEVAL_QUEUE_TIMEOUT_S", "2"))
+    
+    # Query caches (question -> embedding, (dao_id, embedding, top_k) -> documents)
+    QUERY_EMBED_CACHE_SIZE: int = int(os.getenv("QUERY_EMBED_CACHE_SIZE", "2048"))
+    QUERY_RESULT_CACHE_SIZE: int = int(os.getenv("QUERY_RESULT_CACHE_SIZE", "1024"))
+    QUERY_RESULT_CACHE_TTL_S: float = float(os.getenv("QUERY_RESULT_CACHE_TTL_S", "600"))
+    
     # LLM (for query pipeline)
     LLM_PROVIDER: str = os.getenv("LLM_PROVIDER", "router")  # router, openai, local
     ROUTER_BASE_URL: str = os.getenv("ROUTER_BASE_URL", "http://router:9102")
@@ -6,14 +6,18 @@ Uses SentenceTransformers via Haystack
 import logging
 from typing import Optional
 
-from haystack.components.embedders import SentenceTransformersTextEmbedder
+from haystack.components.embedders import (
+    SentenceTransformersDocumentEmbedder,
+    SentenceTransformersTextEmbedder,
+)
 
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
-# Global embedder instance
+# Global embedder instances
 _text_embedder: Optional[SentenceTransformersTextEmbedder] = None
+_document_embedder: Optional[SentenceTransformersDocumentEmbedder] = None
 
 
 def get_text_embedder() -> SentenceTransformersTextEmbedder:
@@ -45,8 +49,44 @@ def get_text_embedder() -> SentenceTransformersTextEmbedder:
         raise RuntimeError(f"TextEmbedder initialization failed: {e}") from e
 
 
+def get_document_embedder() -> SentenceTransformersDocumentEmbedder:
+    """
+    Get or create SentenceTransformersDocumentEmbedder instance (for ingest)
+    
+    Returns:
+        SentenceTransformersDocumentEmbedder encoding INGEST_EMBED_BATCH_SIZE chunks per pass
+    """
+    global _document_embedder
+    
+    if _document_embedder is not None:
+        return _document_embedder
+    
+    logger.info(
+        f"Loading document embedding model: {settings.EMBED_MODEL_NAME} "
+        f"(batch_size={settings.INGEST_EMBED_BATCH_SIZE})"
+    )
+    
+    try:
+        embedder = SentenceTransformersDocumentEmbedder(
+            model=settings.EMBED_MODEL_NAME,
+            device=settings.EMBED_DEVICE,
+            batch_size=settings.INGEST_EMBED_BATCH_SIZE,
+            progress_bar=False,
+        )
+        embedder.warm_up()
+        _document_embedder = embedder
+        
+        logger.info("Document embedder initialized successfully")
+        return _document_embedder
+        
+    except Exception as e:
+        logger.error(f"Failed to initialize DocumentEmbedder: {e}", exc_info=True)
+        raise RuntimeError(f"DocumentEmbedder initialization failed: {e}") from e
+
+
 def reset_embedder():
-    """Reset global embedder instance (for testing)"""
-    global _text_embedder
+    """Reset global embedder instances (for testing)"""
+    global _text_embedder, _document_embedder
     _text_embedder = None
+    _document_embedder = None
 
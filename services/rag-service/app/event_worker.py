@@ -6,11 +6,10 @@ Consumes events from NATS JetStream STREAM_RAG
 import asyncio
 import json
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Set
 
 from app.core.config import settings
 from app.ingest_pipeline import ingest_parsed_document
-from app.document_store import DocumentStore
 import nats
 from nats.js.errors import NotFoundError
 
@@ -20,6 +19,15 @@ logger = logging.getLogger(__name__)
 _nats_conn: Optional[nats.NATS] = None
 _subscriptions: list = []
 
+# Concurrent ingests (created in the worker's event loop)
+_ingest_slots: Optional[asyncio.Semaphore] = None
+_ingest_tasks: Set[asyncio.Task] = set()
+
+# The worker runs its own event loop (background thread); shutdown is
+# requested from the app loop through stop_event_worker()
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+_stop_event: Optional[asyncio.Event] = None
+
 
 async def get_nats_connection():
     """Initialize or return existing NATS connection"""
@@ -51,7 +59,30 @@ async def get_nats_connection():
 
 
 async def handle_parser_document_parsed(msg):
-    """Handle parser.document.parsed events"""
+    """
+    Handle parser.document.parsed events
+    
+    Ingests run as background tasks, at most INGEST_MAX_CONCURRENCY at once;
+    when all slots are busy the callback waits, which stops further delivery.
+    Each message is acked/naked when its ingest finishes.
+    """
+    global _ingest_slots
+    if _ingest_slots is None:
+        _ingest_slots = asyncio.Semaphore(settings.INGEST_MAX_CONCURRENCY)
+    
+    await _ingest_slots.acquire()
+    task = asyncio.create_task(_ingest_parsed_event(msg))
+    _ingest_tasks.add(task)
+    task.add_done_callback(_ingest_done)
+
+
+def _ingest_done(task: asyncio.Task):
+    _ingest_tasks.discard(task)
+    _ingest_slots.release()
+
+
+async def _ingest_parsed_event(msg):
+    """Ingest one parser.document.parsed event and ack/nak it"""
     try:
         event_data = json.loads(msg.data)
         payload = event_data.get("payload", {})
@@ -75,12 +106,19 @@ async def handle_parser_document_parsed(msg):
         mock_parsed_json = {
             "doc_id": doc_id,
             "title": "Sample Document",
-            "pages": ["Sample page 1", "Sample page 2"],
+            # ParsedDocument page shape expected by ingest_parsed_document
+            "pages": [
+                {
+                    "page_num": page_num,
+                    "blocks": [{"type": "paragraph", "text": f"Sample page {page_num}", "reading_order": 1}]
+                }
+                for page_num in (1, 2)
+            ],
             "metadata": payload.get("metadata", {})
         }
         
         # Ingest the document
-        result = ingest_parsed_document(
+        result = await ingest_parsed_document(
             dao_id=dao_id or team_id,
             doc_id=doc_id,
             parsed_json=mock_parsed_json,
@@ -151,7 +189,8 @@ async def subscribe_to_stream():
                         "STREAM_RAG",
                         durable_name=durable_name,
                         filter_subject=subject,
-                        ack_policy="explicit"
+                        ack_policy="explicit",
+                        max_ack_pending=settings.INGEST_MAX_CONCURRENCY * 2
                     )
                     logger.info(f"Created consumer for {subject}: {durable_name}")
                 except nats.js.errors.ConsumerAlreadyExistsError:
@@ -159,7 +198,8 @@ async def subscribe_to_stream():
                 
                 # Subscribe
                 sub = await js.subscribe(
-                    subject="parser.document.parsed",
+                    subject=subject,
+                    durable=durable_name,
                     config=nats.js.api.ConsumerConfig(
                         deliver_policy="all",
                         ack_policy="explicit"
@@ -202,12 +242,18 @@ async def subscribe_to_stream():
 
 
 async def close_subscriptions():
-    """Close all subscriptions and cleanup"""
+    """Close all subscriptions and cleanup (runs in the worker's event loop)"""
+    global _nats_conn
     try:
         for sub in _subscriptions:
             await sub.unsubscribe()
         _subscriptions.clear()
         
+        # Let in-flight ingests finish and ack before the connection drains
+        if _ingest_tasks:
+            logger.info(f"Waiting for {len(_ingest_tasks)} in-flight ingests")
+            await asyncio.gather(*list(_ingest_tasks), return_exceptions=True)
+        
         if _nats_conn:
             await _nats_conn.drain()
             await _nats_conn.close()
@@ -217,21 +263,41 @@ async def close_subscriptions():
         logger.error(f"Error closing subscriptions: {e}")
 
 
+def stop_event_worker():
+    """
+    Ask the worker to shut down; safe to call from any thread
+
+    The worker closes its subscriptions, waits for in-flight ingests and
+    drains NATS in its own loop, then event_worker() returns.
+    """
+    loop, stop_event = _worker_loop, _stop_event
+    if loop is None or stop_event is None:
+        return
+    try:
+        loop.call_soon_threadsafe(stop_event.set)
+    except RuntimeError:
+        # Loop already closed: the worker has exited
+        pass
+
+
 async def event_worker():
     """Main function to start the event worker"""
+    global _worker_loop, _stop_event
     logger.info("Starting RAG event worker...")
+    _worker_loop = asyncio.get_running_loop()
+    _stop_event = asyncio.Event()
     
     # Subscribe to event streams
     if await subscribe_to_stream():
         logger.info("RAG event worker started successfully")
         
-        # Keep the worker running
+        # Keep the worker running until stop_event_worker() or cancellation
         try:
-            while True:
-                await asyncio.sleep(1)
+            await _stop_event.wait()
         except asyncio.CancelledError:
-            logger.info("RAG event worker shutting down...")
-            await close_subscriptions()
+            pass
+        logger.info("RAG event worker shutting down...")
+        await close_subscriptions()
     else:
         logger.error("Failed to start RAG event worker")
 
@@ -93,7 +93,7 @@ async def publish_event(
         # Publish to JetStream
         js = conn.jetstream()
         ack = await js.publish(subject, json.dumps(event_envelope))
-        logger.info(f"Event published to {subject}: {seq={ack.sequence}, stream_seq={ack.stream_seq}")
+        logger.info(f"Event published to {subject}: seq={ack.seq}, stream={ack.stream}")
         
         return ack
     except Exception as e:
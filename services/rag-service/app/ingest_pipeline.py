@@ -3,22 +3,24 @@ Ingest Pipeline: PARSER → RAG
 Converts ParsedDocument to Haystack Documents and indexes them
 """
 
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 
-from haystack import Pipeline, Document
+from haystack import Document
 from haystack.components.preprocessors import DocumentSplitter
 from haystack.components.writers import DocumentWriter
 
 from app.document_store import get_document_store
-from app.embedding import get_text_embedder
+from app.embedding import get_document_embedder
 from app.core.config import settings
+from app.query_cache import query_cache
 from app.events import publish_document_ingested, publish_document_indexed
 
 logger = logging.getLogger(__name__)
 
 
-def ingest_parsed_document(
+async def ingest_parsed_document(
     dao_id: str,
     doc_id: str,
     parsed_json: Dict[str, Any],
@@ -27,6 +29,11 @@ def ingest_parsed_document(
     """
     Ingest parsed document from PARSER service into RAG
     
+    Pages are processed in batches of INGEST_PAGES_PER_BATCH:
+    convert → split → embed → write, so only one batch of chunks is held
+    in memory and chunks become searchable as they are written.
+    Blocking stages run in worker threads.
+    
     Args:
         dao_id: DAO identifier
         doc_id: Document identifier
@@ -41,11 +48,39 @@ def ingest_parsed_document(
     
     logger.info(f"Ingesting document: dao_id={dao_id}, doc_id={doc_id}")
     
+    # Per-stage wall time (ms) accumulated over batches
+    timings = {"convert_ms": 0.0, "split_ms": 0.0, "embed_ms": 0.0, "write_ms": 0.0}
+    written_docs = 0
+    batches = 0
+    
     try:
-        # Convert parsed_json to Haystack Documents
-        documents = _parsed_json_to_documents(parsed_json, dao_id, doc_id, user_id)
+        splitter, embedder, writer = _create_ingest_components()
         
-        if not documents:
+        pipeline_start = time.time()
+        for page_batch in _iter_page_batches(parsed_json, settings.INGEST_PAGES_PER_BATCH):
+            stage_start = time.perf_counter()
+            documents = _pages_to_documents(page_batch, parsed_json, dao_id, doc_id, user_id)
+            timings["convert_ms"] += (time.perf_counter() - stage_start) * 1000
+            if not documents:
+                continue
+            
+            stage_start = time.perf_counter()
+            chunks = (await asyncio.to_thread(splitter.run, documents=documents))["documents"]
+            timings["split_ms"] += (time.perf_counter() - stage_start) * 1000
+            
+            stage_start = time.perf_counter()
+            chunks = (await asyncio.to_thread(embedder.run, documents=chunks))["documents"]
+            timings["embed_ms"] += (time.perf_counter() - stage_start) * 1000
+            
+            stage_start = time.perf_counter()
+            result = await asyncio.to_thread(writer.run, documents=chunks)
+            timings["write_ms"] += (time.perf_counter() - stage_start) * 1000
+            
+            written_docs += result.get("documents_written", 0)
+            batches += 1
+        pipeline_time = time.time() - pipeline_start
+        
+        if not batches:
             logger.warning(f"No documents to ingest for doc_id={doc_id}")
             return {
                 "status": "error",
@@ -53,19 +88,6 @@ def ingest_parsed_document(
                 "doc_count": 0
             }
         
-        logger.info(f"Converted {len(documents)} blocks to Haystack Documents")
-        
-        # Create ingest pipeline
-        pipeline = _create_ingest_pipeline()
-        
-        # Run pipeline
-        pipeline_start = time.time()
-        result = pipeline.run({"documents": documents})
-        pipeline_time = time.time() - pipeline_start
-        
-        # Extract results
-        written_docs = result.get("documents_writer", {}).get("documents_written", 0)
-        
         # Calculate metrics
         total_time = time.time() - ingest_start
         pages_count = len(parsed_json.get("pages", []))
@@ -73,10 +95,12 @@ def ingest_parsed_document(
             len(page.get("blocks", []))
             for page in parsed_json.get("pages", [])
         )
+        timings = {k: round(v, 1) for k, v in timings.items()}
         
         logger.info(
             f"Ingested {written_docs} documents for doc_id={doc_id}: "
-            f"pages={pages_count}, blocks={blocks_count}, "
+            f"pages={pages_count}, blocks={blocks_count}, batches={batches}, "
+            f"embed={timings['embed_ms']:.0f}ms, write={timings['write_ms']:.0f}ms, "
             f"pipeline_time={pipeline_time:.2f}s, total_time={total_time:.2f}s"
         )
         
@@ -92,9 +116,10 @@ def ingest_parsed_document(
                 visibility="public",
                 metadata={
                     "ingestion_time_ms": round(pipeline_time * 1000),
-                    "embed_model": settings.EMBEDDING_MODEL or "bge-m3@v1",
+                    "embed_model": settings.EMBED_MODEL_NAME,
                     "pages_processed": pages_count,
-                    "blocks_processed": blocks_count
+                    "blocks_processed": blocks_count,
+                    "stage_timings_ms": timings
                 }
             )
             logger.info(f"Published rag.document.ingested event for doc_id={doc_id}")
@@ -112,10 +137,10 @@ def ingest_parsed_document(
                 indexed=True,
                 visibility="public",
                 metadata={
-                    "indexing_time_ms": 0,  # TODO: track actual indexing time
+                    "indexing_time_ms": round(timings["embed_ms"] + timings["write_ms"]),
                     "milvus_collection": "documents_v1",
                     "neo4j_nodes_created": len(chunk_ids),
-                    "embed_model": settings.EMBEDDING_MODEL or "bge-m3@v1"
+                    "embed_model": settings.EMBED_MODEL_NAME
                 }
             )
             logger.info(f"Published rag.document.indexed event for doc_id={doc_id}")
@@ -131,6 +156,8 @@ def ingest_parsed_document(
                 "pages_processed": pages_count,
                 "blocks_processed": blocks_count,
                 "documents_indexed": written_docs,
+                "batches": batches,
+                "stage_timings_ms": timings,
                 "pipeline_time_seconds": round(pipeline_time, 2),
                 "total_time_seconds": round(total_time, 2)
             }
@@ -139,16 +166,30 @@ def ingest_parsed_document(
     except Exception as e:
         logger.error(f"Failed to ingest document: {e}", exc_info=True)
         total_time = time.time() - ingest_start
-        logger.error(f"Ingest failed after {total_time:.2f}s: {e}")
+        logger.error(f"Ingest failed after {total_time:.2f}s ({written_docs} chunks written): {e}")
         return {
             "status": "error",
             "message": str(e),
-            "doc_count": 0,
+            "doc_count": written_docs,
             "metrics": {
+                "batches": batches,
+                "stage_timings_ms": {k: round(v, 1) for k, v in timings.items()},
                 "total_time_seconds": round(total_time, 2),
                 "error": str(e)
             }
         }
+    finally:
+        # New chunks change retrieval results for this DAO
+        if written_docs:
+            query_cache.invalidate_dao(dao_id)
+
+
+def _iter_page_batches(parsed_json: Dict[str, Any], pages_per_batch: int) -> Iterator[List[Dict[str, Any]]]:
+    """Yield pages of parsed_json in batches of pages_per_batch"""
+    pages = parsed_json.get("pages", [])
+    step = max(1, pages_per_batch)
+    for i in range(0, len(pages), step):
+        yield pages[i:i + step]
 
 
 def _parsed_json_to_documents(
@@ -169,11 +210,22 @@ def _parsed_json_to_documents(
     Returns:
         List of Haystack Document objects
     """
-    documents = []
-    
     # Extract pages from parsed_json
     pages = parsed_json.get("pages", [])
     
+    return _pages_to_documents(pages, parsed_json, dao_id, doc_id, user_id)
+
+
+def _pages_to_documents(
+    pages: List[Dict[str, Any]],
+    parsed_json: Dict[str, Any],
+    dao_id: str,
+    doc_id: str,
+    user_id: Optional[str] = None
+) -> List[Document]:
+    """Convert a slice of ParsedDocument pages to Haystack Documents"""
+    documents = []
+    
     for page_data in pages:
         page_num = page_data.get("page_num", 1)
         blocks = page_data.get("blocks", [])
@@ -229,14 +281,14 @@ def _parsed_json_to_documents(
     return documents
 
 
-def _create_ingest_pipeline() -> Pipeline:
+def _create_ingest_components() -> Tuple[DocumentSplitter, Any, DocumentWriter]:
     """
-    Create Haystack ingest pipeline
+    Create Haystack ingest components
     
-    Pipeline: DocumentSplitter → Embedder → DocumentWriter
+    Batches flow: DocumentSplitter → DocumentEmbedder → DocumentWriter
     """
     # Get components
-    embedder = get_text_embedder()
+    embedder = get_document_embedder()
     document_store = get_document_store()
     
     # Create splitter (optional, if chunks are too large)
@@ -249,15 +301,4 @@ def _create_ingest_pipeline() -> Pipeline:
     # Create writer
     writer = DocumentWriter(document_store)
     
-    # Build pipeline
-    pipeline = Pipeline()
-    pipeline.add_component("splitter", splitter)
-    pipeline.add_component("embedder", embedder)
-    pipeline.add_component("documents_writer", writer)
-    
-    # Connect components
-    pipeline.connect("splitter", "embedder")
-    pipeline.connect("embedder", "documents_writer")
-    
-    return pipeline
-
+    return splitter, embedder, writer
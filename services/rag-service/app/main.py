@@ -11,7 +11,10 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.models import IngestRequest, IngestResponse, QueryRequest, QueryResponse
 from app.ingest_pipeline import ingest_parsed_document
 from app.query_pipeline import answer_query
-from app.event_worker import event_worker
+from app.retrieval import RetrievalOverloaded, retrieval_stage
+from app.query_cache import query_cache
+from app.event_worker import event_worker, stop_event_worker
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -41,8 +44,11 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down RAG Service...")
     
     import asyncio
-    from app.event_worker import close_subscriptions
-    await close_subscriptions()
+    # Subscriptions, ingest tasks and the NATS connection belong to the
+    # worker's own loop: it closes them there
+    stop_event_worker()
+    await asyncio.to_thread(event_worker_thread.join, settings.INGEST_SHUTDOWN_TIMEOUT_S)
+    await retrieval_stage.close()
     if event_worker_thread.is_alive():
         logger.info("Event Worker is still running, will shut down automatically")
 
@@ -71,7 +77,9 @@ async def health():
     return {
         "status": "healthy",
         "service": "rag-service",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "retrieval": retrieval_stage.stats(),
+        "query_cache": query_cache.stats()
     }
 
 
@@ -87,7 +95,7 @@ async def ingest_endpoint(request: IngestRequest):
     - user_id: Optional user identifier
     """
     try:
-        result = ingest_parsed_document(
+        result = await ingest_parsed_document(
             dao_id=request.dao_id,
             doc_id=request.doc_id,
             parsed_json=request.parsed_json,
@@ -122,6 +130,9 @@ async def query_endpoint(request: QueryRequest):
         
         return QueryResponse(**result)
         
+    except RetrievalOverloaded as e:
+        logger.warning(f"Query rejected: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         logger.error(f"Query endpoint error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -44,4 +44,5 @@ class QueryResponse(BaseModel):
     answer: str = Field(..., description="Generated answer")
     citations: List[Citation] = Field(..., description="List of citations")
     documents: List[Dict[str, Any]] = Field(..., description="Retrieved documents (for debugging)")
+    metrics: Optional[Dict[str, Any]] = Field(None, description="Retrieval/cache metrics")
 
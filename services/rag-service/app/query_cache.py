@@ -0,0 +1,155 @@
+"""
+Query caches for RAG retrieval
+
+Two levels:
+- embedding cache: normalized question text -> (embedding, embedding hash)
+- result cache: (dao_id, embedding hash, top_k) -> retrieved documents
+
+Result entries are dropped when new chunks are ingested for their DAO
+(entries served by the unfiltered fallback are dropped on any ingest).
+Shared between the API event loop and the event worker thread.
+"""
+
+import hashlib
+import logging
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ResultKey = Tuple[str, str, int]
+
+
+def normalize_question(question: str) -> str:
+    """Case/whitespace-insensitive cache key for a question"""
+    return " ".join(question.lower().split())
+
+
+def embedding_hash(embedding: List[float]) -> str:
+    """Stable hash of an embedding (float32 precision)"""
+    return hashlib.blake2b(struct.pack(f"{len(embedding)}f", *embedding), digest_size=16).hexdigest()
+
+
+class QueryCache:
+    """LRU embedding cache + LRU/TTL result cache with per-DAO invalidation"""
+
+    def __init__(
+        self,
+        embedding_size: int = settings.QUERY_EMBED_CACHE_SIZE,
+        result_size: int = settings.QUERY_RESULT_CACHE_SIZE,
+        result_ttl_s: float = settings.QUERY_RESULT_CACHE_TTL_S,
+    ):
+        self.embedding_size = embedding_size
+        self.result_size = result_size
+        self.result_ttl_s = result_ttl_s
+        self._lock = threading.Lock()
+        self._embeddings: "OrderedDict[str, Tuple[List[float], str]]" = OrderedDict()
+        # key -> (expires_at, documents, retrieval_method)
+        self._results: "OrderedDict[ResultKey, Tuple[float, List[Any], str]]" = OrderedDict()
+        # Bumped on every invalidation; searches started earlier are not stored
+        self._epoch = 0
+
+        self.embedding_hits = 0
+        self.embedding_misses = 0
+        self.result_hits = 0
+        self.result_misses = 0
+        self.invalidations = 0
+
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+
+    def get_embedding(self, question_key: str) -> Optional[Tuple[List[float], str]]:
+        with self._lock:
+            entry = self._embeddings.get(question_key)
+            if entry is None:
+                self.embedding_misses += 1
+                return None
+            self._embeddings.move_to_end(question_key)
+            self.embedding_hits += 1
+            return entry
+
+    def put_embedding(self, question_key: str, embedding: List[float]) -> str:
+        """Store embedding, return its hash"""
+        emb_hash = embedding_hash(embedding)
+        if self.embedding_size <= 0:
+            return emb_hash
+        with self._lock:
+            self._embeddings[question_key] = (embedding, emb_hash)
+            self._embeddings.move_to_end(question_key)
+            while len(self._embeddings) > self.embedding_size:
+                self._embeddings.popitem(last=False)
+        return emb_hash
+
+    def get_results(self, dao_id: str, emb_hash: str, top_k: int) -> Optional[Tuple[List[Any], str]]:
+        key = (dao_id, emb_hash, top_k)
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._results.move_to_end(key)
+                self.result_hits += 1
+                return entry[1], entry[2]
+            if entry is not None:
+                del self._results[key]
+            self.result_misses += 1
+            return None
+
+    def put_results(
+        self,
+        dao_id: str,
+        emb_hash: str,
+        top_k: int,
+        documents: List[Any],
+        retrieval_method: str,
+        epoch: int,
+    ):
+        if self.result_size <= 0 or self.result_ttl_s <= 0:
+            return
+        key = (dao_id, emb_hash, top_k)
+        with self._lock:
+            if epoch != self._epoch:
+                return
+            self._results[key] = (time.monotonic() + self.result_ttl_s, documents, retrieval_method)
+            self._results.move_to_end(key)
+            while len(self._results) > self.result_size:
+                self._results.popitem(last=False)
+
+    def invalidate_dao(self, dao_id: str) -> int:
+        """Drop cached results for dao_id (called after ingest writes chunks)"""
+        with self._lock:
+            self._epoch += 1
+            keys = [
+                key for key, entry in self._results.items()
+                if key[0] == dao_id or entry[2].endswith("_no_filter")
+            ]
+            for key in keys:
+                del self._results[key]
+            self.invalidations += len(keys)
+        logger.info(f"Query result cache invalidated for dao_id={dao_id}: {len(keys)} entries")
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._embeddings.clear()
+            self._results.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "embedding_cache_size": len(self._embeddings),
+            "embedding_hits": self.embedding_hits,
+            "embedding_misses": self.embedding_misses,
+            "result_cache_size": len(self._results),
+            "result_hits": self.result_hits,
+            "result_misses": self.result_misses,
+            "invalidations": self.invalidations,
+        }
+
+
+# Global query cache
+query_cache = QueryCache()
@@ -12,9 +12,8 @@ from haystack.components.embedders import SentenceTransformersTextEmbedder
 from haystack.components.retrievers import InMemoryEmbeddingRetriever
 from haystack.document_stores import PGVectorDocumentStore
 
-from app.document_store import get_document_store
-from app.embedding import get_text_embedder
 from app.core.config import settings
+from app.retrieval import RetrievalOverloaded, retrieval_stage
 
 logger = logging.getLogger(__name__)
 
@@ -46,7 +45,7 @@ async def answer_query(
     
     try:
         # Retrieve relevant documents
-        documents, retrieval_metrics = _retrieve_documents(dao_id, question, top_k)
+        documents, retrieval_metrics = await _retrieve_documents(dao_id, question, top_k)
         
         if not documents:
             logger.warning(f"No documents found for dao_id={dao_id}")
@@ -109,6 +108,9 @@ async def answer_query(
             "metrics": final_metrics
         }
         
+    except RetrievalOverloaded:
+        # Surface backpressure to the caller (HTTP 503)
+        raise
     except Exception as e:
         logger.error(f"Failed to answer query: {e}", exc_info=True)
         elapsed_time = time.time() - start_time
@@ -127,7 +129,7 @@ async def answer_query(
         }
 
 
-def _retrieve_documents(
+async def _retrieve_documents(
     dao_id: str,
     question: str,
     top_k: int
@@ -135,6 +137,10 @@ def _retrieve_documents(
     """
     Retrieve relevant documents from DocumentStore
     
+    Embedding and vector search run in the retrieval stage executor,
+    so concurrent queries don't block the event loop and share
+    batched embedding passes.
+    
     Args:
         dao_id: DAO identifier for filtering
         question: Query text
@@ -142,71 +148,11 @@ def _retrieve_documents(
     
     Returns:
         Tuple of (List of Haystack Document objects, metrics dict)
-    """
-    import time
-    retrieval_start = time.time()
-    
-    # Get components
-    embedder = get_text_embedder()
-    document_store = get_document_store()
-    
-    # Embed query
-    embedding_result = embedder.run(question)
-    query_embedding = embedding_result["embedding"][0] if isinstance(embedding_result["embedding"], list) else embedding_result["embedding"]
-    
-    # Retrieve with filters using vector similarity search
-    filters = {"dao_id": [dao_id]}
-    
-    try:
-        documents = document_store.search(
-            query_embedding=query_embedding,
-            filters=filters,
-            top_k=top_k,
-            return_embedding=False
-        )
-        retrieval_method = "vector_search"
-    except Exception as e:
-        logger.warning(f"Vector search failed: {e}, trying filter_documents")
-        # Fallback to filter_documents
-        documents = document_store.filter_documents(
-            filters=filters,
-            top_k=top_k,
-            return_embedding=False
-        )
-        retrieval_method = "filter_documents"
-    
-    # If no documents with filter, try without filter (fallback)
-    if not documents:
-        logger.warning(f"No documents found with dao_id={dao_id}, trying without filter")
-        try:
-            documents = document_store.search(
-                query_embedding=query_embedding,
-                filters=None,
-                top_k=top_k,
-                return_embedding=False
-            )
-            retrieval_method = "vector_search_no_filter"
-        except Exception:
-            documents = document_store.filter_documents(
-                filters=None,
-                top_k=top_k,
-                return_embedding=False
-            )
-            retrieval_method = "filter_documents_no_filter"
     
-    retrieval_time = time.time() - retrieval_start
-    
-    # Build metrics
-    doc_ids = list(set([doc.meta.get("doc_id", "unknown") for doc in documents]))
-    metrics = {
-        "retrieval_method": retrieval_method,
-        "retrieval_time_seconds": round(retrieval_time, 2),
-        "documents_found": len(documents),
-        "doc_ids": doc_ids,
-        "filters_applied": {"dao_id": dao_id}
-    }
-    
-    return documents, metrics
+    Raises:
+        RetrievalOverloaded: if the retrieval queue is full
+    """
+    return await retrieval_stage.retrieve(dao_id, question, top_k)
 
 
 async def _generate_answer(
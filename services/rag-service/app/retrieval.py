@@ -0,0 +1,359 @@
+"""
+Retrieval stage for the query pipeline
+Runs question embedding and vector search off the event loop
+
+- questions arriving within RETRIEVAL_BATCH_WINDOW_MS are embedded
+  in one forward pass (up to RETRIEVAL_MAX_BATCH)
+- vector searches run on a bounded thread pool (RETRIEVAL_WORKERS)
+- pending questions are held in a bounded queue; when it stays full for
+  RETRIEVAL_QUEUE_TIMEOUT_S the caller gets RetrievalOverloaded
+- repeated questions reuse cached embeddings/results (app.query_cache)
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.query_cache import QueryCache, normalize_question, query_cache
+
+logger = logging.getLogger(__name__)
+
+# embed_fn(questions) -> embeddings (same order)
+EmbedFn = Callable[[List[str]], List[List[float]]]
+# search_fn(dao_id, query_embedding, top_k) -> (documents, retrieval_method)
+SearchFn = Callable[[str, List[float], int], Tuple[List[Any], str]]
+
+
+class RetrievalOverloaded(RuntimeError):
+    """Retrieval queue is full; caller should back off"""
+
+
+@dataclass
+class _PendingQuery:
+    dao_id: str
+    question: str
+    top_k: int
+    future: asyncio.Future
+    question_key: str = ""
+    embedding: Optional[List[float]] = None
+    emb_hash: Optional[str] = None
+    cache_epoch: int = 0
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+def embed_questions(questions: List[str]) -> List[List[float]]:
+    """
+    Embed questions with the shared text embedder.
+    Uses one batched encode call when the SentenceTransformers backend is available.
+    """
+    from app.embedding import get_text_embedder
+
+    embedder = get_text_embedder()
+    backend = getattr(embedder, "embedding_backend", None)
+
+    if backend is not None and len(questions) > 1:
+        prefix = getattr(embedder, "prefix", "")
+        suffix = getattr(embedder, "suffix", "")
+        embeddings = backend.embed(
+            [f"{prefix}{q}{suffix}" for q in questions],
+            batch_size=getattr(embedder, "batch_size", 32),
+            show_progress_bar=False,
+            normalize_embeddings=getattr(embedder, "normalize_embeddings", False),
+        )
+        return [list(e) for e in embeddings]
+
+    results = []
+    for question in questions:
+        embedding = embedder.run(question)["embedding"]
+        if embedding and isinstance(embedding[0], list):
+            embedding = embedding[0]
+        results.append(embedding)
+    return results
+
+
+def search_documents(dao_id: str, query_embedding: List[float], top_k: int) -> Tuple[List[Any], str]:
+    """
+    Vector search in DocumentStore filtered by dao_id, with fallbacks
+
+    Returns:
+        Tuple of (List of Haystack Document objects, retrieval method)
+    """
+    from app.document_store import get_document_store
+
+    document_store = get_document_store()
+    filters = {"dao_id": [dao_id]}
+
+    try:
+        documents = document_store.search(
+            query_embedding=query_embedding,
+            filters=filters,
+            top_k=top_k,
+            return_embedding=False
+        )
+        retrieval_method = "vector_search"
+    except Exception as e:
+        logger.warning(f"Vector search failed: {e}, trying filter_documents")
+        # Fallback to filter_documents
+        documents = document_store.filter_documents(
+            filters=filters,
+            top_k=top_k,
+            return_embedding=False
+        )
+        retrieval_method = "filter_documents"
+
+    # If no documents with filter, try without filter (fallback)
+    if not documents:
+        logger.warning(f"No documents found with dao_id={dao_id}, trying without filter")
+        try:
+            documents = document_store.search(
+                query_embedding=query_embedding,
+                filters=None,
+                top_k=top_k,
+                return_embedding=False
+            )
+            retrieval_method = "vector_search_no_filter"
+        except Exception:
+            documents = document_store.filter_documents(
+                filters=None,
+                top_k=top_k,
+                return_embedding=False
+            )
+            retrieval_method = "filter_documents_no_filter"
+
+    return documents, retrieval_method
+
+
+class RetrievalStage:
+    """Micro-batched embedding + pooled vector search with bounded queueing"""
+
+    def __init__(
+        self,
+        embed_fn: EmbedFn = embed_questions,
+        search_fn: SearchFn = search_documents,
+        workers: int = settings.RETRIEVAL_WORKERS,
+        batch_window_ms: float = settings.RETRIEVAL_BATCH_WINDOW_MS,
+        max_batch: int = settings.RETRIEVAL_MAX_BATCH,
+        queue_size: int = settings.RETRIEVAL_QUEUE_SIZE,
+        queue_timeout_s: float = settings.RETRIEVAL_QUEUE_TIMEOUT_S,
+        cache: Optional[QueryCache] = None,
+    ):
+        self.embed_fn = embed_fn
+        self.search_fn = search_fn
+        self.cache = cache
+        self.workers = max(1, workers)
+        self.batch_window_s = batch_window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self.queue_size = queue_size
+        self.queue_timeout_s = queue_timeout_s
+
+        # Embedding gets its own thread so searches never delay a forward pass
+        self._embed_executor: Optional[ThreadPoolExecutor] = None
+        self._search_executor: Optional[ThreadPoolExecutor] = None
+        # Bound to the event loop of the first caller
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._search_slots: Optional[asyncio.Semaphore] = None
+        self._batcher: Optional[asyncio.Task] = None
+
+        self.batches = 0
+        self.embedded = 0
+        self.rejected = 0
+        self.max_batch_seen = 0
+
+    async def retrieve(self, dao_id: str, question: str, top_k: int) -> Tuple[List[Any], Dict[str, Any]]:
+        """
+        Embed question and search documents without blocking the event loop
+
+        Raises:
+            RetrievalOverloaded: if the queue stays full for queue_timeout_s
+        """
+        self._ensure_started()
+        start = time.perf_counter()
+        pending = _PendingQuery(dao_id, question, top_k, self._loop.create_future())
+
+        cached_embedding = None
+        if self.cache is not None:
+            pending.question_key = normalize_question(question)
+            pending.cache_epoch = self.cache.epoch
+            cached_embedding = self.cache.get_embedding(pending.question_key)
+
+        if cached_embedding is not None:
+            # Known question: skip the embedding batch, go straight to search
+            pending.embedding, pending.emb_hash = cached_embedding
+            cached = self.cache.get_results(dao_id, pending.emb_hash, top_k)
+            if cached is not None:
+                pending.future.set_result(self._result(pending, *cached, 0, 0.0, result_hit=True))
+            else:
+                await self._search_slots.acquire()
+                self._loop.create_task(self._search(pending, 0, 0.0, check_cache=False))
+        else:
+            try:
+                await asyncio.wait_for(self._queue.put(pending), timeout=self.queue_timeout_s)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise RetrievalOverloaded(
+                    f"Retrieval queue full ({self.queue_size} pending), retry later"
+                )
+
+        documents, metrics = await pending.future
+        metrics["retrieval_time_seconds"] = round(time.perf_counter() - start, 2)
+        if self.cache is not None:
+            metrics["cache"] = {
+                "embedding_hit": cached_embedding is not None,
+                **metrics["cache"],
+                **self.cache.stats(),
+            }
+        return documents, metrics
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._batcher is not None and not self._batcher.done():
+            return
+        if self._embed_executor is None:
+            self._embed_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rag-embed")
+            self._search_executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="rag-search")
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._search_slots = asyncio.Semaphore(self.workers)
+        self._batcher = loop.create_task(self._run_batcher())
+
+    async def _next_batch(self) -> List[_PendingQuery]:
+        """Wait for one query, then collect more for up to batch_window_s"""
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.batch_window_s
+        while len(batch) < self.max_batch:
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        # Whatever is already queued joins the batch for free
+        while len(batch) < self.max_batch and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run_batcher(self):
+        while True:
+            batch = await self._next_batch()
+            batch = [p for p in batch if not p.future.done()]
+            if not batch:
+                continue
+
+            embed_start = time.perf_counter()
+            try:
+                embeddings = await self._loop.run_in_executor(
+                    self._embed_executor, self.embed_fn, [p.question for p in batch]
+                )
+            except Exception as e:
+                logger.error(f"Batch embedding failed ({len(batch)} questions): {e}")
+                for p in batch:
+                    if not p.future.done():
+                        p.future.set_exception(e)
+                continue
+            embed_time = time.perf_counter() - embed_start
+
+            self.batches += 1
+            self.embedded += len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+
+            for p, embedding in zip(batch, embeddings):
+                p.embedding = embedding
+                if self.cache is not None:
+                    p.emb_hash = self.cache.put_embedding(p.question_key, embedding)
+                # Saturated search pool stalls the batcher, which fills the queue
+                await self._search_slots.acquire()
+                self._loop.create_task(self._search(p, len(batch), embed_time))
+
+    async def _search(self, pending: _PendingQuery, batch_size: int, embed_time: float, check_cache: bool = True):
+        cached = None
+        try:
+            if self.cache is not None and check_cache:
+                cached = self.cache.get_results(pending.dao_id, pending.emb_hash, pending.top_k)
+            if cached is not None:
+                documents, retrieval_method = cached
+            else:
+                documents, retrieval_method = await self._loop.run_in_executor(
+                    self._search_executor, self.search_fn, pending.dao_id, pending.embedding, pending.top_k
+                )
+                if self.cache is not None:
+                    self.cache.put_results(
+                        pending.dao_id,
+                        pending.emb_hash,
+                        pending.top_k,
+                        documents,
+                        retrieval_method,
+                        pending.cache_epoch,
+                    )
+        except Exception as e:
+            if not pending.future.done():
+                pending.future.set_exception(e)
+            return
+        finally:
+            self._search_slots.release()
+
+        if not pending.future.done():
+            pending.future.set_result(
+                self._result(pending, documents, retrieval_method, batch_size, embed_time, cached is not None)
+            )
+
+    def _result(
+        self,
+        pending: _PendingQuery,
+        documents: List[Any],
+        retrieval_method: str,
+        batch_size: int,
+        embed_time: float,
+        result_hit: bool = False,
+    ) -> Tuple[List[Any], Dict[str, Any]]:
+        doc_ids = list(set([doc.meta.get("doc_id", "unknown") for doc in documents]))
+        metrics = {
+            "retrieval_method": retrieval_method,
+            "documents_found": len(documents),
+            "doc_ids": doc_ids,
+            "filters_applied": {"dao_id": pending.dao_id},
+            "embedding_batch_size": batch_size,
+            "embedding_time_ms": round(embed_time * 1000, 1),
+        }
+        if self.cache is not None:
+            metrics["cache"] = {"result_hit": result_hit}
+        return documents, metrics
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self.queue_size,
+            "workers": self.workers,
+            "batches": self.batches,
+            "embedded": self.embedded,
+            "avg_batch_size": round(self.embedded / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "rejected": self.rejected,
+        }
+
+    async def close(self):
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._batcher = None
+        while self._queue is not None and not self._queue.empty():
+            pending = self._queue.get_nowait()
+            if not pending.future.done():
+                pending.future.set_exception(RetrievalOverloaded("Retrieval stage is shutting down"))
+        for executor in (self._embed_executor, self._search_executor):
+            if executor is not None:
+                executor.shutdown(wait=False)
+        self._embed_executor = None
+        self._search_executor = None
+
+
+# Global retrieval stage
+retrieval_stage = RetrievalStage(cache=query_cache)
@@ -0,0 +1,116 @@
+"""
+Concurrency benchmark for the query retrieval stage
+
+N parallel queries against a small in-memory store:
+  - inline:  embedding + search called directly in the coroutine (old behaviour)
+  - stage:   RetrievalStage (executor + micro-batched embedding)
+  - cached:  RetrievalStage with QueryCache, same questions repeated
+
+The embedder simulates a model forward pass (fixed cost + per-item cost,
+GIL released like torch); search is a brute-force cosine scan in Python.
+
+Usage:
+    python tests/bench_retrieval.py [--queries 50] [--docs 2000]
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.query_cache import QueryCache
+from app.retrieval import RetrievalStage
+
+DIM = 64
+FORWARD_BASE_S = 0.020
+FORWARD_PER_ITEM_S = 0.001
+
+
+def _vector(text):
+    rnd = random.Random(text)
+    v = [rnd.uniform(-1, 1) for _ in range(DIM)]
+    norm = math.sqrt(sum(x * x for x in v))
+    return [x / norm for x in v]
+
+
+def embed(questions):
+    time.sleep(FORWARD_BASE_S + FORWARD_PER_ITEM_S * len(questions))
+    return [_vector(q) for q in questions]
+
+
+class InMemoryStore:
+    def __init__(self, n_docs):
+        self.docs = [
+            (SimpleNamespace(content=f"doc {i}", meta={"doc_id": f"doc{i}", "dao_id": f"dao{i % 4}"}), _vector(f"doc{i}"))
+            for i in range(n_docs)
+        ]
+
+    def search(self, dao_id, query_embedding, top_k):
+        scored = [
+            (sum(a * b for a, b in zip(query_embedding, emb)), doc)
+            for doc, emb in self.docs
+            if doc.meta["dao_id"] == dao_id
+        ]
+        scored.sort(key=lambda s: s[0], reverse=True)
+        return [doc for _, doc in scored[:top_k]], "vector_search"
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def run(label, retrieve, n_queries):
+    latencies = []
+    # All queries arrive at once; latency counts time spent waiting behind others
+    start = time.perf_counter()
+
+    async def one(i):
+        await retrieve(f"dao{i % 4}", f"question {i}", 5)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one(i) for i in range(n_queries)))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<8} {n_queries / elapsed:8.1f} q/s  "
+        f"p50={percentile(latencies, 0.50):7.1f} ms  "
+        f"p95={percentile(latencies, 0.95):7.1f} ms  "
+        f"p99={percentile(latencies, 0.99):7.1f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="RAG retrieval concurrency benchmark")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--docs", type=int, default=2000)
+    args = parser.parse_args()
+
+    store = InMemoryStore(args.docs)
+
+    async def inline(dao_id, question, top_k):
+        embedding = embed([question])[0]
+        return store.search(dao_id, embedding, top_k)
+
+    print(f"{args.queries} parallel queries, {args.docs} docs\n")
+    await run("inline", inline, args.queries)
+
+    stage = RetrievalStage(embed, store.search)
+    await run("stage", stage.retrieve, args.queries)
+    print(f"\nstage stats: {stage.stats()}")
+    await stage.close()
+
+    cached_stage = RetrievalStage(embed, store.search, cache=QueryCache())
+    await run("warm-up", cached_stage.retrieve, args.queries)
+    await run("cached", cached_stage.retrieve, args.queries)
+    print(f"\ncache stats: {cached_stage.cache.stats()}")
+    await cached_stage.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -3,6 +3,7 @@ Tests for ingest pipeline
 """
 
 import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
 from app.ingest_pipeline import ingest_parsed_document, _parsed_json_to_documents
 
 
@@ -80,3 +81,39 @@ class TestIngestPipeline:
         assert len(documents) == 1
         assert documents[0].content == "Valid content"
 
+    
+    @pytest.mark.asyncio
+    async def test_ingest_processes_pages_in_batches(self):
+        """Test streaming ingest writes page batches incrementally with stage timings"""
+        parsed_json = {
+            "doc_id": "test-doc",
+            "pages": [
+                {"page_num": i, "blocks": [{"type": "paragraph", "text": f"Page {i} content"}]}
+                for i in range(1, 6)
+            ],
+            "metadata": {}
+        }
+        
+        splitter = MagicMock()
+        splitter.run.side_effect = lambda documents: {"documents": documents}
+        embedder = MagicMock()
+        embedder.run.side_effect = lambda documents: {"documents": documents}
+        writer = MagicMock()
+        writer.run.side_effect = lambda documents: {"documents_written": len(documents)}
+        
+        with patch("app.ingest_pipeline._create_ingest_components", return_value=(splitter, embedder, writer)), \
+             patch("app.ingest_pipeline.settings.INGEST_PAGES_PER_BATCH", 2), \
+             patch("app.ingest_pipeline.publish_document_ingested", new=AsyncMock()), \
+             patch("app.ingest_pipeline.publish_document_indexed", new=AsyncMock()) as indexed:
+            result = await ingest_parsed_document(
+                dao_id="test-dao",
+                doc_id="test-doc",
+                parsed_json=parsed_json
+            )
+        
+        assert result["status"] == "success"
+        assert result["doc_count"] == 5
+        assert result["metrics"]["batches"] == 3
+        assert [len(c.kwargs["documents"]) for c in writer.run.call_args_list] == [2, 2, 1]
+        assert set(result["metrics"]["stage_timings_ms"]) == {"convert_ms", "split_ms", "embed_ms", "write_ms"}
+        assert "indexing_time_ms" in indexed.call_args.kwargs["metadata"]
@@ -13,7 +13,7 @@ class TestQueryPipeline:
     @pytest.mark.asyncio
     async def test_answer_query_no_documents(self):
         """Test query when no documents found"""
-        with patch("app.query_pipeline._retrieve_documents", return_value=[]):
+        with patch("app.query_pipeline._retrieve_documents", return_value=([], {})):
             result = await answer_query(
                 dao_id="test-dao",
                 question="Test question"
@@ -0,0 +1,155 @@
+"""
+Tests for retrieval stage (micro-batching + backpressure)
+"""
+
+import asyncio
+import threading
+import pytest
+from types import SimpleNamespace
+
+from app.query_cache import QueryCache
+from app.retrieval import RetrievalStage, RetrievalOverloaded
+
+
+def _doc(doc_id):
+    return SimpleNamespace(content=f"content of {doc_id}", meta={"doc_id": doc_id})
+
+
+class TestRetrievalStage:
+    """Tests for RetrievalStage"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_questions_share_one_batch(self):
+        """Test questions arriving within the window are embedded together"""
+        batches = []
+
+        def embed(questions):
+            batches.append(list(questions))
+            return [[float(len(q))] for q in questions]
+
+        def search(dao_id, embedding, top_k):
+            return [_doc(f"{dao_id}-{int(embedding[0])}")], "vector_search"
+
+        stage = RetrievalStage(embed, search, workers=2, batch_window_ms=50, max_batch=16)
+        try:
+            results = await asyncio.gather(*(
+                stage.retrieve("dao", "q" * (i + 1), 5) for i in range(8)
+            ))
+        finally:
+            await stage.close()
+
+        assert len(batches) == 1
+        assert len(batches[0]) == 8
+        for i, (documents, metrics) in enumerate(results):
+            assert documents[0].meta["doc_id"] == f"dao-{i + 1}"
+            assert metrics["embedding_batch_size"] == 8
+            assert metrics["retrieval_method"] == "vector_search"
+
+    @pytest.mark.asyncio
+    async def test_event_loop_not_blocked(self):
+        """Test slow embedding runs off the event loop"""
+        release = threading.Event()
+
+        def embed(questions):
+            release.wait(timeout=5)
+            return [[0.0] for _ in questions]
+
+        stage = RetrievalStage(embed, lambda d, e, k: ([], "vector_search"), batch_window_ms=0)
+        try:
+            task = asyncio.ensure_future(stage.retrieve("dao", "q", 5))
+            # Loop keeps running while embedding is stuck
+            await asyncio.sleep(0.05)
+            assert not task.done()
+            release.set()
+            documents, metrics = await task
+        finally:
+            await stage.close()
+
+        assert documents == []
+        assert metrics["documents_found"] == 0
+
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects(self):
+        """Test backpressure when queue stays full"""
+        release = threading.Event()
+
+        def embed(questions):
+            release.wait(timeout=5)
+            return [[0.0] for _ in questions]
+
+        stage = RetrievalStage(
+            embed,
+            lambda d, e, k: ([], "vector_search"),
+            batch_window_ms=0,
+            max_batch=1,
+            queue_size=1,
+            queue_timeout_s=0.05,
+        )
+        try:
+            first = asyncio.ensure_future(stage.retrieve("dao", "q1", 5))
+            await asyncio.sleep(0.02)  # first is being embedded
+            second = asyncio.ensure_future(stage.retrieve("dao", "q2", 5))
+            await asyncio.sleep(0.01)  # second fills the queue
+            with pytest.raises(RetrievalOverloaded):
+                await stage.retrieve("dao", "q3", 5)
+            release.set()
+            await asyncio.gather(first, second)
+        finally:
+            await stage.close()
+
+        assert stage.stats()["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_repeated_question_hits_caches(self):
+        """Test embedding and result caches skip repeated work"""
+        embedded = []
+        searched = []
+
+        def embed(questions):
+            embedded.extend(questions)
+            return [[1.0, 0.5] for _ in questions]
+
+        def search(dao_id, embedding, top_k):
+            searched.append(dao_id)
+            return [_doc("doc1")], "vector_search"
+
+        cache = QueryCache(embedding_size=10, result_size=10, result_ttl_s=60)
+        stage = RetrievalStage(embed, search, batch_window_ms=0, cache=cache)
+        try:
+            _, first = await stage.retrieve("dao", "What is  μGOV?", 5)
+            _, second = await stage.retrieve("dao", "what is μgov?", 5)
+            cache.invalidate_dao("dao")
+            _, third = await stage.retrieve("dao", "What is μGOV?", 5)
+        finally:
+            await stage.close()
+
+        assert embedded == ["What is  μGOV?"]
+        assert searched == ["dao", "dao"]
+        assert first["cache"]["embedding_hit"] is False
+        assert first["cache"]["result_hit"] is False
+        assert second["cache"]["embedding_hit"] is True
+        assert second["cache"]["result_hit"] is True
+        assert third["cache"]["embedding_hit"] is True
+        assert third["cache"]["result_hit"] is False
+        assert third["cache"]["result_hits"] == 1
+
+
+class TestQueryCache:
+    """Tests for QueryCache invalidation"""
+
+    def test_invalidate_dao(self):
+        """Test ingest invalidation drops DAO and unfiltered-fallback entries"""
+        cache = QueryCache(embedding_size=10, result_size=10, result_ttl_s=60)
+        epoch = cache.epoch
+        cache.put_results("dao1", "h1", 5, [_doc("a")], "vector_search", epoch)
+        cache.put_results("dao2", "h1", 5, [_doc("b")], "vector_search", epoch)
+        cache.put_results("dao3", "h1", 5, [_doc("c")], "vector_search_no_filter", epoch)
+
+        assert cache.invalidate_dao("dao1") == 2
+        assert cache.get_results("dao1", "h1", 5) is None
+        assert cache.get_results("dao2", "h1", 5) is not None
+        assert cache.get_results("dao3", "h1", 5) is None
+
+        # Searches started before the invalidation are not stored
+        cache.put_results("dao1", "h1", 5, [_doc("a")], "vector_search", epoch)
+        assert cache.get_results("dao1", "h1", 5) is None
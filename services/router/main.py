@@ -372,41 +372,31 @@ async def agent_infer(agent_id: str, request: InferRequest):
     
     # Try Swapper first (for LLM models)
     try:
-        # Check if Swapper is available
-        health_resp = await http_client.get(f"{SWAPPER_URL}/health", timeout=5.0)
-        if health_resp.status_code == 200:
-            # Load model if needed
-            load_resp = await http_client.post(
-                f"{SWAPPER_URL}/load",
-                json={"model": model},
-                timeout=30.0
+        # Swapper queues the request until the model is loaded and keeps it
+        # loaded until generation finishes (no swap mid-request)
+        generate_resp = await http_client.post(
+            f"{SWAPPER_URL}/generate",
+            json={
+                "model": model,
+                "prompt": request.prompt,
+                "system": request.system_prompt,
+                "options": {
+                    "num_predict": request.max_tokens,
+                    "temperature": request.temperature
+                }
+            },
+            timeout=300.0
+        )
+        
+        if generate_resp.status_code == 200:
+            data = generate_resp.json()
+            return InferResponse(
+                response=data.get("response", ""),
+                model=model,
+                tokens_used=data.get("eval_count"),
+                backend="swapper+ollama"
             )
-            
-            if load_resp.status_code == 200:
-                # Generate response via Ollama
-                generate_resp = await http_client.post(
-                    f"{VISION_URL}/api/generate",
-                    json={
-                        "model": model,
-                        "prompt": request.prompt,
-                        "system": request.system_prompt,
-                        "stream": False,
-                        "options": {
-                            "num_predict": request.max_tokens,
-                            "temperature": request.temperature
-                        }
-                    },
-                    timeout=120.0
-                )
-                
-                if generate_resp.status_code == 200:
-                    data = generate_resp.json()
-                    return InferResponse(
-                        response=data.get("response", ""),
-                        model=model,
-                        tokens_used=data.get("eval_count"),
-                        backend="swapper+ollama"
-                    )
+        logger.warning(f"⚠️ Swapper returned HTTP {generate_resp.status_code} for {model}")
     except Exception as e:
         logger.error(f"❌ Swapper/Ollama error: {e}")
     
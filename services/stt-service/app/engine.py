@@ -0,0 +1,276 @@
+"""
+Резидентний рушій транскрипції Whisper
+
+Модель завантажується один раз при старті (по екземпляру на воркер),
+аудіо приймається як байти в пам'яті й декодується ffmpeg через pipe.
+Запити стають у обмежену чергу; коли вона повна - EngineBusy (503).
+Довгі голосові розбиваються на шматки по ~30 с (розріз у найтихішому
+місці) для потокової транскрипції.
+"""
+
+import asyncio
+import logging
+import tempfile
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    import whisper
+    WHISPER_AVAILABLE = True
+except ImportError:
+    WHISPER_AVAILABLE = False
+    logger.warning("openai-whisper not available, install with: pip install openai-whisper")
+
+SAMPLE_RATE = 16000
+# Скільки останніх тривалостей тримати для статистики
+LATENCY_WINDOW = 256
+
+
+class EngineBusy(Exception):
+    """Черга транскрипції заповнена"""
+
+
+class EngineNotReady(Exception):
+    """Модель ще не завантажена або не завантажилась"""
+
+
+class AudioDecodeError(Exception):
+    """ffmpeg не зміг декодувати аудіо"""
+
+
+async def _ffmpeg_decode(source: str, data: Optional[bytes]) -> Tuple[int, bytes, bytes]:
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", source,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "-"
+    ]
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.PIPE if data is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate(data)
+    return process.returncode, stdout, stderr
+
+
+async def decode_audio(audio_bytes: bytes, suffix: str = "") -> np.ndarray:
+    """
+    Байти аудіо (ogg/opus, webm, mp3, wav, m4a...) -> float32 mono 16 kHz
+
+    Спершу через stdin; формати, що потребують seek (напр. m4a з moov
+    в кінці), декодуються з тимчасового файлу
+    """
+    code, pcm, stderr = await _ffmpeg_decode("pipe:0", audio_bytes)
+    if code != 0 or not pcm:
+        with tempfile.NamedTemporaryFile(suffix=suffix or ".audio") as temp_audio:
+            temp_audio.write(audio_bytes)
+            temp_audio.flush()
+            code, pcm, stderr = await _ffmpeg_decode(temp_audio.name, None)
+    if code != 0:
+        raise AudioDecodeError(stderr.decode(errors="replace").strip()[-500:] or "ffmpeg failed")
+    return np.frombuffer(pcm, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+def split_chunks(audio: np.ndarray, chunk_s: float, search_s: float = 2.0) -> List[Tuple[int, int]]:
+    """
+    Межі шматків (start, end) у семплах, кожен не довший за chunk_s
+
+    Розріз ставиться в найтихший 100 мс фрейм останніх search_s секунд
+    шматка, щоб не різати слова
+    """
+    size = int(chunk_s * SAMPLE_RATE)
+    frame = SAMPLE_RATE // 10
+    search = min(int(search_s * SAMPLE_RATE), size // 2)
+    bounds = []
+    start = 0
+    while len(audio) - start > size:
+        end = start + size
+        window = audio[end - search:end]
+        frames = len(window) // frame
+        energy = np.square(window[:frames * frame]).reshape(frames, frame).mean(axis=1)
+        cut = end - search + int(energy.argmin()) * frame + frame // 2
+        bounds.append((start, cut))
+        start = cut
+    bounds.append((start, len(audio)))
+    return bounds
+
+
+class _Job:
+    __slots__ = ("audio", "options", "future", "enqueued_at")
+
+    def __init__(self, audio: np.ndarray, options: Dict[str, Any], future: asyncio.Future):
+        self.audio = audio
+        self.options = options
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class TranscriptionEngine:
+    """Пул воркерів, кожен з власним екземпляром моделі Whisper"""
+
+    def __init__(
+        self,
+        model_name: str = "base",
+        language: str = "uk",
+        workers: int = 1,
+        queue_size: int = 32,
+        device: Optional[str] = None,
+        chunk_s: float = 30.0,
+    ):
+        self.model_name = model_name
+        self.language = language
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.device = device
+        self.chunk_s = chunk_s
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._busy = 0
+        self.loaded = False
+        self.load_error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.audio_seconds = 0.0
+        self._wait_ms: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._run_ms: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    async def start(self):
+        """Завантажити моделі й запустити воркери"""
+        if not WHISPER_AVAILABLE:
+            self.load_error = "openai-whisper not installed"
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        start = time.perf_counter()
+        try:
+            # По моделі на воркер: transcribe() вішає kv-cache хуки на модель,
+            # тож один екземпляр не можна ділити між паралельними викликами
+            models = []
+            for _ in range(self.workers):
+                models.append(await asyncio.to_thread(whisper.load_model, self.model_name, self.device))
+        except Exception as e:
+            self.load_error = str(e)
+            logger.error(f"❌ Failed to load Whisper model {self.model_name}: {e}", exc_info=True)
+            return
+        self.load_seconds = time.perf_counter() - start
+        self.loaded = True
+        self._tasks = [asyncio.create_task(self._worker(model)) for model in models]
+        logger.info(
+            f"✅ Whisper {self.model_name} loaded in {self.load_seconds:.1f}s "
+            f"({self.workers} worker(s), queue {self.queue_size}, device {models[0].device})"
+        )
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._queue:
+            while not self._queue.empty():
+                job = self._queue.get_nowait()
+                if not job.future.done():
+                    job.future.set_exception(EngineBusy("STT engine stopped"))
+
+    async def _worker(self, model):
+        fp16 = model.device.type == "cuda"
+        while True:
+            job: _Job = await self._queue.get()
+            if job.future.cancelled():
+                continue
+            self._busy += 1
+            started = time.monotonic()
+            self._wait_ms.append((started - job.enqueued_at) * 1000)
+            try:
+                result = await asyncio.to_thread(model.transcribe, job.audio, fp16=fp16, **job.options)
+            except Exception as e:
+                self.failed += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                self.completed += 1
+                self.audio_seconds += len(job.audio) / SAMPLE_RATE
+                if not job.future.done():
+                    job.future.set_result(result)
+            finally:
+                self._busy -= 1
+                self._run_ms.append((time.monotonic() - started) * 1000)
+
+    async def transcribe(
+        self,
+        audio: np.ndarray,
+        language: Optional[str] = None,
+        initial_prompt: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Транскрибувати PCM (float32, 16 kHz); повертає результат whisper.transcribe"""
+        if not self.loaded:
+            raise EngineNotReady(f"STT engine not ready: {self.load_error or 'loading'}")
+        options: Dict[str, Any] = {"language": language or self.language}
+        if initial_prompt:
+            options["initial_prompt"] = initial_prompt
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait(_Job(audio, options, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise EngineBusy(f"STT queue full ({self.queue_size} requests waiting)")
+        return await future
+
+    async def transcribe_chunks(
+        self,
+        audio: np.ndarray,
+        language: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Транскрибувати довге аудіо шматками, віддаючи кожен одразу
+
+        Текст попереднього шматка йде як initial_prompt наступного
+        """
+        previous = None
+        bounds = split_chunks(audio, self.chunk_s)
+        for index, (start, end) in enumerate(bounds):
+            result = await self.transcribe(audio[start:end], language, initial_prompt=previous)
+            text = result.get("text", "").strip()
+            previous = text or previous
+            yield {
+                "chunk": index,
+                "chunks": len(bounds),
+                "start": round(start / SAMPLE_RATE, 2),
+                "end": round(end / SAMPLE_RATE, 2),
+                "text": text,
+                "language": result.get("language"),
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        def summary(values: Deque[float]) -> Dict[str, Optional[float]]:
+            ordered = sorted(values)
+            if not ordered:
+                return {"avg": None, "p95": None}
+            return {
+                "avg": round(sum(ordered) / len(ordered), 1),
+                "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+            }
+
+        return {
+            "model": self.model_name,
+            "loaded": self.loaded,
+            "load_error": self.load_error,
+            "load_seconds": round(self.load_seconds, 2) if self.load_seconds else None,
+            "workers": self.workers,
+            "busy": self._busy,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "queue_size": self.queue_size,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "audio_seconds": round(self.audio_seconds, 1),
+            "wait_ms": summary(self._wait_ms),
+            "transcribe_ms": summary(self._run_ms),
+        }
@@ -5,14 +5,15 @@ STT Service - Speech-to-Text для DAARION
 
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import logging
 import os
-import tempfile
 import base64
-from typing import Optional
-import subprocess
 import json
+from typing import Optional
+
+from app.engine import TranscriptionEngine, EngineBusy, EngineNotReady, AudioDecodeError, decode_audio, SAMPLE_RATE
 
 # Logging
 logging.basicConfig(level=logging.INFO)
@@ -21,7 +22,7 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="STT Service",
     description="Speech-to-Text Service для DAARION (Whisper AI)",
-    version="1.0.0"
+    version="1.1.0"
 )
 
 # CORS
@@ -36,11 +37,25 @@ app.add_middleware(
 # Конфігурація
 WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")  # tiny, base, small, medium, large
 LANGUAGE = os.getenv("WHISPER_LANGUAGE", "uk")  # ukrainian
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE") or None  # cpu, cuda; за замовчанням - автоматично
+WHISPER_WORKERS = int(os.getenv("WHISPER_WORKERS", "1"))  # по екземпляру моделі на воркер
+WHISPER_QUEUE_SIZE = int(os.getenv("WHISPER_QUEUE_SIZE", "32"))  # далі - 503
+WHISPER_CHUNK_S = float(os.getenv("WHISPER_CHUNK_S", "30"))  # шматок для /api/stt/stream
+
+# Модель завантажується один раз і живе весь час роботи сервісу
+engine = TranscriptionEngine(
+    model_name=WHISPER_MODEL,
+    language=LANGUAGE,
+    workers=WHISPER_WORKERS,
+    queue_size=WHISPER_QUEUE_SIZE,
+    device=WHISPER_DEVICE,
+    chunk_s=WHISPER_CHUNK_S
+)
 
 class STTRequest(BaseModel):
     audio: str  # base64 encoded audio
     language: Optional[str] = "uk"
-    model: Optional[str] = "base"
+    model: Optional[str] = "base"  # інформативно: працює модель з WHISPER_MODEL
 
 class STTResponse(BaseModel):
     text: str
@@ -49,6 +64,15 @@ class STTResponse(BaseModel):
     model: str
     confidence: Optional[float] = None
 
+@app.on_event("startup")
+async def startup():
+    """Завантажити модель Whisper"""
+    await engine.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await engine.stop()
+
 @app.get("/")
 async def root():
     """Health check"""
@@ -57,33 +81,39 @@ async def root():
         "status": "running",
         "model": WHISPER_MODEL,
         "language": LANGUAGE,
-        "version": "1.0.0"
+        "version": "1.1.0"
     }
 
 @app.get("/health")
 async def health():
     """Health check endpoint"""
+    stats = engine.stats()
+    return {
+        "status": "healthy" if engine.loaded else "unhealthy",
+        "whisper": "loaded" if engine.loaded else "unavailable",
+        "model": WHISPER_MODEL,
+        "engine": stats
+    }
+
+async def _transcribe_bytes(audio_bytes: bytes, language: str, suffix: str = ""):
+    """Декодувати й транскрибувати; повертає (text, language, duration)"""
     try:
-        # Перевірити чи Whisper доступний
-        result = subprocess.run(
-            ["whisper", "--help"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        whisper_available = result.returncode == 0
-        
-        return {
-            "status": "healthy" if whisper_available else "degraded",
-            "whisper": "available" if whisper_available else "unavailable",
-            "model": WHISPER_MODEL
-        }
+        audio = await decode_audio(audio_bytes, suffix)
+    except AudioDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Cannot decode audio: {e}")
+    duration = len(audio) / SAMPLE_RATE
+    try:
+        result = await engine.transcribe(audio, language)
+    except EngineBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except EngineNotReady as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        logger.error(f"Health check failed: {e}")
-        return {
-            "status": "unhealthy",
-            "error": str(e)
-        }
+        logger.error(f"❌ Whisper error: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Whisper error: {e}")
+    text = result.get('text', '').strip()
+    logger.info(f"✅ Transcribed {duration:.1f}s: '{text[:50]}...'")
+    return text, result.get('language') or language, duration
 
 @app.post("/api/stt", response_model=STTResponse)
 async def speech_to_text(request: STTRequest):
@@ -97,84 +127,31 @@ async def speech_to_text(request: STTRequest):
         "model": "base"
     }
     """
+    logger.info("📥 Received STT request")
+    
+    # Декодувати base64 audio
+    audio_data = request.audio
+    if ',' in audio_data:
+        audio_data = audio_data.split(',')[1]
+    
     try:
-        logger.info("📥 Received STT request")
-        
-        # Декодувати base64 audio
-        audio_data = request.audio
-        if ',' in audio_data:
-            audio_data = audio_data.split(',')[1]
-        
         audio_bytes = base64.b64decode(audio_data)
-        logger.info(f"📊 Audio size: {len(audio_bytes)} bytes")
-        
-        # Зберегти у тимчасовий файл
-        with tempfile.NamedTemporaryFile(suffix='.webm', delete=False) as temp_audio:
-            temp_audio.write(audio_bytes)
-            audio_path = temp_audio.name
-        
-        try:
-            # Запустити Whisper
-            model = request.model or WHISPER_MODEL
-            language = request.language or LANGUAGE
-            
-            logger.info(f"🎤 Running Whisper (model={model}, language={language})")
-            
-            # Whisper CLI команда
-            cmd = [
-                "whisper",
-                audio_path,
-                "--model", model,
-                "--language", language,
-                "--output_format", "json",
-                "--output_dir", tempfile.gettempdir()
-            ]
-            
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
-            
-            if result.returncode != 0:
-                error_msg = result.stderr or "Whisper failed"
-                logger.error(f"❌ Whisper error: {error_msg}")
-                raise HTTPException(status_code=500, detail=f"Whisper error: {error_msg}")
-            
-            # Прочитати результат
-            json_path = audio_path.replace('.webm', '.json')
-            with open(json_path, 'r', encoding='utf-8') as f:
-                whisper_result = json.load(f)
-            
-            text = whisper_result.get('text', '').strip()
-            
-            # Очистити тимчасові файли
-            os.unlink(audio_path)
-            if os.path.exists(json_path):
-                os.unlink(json_path)
-            
-            logger.info(f"✅ Transcribed: '{text[:50]}...'")
-            
-            return STTResponse(
-                text=text,
-                language=language,
-                duration=0.0,  # TODO: отримати з Whisper
-                model=model,
-                confidence=None
-            )
-            
-        except subprocess.TimeoutExpired:
-            os.unlink(audio_path)
-            raise HTTPException(status_code=408, detail="Whisper timeout")
-        except Exception as e:
-            if os.path.exists(audio_path):
-                os.unlink(audio_path)
-            raise
-            
-    except Exception as e:
-        logger.error(f"❌ STT error: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid base64 audio: {e}")
+    logger.info(f"📊 Audio size: {len(audio_bytes)} bytes")
+    
+    if request.model and request.model != WHISPER_MODEL:
+        logger.info(f"ℹ️ Requested model {request.model}, serving with resident {WHISPER_MODEL}")
+    
+    text, language, duration = await _transcribe_bytes(audio_bytes, request.language or LANGUAGE, ".webm")
+    
+    return STTResponse(
+        text=text,
+        language=language,
+        duration=duration,
+        model=WHISPER_MODEL,
+        confidence=None
+    )
 
 @app.post("/api/stt/upload")
 async def stt_upload(file: UploadFile = File(...)):
@@ -182,71 +159,64 @@ async def stt_upload(file: UploadFile = File(...)):
     Конвертує завантажений аудіо файл в текст
     
     Form-data:
-    - file: audio file (webm, mp3, wav, m4a)
+    - file: audio file (webm, mp3, wav, m4a, ogg)
     """
+    logger.info(f"📥 Received file upload: {file.filename}")
+    content = await file.read()
+    logger.info(f"📊 File size: {len(content)} bytes")
+    
+    text, language, duration = await _transcribe_bytes(
+        content, LANGUAGE, os.path.splitext(file.filename or "")[1]
+    )
+    
+    return {
+        "text": text,
+        "filename": file.filename,
+        "language": language,
+        "duration": duration,
+        "model": WHISPER_MODEL
+    }
+
+@app.post("/api/stt/stream")
+async def stt_stream(file: UploadFile = File(...), language: Optional[str] = None):
+    """
+    Потокова транскрипція довгих голосових
+    
+    Відповідь - NDJSON: рядок на кожен шматок (~WHISPER_CHUNK_S секунд)
+    одразу після його розпізнавання, в кінці - {"done": true, "text": ...}
+    """
+    logger.info(f"📥 Received stream upload: {file.filename}")
+    content = await file.read()
     try:
-        logger.info(f"📥 Received file upload: {file.filename}")
-        
-        # Зберегти у тимчасовий файл
-        with tempfile.NamedTemporaryFile(suffix=os.path.splitext(file.filename)[1], delete=False) as temp_audio:
-            content = await file.read()
-            temp_audio.write(content)
-            audio_path = temp_audio.name
-        
-        logger.info(f"📊 File size: {len(content)} bytes")
-        
+        audio = await decode_audio(content, os.path.splitext(file.filename or "")[1])
+    except AudioDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Cannot decode audio: {e}")
+    if not engine.loaded:
+        raise HTTPException(status_code=503, detail=f"STT engine not ready: {engine.load_error or 'loading'}")
+    
+    async def events():
+        texts = []
         try:
-            # Запустити Whisper
-            cmd = [
-                "whisper",
-                audio_path,
-                "--model", WHISPER_MODEL,
-                "--language", LANGUAGE,
-                "--output_format", "json",
-                "--output_dir", tempfile.gettempdir()
-            ]
-            
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
-            
-            if result.returncode != 0:
-                error_msg = result.stderr or "Whisper failed"
-                logger.error(f"❌ Whisper error: {error_msg}")
-                raise HTTPException(status_code=500, detail=f"Whisper error: {error_msg}")
-            
-            # Прочитати результат
-            json_path = audio_path.replace(os.path.splitext(audio_path)[1], '.json')
-            with open(json_path, 'r', encoding='utf-8') as f:
-                whisper_result = json.load(f)
-            
-            text = whisper_result.get('text', '').strip()
-            
-            # Очистити тимчасові файли
-            os.unlink(audio_path)
-            if os.path.exists(json_path):
-                os.unlink(json_path)
-            
-            logger.info(f"✅ Transcribed: '{text[:50]}...'")
-            
-            return {
-                "text": text,
-                "filename": file.filename,
-                "language": LANGUAGE,
-                "model": WHISPER_MODEL
-            }
-            
+            async for chunk in engine.transcribe_chunks(audio, language or LANGUAGE):
+                texts.append(chunk["text"])
+                yield json.dumps(chunk, ensure_ascii=False) + "\n"
         except Exception as e:
-            if os.path.exists(audio_path):
-                os.unlink(audio_path)
-            raise
-            
-    except Exception as e:
-        logger.error(f"❌ Upload STT error: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+            logger.error(f"❌ Stream STT error: {e}", exc_info=True)
+            yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+            return
+        yield json.dumps({
+            "done": True,
+            "text": " ".join(t for t in texts if t),
+            "duration": round(len(audio) / SAMPLE_RATE, 2),
+            "model": WHISPER_MODEL
+        }, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.get("/api/stt/stats")
+async def stt_stats():
+    """Черга, воркери, час очікування/транскрипції"""
+    return engine.stats()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+CPU benchmark for stt-service: a batch of short voice clips
+
+Compares, on the same clips:
+  - cli:        `whisper <file>` subprocess per clip, as the service did
+                before the resident engine (model load + decode every time)
+  - resident:   TranscriptionEngine, one clip at a time
+  - concurrent: TranscriptionEngine, all clips submitted at once
+                (--workers model instances, bounded queue)
+
+Clips are Telegram-style voice notes (.ogg/.oga/.opus, any ffmpeg format
+works). Without --clips, --count synthetic clips of 3-15 s are generated
+with ffmpeg (tones + noise, so only timing is meaningful, not text).
+
+Reported: clips/s, mean / p95 latency per clip and real-time factor
+(processing seconds per audio second).
+
+Usage:
+    python bench_stt.py [--clips 'voices/*.ogg'] [--count 20] [--model base] [--workers 2] [--skip-cli]
+"""
+import argparse
+import asyncio
+import glob
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+
+from app.engine import SAMPLE_RATE, TranscriptionEngine, decode_audio
+
+
+def synth_clips(directory: str, count: int, seed: int):
+    """Opus voice-note stand-ins: a few tones mixed with noise"""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        duration = rng.uniform(3, 15)
+        path = os.path.join(directory, f"clip_{i:03d}.ogg")
+        subprocess.run(
+            [
+                "ffmpeg", "-nostdin", "-loglevel", "error", "-y",
+                "-f", "lavfi", "-i", f"sine=frequency={rng.randint(120, 400)}:duration={duration:.2f}",
+                "-f", "lavfi", "-i", f"anoisesrc=amplitude=0.05:duration={duration:.2f}",
+                "-filter_complex", "amix=inputs=2", "-ac", "1", "-ar", "48000",
+                "-c:a", "libopus", "-b:a", "24k", path,
+            ],
+            check=True,
+        )
+        paths.append(path)
+    return paths
+
+
+def report(name: str, latencies, elapsed: float, audio_s: float):
+    latencies = sorted(latencies)
+    print(
+        f"{name:<11} {len(latencies) / elapsed:7.2f} clips/s  "
+        f"mean {sum(latencies) / len(latencies):6.2f}s  "
+        f"p95 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]:6.2f}s  "
+        f"RTF {elapsed / audio_s:5.3f}  total {elapsed:6.1f}s"
+    )
+
+
+def run_cli(paths, args):
+    latencies = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        start = time.perf_counter()
+        for path in paths:
+            clip_start = time.perf_counter()
+            subprocess.run(
+                [
+                    "whisper", path, "--model", args.model, "--language", args.language,
+                    "--device", "cpu", "--fp16", "False", "--output_dir", out_dir, "--output_format", "txt",
+                ],
+                check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            latencies.append(time.perf_counter() - clip_start)
+        return latencies, time.perf_counter() - start
+
+
+async def run_engine(paths, args, concurrent: bool):
+    engine = TranscriptionEngine(
+        model_name=args.model, language=args.language, workers=args.workers,
+        queue_size=max(len(paths), 1), device="cpu",
+    )
+    await engine.start()
+    if not engine.loaded:
+        raise SystemExit(f"engine failed to start: {engine.load_error}")
+    print(f"  (model load {engine.load_seconds:.1f}s, {engine.workers} worker(s), not counted)")
+
+    blobs = []
+    for path in paths:
+        with open(path, "rb") as f:
+            blobs.append((f.read(), os.path.splitext(path)[1]))
+
+    async def one(data, suffix):
+        clip_start = time.perf_counter()
+        audio = await decode_audio(data, suffix)
+        await engine.transcribe(audio)
+        return time.perf_counter() - clip_start
+
+    start = time.perf_counter()
+    if concurrent:
+        latencies = await asyncio.gather(*(one(*blob) for blob in blobs))
+    else:
+        latencies = [await one(*blob) for blob in blobs]
+    elapsed = time.perf_counter() - start
+    await engine.stop()
+    return list(latencies), elapsed
+
+
+async def main_async(args, paths):
+    audio_s = 0.0
+    for path in paths:
+        with open(path, "rb") as f:
+            audio_s += len(await decode_audio(f.read(), os.path.splitext(path)[1])) / SAMPLE_RATE
+    print(f"\n{len(paths)} clips, {audio_s:.0f}s audio (avg {audio_s / len(paths):.1f}s), "
+          f"model {args.model}, CPU\n")
+
+    if not args.skip_cli:
+        if shutil.which("whisper"):
+            report("cli", *run_cli(paths, args), audio_s)
+        else:
+            print("cli         skipped: `whisper` CLI not on PATH")
+    print("resident:")
+    report("resident", *(await run_engine(paths, args, concurrent=False)), audio_s)
+    print("concurrent:")
+    report("concurrent", *(await run_engine(paths, args, concurrent=True)), audio_s)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="stt-service CPU benchmark")
+    parser.add_argument("--clips", help="glob of audio files, e.g. 'voices/*.ogg'")
+    parser.add_argument("--count", type=int, default=20, help="synthetic clips when --clips is not given")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--language", default="uk")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--skip-cli", action="store_true")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as clip_dir:
+        paths = sorted(glob.glob(args.clips)) if args.clips else synth_clips(clip_dir, args.count, args.seed)
+        if not paths:
+            raise SystemExit(f"no clips match {args.clips}")
+        asyncio.run(main_async(args, paths))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,26 @@
 """
 Swapper Service - Dynamic Model Loading Service
 Manages loading/unloading LLM models on-demand to optimize memory usage.
-Supports single-active model mode (one model loaded at a time).
+Supports single-active mode (one model loaded at a time) and multi-active
+mode (as many models as fit in a memory budget, priority-weighted LRU eviction).
 """
 
 import os
 import asyncio
 import logging
-from typing import Optional, Dict, List, Any
+import time
+from typing import Optional, Dict, List, Any, Iterable, Callable, Union
 from datetime import datetime, timedelta
 from enum import Enum
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import httpx
 import yaml
 
+from app.scheduler import SwapScheduler, ModelLoadError
+
 logger = logging.getLogger(__name__)
 
 # ========== Configuration ==========
@@ -24,8 +28,24 @@ logger = logging.getLogger(__name__)
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 SWAPPER_CONFIG_PATH = os.getenv("SWAPPER_CONFIG_PATH", "./config/swapper_config.yaml")
 SWAPPER_MODE = os.getenv("SWAPPER_MODE", "single-active")  # single-active or multi-active
-MAX_CONCURRENT_MODELS = int(os.getenv("MAX_CONCURRENT_MODELS", "1"))
+# Multi-active limits; unset = swapper.max_concurrent_models / swapper.memory_budget_gb
+# from the config file, 0 = no limit
+MAX_CONCURRENT_MODELS = os.getenv("MAX_CONCURRENT_MODELS")
+SWAPPER_MEMORY_BUDGET_GB = os.getenv("SWAPPER_MEMORY_BUDGET_GB")
 MODEL_SWAP_TIMEOUT = int(os.getenv("MODEL_SWAP_TIMEOUT", "30"))
+# Scheduler: keep a loaded model at least this long, and never let a queued
+# request for another model wait longer than SWAPPER_MAX_WAIT_S before the
+# active model stops taking new requests
+SWAPPER_MIN_RESIDENCY_S = float(os.getenv("SWAPPER_MIN_RESIDENCY_S", "10"))
+SWAPPER_MAX_WAIT_S = float(os.getenv("SWAPPER_MAX_WAIT_S", "60"))
+
+# Ollama keep_alive values: -1 keeps a model loaded until told otherwise, 0 unloads it
+KEEP_LOADED = -1
+UNLOAD_NOW = 0
+
+# Eviction weight per priority: idle time is divided by it, so a high-priority
+# model has to sit idle 3x as long as a low-priority one to be evicted first
+PRIORITY_WEIGHTS = {"high": 3.0, "medium": 2.0, "low": 1.0}
 
 # ========== Models ==========
 
@@ -49,6 +69,9 @@ class ModelInfo(BaseModel):
     unloaded_at: Optional[datetime] = None
     total_uptime_seconds: float = 0.0
     request_count: int = 0
+    hits: int = 0  # Requests served by an already loaded model
+    misses: int = 0  # Requests that waited for a cold load
+    evictions: int = 0  # Unloaded to make room for another model
 
 class SwapperStatus(BaseModel):
     """Swapper service status"""
@@ -58,6 +81,16 @@ class SwapperStatus(BaseModel):
     loaded_models: List[str]
     mode: str
     total_models: int
+    memory_budget_gb: float = 0.0  # 0 = no limit
+    memory_used_gb: float = 0.0
+    max_loaded_models: int = 0  # 0 = no limit
+
+class GenerateRequest(BaseModel):
+    """Generation request, forwarded to Ollama /api/generate"""
+    model: str  # Swapper model name or Ollama name
+    prompt: str
+    system: Optional[str] = None
+    options: Optional[Dict[str, Any]] = None
 
 class ModelMetrics(BaseModel):
     """Model usage metrics"""
@@ -67,6 +100,10 @@ class ModelMetrics(BaseModel):
     uptime_hours: float
     request_count: int
     total_uptime_seconds: float
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    hit_rate: Optional[float] = None
 
 # ========== Swapper Service ==========
 
@@ -80,6 +117,9 @@ class SwapperService:
         self.http_client = httpx.AsyncClient(timeout=300.0)
         self.model_uptime: Dict[str, float] = {}  # Track uptime per model
         self.model_load_times: Dict[str, datetime] = {}  # Track when model was loaded
+        self.last_used: Dict[str, float] = {}  # monotonic time of last use (LRU)
+        self.memory_budget_gb = float(SWAPPER_MEMORY_BUDGET_GB or 0)
+        self.max_loaded = int(MAX_CONCURRENT_MODELS or 0)
         
     async def initialize(self):
         """Initialize Swapper Service - load configuration"""
@@ -116,9 +156,20 @@ class SwapperService:
             logger.info(f"✅ Swapper Service initialized with {len(self.models)} models")
             logger.info(f"✅ Model names: {list(self.models.keys())}")
             
-            # Завантажити модель за замовчанням, якщо вказано в конфігурації
             if config:
                 swapper_config = config.get('swapper', {})
+                if SWAPPER_MEMORY_BUDGET_GB is None:
+                    self.memory_budget_gb = float(swapper_config.get('memory_budget_gb', 0) or 0)
+                if MAX_CONCURRENT_MODELS is None:
+                    self.max_loaded = int(swapper_config.get('max_concurrent_models', 0) or 0)
+            if SWAPPER_MODE == "multi-active":
+                logger.info(
+                    f"✅ Multi-active: budget {self.memory_budget_gb or 'unlimited'} GB, "
+                    f"max {self.max_loaded or 'unlimited'} models"
+                )
+            
+            # Завантажити модель за замовчанням, якщо вказано в конфігурації
+            if config:
                 default_model = swapper_config.get('default_model')
                 
                 if default_model and default_model in self.models:
@@ -135,6 +186,15 @@ class SwapperService:
             import traceback
             logger.error(f"❌ Traceback: {traceback.format_exc()}")
     
+    def resolve_model(self, name: str) -> Optional[str]:
+        """Swapper model name for a model or Ollama name"""
+        if name in self.models:
+            return name
+        for model_name, model_info in self.models.items():
+            if model_info.ollama_name == name:
+                return model_name
+        return None
+    
     async def _load_models_from_ollama(self):
         """Load available models from Ollama"""
         try:
@@ -162,8 +222,21 @@ class SwapperService:
         except Exception as e:
             logger.error(f"❌ Error loading models from Ollama: {e}")
     
-    async def load_model(self, model_name: str) -> bool:
-        """Load a model (unload current if in single-active mode)"""
+    async def load_model(
+        self,
+        model_name: str,
+        protected: Union[Iterable[str], Callable[[], Iterable[str]]] = ()
+    ) -> bool:
+        """
+        Load a model
+        
+        single-active: unload the current model first
+        multi-active: unload models (priority-weighted LRU, never `protected`)
+        until the new one fits the memory budget and model count limit
+        
+        `protected` may be a callable: it is read under loading_lock, so models
+        admitted while this call waited for the lock are not evicted
+        """
         async with self.loading_lock:
             try:
                 # Check if model exists
@@ -172,22 +245,32 @@ class SwapperService:
                     return False
                 
                 model_info = self.models[model_name]
+                if model_info.status == ModelStatus.LOADED:
+                    self.active_model = model_name
+                    self.last_used[model_name] = time.monotonic()
+                    return True
                 
-                # If single-active mode and another model is loaded, unload it first
-                if SWAPPER_MODE == "single-active" and self.active_model and self.active_model != model_name:
-                    await self._unload_model_internal(self.active_model)
+                if callable(protected):
+                    protected = protected()
+                victims = self.eviction_plan(model_name, set(protected) - {model_name})
+                if victims is None:
+                    logger.warning(f"⚠️ No room for {model_name}: memory is held by models in use")
+                    return False
+                # Before the first await: no request is admitted to a victim from here on
+                for victim in victims:
+                    self.models[victim].status = ModelStatus.UNLOADING
+                for victim in victims:
+                    await self._unload_model_internal(victim, evicted=True)
                 
-                # Load the model
+                # Load the model (keep_alive only, no generation)
                 logger.info(f"🔄 Loading model: {model_name}")
                 model_info.status = ModelStatus.LOADING
                 
-                # Check if model is already loaded in Ollama
                 response = await self.http_client.post(
                     f"{OLLAMA_BASE_URL}/api/generate",
                     json={
                         "model": model_info.ollama_name,
-                        "prompt": "test",
-                        "stream": False
+                        "keep_alive": KEEP_LOADED
                     },
                     timeout=MODEL_SWAP_TIMEOUT
                 )
@@ -198,6 +281,7 @@ class SwapperService:
                     model_info.unloaded_at = None
                     self.active_model = model_name
                     self.model_load_times[model_name] = datetime.now()
+                    self.last_used[model_name] = time.monotonic()
                     logger.info(f"✅ Model loaded: {model_name}")
                     return True
                 else:
@@ -211,7 +295,88 @@ class SwapperService:
                     self.models[model_name].status = ModelStatus.ERROR
                 return False
     
-    async def _unload_model_internal(self, model_name: str) -> bool:
+    def loaded_models(self) -> List[str]:
+        return [name for name, model in self.models.items() if model.status == ModelStatus.LOADED]
+    
+    def memory_used_gb(self) -> float:
+        return sum(self.models[name].size_gb for name in self.loaded_models())
+    
+    def _eviction_score(self, model_name: str, now: float) -> float:
+        """Higher = evict first: idle time weighted down by priority"""
+        idle = now - self.last_used.get(model_name, 0.0)
+        return idle / PRIORITY_WEIGHTS.get(self.models[model_name].priority, 1.0)
+    
+    def _fits(self, used_gb: float, count: int, size_gb: float) -> bool:
+        if self.memory_budget_gb > 0 and used_gb + size_gb > self.memory_budget_gb:
+            return False
+        return self.max_loaded <= 0 or count + 1 <= self.max_loaded
+    
+    def eviction_plan(self, model_name: str, protected: Iterable[str] = ()) -> Optional[List[str]]:
+        """
+        Models to unload before `model_name` can be loaded
+        
+        [] when it is loaded or fits as is; None when it only fits after
+        unloading a `protected` (in use) model
+        """
+        if self.models[model_name].status == ModelStatus.LOADED:
+            return []
+        protected = set(protected)
+        loaded = [name for name in self.loaded_models() if name != model_name]
+        
+        if SWAPPER_MODE == "single-active":
+            return None if protected.intersection(loaded) else loaded
+        
+        now = time.monotonic()
+        candidates = sorted(
+            (name for name in loaded if name not in protected),
+            key=lambda name: self._eviction_score(name, now),
+            reverse=True
+        )
+        used = sum(self.models[name].size_gb for name in loaded)
+        count = len(loaded)
+        size = self.models[model_name].size_gb
+        victims = []
+        for name in candidates:
+            if self._fits(used, count, size):
+                break
+            victims.append(name)
+            used -= self.models[name].size_gb
+            count -= 1
+        # A model larger than the whole budget still loads when it is alone
+        if not self._fits(used, count, size) and count > 0:
+            return None
+        return victims
+    
+    def predict(self, model_name: str, protected: Iterable[str] = ()) -> Dict[str, Any]:
+        """Whether a request for `model_name` right now would hit a loaded model"""
+        model_info = self.models[model_name]
+        resident = model_info.status == ModelStatus.LOADED
+        if SWAPPER_MODE == "single-active":
+            resident = resident and self.active_model == model_name
+        victims = None if resident else self.eviction_plan(model_name, protected)
+        return {
+            "model": model_name,
+            "resident": resident,
+            "cold_load": not resident,
+            "evicts": victims or [],
+            # Needs memory held by in-flight requests: waits for them first
+            "waits_for_memory": not resident and victims is None,
+            "size_gb": model_info.size_gb,
+            "memory_used_gb": round(self.memory_used_gb(), 2),
+            "memory_budget_gb": self.memory_budget_gb
+        }
+    
+    def record_use(self, model_name: str, cold: bool):
+        """Count a request served by `model_name` (cold = waited for a load)"""
+        model_info = self.models[model_name]
+        model_info.request_count += 1
+        if cold:
+            model_info.misses += 1
+        else:
+            model_info.hits += 1
+        self.last_used[model_name] = time.monotonic()
+    
+    async def _unload_model_internal(self, model_name: str, evicted: bool = False) -> bool:
         """Internal method to unload a model"""
         try:
             if model_name not in self.models:
@@ -219,10 +384,26 @@ class SwapperService:
             
             model_info = self.models[model_name]
             
-            if model_info.status == ModelStatus.LOADED:
-                logger.info(f"🔄 Unloading model: {model_name}")
+            # UNLOADING: picked as an eviction victim by load_model
+            if model_info.status in (ModelStatus.LOADED, ModelStatus.UNLOADING):
+                logger.info(f"🔄 Unloading model: {model_name}" + (" (evicted)" if evicted else ""))
                 model_info.status = ModelStatus.UNLOADING
                 
+                # Ask Ollama to drop the model from memory now
+                try:
+                    response = await self.http_client.post(
+                        f"{OLLAMA_BASE_URL}/api/generate",
+                        json={
+                            "model": model_info.ollama_name,
+                            "keep_alive": UNLOAD_NOW
+                        },
+                        timeout=MODEL_SWAP_TIMEOUT
+                    )
+                    if response.status_code != 200:
+                        logger.warning(f"⚠️ Ollama unload of {model_name} returned HTTP {response.status_code}")
+                except httpx.HTTPError as e:
+                    logger.warning(f"⚠️ Ollama unload of {model_name} failed: {e}")
+                
                 # Calculate uptime
                 if model_name in self.model_load_times:
                     load_time = self.model_load_times[model_name]
@@ -233,6 +414,8 @@ class SwapperService:
                 
                 model_info.status = ModelStatus.UNLOADED
                 model_info.unloaded_at = datetime.now()
+                if evicted:
+                    model_info.evictions += 1
                 
                 if self.active_model == model_name:
                     self.active_model = None
@@ -244,6 +427,7 @@ class SwapperService:
             logger.error(f"❌ Error unloading model {model_name}: {e}")
             return False
     
+
     async def unload_model(self, model_name: str) -> bool:
         """Unload a model"""
         async with self.loading_lock:
@@ -258,18 +442,16 @@ class SwapperService:
             self.model_uptime[self.active_model] = self.model_uptime.get(self.active_model, 0.0) + current_uptime
             self.model_load_times[self.active_model] = datetime.now()  # Reset timer
         
-        loaded_models = [
-            name for name, model in self.models.items()
-            if model.status == ModelStatus.LOADED
-        ]
-        
         return SwapperStatus(
             status="healthy",
             active_model=self.active_model,
             available_models=list(self.models.keys()),
-            loaded_models=loaded_models,
+            loaded_models=self.loaded_models(),
             mode=SWAPPER_MODE,
-            total_models=len(self.models)
+            total_models=len(self.models),
+            memory_budget_gb=self.memory_budget_gb,
+            memory_used_gb=round(self.memory_used_gb(), 2),
+            max_loaded_models=self.max_loaded
         )
     
     async def get_model_metrics(self, model_name: Optional[str] = None) -> List[ModelMetrics]:
@@ -292,6 +474,7 @@ class SwapperService:
                 uptime_seconds += current_uptime
             
             uptime_hours = uptime_seconds / 3600.0
+            lookups = model_info.hits + model_info.misses
             
             metrics.append(ModelMetrics(
                 model_name=name,
@@ -299,7 +482,11 @@ class SwapperService:
                 loaded_at=model_info.loaded_at,
                 uptime_hours=uptime_hours,
                 request_count=model_info.request_count,
-                total_uptime_seconds=uptime_seconds
+                total_uptime_seconds=uptime_seconds,
+                hits=model_info.hits,
+                misses=model_info.misses,
+                evictions=model_info.evictions,
+                hit_rate=round(model_info.hits / lookups, 4) if lookups else None
             ))
         
         return metrics
@@ -335,6 +522,14 @@ except ImportError:
 # Global Swapper instance
 swapper = SwapperService()
 
+# Requests go through the scheduler so swaps happen between batches, not mid-request
+scheduler = SwapScheduler(
+    swapper,
+    exclusive=SWAPPER_MODE == "single-active",
+    min_residency_s=SWAPPER_MIN_RESIDENCY_S,
+    max_wait_s=SWAPPER_MAX_WAIT_S
+)
+
 @app.on_event("startup")
 async def startup():
     """Initialize Swapper on startup"""
@@ -401,11 +596,68 @@ async def get_model_info(model_name: str):
 
 @app.post("/models/{model_name}/load")
 async def load_model_endpoint(model_name: str):
-    """Load a model"""
-    success = await swapper.load_model(model_name)
-    if success:
-        return {"status": "success", "model": model_name, "message": f"Model {model_name} loaded"}
-    raise HTTPException(status_code=500, detail=f"Failed to load model: {model_name}")
+    """Load a model (queued behind in-flight requests for the active model)"""
+    if model_name not in swapper.models:
+        raise HTTPException(status_code=404, detail=f"Model not found: {model_name}")
+    try:
+        async with scheduler.acquire(model_name):
+            pass
+    except ModelLoadError:
+        raise HTTPException(status_code=500, detail=f"Failed to load model: {model_name}")
+    return {"status": "success", "model": model_name, "message": f"Model {model_name} loaded"}
+
+@app.get("/models/{model_name}/prediction")
+async def predict_model(model_name: str):
+    """Whether a request for this model would be served warm or need a cold load"""
+    resolved = swapper.resolve_model(model_name)
+    if not resolved:
+        raise HTTPException(status_code=404, detail=f"Model not found: {model_name}")
+    prediction = swapper.predict(resolved, scheduler.in_use())
+    prediction["queued"] = scheduler.queued(resolved)
+    return prediction
+
+@app.post("/generate")
+async def generate(request: GenerateRequest, response: Response):
+    """
+    Generate with a model, loading it if needed
+    
+    Waits in the scheduler queue for the model; the model stays loaded
+    until the generation finishes. X-Swapper-Cold-Load tells whether the
+    model had to be loaded for this request.
+    """
+    model_name = swapper.resolve_model(request.model)
+    if not model_name:
+        raise HTTPException(status_code=404, detail=f"Model not found: {request.model}")
+    
+    payload = {
+        "model": swapper.models[model_name].ollama_name,
+        "prompt": request.prompt,
+        "stream": False,
+        # Otherwise Ollama resets the model to its default 5 min keep-alive
+        "keep_alive": KEEP_LOADED
+    }
+    if request.system:
+        payload["system"] = request.system
+    if request.options:
+        payload["options"] = request.options
+    
+    try:
+        async with scheduler.acquire(model_name) as cold:
+            ollama_response = await swapper.http_client.post(f"{OLLAMA_BASE_URL}/api/generate", json=payload)
+    except ModelLoadError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Ollama error: {e}")
+    
+    if ollama_response.status_code != 200:
+        raise HTTPException(status_code=502, detail=f"Ollama error: HTTP {ollama_response.status_code}")
+    response.headers["X-Swapper-Cold-Load"] = "true" if cold else "false"
+    return ollama_response.json()
+
+@app.get("/scheduler")
+async def get_scheduler_status():
+    """Scheduler queues, swaps and wait times"""
+    return scheduler.stats()
 
 @app.post("/models/{model_name}/unload")
 async def unload_model_endpoint(model_name: str):
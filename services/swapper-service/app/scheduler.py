@@ -0,0 +1,318 @@
+"""
+Swap-aware request scheduler
+
+Sits in front of SwapperService.load_model. Requests take a lease on a
+model (`async with scheduler.acquire(model)`) for as long as they use it.
+In single-active mode:
+- requests for the active model are admitted right away
+- requests for other models wait in a per-model FIFO queue
+- a swap happens only after the active model's in-flight requests have
+  finished, and not before it has been resident for min_residency_s
+- fairness bound: once another model's oldest request has waited
+  max_wait_s, the active model stops admitting new requests (they queue),
+  drains, and the model whose queue head is oldest is loaded next
+In multi-active mode a request waits only for its own model to load; if it
+only fits by evicting models that are in use, it waits for them to finish.
+Once such a request has waited max_wait_s, requests for loaded models wait
+too, until it gets its memory.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# How many recent waits to keep for stats
+WAIT_WINDOW = 1024
+
+
+class ModelLoadError(Exception):
+    """The model a request waited for could not be loaded"""
+
+
+class _Waiter:
+    __slots__ = ("future", "enqueued_at")
+
+    def __init__(self, future: asyncio.Future, enqueued_at: float):
+        self.future = future
+        self.enqueued_at = enqueued_at
+
+
+class SwapScheduler:
+    """Per-model request queues that drain the active model before swapping"""
+
+    def __init__(
+        self,
+        swapper,
+        exclusive: bool = True,
+        min_residency_s: float = 10.0,
+        max_wait_s: float = 60.0,
+    ):
+        self.swapper = swapper
+        self.exclusive = exclusive
+        self.min_residency_s = min_residency_s
+        self.max_wait_s = max_wait_s
+
+        self._queues: Dict[str, Deque[_Waiter]] = {}
+        self._running: Dict[str, int] = {}
+        # multi-active: models being loaded for a request, requests waiting
+        # for memory, and futures resolved on every release
+        self._loading: Dict[str, int] = {}
+        self._blocked: List[_Waiter] = []
+        self._release_waiters: List[asyncio.Future] = []
+        # Model loaded by the scheduler and when; residency only applies to it
+        self._resident_model: Optional[str] = None
+        self._resident_since = 0.0
+        self._swapping: Optional[str] = None
+        self._swap_task: Optional[asyncio.Task] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self.swaps = 0
+        self.load_failures = 0
+        self.served = 0
+        self._waits: Deque[float] = deque(maxlen=WAIT_WINDOW)
+
+    @asynccontextmanager
+    async def acquire(self, model: str):
+        """
+        Hold `model` loaded for the duration of the block
+
+        Yields True if the request had to wait for the model to be loaded
+        """
+        cold = await self._admit(model)
+        try:
+            yield cold
+        finally:
+            self._release(model)
+
+    def in_use(self) -> Set[str]:
+        """Models that must not be unloaded right now"""
+        return set(self._running) | set(self._loading)
+
+    def queued(self, model: str) -> int:
+        return len(self._queues.get(model, ()))
+
+    async def _admit(self, model: str) -> bool:
+        if model not in self.swapper.models:
+            raise ModelLoadError(f"Model not found: {model}")
+        if not self.exclusive:
+            return await self._admit_shared(model)
+
+        if self._can_admit(model) and not self._queues.get(model):
+            self._grant(model, 0.0, cold=False)
+            return False
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), time.monotonic())
+        self._queues.setdefault(model, deque()).append(waiter)
+        self._schedule()
+        try:
+            return await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted in the same tick the caller was cancelled
+                self._release(model)
+            else:
+                queue = self._queues.get(model)
+                if queue and waiter in queue:
+                    queue.remove(waiter)
+                self._schedule()
+            raise
+
+    async def _admit_shared(self, model: str) -> bool:
+        start = time.monotonic()
+        cold = False
+        blocked: Optional[_Waiter] = None
+        try:
+            while True:
+                needs_memory = False
+                if self._is_loaded(model):
+                    # A request starved for memory goes first
+                    if blocked is not None or not self._starving():
+                        self._grant(model, time.monotonic() - start, cold)
+                        return cold
+                elif self.swapper.eviction_plan(model, self.in_use()) is not None:
+                    cold = True
+                    self._loading[model] = self._loading.get(model, 0) + 1
+                    try:
+                        # In-use set is read under the swapper's loading lock
+                        loaded = await self.swapper.load_model(model, protected=self.in_use)
+                    finally:
+                        self._loading[model] -= 1
+                        if not self._loading[model]:
+                            del self._loading[model]
+                        self._wake()
+                    if loaded:
+                        continue
+                    if self.swapper.eviction_plan(model, self.in_use()) is not None:
+                        self.load_failures += 1
+                        raise ModelLoadError(f"Failed to load model: {model}")
+                    # No room after all: requests admitted while the load waited
+                    # for the lock hold the memory; wait for them like any other
+                    needs_memory = True
+                else:
+                    needs_memory = True
+                if needs_memory and blocked is None:
+                    blocked = _Waiter(None, start)
+                    self._blocked.append(blocked)
+                await self._wait_for_release()
+        finally:
+            if blocked is not None:
+                self._blocked.remove(blocked)
+                self._wake()
+
+    def _starving(self) -> bool:
+        now = time.monotonic()
+        return any(now - waiter.enqueued_at >= self.max_wait_s for waiter in self._blocked)
+
+    async def _wait_for_release(self):
+        future = asyncio.get_running_loop().create_future()
+        self._release_waiters.append(future)
+        await future
+
+    def _wake(self):
+        """Let multi-active waiters re-check memory"""
+        waiters, self._release_waiters = self._release_waiters, []
+        for future in waiters:
+            if not future.done():
+                future.set_result(None)
+
+    def _release(self, model: str):
+        self._running[model] -= 1
+        if not self._running[model]:
+            del self._running[model]
+        if self.exclusive:
+            self._schedule()
+        else:
+            self._wake()
+
+    def _grant(self, model: str, waited_s: float, cold: bool):
+        self._running[model] = self._running.get(model, 0) + 1
+        self.served += 1
+        self._waits.append(waited_s)
+        self.swapper.record_use(model, cold)
+
+    def _is_loaded(self, model: str) -> bool:
+        info = self.swapper.models.get(model)
+        return info is not None and info.status == "loaded"
+
+    def _residency_left(self, now: float) -> float:
+        active = self.swapper.active_model
+        if active is None or active != self._resident_model:
+            return 0.0
+        return max(0.0, self._resident_since + self.min_residency_s - now)
+
+    def _closing(self, now: float) -> bool:
+        """True when another model has waited past the fairness bound"""
+        if self._residency_left(now) > 0:
+            return False
+        active = self.swapper.active_model
+        return any(
+            queue and now - queue[0].enqueued_at >= self.max_wait_s
+            for model, queue in self._queues.items()
+            if model != active
+        )
+
+    def _can_admit(self, model: str) -> bool:
+        return (
+            self._swapping is None
+            and self.swapper.active_model == model
+            and self._is_loaded(model)
+            and not self._closing(time.monotonic())
+        )
+
+    def _grant_queue(self, model: str, cold: bool):
+        queue = self._queues.pop(model, None)
+        if not queue:
+            return
+        now = time.monotonic()
+        for waiter in queue:
+            if not waiter.future.done():
+                waiter.future.set_result(cold)
+                self._grant(model, now - waiter.enqueued_at, cold)
+
+    def _schedule(self):
+        """Admit, wait, or start a swap; called on every arrival and release"""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if self._swapping is not None:
+            return
+
+        active = self.swapper.active_model
+        if active in self._queues and self._can_admit(active):
+            self._grant_queue(active, cold=False)
+
+        waiting = [model for model, queue in self._queues.items() if queue]
+        if not waiting or any(self._running.values()):
+            # Nothing to swap to, or the active model is still draining
+            return
+
+        now = time.monotonic()
+        if active is not None and self._is_loaded(active):
+            residency_left = self._residency_left(now)
+            if residency_left > 0:
+                self._timer = asyncio.get_running_loop().call_later(residency_left, self._schedule)
+                return
+            # The active model's own queue (closed for fairness) waits its turn
+            waiting = [model for model in waiting if model != active] or waiting
+
+        # Oldest queued request goes next
+        target = min(waiting, key=lambda model: self._queues[model][0].enqueued_at)
+        self._swapping = target
+        self._swap_task = asyncio.create_task(self._swap(target))
+
+    async def _swap(self, model: str):
+        previous = self.swapper.active_model
+        queued = len(self._queues.get(model, ()))
+        logger.info(f"🔀 Scheduler: {previous} → {model} ({queued} queued)")
+        try:
+            loaded = await self.swapper.load_model(model)
+        except Exception as e:
+            logger.error(f"❌ Scheduler: loading {model} failed: {e}")
+            loaded = False
+        finally:
+            self._swapping = None
+
+        if loaded:
+            if previous != model:
+                self.swaps += 1
+            self._resident_model = model
+            self._resident_since = time.monotonic()
+            self._grant_queue(model, cold=True)
+        else:
+            self.load_failures += 1
+            error = ModelLoadError(f"Failed to load model: {model}")
+            for waiter in self._queues.pop(model, ()):
+                if not waiter.future.done():
+                    waiter.future.set_exception(error)
+        self._schedule()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        waits: List[float] = sorted(self._waits)
+        return {
+            "mode": "single-active" if self.exclusive else "multi-active",
+            "min_residency_s": self.min_residency_s,
+            "max_wait_s": self.max_wait_s,
+            "active_model": self.swapper.active_model,
+            "swapping_to": self._swapping,
+            "running": dict(self._running),
+            "queued": {model: len(queue) for model, queue in self._queues.items() if queue},
+            "loading": dict(self._loading),
+            "waiting_for_memory": len(self._blocked),
+            "oldest_wait_s": round(
+                max((now - queue[0].enqueued_at for queue in self._queues.values() if queue), default=0.0), 3
+            ),
+            "swaps": self.swaps,
+            "load_failures": self.load_failures,
+            "served": self.served,
+            "wait_s": {
+                "avg": round(sum(waits) / len(waits), 3) if waits else None,
+                "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else None,
+                "max": round(waits[-1], 3) if waits else None,
+            },
+        }
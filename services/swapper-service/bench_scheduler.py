@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Scheduler simulation for swapper-service
+
+Runs SwapperService against a stub Ollama (httpx MockTransport) that holds
+one model at a time: switching models costs --swap-s and waits for
+in-flight generations to finish; a generation takes ~--service-s.
+
+Each workload is replayed twice:
+  - direct:    load_model(model) then generate, as router did before the
+               scheduler (the swapper swaps as soon as another model is named)
+  - scheduler: SwapScheduler.acquire(model) around the generation
+
+Reported: Ollama-level swaps, wait (latency minus generation time) mean /
+p95 / max per request, and total run time.
+
+Usage:
+    python bench_scheduler.py [--requests 300] [--rate 40] [--swap-s 0.3] [--service-s 0.03]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import httpx
+
+from app.main import ModelInfo, ModelStatus, SwapperService, OLLAMA_BASE_URL
+from app.scheduler import SwapScheduler
+
+WORKLOADS = {
+    "alternating": {"model-a": 0.5, "model-b": 0.5},
+    "skewed": {"model-a": 0.7, "model-b": 0.2, "model-c": 0.1},
+    "hot+rare": {"model-a": 0.95, "model-b": 0.05},
+}
+
+
+class StubOllama:
+    """One resident model; swapping waits for in-flight requests, then costs swap_s"""
+
+    def __init__(self, swap_s: float, service_s: float):
+        self.swap_s = swap_s
+        self.service_s = service_s
+        self.resident = None
+        self.inflight = 0
+        self.swaps = 0
+        self.cond = asyncio.Condition()
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        model = body["model"]
+        if body.get("keep_alive") == 0:
+            # Unload request
+            async with self.cond:
+                if self.resident == model and not self.inflight:
+                    self.resident = None
+            return httpx.Response(200, json={"done": True})
+        async with self.cond:
+            while self.resident != model and self.inflight:
+                await self.cond.wait()
+            if self.resident != model:
+                await asyncio.sleep(self.swap_s)
+                self.resident = model
+                self.swaps += 1
+            self.inflight += 1
+        try:
+            # Loads (no prompt) only pay the swap, real prompts carry their duration
+            await asyncio.sleep(body.get("options", {}).get("duration", 0.001))
+        finally:
+            async with self.cond:
+                self.inflight -= 1
+                self.cond.notify_all()
+        return httpx.Response(200, json={"response": "ok", "eval_count": 1})
+
+
+def make_trace(mix, count: int, rate: float, service_s: float, seed: int):
+    """(arrival offset, model, generation time) with Poisson arrivals"""
+    rng = random.Random(seed)
+    models, weights = list(mix), list(mix.values())
+    trace, t = [], 0.0
+    for _ in range(count):
+        t += rng.expovariate(rate)
+        trace.append((t, rng.choices(models, weights)[0], rng.uniform(0.5, 1.5) * service_s))
+    return trace
+
+
+async def run(trace, mix, mode: str, args):
+    stub = StubOllama(args.swap_s, args.service_s)
+    swapper = SwapperService()
+    await swapper.http_client.aclose()
+    swapper.http_client = httpx.AsyncClient(transport=httpx.MockTransport(stub.handle))
+    for name in mix:
+        swapper.models[name] = ModelInfo(
+            name=name, ollama_name=name, type="llm", size_gb=5.0, priority="medium",
+            status=ModelStatus.UNLOADED
+        )
+    scheduler = SwapScheduler(swapper, min_residency_s=args.min_residency_s, max_wait_s=args.max_wait_s)
+    waits = []
+
+    async def generate(model, duration):
+        await swapper.http_client.post(
+            f"{OLLAMA_BASE_URL}/api/generate",
+            json={"model": model, "prompt": "hi", "options": {"duration": duration}},
+        )
+
+    async def request(offset, model, duration):
+        await asyncio.sleep(max(0.0, start + offset - time.monotonic()))
+        arrived = time.monotonic()
+        if mode == "direct":
+            await swapper.load_model(model)
+            await generate(model, duration)
+        else:
+            async with scheduler.acquire(model):
+                await generate(model, duration)
+        waits.append(time.monotonic() - arrived - duration)
+
+    start = time.monotonic()
+    await asyncio.gather(*(request(*item) for item in trace))
+    elapsed = time.monotonic() - start
+    await swapper.close()
+
+    waits.sort()
+    return {
+        "swaps": stub.swaps,
+        "mean": sum(waits) / len(waits),
+        "p95": waits[int(len(waits) * 0.95)],
+        "max": waits[-1],
+        "elapsed": elapsed,
+    }
+
+
+async def main_async(args):
+    print(
+        f"{args.requests} requests/workload at {args.rate}/s, swap {args.swap_s}s, "
+        f"generation ~{args.service_s}s, min residency {args.min_residency_s}s, max wait {args.max_wait_s}s\n"
+    )
+    print(f"{'workload':<12} {'mode':<10} {'swaps':>6} {'mean wait':>10} {'p95 wait':>9} {'max wait':>9} {'total':>7}")
+    for name, mix in WORKLOADS.items():
+        trace = make_trace(mix, args.requests, args.rate, args.service_s, args.seed)
+        for mode in ("direct", "scheduler"):
+            r = await run(trace, mix, mode, args)
+            print(
+                f"{name:<12} {mode:<10} {r['swaps']:>6} {r['mean']:>9.3f}s {r['p95']:>8.3f}s "
+                f"{r['max']:>8.3f}s {r['elapsed']:>6.1f}s"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="swapper-service scheduler simulation")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=40.0, help="arrivals per second")
+    parser.add_argument("--swap-s", type=float, default=0.3)
+    parser.add_argument("--service-s", type=float, default=0.03)
+    parser.add_argument("--min-residency-s", type=float, default=0.5)
+    parser.add_argument("--max-wait-s", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
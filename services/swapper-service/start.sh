@@ -25,6 +25,8 @@ export SWAPPER_CONFIG_PATH=${SWAPPER_CONFIG_PATH:-./config/swapper_config.yaml}
 export SWAPPER_MODE=${SWAPPER_MODE:-single-active}
 export MAX_CONCURRENT_MODELS=${MAX_CONCURRENT_MODELS:-1}
 export MODEL_SWAP_TIMEOUT=${MODEL_SWAP_TIMEOUT:-30}
+export SWAPPER_MIN_RESIDENCY_S=${SWAPPER_MIN_RESIDENCY_S:-10}
+export SWAPPER_MAX_WAIT_S=${SWAPPER_MAX_WAIT_S:-60}
 
 # Start service
 echo "✅ Starting Swapper Service on port 8890..."
@@ -1,10 +1,15 @@
 """
 Usage Data Aggregators
 Queries and aggregates usage data from database
+
+Reads hourly rollups for whole hours of the period, minute rollups for the
+partial hours at its edges and raw rows only for the partial minutes
+(rollups.period_segments), so the cost of a report does not grow with the
+length of the raw history. Latency percentiles come from merged sketches.
 """
 import asyncpg
-from datetime import datetime, timedelta
-from typing import Optional, List
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from models import (
     UsageSummary,
@@ -13,13 +18,82 @@ from models import (
     ToolUsage,
     UsageQueryRequest
 )
+from rollups import ROLLUP_WINDOW, RAW_WINDOW, period_segments
+from sketch import LatencySketch
+
+# (output column, rollup expression, raw expression)
+Column = Tuple[str, str, str]
+
+# Filters on the parameters that follow the 10 window parameters
+MICRODAO_FILTER = "($11::text IS NULL OR microdao_id = $11)"
+AGENT_FILTER = "($12::text IS NULL OR agent_id = $12)"
+
+
+def _stitched(rollup: str, raw: str, columns: Sequence[Column], filters: Sequence[str] = ()) -> str:
+    """Rollup rows and raw tail rows of the period as one row set"""
+    where = "".join(f" AND {f}" for f in filters)
+    rollup_select = ", ".join(f"{expr} AS {name}" for name, expr, _ in columns)
+    raw_select = ", ".join(f"{expr} AS {name}" for name, _, expr in columns)
+    return f"""
+        SELECT {rollup_select} FROM {rollup} WHERE {ROLLUP_WINDOW}{where}
+        UNION ALL
+        SELECT {raw_select} FROM {raw} WHERE {RAW_WINDOW}{where}
+    """
+
+
+def _sketch_bins(
+    rollup: str,
+    raw: str,
+    sketch_column: str,
+    raw_value: str,
+    group: Sequence[Column] = (),
+    filters: Sequence[str] = ()
+) -> str:
+    """Merged sketch bins (group..., sketch_key, n) of rollup sketches and raw tail values"""
+    where = "".join(f" AND {f}" for f in filters)
+    names = [name for name, _, _ in group]
+    rollup_select = "".join(f"{expr} AS {name}, " for name, expr, _ in group)
+    raw_select = "".join(f"{expr} AS {name}, " for name, _, expr in group)
+    group_by = "".join(f"{name}, " for name in names)
+    return f"""
+        SELECT {group_by}sketch_key::int AS sketch_key, SUM(n) AS n
+        FROM (
+            SELECT {rollup_select}s.key AS sketch_key, s.value::bigint AS n
+            FROM {rollup} CROSS JOIN LATERAL jsonb_each_text({sketch_column}) AS s(key, value)
+            WHERE {ROLLUP_WINDOW}{where}
+            UNION ALL
+            SELECT {raw_select}usage_sketch_key({raw_value})::text AS sketch_key, 1 AS n
+            FROM {raw} WHERE {RAW_WINDOW}{where}
+        ) bins
+        GROUP BY {group_by}sketch_key
+    """
+
+
+async def _fetch_sketches(conn, sql: str, args: Sequence, group_size: int = 0) -> Dict[tuple, LatencySketch]:
+    sketches: Dict[tuple, LatencySketch] = {}
+    for row in await conn.fetch(sql, *args):
+        key = tuple(row[i] for i in range(group_size))
+        sketch = sketches.setdefault(key, LatencySketch())
+        sketch.bins[row['sketch_key']] = sketch.bins.get(row['sketch_key'], 0) + int(row['n'])
+    return sketches
+
+
+def _avg(total, count) -> float:
+    return float(total) / float(count) if count else 0.0
+
 
 class UsageAggregator:
     """Aggregates usage data for reporting"""
-    
+
     def __init__(self, db_pool: asyncpg.Pool):
         self.db_pool = db_pool
-    
+
+    @staticmethod
+    def _period(period_hours: int) -> Tuple[datetime, datetime, List[datetime]]:
+        period_end = datetime.now(timezone.utc)
+        period_start = period_end - timedelta(hours=period_hours)
+        return period_start, period_end, period_segments(period_start, period_end)
+
     async def get_summary(
         self,
         microdao_id: Optional[str] = None,
@@ -27,214 +101,275 @@ class UsageAggregator:
         period_hours: int = 24
     ) -> UsageSummary:
         """Get aggregated usage summary"""
-        
-        period_start = datetime.utcnow() - timedelta(hours=period_hours)
-        period_end = datetime.utcnow()
-        
+
+        period_start, period_end, segments = self._period(period_hours)
+        args = [*segments, microdao_id, agent_id]
+        filters = (MICRODAO_FILTER, AGENT_FILTER)
+
         async with self.db_pool.acquire() as conn:
             # LLM stats
-            llm_stats = await conn.fetchrow("""
+            llm_stats = await conn.fetchrow(f"""
                 SELECT
-                    COUNT(*) as calls,
+                    SUM(calls) as calls,
                     SUM(total_tokens) as tokens_total,
                     SUM(prompt_tokens) as tokens_prompt,
                     SUM(completion_tokens) as tokens_completion,
-                    AVG(latency_ms) as latency_avg
-                FROM usage_llm
-                WHERE timestamp >= $1 AND timestamp <= $2
-                    AND ($3::text IS NULL OR microdao_id = $3)
-                    AND ($4::text IS NULL OR agent_id = $4)
-            """, period_start, period_end, microdao_id, agent_id)
-            
+                    SUM(latency_sum_ms) as latency_sum
+                FROM ({_stitched("usage_llm_rollup", "usage_llm", [
+                    ("calls", "calls", "1"),
+                    ("total_tokens", "total_tokens", "total_tokens"),
+                    ("prompt_tokens", "prompt_tokens", "prompt_tokens"),
+                    ("completion_tokens", "completion_tokens", "completion_tokens"),
+                    ("latency_sum_ms", "latency_sum_ms", "latency_ms"),
+                ], filters)}) s
+            """, *args)
+            llm_latency = await _fetch_sketches(conn, _sketch_bins(
+                "usage_llm_rollup", "usage_llm", "latency_sketch", "latency_ms", filters=filters
+            ), args)
+
             # Tool stats
-            tool_stats = await conn.fetchrow("""
+            tool_stats = await conn.fetchrow(f"""
                 SELECT
-                    COUNT(*) as calls,
-                    SUM(CASE WHEN success THEN 1 ELSE 0 END) as success,
-                    SUM(CASE WHEN NOT success THEN 1 ELSE 0 END) as failed,
-                    AVG(latency_ms) as latency_avg
-                FROM usage_tool
-                WHERE timestamp >= $1 AND timestamp <= $2
-                    AND ($3::text IS NULL OR microdao_id = $3)
-                    AND ($4::text IS NULL OR agent_id = $4)
-            """, period_start, period_end, microdao_id, agent_id)
-            
+                    SUM(calls) as calls,
+                    SUM(success_calls) as success,
+                    SUM(latency_sum_ms) as latency_sum
+                FROM ({_stitched("usage_tool_rollup", "usage_tool", [
+                    ("calls", "calls", "1"),
+                    ("success_calls", "success_calls", "CASE WHEN success THEN 1 ELSE 0 END"),
+                    ("latency_sum_ms", "latency_sum_ms", "latency_ms"),
+                ], filters)}) s
+            """, *args)
+            tool_latency = await _fetch_sketches(conn, _sketch_bins(
+                "usage_tool_rollup", "usage_tool", "latency_sketch", "latency_ms", filters=filters
+            ), args)
+
             # Agent stats
-            agent_stats = await conn.fetchrow("""
+            agent_stats = await conn.fetchrow(f"""
                 SELECT
-                    COUNT(*) as invocations,
-                    SUM(CASE WHEN success THEN 1 ELSE 0 END) as success,
-                    SUM(CASE WHEN NOT success THEN 1 ELSE 0 END) as failed
-                FROM usage_agent
-                WHERE timestamp >= $1 AND timestamp <= $2
-                    AND ($3::text IS NULL OR microdao_id = $3)
-                    AND ($4::text IS NULL OR agent_id = $4)
-            """, period_start, period_end, microdao_id, agent_id)
-            
+                    SUM(invocations) as invocations,
+                    SUM(success_invocations) as success,
+                    SUM(duration_sum_ms) as duration_sum
+                FROM ({_stitched("usage_agent_rollup", "usage_agent", [
+                    ("invocations", "invocations", "1"),
+                    ("success_invocations", "success_invocations", "CASE WHEN success THEN 1 ELSE 0 END"),
+                    ("duration_sum_ms", "duration_sum_ms", "duration_ms"),
+                ], filters)}) s
+            """, *args)
+            agent_duration = await _fetch_sketches(conn, _sketch_bins(
+                "usage_agent_rollup", "usage_agent", "duration_sketch", "duration_ms", filters=filters
+            ), args)
+
             # Message stats
-            message_stats = await conn.fetchrow("""
+            message_stats = await conn.fetchrow(f"""
                 SELECT
-                    COUNT(*) as sent,
-                    SUM(message_length) as total_length
-                FROM usage_message
-                WHERE timestamp >= $1 AND timestamp <= $2
-                    AND ($3::text IS NULL OR microdao_id = $3)
-            """, period_start, period_end, microdao_id)
-        
+                    SUM(messages) as sent,
+                    SUM(total_length) as total_length
+                FROM ({_stitched("usage_message_rollup", "usage_message", [
+                    ("messages", "messages", "1"),
+                    ("total_length", "total_length", "message_length"),
+                ], [MICRODAO_FILTER])}) s
+            """, *args[:11])
+
+        llm_calls = int(llm_stats['calls'] or 0)
+        tool_calls = int(tool_stats['calls'] or 0)
+        tool_success = int(tool_stats['success'] or 0)
+        invocations = int(agent_stats['invocations'] or 0)
+        invocations_success = int(agent_stats['success'] or 0)
+        llm_p = llm_latency.get((), LatencySketch()).percentiles()
+        tool_p = tool_latency.get((), LatencySketch()).percentiles()
+        agent_p = agent_duration.get((), LatencySketch()).percentiles()
+
         return UsageSummary(
             period_start=period_start,
             period_end=period_end,
             microdao_id=microdao_id,
             agent_id=agent_id,
-            
-            llm_calls_total=llm_stats['calls'] or 0,
-            llm_tokens_total=llm_stats['tokens_total'] or 0,
-            llm_tokens_prompt=llm_stats['tokens_prompt'] or 0,
-            llm_tokens_completion=llm_stats['tokens_completion'] or 0,
-            llm_latency_avg_ms=float(llm_stats['latency_avg'] or 0),
-            
-            tool_calls_total=tool_stats['calls'] or 0,
-            tool_calls_success=tool_stats['success'] or 0,
-            tool_calls_failed=tool_stats['failed'] or 0,
-            tool_latency_avg_ms=float(tool_stats['latency_avg'] or 0),
-            
-            agent_invocations_total=agent_stats['invocations'] or 0,
-            agent_invocations_success=agent_stats['success'] or 0,
-            agent_invocations_failed=agent_stats['failed'] or 0,
-            
-            messages_sent=message_stats['sent'] or 0,
-            messages_total_length=message_stats['total_length'] or 0
+
+            llm_calls_total=llm_calls,
+            llm_tokens_total=int(llm_stats['tokens_total'] or 0),
+            llm_tokens_prompt=int(llm_stats['tokens_prompt'] or 0),
+            llm_tokens_completion=int(llm_stats['tokens_completion'] or 0),
+            llm_latency_avg_ms=_avg(llm_stats['latency_sum'] or 0, llm_calls),
+            llm_latency_p50_ms=llm_p['p50'],
+            llm_latency_p95_ms=llm_p['p95'],
+            llm_latency_p99_ms=llm_p['p99'],
+
+            tool_calls_total=tool_calls,
+            tool_calls_success=tool_success,
+            tool_calls_failed=tool_calls - tool_success,
+            tool_latency_avg_ms=_avg(tool_stats['latency_sum'] or 0, tool_calls),
+            tool_latency_p50_ms=tool_p['p50'],
+            tool_latency_p95_ms=tool_p['p95'],
+            tool_latency_p99_ms=tool_p['p99'],
+
+            agent_invocations_total=invocations,
+            agent_invocations_success=invocations_success,
+            agent_invocations_failed=invocations - invocations_success,
+            agent_duration_avg_ms=_avg(agent_stats['duration_sum'] or 0, invocations),
+            agent_duration_p50_ms=agent_p['p50'],
+            agent_duration_p95_ms=agent_p['p95'],
+            agent_duration_p99_ms=agent_p['p99'],
+
+            messages_sent=int(message_stats['sent'] or 0),
+            messages_total_length=int(message_stats['total_length'] or 0)
         )
-    
+
     async def get_model_breakdown(
         self,
         microdao_id: Optional[str] = None,
         period_hours: int = 24
     ) -> List[ModelUsage]:
         """Get usage breakdown by model"""
-        
-        period_start = datetime.utcnow() - timedelta(hours=period_hours)
-        period_end = datetime.utcnow()
-        
+
+        _, _, segments = self._period(period_hours)
+        args = [*segments, microdao_id]
+        group = [("model", "model", "model"), ("provider", "provider", "provider")]
+
         async with self.db_pool.acquire() as conn:
-            rows = await conn.fetch("""
+            rows = await conn.fetch(f"""
                 SELECT
                     model,
                     provider,
-                    COUNT(*) as calls,
+                    SUM(calls) as calls,
                     SUM(total_tokens) as tokens,
-                    AVG(latency_ms) as latency_avg
-                FROM usage_llm
-                WHERE timestamp >= $1 AND timestamp <= $2
-                    AND ($3::text IS NULL OR microdao_id = $3)
+                    SUM(latency_sum_ms) as latency_sum
+                FROM ({_stitched("usage_llm_rollup", "usage_llm", group + [
+                    ("calls", "calls", "1"),
+                    ("total_tokens", "total_tokens", "total_tokens"),
+                    ("latency_sum_ms", "latency_sum_ms", "latency_ms"),
+                ], [MICRODAO_FILTER])}) s
                 GROUP BY model, provider
                 ORDER BY tokens DESC
                 LIMIT 20
-            """, period_start, period_end, microdao_id)
-        
-        return [
-            ModelUsage(
+            """, *args)
+            latency = await _fetch_sketches(conn, _sketch_bins(
+                "usage_llm_rollup", "usage_llm", "latency_sketch", "latency_ms", group, [MICRODAO_FILTER]
+            ), args, group_size=2)
+
+        result = []
+        for row in rows:
+            p = latency.get((row['model'], row['provider']), LatencySketch()).percentiles()
+            result.append(ModelUsage(
                 model=row['model'],
                 provider=row['provider'],
-                calls=row['calls'],
-                tokens=row['tokens'] or 0,
-                avg_latency_ms=float(row['latency_avg'] or 0)
-            )
-            for row in rows
-        ]
-    
+                calls=int(row['calls']),
+                tokens=int(row['tokens'] or 0),
+                avg_latency_ms=_avg(row['latency_sum'] or 0, row['calls']),
+                latency_p50_ms=p['p50'],
+                latency_p95_ms=p['p95'],
+                latency_p99_ms=p['p99']
+            ))
+        return result
+
     async def get_agent_breakdown(
         self,
         microdao_id: Optional[str] = None,
         period_hours: int = 24
     ) -> List[AgentUsage]:
         """Get usage breakdown by agent"""
-        
-        period_start = datetime.utcnow() - timedelta(hours=period_hours)
-        period_end = datetime.utcnow()
-        
+
+        _, _, segments = self._period(period_hours)
+        filters = [MICRODAO_FILTER]
+
         async with self.db_pool.acquire() as conn:
-            rows = await conn.fetch("""
+            rows = await conn.fetch(f"""
                 SELECT
                     a.agent_id,
-                    COUNT(DISTINCT a.event_id) as invocations,
-                    COALESCE(SUM(a.llm_calls), 0) as llm_calls,
-                    COALESCE(SUM(a.tool_calls), 0) as tool_calls,
+                    a.invocations,
+                    a.llm_calls,
+                    a.tool_calls,
                     COALESCE(llm.tokens, 0) as total_tokens,
                     COALESCE(msg.messages, 0) as messages_sent
-                FROM usage_agent a
+                FROM (
+                    SELECT
+                        agent_id,
+                        SUM(invocations) as invocations,
+                        SUM(llm_calls) as llm_calls,
+                        SUM(tool_calls) as tool_calls
+                    FROM ({_stitched("usage_agent_rollup", "usage_agent", [
+                        ("agent_id", "agent_id", "agent_id"),
+                        ("invocations", "invocations", "1"),
+                        ("llm_calls", "llm_calls", "COALESCE(llm_calls, 0)"),
+                        ("tool_calls", "tool_calls", "COALESCE(tool_calls, 0)"),
+                    ], filters)}) s
+                    GROUP BY agent_id
+                ) a
                 LEFT JOIN (
                     SELECT agent_id, SUM(total_tokens) as tokens
-                    FROM usage_llm
-                    WHERE timestamp >= $1 AND timestamp <= $2
-                        AND ($3::text IS NULL OR microdao_id = $3)
+                    FROM ({_stitched("usage_llm_rollup", "usage_llm", [
+                        ("agent_id", "agent_id", "COALESCE(agent_id, '')"),
+                        ("total_tokens", "total_tokens", "total_tokens"),
+                    ], filters)}) s
                     GROUP BY agent_id
                 ) llm ON llm.agent_id = a.agent_id
                 LEFT JOIN (
-                    SELECT actor_id, COUNT(*) as messages
-                    FROM usage_message
-                    WHERE timestamp >= $1 AND timestamp <= $2
-                        AND actor_type = 'agent'
-                        AND ($3::text IS NULL OR microdao_id = $3)
-                    GROUP BY actor_id
-                ) msg ON msg.actor_id = a.agent_id
-                WHERE a.timestamp >= $1 AND a.timestamp <= $2
-                    AND ($3::text IS NULL OR a.microdao_id = $3)
-                GROUP BY a.agent_id, llm.tokens, msg.messages
-                ORDER BY invocations DESC
+                    SELECT agent_id, SUM(messages) as messages
+                    FROM ({_stitched("usage_message_rollup", "usage_message", [
+                        ("agent_id", "agent_id", "CASE WHEN actor_type = 'agent' THEN actor_id ELSE '' END"),
+                        ("messages", "messages", "1"),
+                    ], filters)}) s
+                    WHERE agent_id <> ''
+                    GROUP BY agent_id
+                ) msg ON msg.agent_id = a.agent_id
+                ORDER BY a.invocations DESC
                 LIMIT 20
-            """, period_start, period_end, microdao_id)
-        
+            """, *segments, microdao_id)
+
         return [
             AgentUsage(
                 agent_id=row['agent_id'],
-                invocations=row['invocations'],
-                llm_calls=row['llm_calls'],
-                tool_calls=row['tool_calls'],
-                messages_sent=row['messages_sent'],
-                total_tokens=row['total_tokens']
+                invocations=int(row['invocations']),
+                llm_calls=int(row['llm_calls']),
+                tool_calls=int(row['tool_calls']),
+                messages_sent=int(row['messages_sent']),
+                total_tokens=int(row['total_tokens'])
             )
             for row in rows
         ]
-    
+
     async def get_tool_breakdown(
         self,
         microdao_id: Optional[str] = None,
         period_hours: int = 24
     ) -> List[ToolUsage]:
         """Get usage breakdown by tool"""
-        
-        period_start = datetime.utcnow() - timedelta(hours=period_hours)
-        period_end = datetime.utcnow()
-        
+
+        _, _, segments = self._period(period_hours)
+        args = [*segments, microdao_id]
+        group = [("tool_id", "tool_id", "tool_id"), ("tool_name", "tool_name", "tool_name")]
+
         async with self.db_pool.acquire() as conn:
-            rows = await conn.fetch("""
+            rows = await conn.fetch(f"""
                 SELECT
                     tool_id,
                     tool_name,
-                    COUNT(*) as calls,
-                    AVG(CASE WHEN success THEN 1.0 ELSE 0.0 END) as success_rate,
-                    AVG(latency_ms) as latency_avg
-                FROM usage_tool
-                WHERE timestamp >= $1 AND timestamp <= $2
-                    AND ($3::text IS NULL OR microdao_id = $3)
+                    SUM(calls) as calls,
+                    SUM(success_calls) as success,
+                    SUM(latency_sum_ms) as latency_sum
+                FROM ({_stitched("usage_tool_rollup", "usage_tool", group + [
+                    ("calls", "calls", "1"),
+                    ("success_calls", "success_calls", "CASE WHEN success THEN 1 ELSE 0 END"),
+                    ("latency_sum_ms", "latency_sum_ms", "latency_ms"),
+                ], [MICRODAO_FILTER])}) s
                 GROUP BY tool_id, tool_name
                 ORDER BY calls DESC
                 LIMIT 20
-            """, period_start, period_end, microdao_id)
-        
-        return [
-            ToolUsage(
+            """, *args)
+            latency = await _fetch_sketches(conn, _sketch_bins(
+                "usage_tool_rollup", "usage_tool", "latency_sketch", "latency_ms", group, [MICRODAO_FILTER]
+            ), args, group_size=2)
+
+        result = []
+        for row in rows:
+            p = latency.get((row['tool_id'], row['tool_name']), LatencySketch()).percentiles()
+            result.append(ToolUsage(
                 tool_id=row['tool_id'],
                 tool_name=row['tool_name'],
-                calls=row['calls'],
-                success_rate=float(row['success_rate'] or 0),
-                avg_latency_ms=float(row['latency_avg'] or 0)
-            )
-            for row in rows
-        ]
-
-
-
-
-
+                calls=int(row['calls']),
+                success_rate=_avg(row['success'] or 0, row['calls']),
+                avg_latency_ms=_avg(row['latency_sum'] or 0, row['calls']),
+                latency_p50_ms=p['p50'],
+                latency_p95_ms=p['p95'],
+                latency_p99_ms=p['p99']
+            ))
+        return result
@@ -4,7 +4,6 @@ Collects usage events from various services via NATS
 """
 import json
 import asyncio
-import asyncpg
 from datetime import datetime
 from typing import Optional
 
@@ -15,13 +14,14 @@ from models import (
     MessageUsageEvent,
     UsageEventType
 )
+from writer import BufferedUsageWriter
 
 class UsageCollector:
-    """Collects and stores usage events from NATS"""
+    """Collects usage events from NATS and hands them to the batched writer"""
     
-    def __init__(self, nats_client, db_pool: asyncpg.Pool):
+    def __init__(self, nats_client, writer: BufferedUsageWriter):
         self.nc = nats_client
-        self.db_pool = db_pool
+        self.writer = writer
         self.subscriptions = []
     
     async def start(self):
@@ -33,6 +33,11 @@ class UsageCollector:
         self.subscriptions.append(sub_llm)
         print("✅ Subscribed to usage.llm")
         
+        # Batched LLM usage (llm-proxy publishes {"events": [...]})
+        sub_llm_batch = await self.nc.subscribe("usage.llm.batch", cb=self._handle_llm_batch)
+        self.subscriptions.append(sub_llm_batch)
+        print("✅ Subscribed to usage.llm.batch")
+        
         # Subscribe to Tool usage
         sub_tool = await self.nc.subscribe("usage.tool", cb=self._handle_tool_event)
         self.subscriptions.append(sub_tool)
@@ -51,7 +56,7 @@ class UsageCollector:
         print("🎧 All collectors active")
     
     async def stop(self):
-        """Unsubscribe from all subjects"""
+        """Unsubscribe from all subjects (the writer is drained separately)"""
         for sub in self.subscriptions:
             await sub.unsubscribe()
         print("🛑 All collectors stopped")
@@ -65,17 +70,33 @@ class UsageCollector:
         try:
             data = json.loads(msg.data.decode())
             event = LlmUsageEvent(**data)
-            await self._store_llm_event(event)
+            self._store_llm_event(event)
             print(f"📊 LLM usage: {event.model} | {event.total_tokens} tokens | {event.latency_ms}ms")
         except Exception as e:
             print(f"❌ Error handling LLM event: {e}")
     
+    async def _handle_llm_batch(self, msg):
+        """Handle a batch of LLM usage events"""
+        try:
+            events = json.loads(msg.data.decode()).get("events", [])
+        except Exception as e:
+            print(f"❌ Error decoding LLM usage batch: {e}")
+            return
+        stored = 0
+        for data in events:
+            try:
+                self._store_llm_event(LlmUsageEvent(**data))
+                stored += 1
+            except Exception as e:
+                print(f"❌ Error handling LLM event in batch: {e}")
+        print(f"📊 LLM usage batch: {stored}/{len(events)} events")
+    
     async def _handle_tool_event(self, msg):
         """Handle tool usage event"""
         try:
             data = json.loads(msg.data.decode())
             event = ToolUsageEvent(**data)
-            await self._store_tool_event(event)
+            self._store_tool_event(event)
             print(f"📊 Tool usage: {event.tool_id} | success={event.success} | {event.latency_ms}ms")
         except Exception as e:
             print(f"❌ Error handling tool event: {e}")
@@ -85,7 +106,7 @@ class UsageCollector:
         try:
             data = json.loads(msg.data.decode())
             event = AgentInvocationEvent(**data)
-            await self._store_agent_event(event)
+            self._store_agent_event(event)
             print(f"📊 Agent invocation: {event.agent_id} | {event.duration_ms}ms | LLM:{event.llm_calls} Tool:{event.tool_calls}")
         except Exception as e:
             print(f"❌ Error handling agent event: {e}")
@@ -105,81 +126,47 @@ class UsageCollector:
                 message_length=len(data.get("content_preview", "")),
                 metadata={"matrix_event_id": data.get("matrix_event_id")}
             )
-            await self._store_message_event(event)
+            self._store_message_event(event)
             print(f"📊 Message sent: {event.actor_id} | {event.message_length} chars")
         except Exception as e:
             print(f"❌ Error handling message event: {e}")
     
     # ========================================================================
-    # Database Storage
+    # Buffered Storage (rows in writer.TABLE_COLUMNS order)
     # ========================================================================
     
-    async def _store_llm_event(self, event: LlmUsageEvent):
-        """Store LLM usage event to database"""
-        async with self.db_pool.acquire() as conn:
-            await conn.execute("""
-                INSERT INTO usage_llm
-                (event_id, timestamp, actor_id, actor_type, agent_id, microdao_id,
-                 model, provider, prompt_tokens, completion_tokens, total_tokens,
-                 latency_ms, success, error, metadata)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15)
-                ON CONFLICT (event_id) DO NOTHING
-            """,
-                event.event_id, event.timestamp, event.actor_id, event.actor_type.value,
-                event.agent_id, event.microdao_id, event.model, event.provider,
-                event.prompt_tokens, event.completion_tokens, event.total_tokens,
-                event.latency_ms, event.success, event.error,
-                json.dumps(event.metadata or {})
-            )
+    def _store_llm_event(self, event: LlmUsageEvent):
+        """Buffer LLM usage event for the batched writer"""
+        self.writer.add("usage_llm", (
+            event.event_id, event.timestamp, event.actor_id, event.actor_type.value,
+            event.agent_id, event.microdao_id, event.model, event.provider,
+            event.prompt_tokens, event.completion_tokens, event.total_tokens,
+            event.latency_ms, event.success, event.error,
+            json.dumps(event.metadata or {})
+        ))
     
-    async def _store_tool_event(self, event: ToolUsageEvent):
-        """Store tool usage event to database"""
-        async with self.db_pool.acquire() as conn:
-            await conn.execute("""
-                INSERT INTO usage_tool
-                (event_id, timestamp, actor_id, actor_type, agent_id, microdao_id,
-                 tool_id, tool_name, success, latency_ms, error, metadata)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12)
-                ON CONFLICT (event_id) DO NOTHING
-            """,
-                event.event_id, event.timestamp, event.actor_id, event.actor_type.value,
-                event.agent_id, event.microdao_id, event.tool_id, event.tool_name,
-                event.success, event.latency_ms, event.error,
-                json.dumps(event.metadata or {})
-            )
+    def _store_tool_event(self, event: ToolUsageEvent):
+        """Buffer tool usage event for the batched writer"""
+        self.writer.add("usage_tool", (
+            event.event_id, event.timestamp, event.actor_id, event.actor_type.value,
+            event.agent_id, event.microdao_id, event.tool_id, event.tool_name,
+            event.success, event.latency_ms, event.error,
+            json.dumps(event.metadata or {})
+        ))
     
-    async def _store_agent_event(self, event: AgentInvocationEvent):
-        """Store agent invocation event to database"""
-        async with self.db_pool.acquire() as conn:
-            await conn.execute("""
-                INSERT INTO usage_agent
-                (event_id, timestamp, agent_id, microdao_id, channel_id,
-                 trigger, duration_ms, llm_calls, tool_calls, success, error, metadata)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12)
-                ON CONFLICT (event_id) DO NOTHING
-            """,
-                event.event_id, event.timestamp, event.agent_id, event.microdao_id,
-                event.channel_id, event.trigger, event.duration_ms, event.llm_calls,
-                event.tool_calls, event.success, event.error,
-                json.dumps(event.metadata or {})
-            )
+    def _store_agent_event(self, event: AgentInvocationEvent):
+        """Buffer agent invocation event for the batched writer"""
+        self.writer.add("usage_agent", (
+            event.event_id, event.timestamp, event.agent_id, event.microdao_id,
+            event.channel_id, event.trigger, event.duration_ms, event.llm_calls,
+            event.tool_calls, event.success, event.error,
+            json.dumps(event.metadata or {})
+        ))
     
-    async def _store_message_event(self, event: MessageUsageEvent):
-        """Store message usage event to database"""
-        async with self.db_pool.acquire() as conn:
-            await conn.execute("""
-                INSERT INTO usage_message
-                (event_id, timestamp, actor_id, actor_type, microdao_id, channel_id,
-                 message_length, metadata)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-                ON CONFLICT (event_id) DO NOTHING
-            """,
-                event.event_id, event.timestamp, event.actor_id, event.actor_type.value,
-                event.microdao_id, event.channel_id, event.message_length,
-                json.dumps(event.metadata or {})
-            )
-
-
-
-
-
+    def _store_message_event(self, event: MessageUsageEvent):
+        """Buffer message usage event for the batched writer"""
+        self.writer.add("usage_message", (
+            event.event_id, event.timestamp, event.actor_id, event.actor_type.value,
+            event.microdao_id, event.channel_id, event.message_length,
+            json.dumps(event.metadata or {})
+        ))
@@ -98,17 +98,27 @@ class UsageSummary(BaseModel):
     llm_tokens_prompt: int = 0
     llm_tokens_completion: int = 0
     llm_latency_avg_ms: float = 0.0
+    llm_latency_p50_ms: Optional[float] = None
+    llm_latency_p95_ms: Optional[float] = None
+    llm_latency_p99_ms: Optional[float] = None
     
     # Tool stats
     tool_calls_total: int = 0
     tool_calls_success: int = 0
     tool_calls_failed: int = 0
     tool_latency_avg_ms: float = 0.0
+    tool_latency_p50_ms: Optional[float] = None
+    tool_latency_p95_ms: Optional[float] = None
+    tool_latency_p99_ms: Optional[float] = None
     
     # Agent stats
     agent_invocations_total: int = 0
     agent_invocations_success: int = 0
     agent_invocations_failed: int = 0
+    agent_duration_avg_ms: float = 0.0
+    agent_duration_p50_ms: Optional[float] = None
+    agent_duration_p95_ms: Optional[float] = None
+    agent_duration_p99_ms: Optional[float] = None
     
     # Message stats
     messages_sent: int = 0
@@ -121,6 +131,9 @@ class ModelUsage(BaseModel):
     calls: int
     tokens: int
     avg_latency_ms: float
+    latency_p50_ms: Optional[float] = None
+    latency_p95_ms: Optional[float] = None
+    latency_p99_ms: Optional[float] = None
 
 class AgentUsage(BaseModel):
     """Usage by agent"""
@@ -138,6 +151,9 @@ class ToolUsage(BaseModel):
     calls: int
     success_rate: float
     avg_latency_ms: float
+    latency_p50_ms: Optional[float] = None
+    latency_p95_ms: Optional[float] = None
+    latency_p99_ms: Optional[float] = None
 
 # ============================================================================
 # API Request/Response Models
@@ -0,0 +1,202 @@
+"""
+Usage Rollups
+Per-minute and per-hour pre-aggregates of the raw usage tables.
+
+Rollups are maintained incrementally by the batched writer: every flush
+inserts the raw rows and, in the same statement, adds the rows that were
+actually inserted (ON CONFLICT skips duplicates) to their minute and hour
+buckets. Readers combine hour rollups, minute rollups at the period edges
+and the raw tail for the partial minutes (see aggregators.py).
+
+Schema: migrations/032_usage_rollups.sql
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+GRANULARITIES = ("minute", "hour")
+
+
+@dataclass(frozen=True)
+class RollupSpec:
+    """How one raw table is rolled up"""
+    rollup_table: str
+    # (rollup column, expression over the raw row)
+    dimensions: Tuple[Tuple[str, str], ...]
+    # (rollup column, per-bin aggregate over raw rows); merged by addition
+    measures: Tuple[Tuple[str, str], ...]
+    # (rollup JSONB column, raw value column) for the latency sketch
+    sketch: Optional[Tuple[str, str]] = None
+
+
+ROLLUPS: Dict[str, RollupSpec] = {
+    "usage_llm": RollupSpec(
+        rollup_table="usage_llm_rollup",
+        dimensions=(
+            ("microdao_id", "COALESCE(microdao_id, '')"),
+            ("agent_id", "COALESCE(agent_id, '')"),
+            ("model", "model"),
+            ("provider", "provider"),
+        ),
+        measures=(
+            ("calls", "COUNT(*)"),
+            ("success_calls", "COUNT(*) FILTER (WHERE success)"),
+            ("prompt_tokens", "SUM(prompt_tokens)"),
+            ("completion_tokens", "SUM(completion_tokens)"),
+            ("total_tokens", "SUM(total_tokens)"),
+            ("latency_sum_ms", "SUM(latency_ms)"),
+        ),
+        sketch=("latency_sketch", "latency_ms"),
+    ),
+    "usage_tool": RollupSpec(
+        rollup_table="usage_tool_rollup",
+        dimensions=(
+            ("microdao_id", "COALESCE(microdao_id, '')"),
+            ("agent_id", "COALESCE(agent_id, '')"),
+            ("tool_id", "tool_id"),
+            ("tool_name", "tool_name"),
+        ),
+        measures=(
+            ("calls", "COUNT(*)"),
+            ("success_calls", "COUNT(*) FILTER (WHERE success)"),
+            ("latency_sum_ms", "SUM(latency_ms)"),
+        ),
+        sketch=("latency_sketch", "latency_ms"),
+    ),
+    "usage_agent": RollupSpec(
+        rollup_table="usage_agent_rollup",
+        dimensions=(
+            ("microdao_id", "COALESCE(microdao_id, '')"),
+            ("agent_id", "agent_id"),
+        ),
+        measures=(
+            ("invocations", "COUNT(*)"),
+            ("success_invocations", "COUNT(*) FILTER (WHERE success)"),
+            ("llm_calls", "SUM(COALESCE(llm_calls, 0))"),
+            ("tool_calls", "SUM(COALESCE(tool_calls, 0))"),
+            ("duration_sum_ms", "SUM(duration_ms)"),
+        ),
+        sketch=("duration_sketch", "duration_ms"),
+    ),
+    "usage_message": RollupSpec(
+        rollup_table="usage_message_rollup",
+        dimensions=(
+            ("microdao_id", "microdao_id"),
+            # Only agent senders are broken down; human messages share ''
+            ("agent_id", "CASE WHEN actor_type = 'agent' THEN actor_id ELSE '' END"),
+        ),
+        measures=(
+            ("messages", "COUNT(*)"),
+            ("total_length", "SUM(message_length)"),
+        ),
+    ),
+}
+
+
+def _rollup_upsert(spec: RollupSpec, source: str) -> str:
+    """
+    Bins rows of `source` per granularity, bucket, dimensions and sketch key,
+    then adds them to the rollup table (same binning as the backfill in
+    migrations/032_usage_rollups.sql)
+    """
+    dims = [name for name, _ in spec.dimensions]
+    measures = [name for name, _ in spec.measures]
+
+    bin_columns = [f"{expr} AS {name}" for name, expr in spec.dimensions]
+    bin_columns += [f"{expr} AS {name}" for name, expr in spec.measures]
+    # Grouped by position: dimension aliases shadow raw columns of the same name
+    bin_group = [str(i) for i in range(1, len(dims) + 3)]
+    if spec.sketch:
+        bin_columns.append(f"usage_sketch_key({spec.sketch[1]}) AS sketch_key")
+        bin_group.append(str(len(bin_columns) + 2))
+        bin_columns.append("COUNT(*) AS sketch_count")
+
+    insert_columns = ["granularity", "bucket_start"] + dims + measures
+    select_columns = ["granularity", "bucket_start"] + dims + [f"SUM({name})" for name in measures]
+    updates = [f"{name} = r.{name} + EXCLUDED.{name}" for name in measures]
+    if spec.sketch:
+        column = spec.sketch[0]
+        insert_columns.append(column)
+        select_columns.append("jsonb_object_agg(sketch_key, sketch_count)")
+        updates.append(f"{column} = usage_sketch_merge(r.{column}, EXCLUDED.{column})")
+
+    return f"""
+        bins AS (
+            SELECT
+                g.granularity,
+                date_trunc(g.granularity, src.timestamp AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS bucket_start,
+                {', '.join(bin_columns)}
+            FROM {source} src
+            CROSS JOIN (VALUES {', '.join(f"('{g}')" for g in GRANULARITIES)}) AS g(granularity)
+            GROUP BY {', '.join(bin_group)}
+        )
+        INSERT INTO {spec.rollup_table} AS r ({', '.join(insert_columns)})
+        SELECT {', '.join(select_columns)}
+        FROM bins
+        GROUP BY {', '.join(['granularity', 'bucket_start'] + dims)}
+        ORDER BY {', '.join(['granularity', 'bucket_start'] + dims)}
+        ON CONFLICT (granularity, bucket_start, {', '.join(dims)}) DO UPDATE SET
+            {', '.join(updates)}
+    """
+
+
+def ingest_sql(table: str, staging: str, columns: Sequence[str]) -> str:
+    """Move staged rows into `table` (skipping known event_ids) and add them to the rollups"""
+    column_list = ", ".join(columns)
+    return f"""
+        WITH inserted AS (
+            INSERT INTO {table} ({column_list})
+            SELECT {column_list} FROM {staging}
+            ON CONFLICT (event_id) DO NOTHING
+            RETURNING *
+        ),
+        {_rollup_upsert(ROLLUPS[table], "inserted")}
+    """
+
+
+# ============================================================================
+# Period Stitching
+# ============================================================================
+
+def _floor(ts: datetime, step: timedelta) -> datetime:
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return epoch + ((ts - epoch) // step) * step
+
+
+def _ceil(ts: datetime, step: timedelta) -> datetime:
+    floored = _floor(ts, step)
+    return floored if floored == ts else floored + step
+
+
+def period_segments(start: datetime, end: datetime) -> List[datetime]:
+    """
+    Split [start, end] into the parameters of ROLLUP_WINDOW and RAW_WINDOW:
+      hour rollups   [h_start, h_end)
+      minute rollups [m_start, h_start) and [h_end, m_end)
+      raw rows       [start, m_start) and [m_end, end]
+    Empty ranges are returned as (x, x).
+    """
+    minute, hour = timedelta(minutes=1), timedelta(hours=1)
+    m_start, m_end = _ceil(start, minute), _floor(end, minute)
+    if m_start >= m_end:
+        # Shorter than one whole minute: raw rows only
+        return [start, start, start, start, start, start, start, start, start, end]
+
+    h_start, h_end = _ceil(start, hour), _floor(end, hour)
+    if h_start >= h_end:
+        h_start = h_end = m_end
+    return [h_start, h_end, m_start, h_start, h_end, m_end, start, m_start, m_end, end]
+
+
+# Rows of a rollup table inside the period ($1..$6 from period_segments)
+ROLLUP_WINDOW = """(
+    (granularity = 'hour' AND bucket_start >= $1 AND bucket_start < $2)
+    OR (granularity = 'minute' AND (
+        (bucket_start >= $3 AND bucket_start < $4) OR (bucket_start >= $5 AND bucket_start < $6)
+    ))
+)"""
+
+# Raw rows not covered by rollups ($7..$10 from period_segments)
+RAW_WINDOW = """(
+    (timestamp >= $7 AND timestamp < $8) OR (timestamp >= $9 AND timestamp <= $10)
+)"""
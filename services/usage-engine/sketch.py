@@ -0,0 +1,76 @@
+"""
+Mergeable Latency Sketch
+Log-bucketed histogram (DDSketch-style) with ~1% relative error on quantiles.
+Bucket counts add up when sketches are merged, so per-minute/per-hour
+rollups can be combined into p50/p95/p99 for any period.
+
+Stored in rollup tables as JSONB {"<key>": count}; the key function must
+stay identical to usage_sketch_key() in migrations/032_usage_rollups.sql.
+"""
+import math
+from typing import Dict, Iterable, Optional, Tuple
+
+SKETCH_GAMMA = 1.02
+_LOG_GAMMA = math.log(SKETCH_GAMMA)
+
+
+def sketch_key(value: float) -> int:
+    """Bucket index: values in (gamma^(k-1), gamma^k] share key k; <= 1 ms is key 0"""
+    if value <= 1:
+        return 0
+    return math.ceil(math.log(value) / _LOG_GAMMA)
+
+
+class LatencySketch:
+    """Bucket counts keyed by sketch_key()"""
+
+    def __init__(self, bins: Optional[Dict[int, int]] = None):
+        self.bins: Dict[int, int] = dict(bins or {})
+
+    @classmethod
+    def from_bins(cls, bins: Iterable[Tuple[int, int]]) -> "LatencySketch":
+        sketch = cls()
+        for key, count in bins:
+            sketch.bins[key] = sketch.bins.get(key, 0) + count
+        return sketch
+
+    @classmethod
+    def from_json(cls, data: Optional[Dict[str, int]]) -> "LatencySketch":
+        return cls.from_bins((int(key), int(count)) for key, count in (data or {}).items())
+
+    def to_json(self) -> Dict[str, int]:
+        return {str(key): count for key, count in self.bins.items()}
+
+    @property
+    def count(self) -> int:
+        return sum(self.bins.values())
+
+    def add(self, value: float, count: int = 1):
+        key = sketch_key(value)
+        self.bins[key] = self.bins.get(key, 0) + count
+
+    def merge(self, other: "LatencySketch") -> "LatencySketch":
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                # Midpoint of the bucket (in relative terms)
+                return 2 * SKETCH_GAMMA ** key / (SKETCH_GAMMA + 1)
+        return 2 * SKETCH_GAMMA ** max(self.bins) / (SKETCH_GAMMA + 1)
+
+    def percentiles(self) -> Dict[str, Optional[float]]:
+        """p50/p95/p99 in ms (None for an empty sketch)"""
+        result = {}
+        for name, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+            value = self.quantile(q)
+            result[name] = round(value, 1) if value is not None else None
+        return result
@@ -0,0 +1,256 @@
+"""
+Buffered Usage Writer
+Accumulates usage rows per table and writes them in batches
+(COPY or executemany into a staging table) instead of one INSERT per event,
+maintaining the usage rollups in the same statement
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+import asyncpg
+
+from rollups import ingest_sql
+
+logger = logging.getLogger(__name__)
+
+# Column order of the rows passed to BufferedUsageWriter.add()
+TABLE_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "usage_llm": (
+        "event_id", "timestamp", "actor_id", "actor_type", "agent_id", "microdao_id",
+        "model", "provider", "prompt_tokens", "completion_tokens", "total_tokens",
+        "latency_ms", "success", "error", "metadata",
+    ),
+    "usage_tool": (
+        "event_id", "timestamp", "actor_id", "actor_type", "agent_id", "microdao_id",
+        "tool_id", "tool_name", "success", "latency_ms", "error", "metadata",
+    ),
+    "usage_agent": (
+        "event_id", "timestamp", "agent_id", "microdao_id", "channel_id",
+        "trigger", "duration_ms", "llm_calls", "tool_calls", "success", "error", "metadata",
+    ),
+    "usage_message": (
+        "event_id", "timestamp", "actor_id", "actor_type", "microdao_id", "channel_id",
+        "message_length", "metadata",
+    ),
+}
+
+# How many recent flush durations to keep for latency metrics
+LATENCY_WINDOW = 256
+
+# Errors caused by the rows themselves (bad value, constraint violation):
+# retrying the same batch will never succeed, so it gets bisected instead
+ROW_ERRORS = (asyncpg.DataError, asyncpg.IntegrityConstraintViolationError, ValueError, TypeError)
+
+
+def _insert_sql(target: str, table: str) -> str:
+    """Single-row INSERT of a `table` row into `target` (the table itself or its staging copy)"""
+    columns = TABLE_COLUMNS[table]
+    placeholders = ", ".join(f"${i}" for i in range(1, len(columns) + 1))
+    sql = f"INSERT INTO {target} ({', '.join(columns)}) VALUES ({placeholders})"
+    return sql + " ON CONFLICT (event_id) DO NOTHING" if target == table else sql
+
+
+class BufferedUsageWriter:
+    """
+    Per-table row buffers flushed when a buffer reaches batch_size rows
+    or flush_interval seconds pass, whichever comes first.
+
+    Each batch is staged in a temp table, then moved with one
+    INSERT ... SELECT ... ON CONFLICT (event_id) DO NOTHING (keeps dedupe)
+    that also adds the inserted rows to the minute/hour rollups (rollups.py).
+
+    mode="copy":        stage rows with COPY
+    mode="executemany": stage rows with a prepared INSERT run for all rows
+
+    Failed batches go back to the buffer and are retried on the next flush;
+    beyond max_buffered rows per table the oldest rows are dropped (and counted).
+    After max_attempts failures in a row the batch is bisected: healthy halves
+    are written, and a single row that still fails with a row-level error
+    (ROW_ERRORS) is logged and dead-lettered (and counted). Other errors
+    (connection lost, database down) keep the batch in the buffer.
+    """
+
+    def __init__(
+        self,
+        db_pool: asyncpg.Pool,
+        batch_size: int = 1000,
+        flush_interval: float = 1.0,
+        max_buffered: int = 50000,
+        mode: str = "copy",
+        max_attempts: int = 3,
+    ):
+        if mode not in ("copy", "executemany"):
+            raise ValueError(f"Unknown writer mode: {mode}")
+        self.db_pool = db_pool
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_buffered = max(self.batch_size, max_buffered)
+        self.mode = mode
+        self.max_attempts = max(1, max_attempts)
+
+        self._buffers: Dict[str, List[Sequence[Any]]] = {table: [] for table in TABLE_COLUMNS}
+        self._locks: Dict[str, asyncio.Lock] = {table: asyncio.Lock() for table in TABLE_COLUMNS}
+        self._flush_tasks: Dict[str, asyncio.Task] = {}
+        self._timer: Optional[asyncio.Task] = None
+        # After a failed flush, size-triggered flushes wait for the next interval
+        self._retry_at = 0.0
+        # Consecutive failed flushes of the batch at the head of each buffer
+        self._attempts: Dict[str, int] = {table: 0 for table in TABLE_COLUMNS}
+
+        self.rows_written: Dict[str, int] = {table: 0 for table in TABLE_COLUMNS}
+        self.rows_dropped: Dict[str, int] = {table: 0 for table in TABLE_COLUMNS}
+        self.rows_dead_lettered: Dict[str, int] = {table: 0 for table in TABLE_COLUMNS}
+        self.flushes = 0
+        self.flush_errors = 0
+        self.last_error: Optional[str] = None
+        self._flush_ms: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._flush_rows: Deque[int] = deque(maxlen=LATENCY_WINDOW)
+
+    async def start(self):
+        """Start the periodic flush timer"""
+        if self._timer is None:
+            self._timer = asyncio.create_task(self._flush_periodically())
+        print(f"✅ Usage writer started (mode={self.mode}, batch={self.batch_size}, interval={self.flush_interval}s)")
+
+    async def stop(self):
+        """Stop the timer and write everything still buffered"""
+        if self._timer:
+            self._timer.cancel()
+            await asyncio.gather(self._timer, return_exceptions=True)
+            self._timer = None
+        await asyncio.gather(*self._flush_tasks.values(), return_exceptions=True)
+        await self.flush_all()
+        remaining = self.buffered()
+        if remaining:
+            print(f"⚠️  Usage writer stopped with {remaining} unwritten rows: {self.last_error}")
+        else:
+            print("🛑 Usage writer drained")
+
+    def add(self, table: str, row: Sequence[Any]):
+        """Buffer one row (columns in TABLE_COLUMNS[table] order)"""
+        buffer = self._buffers[table]
+        buffer.append(row)
+        if len(buffer) > self.max_buffered:
+            overflow = len(buffer) - self.max_buffered
+            del buffer[:overflow]
+            self.rows_dropped[table] += overflow
+        if (
+            len(buffer) >= self.batch_size
+            and table not in self._flush_tasks
+            and time.monotonic() >= self._retry_at
+        ):
+            self._flush_tasks[table] = asyncio.create_task(self._flush_in_background(table))
+
+    def buffered(self) -> int:
+        return sum(len(buffer) for buffer in self._buffers.values())
+
+    async def _flush_in_background(self, table: str):
+        try:
+            await self.flush(table)
+        finally:
+            self._flush_tasks.pop(table, None)
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush_all()
+
+    async def flush_all(self):
+        await asyncio.gather(*(self.flush(table) for table in TABLE_COLUMNS))
+
+    async def flush(self, table: str):
+        """Write buffered rows of one table in batch_size chunks"""
+        async with self._locks[table]:
+            buffer = self._buffers[table]
+            while buffer:
+                batch = buffer[:self.batch_size]
+                del buffer[:len(batch)]
+                start = time.perf_counter()
+                try:
+                    if self._attempts[table] >= self.max_attempts:
+                        written = await self._write_isolating(table, batch)
+                    else:
+                        await self._write(table, batch)
+                        written = len(batch)
+                except asyncio.CancelledError:
+                    # Rewriting is safe: rows are deduplicated by event_id
+                    buffer[:0] = batch
+                    raise
+                except Exception as e:
+                    # Put the batch back in front; the next flush retries it
+                    buffer[:0] = batch
+                    self._attempts[table] += 1
+                    self.flush_errors += 1
+                    self.last_error = f"{table}: {e}"
+                    self._retry_at = time.monotonic() + self.flush_interval
+                    logger.error(
+                        f"❌ Failed to flush {len(batch)} rows to {table} "
+                        f"(attempt {self._attempts[table]}): {e}"
+                    )
+                    return
+                self._attempts[table] = 0
+                self._flush_ms.append((time.perf_counter() - start) * 1000)
+                self._flush_rows.append(len(batch))
+                self.rows_written[table] += written
+                self.flushes += 1
+
+    async def _write_isolating(self, table: str, rows: List[Sequence[Any]]) -> int:
+        """
+        Write rows, bisecting on row-level errors until the bad rows are
+        isolated; those are logged and dead-lettered. Returns rows written.
+        Any other error propagates and the whole batch is retried later
+        (rewriting the halves already written is safe: dedupe by event_id)
+        """
+        try:
+            await self._write(table, rows)
+            return len(rows)
+        except ROW_ERRORS as e:
+            if len(rows) == 1:
+                self.rows_dead_lettered[table] += 1
+                logger.error(f"☠️  Dead-lettered {table} row: {e}; row={rows[0]!r}")
+                return 0
+        middle = len(rows) // 2
+        return (
+            await self._write_isolating(table, rows[:middle])
+            + await self._write_isolating(table, rows[middle:])
+        )
+
+    async def _write(self, table: str, rows: List[Sequence[Any]]):
+        columns = TABLE_COLUMNS[table]
+        staging = f"_stage_{table}"
+        async with self.db_pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    f"CREATE TEMP TABLE {staging} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"
+                )
+                if self.mode == "copy":
+                    await conn.copy_records_to_table(staging, records=rows, columns=list(columns))
+                else:
+                    await conn.executemany(_insert_sql(staging, table), rows)
+                # Raw insert + minute/hour rollups of the rows actually inserted
+                await conn.execute(ingest_sql(table, staging, columns))
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._flush_ms)
+        return {
+            "mode": self.mode,
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "buffer_depth": {table: len(buffer) for table, buffer in self._buffers.items()},
+            "buffered": self.buffered(),
+            "rows_written": dict(self.rows_written),
+            "rows_dropped": dict(self.rows_dropped),
+            "rows_dead_lettered": dict(self.rows_dead_lettered),
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+            "last_error": self.last_error,
+            "flush_latency_ms": {
+                "avg": round(sum(latencies) / len(latencies), 2) if latencies else None,
+                "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2) if latencies else None,
+                "max": round(latencies[-1], 2) if latencies else None,
+            },
+            "avg_batch_rows": round(sum(self._flush_rows) / len(self._flush_rows), 1) if self._flush_rows else None,
+        }
@@ -0,0 +1,188 @@
+"""
+Micro-batching and embedding cache for the vision encoder.
+
+MicroBatcher coalesces concurrent single-item requests into one forward
+pass: the first item opens a batch, which is flushed when it reaches
+max_batch_size or max_wait_ms after that first item arrived, whichever
+comes first. The forward pass runs in a worker thread, so the event loop
+keeps accepting (and preprocessing) requests while the model is busy.
+
+EmbeddingCache is an LRU of raw (unnormalized) embeddings keyed by a
+content hash, so the same text or image bytes are encoded once.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# How many recent batch sizes / latencies to keep for stats
+STATS_WINDOW = 1024
+
+
+def content_key(kind: str, data: bytes) -> Tuple[str, str]:
+    """Cache key for a text ("text") or image ("image") payload."""
+    return kind, hashlib.sha256(data).hexdigest()
+
+
+class EmbeddingCache:
+    """Bounded LRU of embeddings keyed by content hash."""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._items: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[np.ndarray]:
+        embedding = self._items.get(key)
+        if embedding is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return embedding
+
+    def put(self, key: Tuple[str, str], embedding: np.ndarray):
+        if self.max_size <= 0:
+            return
+        self._items[key] = embedding
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class MicroBatcher:
+    """
+    Collects items submitted concurrently and encodes them as one batch.
+
+    encode_batch(items) runs in a worker thread and must return one row
+    per item (np.ndarray of shape [len(items), dim]). Batches run one at
+    a time, in arrival order.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        encode_batch: Callable[[List[Any]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        self.name = name
+        self.encode_batch = encode_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max_wait_ms
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.batches = 0
+        self.items = 0
+        self.failures = 0
+        self._sizes: Deque[int] = deque(maxlen=STATS_WINDOW)
+        self._batch_ms: Deque[float] = deque(maxlen=STATS_WINDOW)
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError(f"{self.name} batcher stopped"))
+
+    async def submit(self, item: Any) -> np.ndarray:
+        """Encode one item; resolves with its embedding row."""
+        if self._task is None:
+            raise RuntimeError(f"{self.name} batcher not started")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+
+    async def submit_many(self, items: Sequence[Any]) -> List[np.ndarray]:
+        """Encode several items; they share batches with concurrent requests."""
+        return list(await asyncio.gather(*(self.submit(item) for item in items)))
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued without waiting
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            batch = [(item, future) for item, future in batch if not future.cancelled()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            try:
+                embeddings = await asyncio.to_thread(self.encode_batch, [item for item, _ in batch])
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"{self.name} batch of {len(batch)} failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            self._sizes.append(len(batch))
+            self._batch_ms.append((time.perf_counter() - started) * 1000)
+            for (_, future), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+
+    def stats(self) -> Dict[str, Any]:
+        sizes = list(self._sizes)
+        batch_ms = sorted(self._batch_ms)
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "batches": self.batches,
+            "items": self.items,
+            "failures": self.failures,
+            "avg_batch_size": round(sum(sizes) / len(sizes), 2) if sizes else None,
+            "batch_ms": {
+                "avg": round(sum(batch_ms) / len(batch_ms), 1) if batch_ms else None,
+                "p95": round(batch_ms[min(len(batch_ms) - 1, int(len(batch_ms) * 0.95))], 1) if batch_ms else None,
+            },
+        }
@@ -3,24 +3,36 @@ Vision Encoder Service - FastAPI app for text and image embeddings using OpenCLI
 
 Endpoints:
 - POST /embed/text - Generate text embeddings
+- POST /embed/text/batch - Generate embeddings for a list of texts
 - POST /embed/image - Generate image embeddings
+- POST /embed/image/batch - Generate embeddings for a list of image URLs
+- POST /embed/image/upload - Generate image embedding from uploaded file
+- POST /embed/image/upload/batch - Generate embeddings for uploaded files
 - GET /health - Health check
 - GET /info - Model information
+- GET /stats - Micro-batching and cache statistics
+
+Concurrent requests are coalesced into one forward pass per modality
+(see app/batcher.py); inference runs off the event loop.
 """
 
 import os
+import asyncio
 import logging
+from io import BytesIO
 from typing import List, Optional, Dict, Any
 from contextlib import asynccontextmanager
 
 import torch
 import open_clip
-from PIL import Image
+from PIL import Image, UnidentifiedImageError
 import numpy as np
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from pydantic import BaseModel, Field
 import httpx
 
+from app.batcher import EmbeddingCache, MicroBatcher, content_key
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -34,6 +46,12 @@ MODEL_NAME = os.getenv("MODEL_NAME", "ViT-L-14")
 MODEL_PRETRAINED = os.getenv("MODEL_PRETRAINED", "openai")
 NORMALIZE_EMBEDDINGS = os.getenv("NORMALIZE_EMBEDDINGS", "true").lower() == "true"
 
+# Micro-batching and cache configuration
+MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", "32"))
+MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "5"))
+CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "10000"))
+MAX_BATCH_ITEMS = int(os.getenv("EMBED_MAX_BATCH_ITEMS", "256"))
+
 # Qdrant configuration (optional)
 QDRANT_HOST = os.getenv("QDRANT_HOST", "qdrant")
 QDRANT_PORT = int(os.getenv("QDRANT_PORT", "6333"))
@@ -43,6 +61,12 @@ QDRANT_ENABLED = os.getenv("QDRANT_ENABLED", "false").lower() == "true"
 _model = None
 _preprocess = None
 _tokenizer = None
+_embedding_dim = None
+
+_cache = EmbeddingCache(max_size=CACHE_SIZE)
+_text_batcher: Optional[MicroBatcher] = None
+_image_batcher: Optional[MicroBatcher] = None
+_http_client: Optional[httpx.AsyncClient] = None
 
 
 class TextEmbedRequest(BaseModel):
@@ -51,12 +75,24 @@ class TextEmbedRequest(BaseModel):
     normalize: bool = Field(True, description="Normalize embedding to unit vector")
 
 
+class TextBatchEmbedRequest(BaseModel):
+    """Request for embeddings of several texts."""
+    texts: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_ITEMS, description="Texts to embed")
+    normalize: bool = Field(True, description="Normalize embeddings to unit vectors")
+
+
 class ImageEmbedRequest(BaseModel):
     """Request for image embedding from URL."""
     image_url: str = Field(..., description="URL of image to embed")
     normalize: bool = Field(True, description="Normalize embedding to unit vector")
 
 
+class ImageBatchEmbedRequest(BaseModel):
+    """Request for embeddings of several images by URL."""
+    image_urls: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_ITEMS, description="Image URLs to embed")
+    normalize: bool = Field(True, description="Normalize embeddings to unit vectors")
+
+
 class EmbedResponse(BaseModel):
     """Response with embedding vector."""
     embedding: List[float] = Field(..., description="Embedding vector")
@@ -65,6 +101,15 @@ class EmbedResponse(BaseModel):
     normalized: bool = Field(..., description="Whether embedding is normalized")
 
 
+class BatchEmbedResponse(BaseModel):
+    """Response with one embedding vector per input, in input order."""
+    embeddings: List[List[float]] = Field(..., description="Embedding vectors")
+    count: int = Field(..., description="Number of embeddings")
+    dimension: int = Field(..., description="Embedding dimension")
+    model: str = Field(..., description="Model used for embedding")
+    normalized: bool = Field(..., description="Whether embeddings are normalized")
+
+
 class HealthResponse(BaseModel):
     """Health check response."""
     status: str
@@ -86,14 +131,14 @@ class ModelInfo(BaseModel):
 
 def load_model():
     """Load OpenCLIP model and preprocessing pipeline."""
-    global _model, _preprocess, _tokenizer
-    
+    global _model, _preprocess, _tokenizer, _embedding_dim
+
     if _model is not None:
         return _model, _preprocess, _tokenizer
-    
+
     logger.info(f"Loading model {MODEL_NAME} with pretrained weights {MODEL_PRETRAINED}")
     logger.info(f"Device: {DEVICE}")
-    
+
     try:
         # Load model and preprocessing
         model, _, preprocess = open_clip.create_model_and_transforms(
@@ -101,61 +146,169 @@ def load_model():
             pretrained=MODEL_PRETRAINED,
             device=DEVICE
         )
-        
+
         # Get tokenizer
         tokenizer = open_clip.get_tokenizer(MODEL_NAME)
-        
+
         # Set to eval mode
         model.eval()
-        
+
         _model = model
         _preprocess = preprocess
         _tokenizer = tokenizer
-        
-        # Log model info
+
+        # Embedding dimension is fixed for the model; /info reuses it
         with torch.no_grad():
             dummy_text = tokenizer(["test"])
             text_features = model.encode_text(dummy_text.to(DEVICE))
-            embedding_dim = text_features.shape[1]
-        
-        logger.info(f"Model loaded successfully. Embedding dimension: {embedding_dim}")
-        
+            _embedding_dim = text_features.shape[1]
+
+        logger.info(f"Model loaded successfully. Embedding dimension: {_embedding_dim}")
+
         if DEVICE == "cuda":
             gpu_name = torch.cuda.get_device_name(0)
             gpu_memory = torch.cuda.get_device_properties(0).total_memory / 1024**3
             logger.info(f"GPU: {gpu_name}, Memory: {gpu_memory:.2f} GB")
-        
+
         return _model, _preprocess, _tokenizer
-        
+
     except Exception as e:
         logger.error(f"Failed to load model: {e}")
         raise
 
 
+def encode_texts(texts: List[str]) -> np.ndarray:
+    """One forward pass for a batch of texts; raw (unnormalized) float32 embeddings."""
+    model, _, tokenizer = load_model()
+    with torch.inference_mode():
+        text_features = model.encode_text(tokenizer(texts).to(DEVICE))
+    return text_features.float().cpu().numpy()
+
+
+def encode_images(image_tensors: List[torch.Tensor]) -> np.ndarray:
+    """One forward pass for a batch of preprocessed images; raw float32 embeddings."""
+    model, _, _ = load_model()
+    with torch.inference_mode():
+        image_features = model.encode_image(torch.stack(image_tensors).to(DEVICE))
+    return image_features.float().cpu().numpy()
+
+
+def preprocess_image(image_bytes: bytes) -> torch.Tensor:
+    """Decode and preprocess one image (CPU, runs in a worker thread)."""
+    _, preprocess, _ = load_model()
+    image = Image.open(BytesIO(image_bytes)).convert("RGB")
+    return preprocess(image)
+
+
+def _finish(embedding: np.ndarray, normalize: bool) -> List[float]:
+    if normalize:
+        embedding = embedding / np.linalg.norm(embedding)
+    return embedding.tolist()
+
+
+async def _embed_cached(kind: str, payloads: List[bytes], encode) -> List[np.ndarray]:
+    """
+    Embeddings for payloads, in order: cached ones are reused, duplicates
+    within the call are encoded once, the rest go through encode(misses).
+    """
+    keys = [content_key(kind, payload) for payload in payloads]
+    results: Dict[Any, np.ndarray] = {}
+    misses: Dict[Any, bytes] = {}
+    for key, payload in zip(keys, payloads):
+        if key in results or key in misses:
+            continue
+        embedding = _cache.get(key)
+        if embedding is None:
+            misses[key] = payload
+        else:
+            results[key] = embedding
+    if misses:
+        embeddings = await encode(list(misses.values()))
+        for key, embedding in zip(misses, embeddings):
+            _cache.put(key, embedding)
+            results[key] = embedding
+    return [results[key] for key in keys]
+
+
+async def _encode_text_payloads(payloads: List[bytes]) -> List[np.ndarray]:
+    return await _text_batcher.submit_many([payload.decode("utf-8") for payload in payloads])
+
+
+async def _encode_image_payloads(payloads: List[bytes]) -> List[np.ndarray]:
+    tensors = await asyncio.gather(*(asyncio.to_thread(preprocess_image, payload) for payload in payloads))
+    return await _image_batcher.submit_many(tensors)
+
+
+async def embed_texts(texts: List[str]) -> List[np.ndarray]:
+    return await _embed_cached("text", [text.encode("utf-8") for text in texts], _encode_text_payloads)
+
+
+async def embed_images(images: List[bytes]) -> List[np.ndarray]:
+    return await _embed_cached("image", images, _encode_image_payloads)
+
+
+async def download_image(image_url: str) -> bytes:
+    response = await _http_client.get(image_url)
+    response.raise_for_status()
+    return response.content
+
+
+def _response(embedding: np.ndarray, normalize: bool) -> EmbedResponse:
+    values = _finish(embedding, normalize)
+    return EmbedResponse(
+        embedding=values,
+        dimension=len(values),
+        model=f"{MODEL_NAME}/{MODEL_PRETRAINED}",
+        normalized=normalize
+    )
+
+
+def _batch_response(embeddings: List[np.ndarray], normalize: bool) -> BatchEmbedResponse:
+    values = [_finish(embedding, normalize) for embedding in embeddings]
+    return BatchEmbedResponse(
+        embeddings=values,
+        count=len(values),
+        dimension=len(values[0]) if values else (_embedding_dim or 0),
+        model=f"{MODEL_NAME}/{MODEL_PRETRAINED}",
+        normalized=normalize
+    )
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for model loading."""
+    global _text_batcher, _image_batcher, _http_client
     logger.info("Starting vision-encoder service...")
-    
+
     # Load model on startup
     try:
-        load_model()
+        await asyncio.to_thread(load_model)
         logger.info("Model loaded successfully during startup")
     except Exception as e:
         logger.error(f"Failed to load model during startup: {e}")
         raise
-    
+
+    _text_batcher = MicroBatcher("text", encode_texts, MAX_BATCH_SIZE, MAX_WAIT_MS)
+    _image_batcher = MicroBatcher("image", encode_images, MAX_BATCH_SIZE, MAX_WAIT_MS)
+    _text_batcher.start()
+    _image_batcher.start()
+    _http_client = httpx.AsyncClient(timeout=30.0)
+    logger.info(f"Micro-batching: max batch {MAX_BATCH_SIZE}, max wait {MAX_WAIT_MS} ms, cache {CACHE_SIZE}")
+
     yield
-    
+
     # Cleanup
     logger.info("Shutting down vision-encoder service...")
+    await _text_batcher.stop()
+    await _image_batcher.stop()
+    await _http_client.aclose()
 
 
 # Create FastAPI app
 app = FastAPI(
     title="Vision Encoder Service",
     description="Text and Image embedding service using OpenCLIP",
-    version="1.0.0",
+    version="1.1.0",
     lifespan=lifespan
 )
 
@@ -166,7 +319,7 @@ async def health_check():
     gpu_name = None
     if torch.cuda.is_available():
         gpu_name = torch.cuda.get_device_name(0)
-    
+
     return HealthResponse(
         status="healthy",
         device=DEVICE,
@@ -179,99 +332,90 @@ async def health_check():
 @app.get("/info", response_model=ModelInfo)
 async def model_info():
     """Get model information."""
-    model, _, _ = load_model()
-    
-    # Get embedding dimension
-    with torch.no_grad():
-        dummy_text = _tokenizer(["test"])
-        text_features = model.encode_text(dummy_text.to(DEVICE))
-        embedding_dim = text_features.shape[1]
-    
+    await asyncio.to_thread(load_model)
+
     return ModelInfo(
         model_name=MODEL_NAME,
         pretrained=MODEL_PRETRAINED,
         device=DEVICE,
-        embedding_dim=embedding_dim,
+        embedding_dim=_embedding_dim,
         normalize_default=NORMALIZE_EMBEDDINGS,
         qdrant_enabled=QDRANT_ENABLED
     )
 
 
+@app.get("/stats")
+async def stats():
+    """Micro-batching and embedding cache statistics."""
+    return {
+        "text": _text_batcher.stats() if _text_batcher else None,
+        "image": _image_batcher.stats() if _image_batcher else None,
+        "cache": _cache.stats()
+    }
+
+
 @app.post("/embed/text", response_model=EmbedResponse)
 async def embed_text(request: TextEmbedRequest):
     """Generate text embedding."""
     try:
-        model, _, tokenizer = load_model()
-        
-        # Tokenize text
-        text_tokens = tokenizer([request.text]).to(DEVICE)
-        
-        # Generate embedding
-        with torch.no_grad():
-            text_features = model.encode_text(text_tokens)
-            
-            # Normalize if requested
-            if request.normalize:
-                text_features = text_features / text_features.norm(dim=-1, keepdim=True)
-            
-            # Convert to numpy and then to list
-            embedding = text_features.cpu().numpy()[0].tolist()
-        
-        return EmbedResponse(
-            embedding=embedding,
-            dimension=len(embedding),
-            model=f"{MODEL_NAME}/{MODEL_PRETRAINED}",
-            normalized=request.normalize
-        )
-        
+        embeddings = await embed_texts([request.text])
+        return _response(embeddings[0], request.normalize)
+
     except Exception as e:
         logger.error(f"Error generating text embedding: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to generate text embedding: {str(e)}")
 
 
+@app.post("/embed/text/batch", response_model=BatchEmbedResponse)
+async def embed_text_batch(request: TextBatchEmbedRequest):
+    """Generate embeddings for a list of texts (same order as input)."""
+    try:
+        embeddings = await embed_texts(request.texts)
+        return _batch_response(embeddings, request.normalize)
+
+    except Exception as e:
+        logger.error(f"Error generating text embeddings: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate text embeddings: {str(e)}")
+
+
 @app.post("/embed/image", response_model=EmbedResponse)
 async def embed_image_from_url(request: ImageEmbedRequest):
     """Generate image embedding from URL."""
     try:
-        model, preprocess, _ = load_model()
-        
-        # Download image
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(request.image_url)
-            response.raise_for_status()
-            image_bytes = response.content
-        
-        # Load and preprocess image
-        from io import BytesIO
-        image = Image.open(BytesIO(image_bytes)).convert("RGB")
-        image_tensor = preprocess(image).unsqueeze(0).to(DEVICE)
-        
-        # Generate embedding
-        with torch.no_grad():
-            image_features = model.encode_image(image_tensor)
-            
-            # Normalize if requested
-            if request.normalize:
-                image_features = image_features / image_features.norm(dim=-1, keepdim=True)
-            
-            # Convert to numpy and then to list
-            embedding = image_features.cpu().numpy()[0].tolist()
-        
-        return EmbedResponse(
-            embedding=embedding,
-            dimension=len(embedding),
-            model=f"{MODEL_NAME}/{MODEL_PRETRAINED}",
-            normalized=request.normalize
-        )
-        
+        image_bytes = await download_image(request.image_url)
+        embeddings = await embed_images([image_bytes])
+        return _response(embeddings[0], request.normalize)
+
     except httpx.HTTPError as e:
         logger.error(f"Failed to download image from URL: {e}")
         raise HTTPException(status_code=400, detail=f"Failed to download image: {str(e)}")
+    except UnidentifiedImageError as e:
+        logger.error(f"Unsupported image: {e}")
+        raise HTTPException(status_code=400, detail=f"Unsupported image: {str(e)}")
     except Exception as e:
         logger.error(f"Error generating image embedding: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to generate image embedding: {str(e)}")
 
 
+@app.post("/embed/image/batch", response_model=BatchEmbedResponse)
+async def embed_image_batch(request: ImageBatchEmbedRequest):
+    """Generate embeddings for a list of image URLs (downloaded concurrently)."""
+    try:
+        images = await asyncio.gather(*(download_image(url) for url in request.image_urls))
+        embeddings = await embed_images(list(images))
+        return _batch_response(embeddings, request.normalize)
+
+    except httpx.HTTPError as e:
+        logger.error(f"Failed to download image from URL: {e}")
+        raise HTTPException(status_code=400, detail=f"Failed to download image: {str(e)}")
+    except UnidentifiedImageError as e:
+        logger.error(f"Unsupported image: {e}")
+        raise HTTPException(status_code=400, detail=f"Unsupported image: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error generating image embeddings: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate image embeddings: {str(e)}")
+
+
 @app.post("/embed/image/upload", response_model=EmbedResponse)
 async def embed_image_from_upload(
     file: UploadFile = File(...),
@@ -279,44 +423,44 @@ async def embed_image_from_upload(
 ):
     """Generate image embedding from uploaded file."""
     try:
-        model, preprocess, _ = load_model()
-        
-        # Read uploaded file
         image_bytes = await file.read()
-        
-        # Load and preprocess image
-        from io import BytesIO
-        image = Image.open(BytesIO(image_bytes)).convert("RGB")
-        image_tensor = preprocess(image).unsqueeze(0).to(DEVICE)
-        
-        # Generate embedding
-        with torch.no_grad():
-            image_features = model.encode_image(image_tensor)
-            
-            # Normalize if requested
-            if normalize:
-                image_features = image_features / image_features.norm(dim=-1, keepdim=True)
-            
-            # Convert to numpy and then to list
-            embedding = image_features.cpu().numpy()[0].tolist()
-        
-        return EmbedResponse(
-            embedding=embedding,
-            dimension=len(embedding),
-            model=f"{MODEL_NAME}/{MODEL_PRETRAINED}",
-            normalized=normalize
-        )
-        
+        embeddings = await embed_images([image_bytes])
+        return _response(embeddings[0], normalize)
+
+    except UnidentifiedImageError as e:
+        logger.error(f"Unsupported image upload: {e}")
+        raise HTTPException(status_code=400, detail=f"Unsupported image: {str(e)}")
     except Exception as e:
         logger.error(f"Error generating image embedding from upload: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to generate image embedding: {str(e)}")
 
 
+@app.post("/embed/image/upload/batch", response_model=BatchEmbedResponse)
+async def embed_image_upload_batch(
+    files: List[UploadFile] = File(...),
+    normalize: bool = True
+):
+    """Generate embeddings for several uploaded files (same order as upload)."""
+    if len(files) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Too many files: {len(files)} > {MAX_BATCH_ITEMS}")
+    try:
+        images = [await file.read() for file in files]
+        embeddings = await embed_images(images)
+        return _batch_response(embeddings, normalize)
+
+    except UnidentifiedImageError as e:
+        logger.error(f"Unsupported image upload: {e}")
+        raise HTTPException(status_code=400, detail=f"Unsupported image: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error generating image embeddings from upload: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate image embeddings: {str(e)}")
+
+
 if __name__ == "__main__":
     import uvicorn
-    
+
     port = int(os.getenv("PORT", "8001"))
     host = os.getenv("HOST", "0.0.0.0")
-    
+
     logger.info(f"Starting server on {host}:{port}")
     uvicorn.run(app, host=host, port=port, log_level="info")
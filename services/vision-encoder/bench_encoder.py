@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+CPU throughput benchmark for vision-encoder
+
+Measures images/sec for:
+  - batch N:       encode_images() on fixed batches of N preprocessed images
+                   (N = 1, 8, 32 by default); batch 1 is what every request
+                   cost before micro-batching
+  - micro-batched: --concurrency single-image requests in flight through
+                   MicroBatcher (preprocessing in threads, one forward pass
+                   per coalesced batch), i.e. what /embed/image/upload does
+                   under concurrent load
+
+Images are random RGB noise (distinct bytes, so the embedding cache never
+hits). Without --pretrained the model has random weights: timing only.
+
+Usage:
+    python bench_encoder.py [--model ViT-B-32] [--pretrained openai] [--images 64] [--batch-sizes 1,8,32]
+"""
+import argparse
+import asyncio
+import os
+import time
+from io import BytesIO
+
+
+def make_images(count: int, size: int):
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(7)
+    images = []
+    for _ in range(count):
+        buffer = BytesIO()
+        Image.fromarray(rng.integers(0, 256, (size, size, 3), dtype=np.uint8)).save(buffer, format="JPEG")
+        images.append(buffer.getvalue())
+    return images
+
+
+def report(name: str, count: int, elapsed: float, extra: str = ""):
+    print(f"{name:<16} {count / elapsed:8.2f} images/s  {elapsed * 1000 / count:8.1f} ms/image  {extra}")
+
+
+async def run_micro_batched(main, images, concurrency: int, max_batch_size: int, max_wait_ms: float):
+    from app.batcher import MicroBatcher
+
+    batcher = MicroBatcher("image", main.encode_images, max_batch_size, max_wait_ms)
+    batcher.start()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(image_bytes):
+        async with semaphore:
+            tensor = await asyncio.to_thread(main.preprocess_image, image_bytes)
+            await batcher.submit(tensor)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(image) for image in images))
+    elapsed = time.perf_counter() - start
+    stats = batcher.stats()
+    await batcher.stop()
+    return elapsed, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="vision-encoder CPU throughput benchmark")
+    parser.add_argument("--model", default="ViT-B-32")
+    parser.add_argument("--pretrained", default="", help="weights to load (empty: random init)")
+    parser.add_argument("--images", type=int, default=64)
+    parser.add_argument("--image-size", type=int, default=512, help="source image side before preprocessing")
+    parser.add_argument("--batch-sizes", default="1,8,32")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0: torch default)")
+    args = parser.parse_args()
+
+    # app.main reads its configuration at import time
+    os.environ["DEVICE"] = "cpu"
+    os.environ["MODEL_NAME"] = args.model
+    os.environ["MODEL_PRETRAINED"] = args.pretrained
+
+    import torch
+    from app import main as encoder
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    start = time.perf_counter()
+    encoder.load_model()
+    print(f"\n{args.model} ({args.pretrained or 'random init'}) on CPU, {torch.get_num_threads()} threads, "
+          f"dim {encoder._embedding_dim}, load {time.perf_counter() - start:.1f}s, {args.images} images\n")
+
+    images = make_images(args.images, args.image_size)
+    tensors = [encoder.preprocess_image(image) for image in images]
+    encoder.encode_images(tensors[:1])  # warm-up
+
+    for batch_size in [int(size) for size in args.batch_sizes.split(",")]:
+        start = time.perf_counter()
+        for i in range(0, len(tensors), batch_size):
+            encoder.encode_images(tensors[i : i + batch_size])
+        report(f"batch {batch_size}", len(tensors), time.perf_counter() - start, "(forward pass only)")
+
+    max_batch_size = max(int(size) for size in args.batch_sizes.split(","))
+    elapsed, stats = asyncio.run(
+        run_micro_batched(encoder, images, args.concurrency, max_batch_size, args.max_wait_ms)
+    )
+    report("micro-batched", len(images), elapsed,
+           f"(decode+preprocess+forward, {args.concurrency} in flight, avg batch {stats['avg_batch_size']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -41,6 +41,23 @@ class Settings(BaseSettings):
     # Використовується для маршрутизації повідомлень до агентів
     ROUTER_BASE_URL: str = "http://router:9102"
 
+    # Обробка agent.telegram.update (RouterHandler)
+    # JetStream-стрім і durable consumer: події переживають рестарт, ack після обробки
+    UPDATES_STREAM: str = "TELEGRAM_UPDATES"
+    UPDATES_DURABLE: str = "telegram-gateway-router"
+    UPDATES_ACK_WAIT_S: float = 300.0
+    # Невдало оброблена подія повертається (nak) із затримкою, не більше MAX_DELIVER доставок
+    UPDATES_NAK_DELAY_S: float = 10.0
+    UPDATES_MAX_DELIVER: int = 3
+    # Ліміти одночасних викликів Router: загальний і на одного бота
+    UPDATES_MAX_CONCURRENCY: int = 32
+    UPDATES_PER_BOT_CONCURRENCY: int = 8
+    # Максимум прийнятих подій (в черзі + в обробці), далі NATS не читається
+    UPDATES_MAX_PENDING: int = 256
+    # Скільки чекати продовження серії повідомлень від користувача (0 = лише злиття вже накопичених)
+    UPDATES_COALESCE_WINDOW_MS: int = 300
+    UPDATES_COALESCE_MAX: int = 10
+
     # Debug логування (true для детальних логів)
     DEBUG: bool = False
 
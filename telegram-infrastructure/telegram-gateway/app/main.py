@@ -95,6 +95,12 @@ async def healthz():
     return {"status": "ok"}
 
 
+@app.get("/router/metrics")
+async def router_metrics():
+    """Черга та затримки обробки agent.telegram.update"""
+    return router_handler.stats()
+
+
 @app.post("/bots/register")
 async def register_bot(reg: BotRegistration):
     """
@@ -176,6 +182,7 @@ async def root():
         "docs": "/docs",
         "endpoints": [
             "GET /healthz",
+            "GET /router/metrics",
             "POST /bots/register",
             "POST /send"
         ]
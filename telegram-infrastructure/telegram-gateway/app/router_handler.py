@@ -1,8 +1,13 @@
 """
 NATS subscriber для обробки подій agent.telegram.update
 Викликає Router через HTTP API та відправляє відповідь назад в Telegram
+
+Події читаються через JetStream durable consumer (ack після обробки) і
+проходять через UpdateDispatcher: обмежена конкурентність, послідовна
+обробка в межах чату, злиття серії повідомлень від одного користувача.
 """
 import asyncio
+import functools
 import json
 import logging
 from typing import Dict, Any
@@ -13,9 +18,66 @@ import nats
 from .config import settings
 from .models import TelegramUpdateEvent, TelegramSendCommand
 from .telegram_listener import telegram_listener
+from .update_dispatcher import UpdateDispatcher
 
 logger = logging.getLogger(__name__)
 
+UPDATES_SUBJECT = "agent.telegram.update"
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Системні промпти для агентів
+SYSTEM_PROMPTS = {
+    "helion": """Ти - Helion, AI-агент платформи Energy Union екосистеми DAARION.city.
+Допомагай користувачам з технологіями EcoMiner/BioMiner, токеномікою та DAO governance.
+
+Твої основні функції:
+- Консультації з енергетичними технологіями (сонячні панелі, вітряки, біогаз)
+- Пояснення токеноміки Energy Union (ENERGY токен, стейкінг, винагороди)
+- Допомога з onboarding в DAO
+- Відповіді на питання про EcoMiner/BioMiner устаткування
+
+Стиль спілкування:
+- професійний, технічний, але зрозумілий
+- точний у цифрах та даних
+- конструктивний у рекомендаціях
+
+Важливо:
+- Не вигадуй дані, яких немає в системі
+- Якщо дані недоступні — чесно скажи про це
+- Не давай фінансових порад без консультації з експертами""",
+    
+    "daarwizz": """Ти — DAARWIZZ, офіційний AI-агент екосистеми DAARION.city.
+Допомагай учасникам з microDAO, ролями та процесами.
+Відповідай коротко, практично, враховуй RBAC контекст користувача.""",
+    
+    "greenfood": """Ти — GREENFOOD Assistant, фронтовий оркестратор ERP-системи для крафтових виробників, хабів та покупців.
+
+Твоя місія: зрозуміти, хто з тобою говорить (комітент, менеджер складу, логіст, бухгалтер, маркетолог, покупець), виявити намір і делегувати завдання спеціалізованим агентам GREENFOOD.
+
+У твоєму розпорядженні 12 спеціалізованих агентів:
+- Product & Catalog (каталог товарів)
+- Batch & Quality (партії та якість)
+- Vendor Success (успіх комітентів)
+- Warehouse (склад)
+- Logistics & Delivery (доставка)
+- Seller (продажі)
+- Customer Care (підтримка)
+- Finance & Pricing (фінанси)
+- SMM & Campaigns (маркетинг)
+- SEO & Web (SEO)
+- Analytics & BI (аналітика)
+- Compliance & Audit (аудит)
+
+Правила роботи:
+- Спочатку уточнюй роль і контекст
+- Перетворюй запит на чітку дію
+- Не вигадуй дані - якщо чогось немає, чесно кажи
+- Завжди давай коротке резюме: що зроблено, наступні кроки
+
+Відповідай українською, чітко та по-діловому.""",
+}
+
+
 
 class RouterHandler:
     """Обробник подій з NATS, який викликає Router та відправляє відповіді"""
@@ -25,6 +87,23 @@ class RouterHandler:
         self._sub = None
         self._router_url = settings.ROUTER_BASE_URL
         self._running = False
+        self._consumer_task = None
+        self._mode = None
+        self._http: httpx.AsyncClient = None
+        # agent_id -> шаблон запиту до Router / довжина системного промпту
+        self._templates: Dict[str, Dict[str, Any]] = {}
+        self._prompt_lengths: Dict[str, int] = {}
+        self._dispatcher = UpdateDispatcher(
+            self._handle_telegram_event,
+            max_concurrency=settings.UPDATES_MAX_CONCURRENCY,
+            per_bot_concurrency=settings.UPDATES_PER_BOT_CONCURRENCY,
+            max_pending=settings.UPDATES_MAX_PENDING,
+            coalesce_window_s=settings.UPDATES_COALESCE_WINDOW_MS / 1000,
+            coalesce_max=settings.UPDATES_COALESCE_MAX,
+            on_give_up=self._notify_failure,
+            # Кілька in_progress за ack_wait, поки подія чекає своєї черги
+            progress_interval_s=settings.UPDATES_ACK_WAIT_S / 3,
+        )
     
     async def connect(self):
         """Підключитися до NATS"""
@@ -36,33 +115,127 @@ class RouterHandler:
         """Підписатися на події agent.telegram.update"""
         await self.connect()
         
-        async def message_handler(msg):
-            """Обробка повідомлення з NATS"""
+        try:
+            psub = await self._create_consumer()
+        except Exception as e:
+            logger.warning(f"⚠️ JetStream unavailable ({e}), using core NATS subscription (no redelivery)")
+            await self._start_core_subscription()
+            return
+        
+        self._running = True
+        self._mode = "jetstream"
+        self._consumer_task = asyncio.create_task(self._consume(psub))
+        logger.info(
+            f"✅ Consuming {UPDATES_SUBJECT} via JetStream "
+            f"({settings.UPDATES_STREAM}/{settings.UPDATES_DURABLE})"
+        )
+    
+    async def _create_consumer(self):
+        """Стрім захоплює звичайні publish від telegram_listener; durable consumer з явним ack"""
+        from nats.js.api import AckPolicy, ConsumerConfig, RetentionPolicy
+        
+        js = self._nc.jetstream()
+        try:
+            await js.add_stream(
+                name=settings.UPDATES_STREAM,
+                subjects=[UPDATES_SUBJECT],
+                retention=RetentionPolicy.WORK_QUEUE,
+            )
+        except Exception as e:
+            # Стрім уже існує (можливо з іншими налаштуваннями)
+            logger.info(f"ℹ️ Stream {settings.UPDATES_STREAM}: {e}")
+        
+        return await js.pull_subscribe(
+            UPDATES_SUBJECT,
+            durable=settings.UPDATES_DURABLE,
+            stream=settings.UPDATES_STREAM,
+            config=ConsumerConfig(
+                ack_policy=AckPolicy.EXPLICIT,
+                ack_wait=settings.UPDATES_ACK_WAIT_S,
+                max_ack_pending=settings.UPDATES_MAX_PENDING,
+                max_deliver=settings.UPDATES_MAX_DELIVER,
+            ),
+        )
+    
+    async def _consume(self, psub):
+        """Забирати з JetStream лише стільки, скільки диспетчер може прийняти"""
+        while self._running:
+            batch = max(1, min(self._dispatcher.free_slots(), 64))
             try:
-                data = json.loads(msg.data.decode())
-                event = TelegramUpdateEvent(**data)
+                msgs = await psub.fetch(batch, timeout=1)
+            except nats.errors.TimeoutError:
+                continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ JetStream fetch error: {e}")
+                await asyncio.sleep(1)
+                continue
+            
+            for msg in msgs:
+                try:
+                    event = TelegramUpdateEvent(**json.loads(msg.data.decode()))
+                except Exception as e:
+                    logger.error(f"❌ Dropping malformed update: {e}")
+                    await msg.term()
+                    continue
+                
+                published_at = None
+                last_delivery = True
+                try:
+                    published_at = msg.metadata.timestamp
+                    self._dispatcher.stream_pending = msg.metadata.num_pending
+                    last_delivery = msg.metadata.num_delivered >= settings.UPDATES_MAX_DELIVER
+                except Exception:
+                    pass
                 
                 logger.info(
                     f"📥 Received NATS event: agent={event.agent_id}, "
                     f"chat={event.chat_id}, text_len={len(event.text or '')}"
                 )
-                
-                # Обробити подію асинхронно
-                asyncio.create_task(self._handle_telegram_event(event))
-                
-                # NOTE: No ack() for core NATS (non-JetStream) subscriptions
-                # JetStream ack is only needed when using JetStream consumers
-                
+                await self._dispatcher.submit(
+                    event,
+                    on_success=msg.ack,
+                    on_failure=functools.partial(msg.nak, delay=settings.UPDATES_NAK_DELAY_S),
+                    published_at=published_at,
+                    on_progress=msg.in_progress,
+                    last_delivery=last_delivery,
+                )
+    
+    async def _start_core_subscription(self):
+        """Запасний варіант без JetStream: ті самі ліміти, але без ack і повторної доставки"""
+        async def message_handler(msg):
+            """Обробка повідомлення з NATS"""
+            try:
+                event = TelegramUpdateEvent(**json.loads(msg.data.decode()))
             except Exception as e:
                 logger.error(f"❌ Error processing NATS message: {e}", exc_info=True)
+                return
+            
+            logger.info(
+                f"📥 Received NATS event: agent={event.agent_id}, "
+                f"chat={event.chat_id}, text_len={len(event.text or '')}"
+            )
+            # Чекає, якщо диспетчер заповнений (backpressure на підписку)
+            await self._dispatcher.submit(event)
         
-        # Підписатися на subject
-        self._sub = await self._nc.subscribe("agent.telegram.update", cb=message_handler)
+        self._sub = await self._nc.subscribe(UPDATES_SUBJECT, cb=message_handler)
         self._running = True
-        logger.info("✅ Subscribed to NATS subject: agent.telegram.update")
+        self._mode = "core"
+        logger.info(f"✅ Subscribed to NATS subject: {UPDATES_SUBJECT}")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Метрики обробки: глибина черги, затримки, активні виклики"""
+        return {"mode": self._mode, "running": self._running, **self._dispatcher.stats()}
     
     async def _handle_telegram_event(self, event: TelegramUpdateEvent):
-        """Обробити подію Telegram та викликати Router"""
+        """
+        Обробити подію Telegram та викликати Router
+
+        Помилки не перехоплюються: диспетчер рахує їх і робить nak,
+        щоб JetStream доставив подію повторно; користувача повідомляє
+        _notify_failure після останньої доставки
+        """
         try:
             metadata = event.metadata or {}
 
@@ -81,68 +254,43 @@ class RouterHandler:
                 logger.debug(f"Skipping event without text: agent={event.agent_id}")
                 return
             
-            # Отримати системний промпт для агента
-            system_prompt = self._get_system_prompt(event.agent_id)
-            
             # Викликати Router через HTTP API
             # Структура: payload.context.system_prompt (як очікує Router)
+            # Шаблон запиту з системним промптом готується один раз на агента
             router_request = {
+                **self._request_template(event.agent_id),
                 "message": event.text,
-                "mode": "chat",
-                "agent": event.agent_id,
-                "source": "telegram",
                 "user_id": f"tg:{event.user_id}",
                 "session_id": f"telegram:{event.chat_id}",
-                "payload": {
-                    "context": {
-                        "agent_name": event.agent_id.upper(),
-                        "system_prompt": system_prompt,  # Системний промпт для агента
-                    }
-                }
             }
+            # Серіалізуємо один раз: ці ж байти йдуть у запит і в лог
+            body = json.dumps(router_request, ensure_ascii=False).encode("utf-8")
             
-            # Детальне логування перед відправкою
-            payload_keys = list(router_request.get('payload', {}).keys())
-            context_keys = list(router_request.get('payload', {}).get('context', {}).keys())
-            sp_len = len(system_prompt) if system_prompt else 0
-            
-            logger.info(
-                f"📞 Calling Router: agent={event.agent_id}, chat={event.chat_id}"
-            )
             logger.info(
-                f"   payload.keys={payload_keys}, "
-                f"context.keys={context_keys}, "
-                f"system_prompt_len={sp_len}"
+                "📞 Calling Router: agent=%s, chat=%s, request_bytes=%d, system_prompt_len=%d",
+                event.agent_id, event.chat_id, len(body), self._prompt_lengths.get(event.agent_id, 0)
             )
-            if system_prompt:
-                logger.info(f"   system_prompt preview: {system_prompt[:80]}...")
             
-            # Логування JSON перед відправкою (з повним system_prompt для діагностики)
-            import json
-            full_json = json.dumps(router_request, ensure_ascii=False)
-            logger.info(f"📤 Full request JSON length: {len(full_json)} bytes")
-            logger.info(f"📤 Payload.context.system_prompt in request: {router_request.get('payload', {}).get('context', {}).get('system_prompt', '')[:100]}...")
+            response = await self._http_client().post(
+                f"{self._router_url}/route",
+                content=body,
+                headers=JSON_HEADERS,
+                timeout=120.0,  # Збільшено timeout до 120 сек
+            )
+            logger.info("📡 Router response status: %s", response.status_code)
             
-            async with httpx.AsyncClient(timeout=120.0) as client:  # Збільшено timeout до 120 сек
-                logger.info(f"📡 Sending HTTP POST to {self._router_url}/route")
-                response = await client.post(
-                    f"{self._router_url}/route",
-                    json=router_request
+            # Перевірка на 502 Bad Gateway
+            if response.status_code == 502:
+                logger.error(f"❌ Router returned 502 Bad Gateway for agent={event.agent_id}")
+                await telegram_listener.send_message(
+                    agent_id=event.agent_id,
+                    chat_id=event.chat_id,
+                    text="⚠️ Вибач, зараз велике навантаження. Спробуй через хвилину."
                 )
-                logger.info(f"📡 Router response status: {response.status_code}")
-                
-                # Перевірка на 502 Bad Gateway
-                if response.status_code == 502:
-                    logger.error(f"❌ Router returned 502 Bad Gateway for agent={event.agent_id}")
-                    await telegram_listener.send_message(
-                        agent_id=event.agent_id,
-                        chat_id=event.chat_id,
-                        text="⚠️ Вибач, зараз велике навантаження. Спробуй через хвилину."
-                    )
-                    return
-                
-                response.raise_for_status()
-                result = response.json()
+                return
+            
+            response.raise_for_status()
+            result = response.json()
             
             # Отримати відповідь
             answer = None
@@ -193,17 +341,15 @@ class RouterHandler:
             
         except httpx.HTTPError as e:
             logger.error(f"❌ HTTP error calling Router: {e}")
-            # Відправити повідомлення про помилку користувачу
-            try:
-                await telegram_listener.send_message(
-                    agent_id=event.agent_id,
-                    chat_id=event.chat_id,
-                    text="❌ Помилка зв'язку з сервером. Спробуй ще раз."
-                )
-            except:
-                pass
-        except Exception as e:
-            logger.error(f"❌ Error handling Telegram event: {e}", exc_info=True)
+            raise
+    
+    async def _notify_failure(self, event: TelegramUpdateEvent):
+        """Повідомити користувача, що подію не вдалося обробити (повторів більше не буде)"""
+        await telegram_listener.send_message(
+            agent_id=event.agent_id,
+            chat_id=event.chat_id,
+            text="❌ Помилка зв'язку з сервером. Спробуй ще раз."
+        )
     
     async def _handle_photo(self, event: TelegramUpdateEvent, metadata: Dict[str, Any]):
         """Обробити фото через Swapper vision-8b модель"""
@@ -231,29 +377,29 @@ class RouterHandler:
             router_request["metadata"]["use_llm"] = "specialist_vision_8b"
             
             try:
-                async with httpx.AsyncClient(timeout=90.0) as client:
-                    response = await client.post(f"{self._router_url}/route", json=router_request)
-                    response.raise_for_status()
-                    result = response.json()
-                    
-                    if result.get("ok"):
-                        answer_text = result.get("data", {}).get("text") or result.get("response", "")
-                        if answer_text:
-                            await telegram_listener.send_message(
-                                agent_id=event.agent_id,
-                                chat_id=event.chat_id,
-                                text=f"✅ **Фото оброблено**\n\n{answer_text}"
-                            )
-                            return
-                    
-                    # Якщо помилка
-                    error_msg = result.get("error", "Unknown error")
-                    logger.error(f"Router error: {error_msg}")
-                    await telegram_listener.send_message(
-                        agent_id=event.agent_id,
-                        chat_id=event.chat_id,
-                        text=f"Вибач, не вдалося обробити фото: {error_msg}"
-                    )
+                client = self._http_client()
+                response = await client.post(f"{self._router_url}/route", json=router_request, timeout=90.0)
+                response.raise_for_status()
+                result = response.json()
+                
+                if result.get("ok"):
+                    answer_text = result.get("data", {}).get("text") or result.get("response", "")
+                    if answer_text:
+                        await telegram_listener.send_message(
+                            agent_id=event.agent_id,
+                            chat_id=event.chat_id,
+                            text=f"✅ **Фото оброблено**\n\n{answer_text}"
+                        )
+                        return
+                
+                # Якщо помилка
+                error_msg = result.get("error", "Unknown error")
+                logger.error(f"Router error: {error_msg}")
+                await telegram_listener.send_message(
+                    agent_id=event.agent_id,
+                    chat_id=event.chat_id,
+                    text=f"Вибач, не вдалося обробити фото: {error_msg}"
+                )
             except Exception as e:
                 logger.error(f"Error calling Router: {e}", exc_info=True)
                 await telegram_listener.send_message(
@@ -291,42 +437,33 @@ class RouterHandler:
             user_question = event.text
             if user_question and user_question != f"[DOCUMENT] {file_name}":
                 # Додати parsed content до контексту
-                system_prompt = self._get_system_prompt(event.agent_id)
-                
                 enhanced_text = f"Користувач запитує про документ '{file_name}':\n{user_question}\n\n[DOCUMENT_CONTENT]:\n{parsed_content[:2000]}"
                 
                 # Викликати Router для відповіді
                 router_request = {
+                    **self._request_template(event.agent_id),
                     "message": enhanced_text,
-                    "mode": "chat",
-                    "agent": event.agent_id,
-                    "source": "telegram",
                     "user_id": f"tg:{event.user_id}",
                     "session_id": f"telegram:{event.chat_id}",
-                    "payload": {
-                        "context": {
-                            "agent_name": event.agent_id.upper(),
-                            "system_prompt": system_prompt,
-                        }
-                    }
                 }
                 
-                async with httpx.AsyncClient(timeout=120.0) as client:
-                    response = await client.post(
-                        f"{self._router_url}/route",
-                        json=router_request
+                client = self._http_client()
+                response = await client.post(
+                    f"{self._router_url}/route",
+                    json=router_request,
+                    timeout=120.0
+                )
+                
+                if response.status_code == 502:
+                    await telegram_listener.send_message(
+                        agent_id=event.agent_id,
+                        chat_id=event.chat_id,
+                        text="⚠️ Вибач, зараз велике навантаження. Спробуй через хвилину."
                     )
-                    
-                    if response.status_code == 502:
-                        await telegram_listener.send_message(
-                            agent_id=event.agent_id,
-                            chat_id=event.chat_id,
-                            text="⚠️ Вибач, зараз велике навантаження. Спробуй через хвилину."
-                        )
-                        return
-                    
-                    response.raise_for_status()
-                    result = response.json()
+                    return
+                
+                response.raise_for_status()
+                result = response.json()
                 
                 # Отримати відповідь
                 answer = (
@@ -369,34 +506,35 @@ class RouterHandler:
         try:
             logger.info(f"📡 Calling Parser Service: url={doc_url[:50]}..., file={file_name}")
             
-            async with httpx.AsyncClient(timeout=90.0) as client:
-                # Виклик DAGI Router з mode: "doc_parse"
-                response = await client.post(
-                    f"{self._router_url}/route",
-                    json={
-                        "mode": "doc_parse",
-                        "agent": "parser",
-                        "payload": {
-                            "context": {
-                                "doc_url": doc_url,
-                                "file_name": file_name,
-                                "output_mode": "markdown"
-                            }
+            client = self._http_client()
+            # Виклик DAGI Router з mode: "doc_parse"
+            response = await client.post(
+                f"{self._router_url}/route",
+                json={
+                    "mode": "doc_parse",
+                    "agent": "parser",
+                    "payload": {
+                        "context": {
+                            "doc_url": doc_url,
+                            "file_name": file_name,
+                            "output_mode": "markdown"
                         }
                     }
-                )
-                response.raise_for_status()
-                result = response.json()
-                
-                # Витягнути parsed content
-                if "data" in result:
-                    markdown = result["data"].get("markdown", "")
-                    if markdown:
-                        return markdown
-                
-                # Fallback
-                return result.get("text", "") or result.get("response", "") or "Документ оброблено"
-                
+                },
+                timeout=90.0
+            )
+            response.raise_for_status()
+            result = response.json()
+            
+            # Витягнути parsed content
+            if "data" in result:
+                markdown = result["data"].get("markdown", "")
+                if markdown:
+                    return markdown
+            
+            # Fallback
+            return result.get("text", "") or result.get("response", "") or "Документ оброблено"
+            
         except Exception as e:
             logger.error(f"❌ Parser Service error: {e}")
             return "[Не вдалося прочитати документ]"
@@ -406,91 +544,82 @@ class RouterHandler:
         try:
             logger.info(f"🔊 Calling TTS Service: text_len={len(text)}")
             
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    "http://dagi-tts:9100/tts",
-                    json={
-                        "text": text[:500],  # Обмежуємо довжину для TTS
-                        "lang": "uk"
-                    }
-                )
-                response.raise_for_status()
-                audio_bytes = response.content
-                
-                logger.info(f"✅ TTS response: {len(audio_bytes)} bytes")
-                return audio_bytes
-                
+            client = self._http_client()
+            response = await client.post(
+                "http://dagi-tts:9100/tts",
+                json={
+                    "text": text[:500],  # Обмежуємо довжину для TTS
+                    "lang": "uk"
+                },
+                timeout=60.0
+            )
+            response.raise_for_status()
+            audio_bytes = response.content
+            
+            logger.info(f"✅ TTS response: {len(audio_bytes)} bytes")
+            return audio_bytes
+            
         except Exception as e:
             logger.error(f"❌ TTS Service error: {e}")
             return b""  # Fallback to text
     
     def _get_system_prompt(self, agent_id: str) -> str:
         """Отримати системний промпт для агента"""
-        # Системні промпти для агентів
-        prompts = {
-            "helion": """Ти - Helion, AI-агент платформи Energy Union екосистеми DAARION.city.
-Допомагай користувачам з технологіями EcoMiner/BioMiner, токеномікою та DAO governance.
-
-Твої основні функції:
-- Консультації з енергетичними технологіями (сонячні панелі, вітряки, біогаз)
-- Пояснення токеноміки Energy Union (ENERGY токен, стейкінг, винагороди)
-- Допомога з onboarding в DAO
-- Відповіді на питання про EcoMiner/BioMiner устаткування
-
-Стиль спілкування:
-- професійний, технічний, але зрозумілий
-- точний у цифрах та даних
-- конструктивний у рекомендаціях
-
-Важливо:
-- Не вигадуй дані, яких немає в системі
-- Якщо дані недоступні — чесно скажи про це
-- Не давай фінансових порад без консультації з експертами""",
-            
-            "daarwizz": """Ти — DAARWIZZ, офіційний AI-агент екосистеми DAARION.city.
-Допомагай учасникам з microDAO, ролями та процесами.
-Відповідай коротко, практично, враховуй RBAC контекст користувача.""",
-            
-            "greenfood": """Ти — GREENFOOD Assistant, фронтовий оркестратор ERP-системи для крафтових виробників, хабів та покупців.
-
-Твоя місія: зрозуміти, хто з тобою говорить (комітент, менеджер складу, логіст, бухгалтер, маркетолог, покупець), виявити намір і делегувати завдання спеціалізованим агентам GREENFOOD.
-
-У твоєму розпорядженні 12 спеціалізованих агентів:
-- Product & Catalog (каталог товарів)
-- Batch & Quality (партії та якість)
-- Vendor Success (успіх комітентів)
-- Warehouse (склад)
-- Logistics & Delivery (доставка)
-- Seller (продажі)
-- Customer Care (підтримка)
-- Finance & Pricing (фінанси)
-- SMM & Campaigns (маркетинг)
-- SEO & Web (SEO)
-- Analytics & BI (аналітика)
-- Compliance & Audit (аудит)
-
-Правила роботи:
-- Спочатку уточнюй роль і контекст
-- Перетворюй запит на чітку дію
-- Не вигадуй дані - якщо чогось немає, чесно кажи
-- Завжди давай коротке резюме: що зроблено, наступні кроки
-
-Відповідай українською, чітко та по-діловому.""",
-        }
-        
-        prompt = prompts.get(agent_id.lower(), "")
+        prompt = SYSTEM_PROMPTS.get(agent_id.lower(), "")
         if prompt:
-            logger.debug(f"Using system prompt for agent={agent_id}, len={len(prompt)}")
+            logger.debug("Using system prompt for agent=%s, len=%d", agent_id, len(prompt))
         else:
             logger.warning(f"No system prompt found for agent={agent_id}")
         
         return prompt
     
+    def _request_template(self, agent_id: str) -> Dict[str, Any]:
+        """
+        Незмінна частина запиту до Router для агента (з системним промптом).
+        Будується один раз; запити лише додають message/user_id/session_id.
+        """
+        template = self._templates.get(agent_id)
+        if template is None:
+            system_prompt = self._get_system_prompt(agent_id)
+            template = {
+                "mode": "chat",
+                "agent": agent_id,
+                "source": "telegram",
+                "payload": {
+                    "context": {
+                        "agent_name": agent_id.upper(),
+                        "system_prompt": system_prompt,  # Системний промпт для агента
+                    }
+                },
+            }
+            self._templates[agent_id] = template
+            self._prompt_lengths[agent_id] = len(system_prompt)
+        return template
+    
+    def _http_client(self) -> httpx.AsyncClient:
+        """Один пул з'єднань на весь час життя обробника (timeout задається на запит)"""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                timeout=120.0,
+                limits=httpx.Limits(
+                    max_connections=settings.UPDATES_MAX_CONCURRENCY * 2,
+                    max_keepalive_connections=settings.UPDATES_MAX_CONCURRENCY,
+                ),
+            )
+        return self._http
+    
     async def close(self):
         """Закрити підписку та з'єднання"""
         self._running = False
+        if self._consumer_task:
+            self._consumer_task.cancel()
+            await asyncio.gather(self._consumer_task, return_exceptions=True)
+        # Дообробити вже прийняті події, щоб вони отримали ack, а не повторну доставку
+        await self._dispatcher.stop(drain=True)
         if self._sub:
             await self._sub.unsubscribe()
+        if self._http and not self._http.is_closed:
+            await self._http.aclose()
         if self._nc and not self._nc.is_closed:
             await self._nc.drain()
             await self._nc.close()
@@ -0,0 +1,281 @@
+"""
+Диспетчер подій agent.telegram.update для RouterHandler
+
+- події одного чату (agent_id, chat_id) обробляються послідовно, у порядку надходження
+- одночасно виконується не більше max_concurrency викликів Router загалом
+  і не більше per_bot_concurrency на одного бота
+- handler сигналізує про помилку винятком: тоді викликається on_failure (nak);
+  on_give_up (повідомлення користувачу) лише коли подію більше не доставлять
+- поки подія чекає в черзі чи обробляється, раз на progress_interval_s
+  викликається on_progress (in_progress), щоб JetStream не доставив її вдруге
+- приймається не більше max_pending подій (в черзі + в обробці);
+  submit() чекає, коли черга повна, тож NATS-споживач перестає забирати нові
+- кілька текстових повідомлень поспіль від одного користувача зливаються в один виклик
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from .models import TelegramUpdateEvent
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[TelegramUpdateEvent], Awaitable[Any]]
+GiveUp = Optional[Callable[[TelegramUpdateEvent], Awaitable[Any]]]
+Callback = Optional[Callable[[], Awaitable[Any]]]
+
+# Скільки останніх значень затримки тримати для метрик
+LAG_WINDOW = 512
+
+
+@dataclass(eq=False)
+class _Pending:
+    event: TelegramUpdateEvent
+    received: float
+    published_at: Optional[datetime] = None
+    on_success: Callback = None
+    on_failure: Callback = None
+    on_progress: Callback = None
+    # Остання доставка: після невдачі подія не повториться
+    last_delivery: bool = True
+    progressed: float = 0.0
+
+
+def _coalescable(event: TelegramUpdateEvent) -> bool:
+    """Тільки звичайний текст: фото, документи і голос обробляються окремо"""
+    if not event.text:
+        return False
+    metadata = event.metadata or {}
+    if "photo" in metadata or "document" in metadata:
+        return False
+    raw_update = event.raw_update or {}
+    return not (raw_update.get("voice") or raw_update.get("audio") or raw_update.get("video_note"))
+
+
+class UpdateDispatcher:
+    """Обмежена конкурентність + послідовні черги на чат + злиття повідомлень"""
+
+    def __init__(
+        self,
+        handler: Handler,
+        max_concurrency: int = 32,
+        per_bot_concurrency: int = 8,
+        max_pending: int = 256,
+        coalesce_window_s: float = 0.0,
+        coalesce_max: int = 10,
+        on_give_up: GiveUp = None,
+        progress_interval_s: float = 0.0,
+    ):
+        self.handler = handler
+        self.on_give_up = on_give_up
+        self.progress_interval_s = max(0.0, progress_interval_s)
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_bot_concurrency = max(1, per_bot_concurrency)
+        self.max_pending = max(1, max_pending)
+        self.coalesce_window_s = max(0.0, coalesce_window_s)
+        self.coalesce_max = max(1, coalesce_max)
+
+        self._lanes: Dict[Tuple[str, int], Deque[_Pending]] = {}
+        self._lane_tasks: Dict[Tuple[str, int], asyncio.Task] = {}
+        self._capacity = asyncio.Semaphore(self.max_pending)
+        self._global = asyncio.Semaphore(self.max_concurrency)
+        self._per_bot: Dict[str, asyncio.Semaphore] = {}
+        # Прийняті, але ще не підтверджені події (для on_progress)
+        self._unacked: Set[_Pending] = set()
+        self._progress_task: Optional[asyncio.Task] = None
+
+        self.pending = 0
+        self.active = 0
+        self.active_per_bot: Dict[str, int] = {}
+        self.processed = 0
+        self.failed = 0
+        self.coalesced = 0
+        # Затримка від отримання (і від публікації в JetStream) до початку обробки
+        self._queue_lag_ms: Deque[float] = deque(maxlen=LAG_WINDOW)
+        self._publish_lag_ms: Deque[float] = deque(maxlen=LAG_WINDOW)
+        # Залишок у стрімі за останнім повідомленням (JetStream num_pending)
+        self.stream_pending: Optional[int] = None
+
+    def free_slots(self) -> int:
+        return self.max_pending - self.pending
+
+    async def submit(
+        self,
+        event: TelegramUpdateEvent,
+        on_success: Callback = None,
+        on_failure: Callback = None,
+        published_at: Optional[datetime] = None,
+        on_progress: Callback = None,
+        last_delivery: bool = True,
+    ):
+        """Поставити подію в чергу її чату; чекає, якщо диспетчер заповнений"""
+        await self._capacity.acquire()
+        self.pending += 1
+        key = (event.agent_id, event.chat_id)
+        now = time.monotonic()
+        item = _Pending(
+            event, now, published_at, on_success, on_failure, on_progress, last_delivery, progressed=now
+        )
+        if on_progress and self.progress_interval_s:
+            self._unacked.add(item)
+            if self._progress_task is None or self._progress_task.done():
+                self._progress_task = asyncio.create_task(self._report_progress())
+
+        lane = self._lanes.get(key)
+        if lane is None:
+            self._lanes[key] = deque([item])
+            self._lane_tasks[key] = asyncio.create_task(self._run_lane(key))
+        else:
+            lane.append(item)
+
+    async def _report_progress(self):
+        """Продовжувати ack_wait подіям, що довго чекають або обробляються"""
+        while self._unacked:
+            await asyncio.sleep(self.progress_interval_s)
+            now = time.monotonic()
+            for item in list(self._unacked):
+                if now - item.progressed < self.progress_interval_s:
+                    continue
+                item.progressed = now
+                try:
+                    await item.on_progress()
+                except Exception as e:
+                    logger.warning(f"⚠️ in_progress failed: chat={item.event.chat_id}: {e}")
+
+    async def _run_lane(self, key: Tuple[str, int]):
+        lane = self._lanes[key]
+        try:
+            while lane:
+                head = lane[0]
+                if self.coalesce_window_s and _coalescable(head.event):
+                    # Дати користувачу дописати серію повідомлень
+                    wait = head.received + self.coalesce_window_s - time.monotonic()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+
+                batch = self._take_batch(lane)
+                event = self._merge(batch)
+                await self._process(event, batch)
+        finally:
+            del self._lanes[key]
+            self._lane_tasks.pop(key, None)
+
+    def _take_batch(self, lane: Deque[_Pending]) -> List[_Pending]:
+        batch = [lane.popleft()]
+        head = batch[0].event
+        if not _coalescable(head):
+            return batch
+        while (
+            lane
+            and len(batch) < self.coalesce_max
+            and lane[0].event.user_id == head.user_id
+            and _coalescable(lane[0].event)
+        ):
+            batch.append(lane.popleft())
+        return batch
+
+    def _merge(self, batch: List[_Pending]) -> TelegramUpdateEvent:
+        if len(batch) == 1:
+            return batch[0].event
+        self.coalesced += len(batch) - 1
+        return batch[0].event.model_copy(update={
+            "text": "\n".join(item.event.text for item in batch),
+            "raw_update": batch[-1].event.raw_update,
+        })
+
+    async def _process(self, event: TelegramUpdateEvent, batch: List[_Pending]):
+        bot_limit = self._per_bot.get(event.agent_id)
+        if bot_limit is None:
+            bot_limit = self._per_bot[event.agent_id] = asyncio.Semaphore(self.per_bot_concurrency)
+
+        ok = False
+        error = None
+        # Спершу слот бота, потім загальний: бот, що впирається у свій ліміт,
+        # не тримає загальні слоти, потрібні іншим ботам
+        async with bot_limit, self._global:
+            self._record_lag(batch[0])
+            self.active += 1
+            self.active_per_bot[event.agent_id] = self.active_per_bot.get(event.agent_id, 0) + 1
+            try:
+                await self.handler(event)
+                ok = True
+                self.processed += len(batch)
+            except Exception as e:
+                error = e
+                self.failed += len(batch)
+                logger.error(f"❌ Update failed: agent={event.agent_id}, chat={event.chat_id}: {e}", exc_info=True)
+            finally:
+                self.active -= 1
+                self.active_per_bot[event.agent_id] -= 1
+
+        # Повідомити користувача лише коли повтору не буде
+        if error is not None and self.on_give_up and any(item.last_delivery for item in batch):
+            try:
+                await self.on_give_up(event)
+            except Exception as e:
+                logger.warning(f"⚠️ Failure notice failed: chat={event.chat_id}: {e}")
+
+        for item in batch:
+            callback = item.on_success if ok else item.on_failure
+            self._unacked.discard(item)
+            self.pending -= 1
+            self._capacity.release()
+            if callback:
+                try:
+                    await callback()
+                except Exception as e:
+                    logger.warning(f"⚠️ Ack/nak failed: chat={event.chat_id}: {e}")
+
+    def _record_lag(self, item: _Pending):
+        self._queue_lag_ms.append((time.monotonic() - item.received) * 1000)
+        if item.published_at is not None:
+            published_at = item.published_at
+            if published_at.tzinfo is None:
+                published_at = published_at.replace(tzinfo=timezone.utc)
+            self._publish_lag_ms.append((datetime.now(timezone.utc) - published_at).total_seconds() * 1000)
+
+    async def stop(self, drain: bool = True, timeout: float = 30.0):
+        """Зупинити обробку (опційно дочекавшись уже прийнятих подій)"""
+        if drain:
+            deadline = time.monotonic() + timeout
+            while self.pending and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+        tasks = list(self._lane_tasks.values())
+        if self._progress_task is not None:
+            tasks.append(self._progress_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @staticmethod
+    def _lag_summary(values: Deque[float]) -> Dict[str, Optional[float]]:
+        if not values:
+            return {"avg_ms": None, "p95_ms": None, "max_ms": None}
+        ordered = sorted(values)
+        return {
+            "avg_ms": round(sum(ordered) / len(ordered), 1),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+            "max_ms": round(ordered[-1], 1),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "per_bot_concurrency": self.per_bot_concurrency,
+            "max_pending": self.max_pending,
+            "queue_depth": self.pending - self.active,
+            "pending": self.pending,
+            "active": self.active,
+            "active_per_bot": {agent: n for agent, n in self.active_per_bot.items() if n},
+            "chats": len(self._lanes),
+            "processed": self.processed,
+            "failed": self.failed,
+            "coalesced": self.coalesced,
+            "stream_pending": self.stream_pending,
+            "queue_lag": self._lag_summary(self._queue_lag_ms),
+            "processing_lag": self._lag_summary(self._publish_lag_ms),
+        }
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Per-message overhead benchmark for RouterHandler._handle_telegram_event
+
+Sends N text updates through the handler against a local stub Router
+(immediate reply) and compares:
+  - per-message: new httpx.AsyncClient per message and a full json.dumps of
+    the request just for logging (previous behaviour, reproduced here)
+  - pooled:      RouterHandler as is (shared client, cached request template,
+    request serialized once)
+
+Telegram sends are replaced by a no-op so only gateway-side work is measured.
+
+Usage:
+    python bench_router_handler.py [--messages 500] [--concurrency 16] [--latency-ms 0]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import httpx
+
+REPLY = json.dumps({"ok": True, "data": {"text": "Відповідь агента"}}).encode()
+
+
+def make_stub_handler(latency_s: float):
+    async def stub_handler(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Minimal HTTP/1.1 keep-alive server imitating Router /route"""
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                if latency_s:
+                    await asyncio.sleep(latency_s)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(REPLY)).encode() + b"\r\n\r\n" + REPLY
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+    return stub_handler
+
+
+def make_per_message_handler(handler):
+    """Previous _handle_telegram_event text path: client and prompt rebuilt per message"""
+    async def handle(event):
+        system_prompt = handler._get_system_prompt(event.agent_id)
+        router_request = {
+            "message": event.text,
+            "mode": "chat",
+            "agent": event.agent_id,
+            "source": "telegram",
+            "user_id": f"tg:{event.user_id}",
+            "session_id": f"telegram:{event.chat_id}",
+            "payload": {
+                "context": {
+                    "agent_name": event.agent_id.upper(),
+                    "system_prompt": system_prompt,
+                }
+            }
+        }
+        full_json = json.dumps(router_request, ensure_ascii=False)
+        assert full_json
+        async with httpx.AsyncClient(timeout=120.0) as client:
+            response = await client.post(f"{handler._router_url}/route", json=router_request)
+            response.raise_for_status()
+            response.json()
+    return handle
+
+
+async def run(label: str, handle, events, concurrency: int):
+    limit = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(event):
+        async with limit:
+            start = time.perf_counter()
+            await handle(event)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    await asyncio.gather(*(one(event) for event in events))
+    elapsed = time.perf_counter() - start
+    cpu_ms = (time.process_time() - cpu_start) * 1000
+
+    latencies.sort()
+    print(
+        f"{label:<12} {len(events) / elapsed:8.1f} msg/s  "
+        f"cpu={cpu_ms / len(events):6.2f} ms/msg  "
+        f"p50={statistics.median(latencies):6.2f} ms  p95={latencies[int(len(latencies) * 0.95)]:6.2f} ms"
+    )
+
+
+async def main_async(args):
+    server = await asyncio.start_server(make_stub_handler(args.latency_ms / 1000), "127.0.0.1", 0)
+    os.environ["ROUTER_BASE_URL"] = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+
+    from app.models import TelegramUpdateEvent
+    from app.router_handler import RouterHandler
+    from app.telegram_listener import telegram_listener
+
+    async def send_message(**kwargs):
+        return None
+
+    telegram_listener.send_message = send_message
+
+    handler = RouterHandler()
+    events = [
+        TelegramUpdateEvent(
+            agent_id=("helion", "daarwizz", "greenfood")[i % 3],
+            bot_id="bot:1",
+            chat_id=1000 + i % 50,
+            user_id=i % 50,
+            text=f"Повідомлення {i}: як працює стейкінг ENERGY?",
+            raw_update={},
+        )
+        for i in range(args.messages)
+    ]
+
+    print(f"{args.messages} messages, concurrency {args.concurrency}, stub latency {args.latency_ms} ms\n")
+    await run("per-message", make_per_message_handler(handler), events, args.concurrency)
+    await run("pooled", handler._handle_telegram_event, events, args.concurrency)
+
+    await handler._http.aclose()
+    server.close()
+    await server.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RouterHandler per-message overhead benchmark")
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
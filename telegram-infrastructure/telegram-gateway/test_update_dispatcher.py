@@ -0,0 +1,134 @@
+"""
+Unit tests for UpdateDispatcher (app/update_dispatcher.py)
+"""
+
+import asyncio
+
+from app.models import TelegramUpdateEvent
+from app.update_dispatcher import UpdateDispatcher
+
+
+def _event(agent_id="daarwizz", chat_id=1, text="hi", user_id=10):
+    return TelegramUpdateEvent(
+        agent_id=agent_id, bot_id=agent_id, chat_id=chat_id, user_id=user_id, text=text, raw_update={}
+    )
+
+
+def test_failed_handler_naks():
+    """Test that a handler exception counts as failure and calls on_failure, not on_success"""
+    acks, naks = [], []
+
+    async def handler(event):
+        if event.text == "boom":
+            raise RuntimeError("router down")
+
+    async def run():
+        dispatcher = UpdateDispatcher(handler)
+
+        async def ack(text):
+            acks.append(text)
+
+        async def nak(text):
+            naks.append(text)
+
+        for chat_id, text in ((1, "boom"), (2, "ok")):
+            await dispatcher.submit(
+                _event(chat_id=chat_id, text=text),
+                on_success=lambda text=text: ack(text),
+                on_failure=lambda text=text: nak(text),
+            )
+        await dispatcher.stop(drain=True, timeout=5)
+        return dispatcher.stats()
+
+    stats = asyncio.run(run())
+
+    assert naks == ["boom"]
+    assert acks == ["ok"]
+    assert stats["failed"] == 1
+    assert stats["processed"] == 1
+    assert stats["pending"] == 0
+
+
+def test_saturated_bot_does_not_hold_global_slots():
+    """Test that a bot blocked on its own limit leaves global slots for other bots"""
+    release = None
+    started = []
+
+    async def handler(event):
+        started.append(event.agent_id)
+        if event.agent_id == "busy":
+            await release.wait()
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        dispatcher = UpdateDispatcher(handler, max_concurrency=2, per_bot_concurrency=1)
+        # Three chats of one bot: one runs, two wait on the per-bot limit
+        for chat_id in (1, 2, 3):
+            await dispatcher.submit(_event(agent_id="busy", chat_id=chat_id))
+        await asyncio.sleep(0.05)
+        await dispatcher.submit(_event(agent_id="other", chat_id=4))
+        await asyncio.sleep(0.05)
+        other_started = "other" in started
+        release.set()
+        await dispatcher.stop(drain=True, timeout=5)
+        return other_started
+
+    assert asyncio.run(run())
+
+
+def test_user_notified_only_on_last_delivery():
+    """Test that on_give_up runs for a failed last delivery, not for one JetStream will redeliver"""
+    notified = []
+
+    async def handler(event):
+        raise RuntimeError("router down")
+
+    async def give_up(event):
+        notified.append(event.chat_id)
+
+    async def run():
+        dispatcher = UpdateDispatcher(handler, on_give_up=give_up)
+        await dispatcher.submit(_event(chat_id=1), last_delivery=False)
+        await dispatcher.submit(_event(chat_id=2), last_delivery=True)
+        await dispatcher.stop(drain=True, timeout=5)
+
+    asyncio.run(run())
+
+    assert notified == [2]
+
+
+def test_queued_events_report_progress():
+    """Test that events waiting behind a slow one get on_progress until they are acked"""
+    release = None
+    progress = []
+
+    async def handler(event):
+        if event.text == "slow":
+            await release.wait()
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        dispatcher = UpdateDispatcher(handler, progress_interval_s=0.02)
+
+        async def in_progress(text):
+            progress.append(text)
+
+        # Different users: the queued event is not merged into the slow one
+        for user_id, text in ((10, "slow"), (11, "queued")):
+            await dispatcher.submit(
+                _event(text=text, user_id=user_id),
+                on_progress=lambda text=text: in_progress(text),
+            )
+        await asyncio.sleep(0.1)
+        release.set()
+        await dispatcher.stop(drain=True, timeout=5)
+        reported = len(progress)
+        await asyncio.sleep(0.05)
+        return reported
+
+    reported = asyncio.run(run())
+
+    assert "slow" in progress and "queued" in progress
+    assert len(progress) == reported
@@ -0,0 +1,134 @@
+"""
+Streaming tests for LLMProvider against a local fake streaming server
+"""
+
+import asyncio
+import json
+
+from http_pool import HTTPClientPool
+from providers.llm_provider import LLMProvider
+from router_models import RouterRequest
+
+
+def _sse_body(tokens):
+    lines = [
+        "data: " + json.dumps({"choices": [{"delta": {"content": tok}}]})
+        for tok in tokens
+    ]
+    lines.append("data: [DONE]")
+    return [line + "\n\n" for line in lines]
+
+
+def _ndjson_body(tokens):
+    lines = [json.dumps({"message": {"content": tok}, "done": False}) for tok in tokens]
+    lines.append(json.dumps({"message": {"content": ""}, "done": True}))
+    return [line + "\n" for line in lines]
+
+
+async def _serve(frames, status=200):
+    """Start a fake upstream that writes `frames` one by one, then closes"""
+    requests = []
+
+    async def handler(reader, writer):
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = 0
+        for line in head.split(b"\r\n"):
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":", 1)[1])
+        requests.append(json.loads(await reader.readexactly(length)))
+        writer.write(
+            f"HTTP/1.1 {status} OK\r\nContent-Type: text/event-stream\r\nConnection: close\r\n\r\n".encode()
+        )
+        for frame in frames:
+            writer.write(frame.encode())
+            await writer.drain()
+            await asyncio.sleep(0.01)
+        writer.close()
+
+    server = await asyncio.start_server(handler, "127.0.0.1", 0)
+    return server, f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}", requests
+
+
+async def _collect(provider, message="hi"):
+    return [chunk async for chunk in provider.stream(RouterRequest(agent="test", message=message))]
+
+
+def test_stream_openai_sse():
+    """Test OpenAI-compatible SSE deltas and final metrics"""
+    async def run():
+        server, base_url, requests = await _serve(_sse_body(["Hel", "lo", "!"]))
+        pool = HTTPClientPool()
+        provider = LLMProvider("llm_test", base_url, "stub", provider_type="openai", http_pool=pool)
+        chunks = await _collect(provider)
+        await pool.aclose()
+        server.close()
+        return chunks, requests
+
+    chunks, requests = asyncio.run(run())
+
+    assert requests[0]["stream"] is True
+    assert "".join(c.delta for c in chunks) == "Hello!"
+    final = chunks[-1]
+    assert final.done and final.error is None
+    assert final.metadata["tokens"] == 3
+    assert final.metadata["ttft_ms"] is not None
+    assert final.metadata["tokens_per_sec"] > 0
+
+
+def test_stream_ollama_ndjson():
+    """Test Ollama branch sends stream=true and accepts NDJSON chunks"""
+    async def run():
+        server, base_url, requests = await _serve(_ndjson_body(["a", "b"]))
+        pool = HTTPClientPool()
+        provider = LLMProvider("llm_test", base_url, "stub", provider_type="ollama", http_pool=pool)
+        chunks = await _collect(provider)
+        await pool.aclose()
+        server.close()
+        return chunks, requests
+
+    chunks, requests = asyncio.run(run())
+
+    assert requests[0]["stream"] is True
+    assert [c.delta for c in chunks if not c.done] == ["a", "b"]
+    assert chunks[-1].done
+
+
+def test_stream_http_error():
+    """Test upstream HTTP error becomes a final error chunk"""
+    async def run():
+        server, base_url, _ = await _serve(["model not found"], status=404)
+        pool = HTTPClientPool()
+        provider = LLMProvider("llm_test", base_url, "stub", http_pool=pool)
+        chunks = await _collect(provider)
+        await pool.aclose()
+        server.close()
+        return chunks
+
+    chunks = asyncio.run(run())
+
+    assert len(chunks) == 1
+    assert chunks[0].done
+    assert chunks[0].error.startswith("HTTP 404")
+
+
+def test_stream_upstream_busy():
+    """Test a stream that gets no pool connection fails as upstream busy, not as a timeout"""
+    async def run():
+        server, base_url, _ = await _serve(_sse_body(["x"] * 50))
+        pool = HTTPClientPool()
+        pool.set_upstream_limits(base_url, 1)
+        provider = LLMProvider("llm_test", base_url, "stub", timeout_s=0.2, http_pool=pool)
+        # First stream holds the only connection for ~0.5s
+        holder = asyncio.create_task(_collect(provider))
+        await asyncio.sleep(0.05)
+        busy = await _collect(provider)
+        held = await holder
+        await pool.aclose()
+        server.close()
+        return held, busy
+
+    held, busy = asyncio.run(run())
+
+    assert held[-1].error is None
+    assert len(busy) == 1
+    assert busy[0].error.startswith("Upstream busy")
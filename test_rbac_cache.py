@@ -0,0 +1,98 @@
+"""
+Unit tests for RBAC cache in rbac_client.py
+"""
+
+import asyncio
+
+import httpx
+
+import rbac_client
+from rbac_client import RBACCache, RBACInfo
+
+
+def _install_resolver(monkeypatch, roles=("member",), delay=0.01, fail=False):
+    calls = []
+
+    async def resolver(dao_id, user_id):
+        calls.append((dao_id, user_id))
+        await asyncio.sleep(delay)
+        if fail:
+            raise httpx.ConnectError("down")
+        return RBACInfo(dao_id=dao_id, user_id=user_id, roles=list(roles), entitlements=["chat.write"])
+
+    monkeypatch.setattr(rbac_client, "_resolve_rbac", resolver)
+    return calls
+
+
+def test_single_flight_and_hits(monkeypatch):
+    """Test that concurrent misses share one upstream call"""
+    calls = _install_resolver(monkeypatch)
+    cache = RBACCache(ttl_s=60, stale_s=0)
+
+    async def run():
+        results = await asyncio.gather(*(cache.get("dao1", "u1") for _ in range(10)))
+        await cache.get("dao1", "u1")
+        return results
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert all(r.roles == ["member"] for r in results)
+    stats = cache.stats()
+    assert stats["misses"] == 10
+    assert stats["coalesced"] == 9
+    assert stats["hits"] == 1
+
+
+def test_stale_while_revalidate(monkeypatch):
+    """Test that expired entries are served while a refresh runs"""
+    calls = _install_resolver(monkeypatch)
+    cache = RBACCache(ttl_s=0, stale_s=60)
+
+    async def run():
+        await cache.get("dao1", "u1")
+        stale = await cache.get("dao1", "u1")
+        await asyncio.sleep(0.05)
+        return stale
+
+    stale = asyncio.run(run())
+
+    assert stale.roles == ["member"]
+    assert len(calls) == 2
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_error_falls_back_to_guest_without_caching(monkeypatch):
+    """Test guest fallback is not cached"""
+    _install_resolver(monkeypatch, fail=True)
+    cache = RBACCache()
+
+    info = asyncio.run(cache.get("dao1", "u1"))
+
+    assert info.roles == ["guest"]
+    assert cache.stats()["size"] == 0
+
+
+def test_membership_events_invalidate(monkeypatch):
+    """Test microdao/dao events drop affected entries"""
+    _install_resolver(monkeypatch)
+    cache = RBACCache()
+
+    async def run():
+        for user in ("u1", "u2"):
+            await cache.get("dao1", user)
+        await cache.get("other", "u1")
+
+        await cache.handle_event("microdao.event.updated", {"microdao_id": "dao1"})
+        assert cache.stats()["size"] == 3
+
+        await cache.handle_event(
+            "microdao.event.member_role_updated",
+            {"microdao_id": "x", "slug": "dao1", "user_id": "u1"},
+        )
+        assert cache.stats()["size"] == 2
+
+        await cache.handle_event("dao.event.deleted", {"dao_id": "dao1"})
+        assert cache.stats()["size"] == 1
+
+    asyncio.run(run())
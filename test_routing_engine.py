@@ -0,0 +1,89 @@
+"""
+Unit tests for routing_engine.py
+"""
+
+from config_loader import RouterConfig
+from router_models import RouterRequest, RouterResponse
+from providers.base import Provider
+from routing_engine import RoutingTable
+
+
+class StubProvider(Provider):
+    async def call(self, req: RouterRequest) -> RouterResponse:
+        return RouterResponse(ok=True, provider_id=self.id)
+
+
+def _make_table(routing, env=None, monkeypatch=None) -> RoutingTable:
+    config = RouterConfig(
+        node={"id": "test-node", "role": "router", "env": "dev"},
+        llm_profiles={
+            name: {"provider": "ollama", "base_url": "http://localhost:11434", "model": name}
+            for name in ("local", "cloud", "science")
+        },
+        routing=routing,
+    )
+    providers = {f"llm_{name}": StubProvider(f"llm_{name}") for name in config.llm_profiles}
+    providers["orchestrator_crewai"] = StubProvider("orchestrator_crewai")
+    return RoutingTable(config, providers)
+
+
+RULES = [
+    {"id": "override", "priority": 1, "when": {"metadata_has": "provider"}, "use_metadata": "provider"},
+    {"id": "crew", "priority": 2, "when": {"mode": "crew"}, "use_provider": "orchestrator_crewai"},
+    {
+        "id": "heavy",
+        "priority": 3,
+        "when": {"agent": "devtools", "and": [{"task_type": ["refactor", "bugfix"]}, {"api_key_available": "TEST_ROUTING_KEY"}]},
+        "use_llm": "cloud",
+    },
+    {"id": "helion", "priority": 5, "when": {"agent": "helion"}, "use_llm": "science"},
+    {"id": "fallback", "priority": 100, "when": {"default": True}, "use_llm": "local"},
+]
+
+
+def test_resolve_by_agent_mode_and_default():
+    """Test index lookup for agent, mode and default rules"""
+    table = _make_table(RULES)
+
+    assert table.resolve_provider(RouterRequest(agent="helion", mode="chat")).id == "llm_science"
+    assert table.resolve_provider(RouterRequest(agent="helion", mode="crew")).id == "orchestrator_crewai"
+    assert table.resolve_provider(RouterRequest(agent="unknown", mode="chat")).id == "llm_local"
+
+
+def test_metadata_override_not_shadowed_by_cache():
+    """Test that payload keys used by rules are part of the decision cache key"""
+    table = _make_table(RULES)
+
+    plain = RouterRequest(agent="helion", mode="chat")
+    override = RouterRequest(agent="helion", mode="chat", payload={"provider": "llm_cloud"})
+
+    assert table.resolve_provider(plain).id == "llm_science"
+    assert table.resolve_provider(override).id == "llm_cloud"
+    assert table.resolve_provider(plain).id == "llm_science"
+    assert table.cache_info()["hits"] == 1
+
+
+def test_api_key_checks_precomputed(monkeypatch):
+    """Test that api_key_available is evaluated at compile time"""
+    monkeypatch.delenv("TEST_ROUTING_KEY", raising=False)
+    table = _make_table(RULES)
+    req = RouterRequest(agent="devtools", mode="chat", payload={"task_type": "bugfix"})
+    assert table.resolve_provider(req).id == "llm_local"
+
+    monkeypatch.setenv("TEST_ROUTING_KEY", "secret")
+    assert table.resolve_provider(req).id == "llm_local"
+
+    table.invalidate_cache()
+    assert table.resolve_provider(req).id == "llm_cloud"
+    assert table.resolve_provider(
+        RouterRequest(agent="devtools", mode="chat", payload={"task_type": "summarize"})
+    ).id == "llm_local"
+
+
+def test_unhashable_fields_fall_back_to_linear_scan():
+    """Test requests whose routing fields cannot be cached"""
+    table = _make_table(RULES)
+    req = RouterRequest(agent="helion", mode="chat", payload={"task_type": ["a", "b"]})
+
+    assert table.resolve_provider(req).id == "llm_science"
+    assert table.cache_info()["size"] == 0
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+HTTP Pool Load Test
+Fires concurrent requests at a local stub upstream and reports p50/p99
+latency with a fresh httpx.AsyncClient per call vs the shared HTTPClientPool.
+
+Usage:
+    python tests/bench_http_pool.py [--requests 2000] [--concurrency 50]
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from http_pool import HTTPClientPool
+
+
+BODY = b'{"choices":[{"message":{"content":"ok"}}],"usage":{"total_tokens":3}}'
+
+
+async def stub_handler(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Minimal HTTP/1.1 keep-alive server returning a fixed JSON body"""
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            if length:
+                await reader.readexactly(length)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                b"Content-Length: " + str(len(BODY)).encode() + b"\r\n\r\n" + BODY
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+
+async def run_load(label: str, call, total: int, concurrency: int):
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            start = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{label:<22} p50={p50:7.2f} ms  p99={p99:7.2f} ms  rps={total / elapsed:8.0f}")
+
+
+async def main_async(args):
+    server = await asyncio.start_server(stub_handler, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}"
+    url = f"{base_url}/v1/chat/completions"
+    body = {"model": "stub", "messages": [{"role": "user", "content": "hi"}]}
+
+    async def unpooled():
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            (await client.post(url, json=body)).raise_for_status()
+
+    pool = HTTPClientPool(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async def pooled():
+        client = pool.get_client(base_url)
+        (await client.post(url, json=body, timeout=10.0)).raise_for_status()
+
+    print(f"Requests: {args.requests}, concurrency: {args.concurrency}\n")
+    await run_load("without pooling", unpooled, args.requests, args.concurrency)
+    await run_load("with shared pool", pooled, args.requests, args.concurrency)
+    print(f"\nPool stats: {pool.stats()}")
+
+    await pool.aclose()
+    server.close()
+    await server.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP pool load test")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Routing Engine Micro-benchmark
+Routes synthetic RouterRequests against a large synthetic rule set and
+reports ns/decision for the linear matcher vs the compiled RoutingTable.
+
+Usage:
+    python tests/bench_routing_engine.py [--rules 500] [--requests 100000]
+"""
+
+import argparse
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config_loader import RouterConfig
+from router_models import RouterRequest, RouterResponse
+from providers.base import Provider
+from routing_engine import RoutingTable, rule_matches
+
+
+MODES = ["chat", "crew", "devtools", "rag_query", "qa_build", "vision_embed"]
+TASK_TYPES = [None, "code_review", "refactor", "bugfix", "test_generation", "summarize"]
+
+
+class NullProvider(Provider):
+    """Provider stub - never called during routing"""
+
+    async def call(self, req: RouterRequest) -> RouterResponse:
+        return RouterResponse(ok=True, provider_id=self.id)
+
+
+def build_config(num_rules: int, num_agents: int) -> RouterConfig:
+    """Synthetic config: mix of agent, mode, task_type and metadata rules"""
+    rnd = random.Random(42)
+    profiles = {
+        f"profile_{i}": {"provider": "ollama", "base_url": "http://localhost:11434", "model": f"m{i}"}
+        for i in range(10)
+    }
+    rules = []
+    for i in range(num_rules):
+        when = {}
+        kind = i % 5
+        if kind in (0, 1, 2):
+            when["agent"] = f"agent_{rnd.randrange(num_agents)}"
+        if kind in (1, 3):
+            when["mode"] = rnd.choice(MODES)
+        if kind == 2:
+            when["and"] = [{"task_type": rnd.sample(TASK_TYPES[1:], 2)}]
+        if kind == 4:
+            when["metadata_has"] = f"flag_{rnd.randrange(5)}"
+        rules.append({
+            "id": f"rule_{i}",
+            "priority": rnd.randrange(1, 100),
+            "when": when,
+            "use_llm": f"profile_{rnd.randrange(10)}",
+        })
+    rules.append({"id": "fallback", "priority": 1000, "when": {"default": True}, "use_llm": "profile_0"})
+
+    return RouterConfig(
+        node={"id": "bench", "role": "router", "env": "dev"},
+        llm_profiles=profiles,
+        routing=rules,
+    )
+
+
+def build_requests(count: int, num_agents: int, distinct: int):
+    """`count` requests drawn from `distinct` routing-relevant shapes"""
+    rnd = random.Random(7)
+    shapes = []
+    for _ in range(distinct):
+        payload = {"context": {"system_prompt": "x" * 200}}
+        task_type = rnd.choice(TASK_TYPES)
+        if task_type:
+            payload["task_type"] = task_type
+        if rnd.random() < 0.2:
+            payload[f"flag_{rnd.randrange(5)}"] = True
+        shapes.append((f"agent_{rnd.randrange(num_agents + 10)}", rnd.choice(MODES), payload))
+
+    requests = []
+    for _ in range(count):
+        agent, mode, payload = rnd.choice(shapes)
+        requests.append(RouterRequest(agent=agent, mode=mode, message="hi", payload=dict(payload)))
+    return requests
+
+
+def linear_resolve(table: RoutingTable, req: RouterRequest) -> Provider:
+    """Pre-compilation behaviour: scan every rule with rule_matches"""
+    matched_rule = None
+    for rule in table.rules:
+        if rule.when.get("default"):
+            continue
+        if rule_matches(rule, req):
+            matched_rule = rule
+            break
+    if not matched_rule:
+        for rule in table.rules:
+            if rule.when.get("default"):
+                matched_rule = rule
+                break
+    return table.providers[table._resolve_provider_id(matched_rule.use_llm, req)]
+
+
+def run(label: str, fn, requests) -> float:
+    start = time.perf_counter_ns()
+    for req in requests:
+        fn(req)
+    elapsed = time.perf_counter_ns() - start
+    ns_per = elapsed / len(requests)
+    print(f"{label:<28} {ns_per:>10.0f} ns/decision  ({elapsed / 1e6:.1f} ms total)")
+    return ns_per
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Routing engine micro-benchmark")
+    parser.add_argument("--rules", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--agents", type=int, default=50)
+    parser.add_argument("--distinct", type=int, default=2000, help="Distinct routing shapes")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    config = build_config(args.rules, args.agents)
+    providers = {f"llm_{name}": NullProvider(f"llm_{name}") for name in config.llm_profiles}
+    table = RoutingTable(config, providers)
+    requests = build_requests(args.requests, args.agents, args.distinct)
+
+    # Sanity: both paths must agree
+    for req in requests[:2000]:
+        assert linear_resolve(table, req) is table.resolve_provider(req), req
+    table.invalidate_cache()
+
+    print(f"Rules: {args.rules}, requests: {args.requests}, distinct shapes: {args.distinct}\n")
+    before = run("before (linear scan)", lambda r: linear_resolve(table, r), requests)
+    after_cold = run("after (compiled, cold)", table.resolve_provider, requests)
+    after_warm = run("after (compiled, warm)", table.resolve_provider, requests)
+
+    print(f"\nCache: {table.cache_info()}")
+    print(f"Speedup: {before / after_cold:.1f}x cold, {before / after_warm:.1f}x warm")
+
+
+if __name__ == "__main__":
+    main()